@@ -0,0 +1,212 @@
+"""
+Admission - Load-aware admission control for /api/offer
+
+Every accepted offer starts a full pipeline (VAD, LLM stream, audio
+transport) on the same event loop as the lanes already talking. Past the
+box's capacity each extra car makes every lane slower, so new offers go
+through `AdmissionController.acquire` first:
+
+- a new lane is admitted only while a lane slot is free, the event loop is
+  keeping up (lag under ADMISSION_MAX_LOOP_LAG_MS) and the process isn't
+  saturating its core (CPU under ADMISSION_MAX_CPU)
+- otherwise the offer waits in a short FIFO queue, if its estimated wait
+  (from recent lane lifetimes) fits ADMISSION_MAX_WAIT_SECS
+- or it is rejected at once with a Retry-After hint, so the car's client
+  retries instead of the box taking on a lane it can't serve
+
+Overload then costs one car a short wait, not every lane its latency.
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from loguru import logger
+
+from lane_manager import LaneManager, lane_manager
+
+DEFAULT_MAX_QUEUE = 4
+DEFAULT_MAX_WAIT_SECS = 15.0
+DEFAULT_MAX_LOOP_LAG_MS = 150.0
+DEFAULT_MAX_CPU = 0.9
+
+# Assumed lane lifetime until some lanes have finished
+DEFAULT_LANE_SECS = 180.0
+
+# How often the loop-lag and CPU probe runs
+PROBE_INTERVAL_SECS = 0.5
+
+# Weight of the newest probe sample in the smoothed lag and CPU
+PROBE_SMOOTHING = 0.3
+
+
+class AdmissionRejected(Exception):
+    """The box can't take another lane now; retry after `retry_after` seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Admits, queues or rejects new lanes based on the box's current load."""
+
+    def __init__(self, lanes: LaneManager, max_queue: int = DEFAULT_MAX_QUEUE,
+                 max_wait: float = DEFAULT_MAX_WAIT_SECS, max_loop_lag_ms: float = DEFAULT_MAX_LOOP_LAG_MS,
+                 max_cpu: float = DEFAULT_MAX_CPU, default_lane_secs: float = DEFAULT_LANE_SECS):
+        self.lanes = lanes
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.max_loop_lag_ms = max_loop_lag_ms
+        self.max_cpu = max_cpu
+        self.default_lane_secs = default_lane_secs
+
+        self.loop_lag_ms = 0.0
+        self.cpu = 0.0
+        # Slots granted to offers that haven't registered their lane yet
+        self.reserved = 0
+        self.waiters = deque()
+        self.counters = {"admitted": 0, "queued": 0, "rejected": 0, "timed_out": 0}
+        self._probe: Optional[asyncio.Task] = None
+        lanes.freed_callbacks.append(self.wake)
+
+    @classmethod
+    def from_env(cls, lanes: LaneManager) -> "AdmissionController":
+        return cls(
+            lanes,
+            max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", DEFAULT_MAX_QUEUE)),
+            max_wait=float(os.getenv("ADMISSION_MAX_WAIT_SECS", DEFAULT_MAX_WAIT_SECS)),
+            max_loop_lag_ms=float(os.getenv("ADMISSION_MAX_LOOP_LAG_MS", DEFAULT_MAX_LOOP_LAG_MS)),
+            max_cpu=float(os.getenv("ADMISSION_MAX_CPU", DEFAULT_MAX_CPU)),
+        )
+
+    def overload_reason(self) -> Optional[str]:
+        """Why a new lane can't start right now, or None if it can."""
+        if self.lanes.active_lanes() + self.reserved >= self.lanes.max_lanes:
+            return "all lanes busy"
+        if self.loop_lag_ms > self.max_loop_lag_ms:
+            return f"event loop lag {self.loop_lag_ms:.0f} ms"
+        if self.cpu > self.max_cpu:
+            return f"cpu {self.cpu:.0%}"
+        return None
+
+    def estimate_wait(self, position: int) -> float:
+        """Seconds until the offer at `position` in the queue gets a slot."""
+        lane_secs = self.lanes.average_lane_secs(self.default_lane_secs)
+        # Lanes finish at about max_lanes per lane lifetime; a busy slot is half done on average
+        return (position + 0.5) * lane_secs / max(1, self.lanes.max_lanes)
+
+    def _reject(self, reason: str, retry_after: float):
+        self.counters["rejected"] += 1
+        self.lanes.reject()
+        raise AdmissionRejected(reason, max(1, math.ceil(retry_after)))
+
+    async def acquire(self):
+        """
+        Reserve a lane slot for a new offer, waiting in the queue if needed
+
+        Call release() once the lane is registered (or the offer failed).
+
+        Raises:
+            AdmissionRejected: the queue is full, the wait would be too long,
+                or the slot didn't free up in time
+        """
+        if not self.waiters and self.overload_reason() is None:
+            self.reserved += 1
+            self.counters["admitted"] += 1
+            return
+
+        position = len(self.waiters)
+        reason = self.overload_reason() or "queue ahead"
+        if position >= self.max_queue:
+            self._reject(f"{reason}, queue full", self.estimate_wait(position))
+        wait = self.estimate_wait(position)
+        if wait > self.max_wait:
+            self._reject(f"{reason}, estimated wait {wait:.0f} s", wait)
+
+        logger.info(f"Admission: queued offer at position {position + 1} ({reason}, ~{wait:.0f} s)")
+        self.counters["queued"] += 1
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # The offer went away while queued; hand back a slot it was just granted
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            waiter.cancel()
+            raise
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+
+        # wake() reserved the slot when it resolved the waiter
+        if not waiter.done() or waiter.cancelled():
+            waiter.cancel()
+            self.counters["timed_out"] += 1
+            self._reject(f"{reason}, no lane freed in {self.max_wait:.0f} s", self.estimate_wait(0))
+        self.counters["admitted"] += 1
+
+    def release(self):
+        """The offer holding a reserved slot has registered its lane or given up."""
+        self.reserved = max(0, self.reserved - 1)
+        self.wake()
+
+    def wake(self):
+        """Hand free slots to queued offers, oldest first."""
+        while self.waiters and self.overload_reason() is None:
+            waiter = self.waiters.popleft()
+            if waiter.done():
+                continue
+            self.reserved += 1
+            waiter.set_result(True)
+
+    async def run_probe(self):
+        """Measure event-loop lag and process CPU, and wake the queue as load drops."""
+        loop = asyncio.get_running_loop()
+        last_wall, last_cpu = time.perf_counter(), time.process_time()
+        while True:
+            expected = loop.time() + PROBE_INTERVAL_SECS
+            await asyncio.sleep(PROBE_INTERVAL_SECS)
+            lag_ms = max(0.0, (loop.time() - expected) * 1000)
+            wall, cpu = time.perf_counter(), time.process_time()
+            cpu_share = (cpu - last_cpu) / max(1e-6, wall - last_wall)
+            last_wall, last_cpu = wall, cpu
+
+            self.loop_lag_ms += PROBE_SMOOTHING * (lag_ms - self.loop_lag_ms)
+            self.cpu += PROBE_SMOOTHING * (cpu_share - self.cpu)
+            self.wake()
+
+    def start(self):
+        if self._probe is None or self._probe.done():
+            self._probe = asyncio.create_task(self.run_probe())
+
+    def stop(self):
+        if self._probe is not None:
+            self._probe.cancel()
+            self._probe = None
+        for waiter in self.waiters:
+            if not waiter.done():
+                waiter.cancel()
+        self.waiters.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "loop_lag_ms": round(self.loop_lag_ms, 1),
+            "cpu": round(self.cpu, 2),
+            "reserved": self.reserved,
+            "queued": len(self.waiters),
+            "overload": self.overload_reason(),
+            "next_wait_secs": round(self.estimate_wait(len(self.waiters)), 1),
+            "counters": dict(self.counters),
+        }
+
+
+# Global controller for run.py's /api/offer
+admission_controller = AdmissionController.from_env(lane_manager)
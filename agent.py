@@ -5,26 +5,36 @@ Voice-enabled AI agent for drive-through ordering system.
 import argparse
 import os
 from datetime import datetime
+from typing import TYPE_CHECKING
 
 from dotenv import load_dotenv
 from loguru import logger
 
 from pipecat.adapters.schemas.function_schema import FunctionSchema
 from pipecat.adapters.schemas.tools_schema import ToolsSchema
-from pipecat.audio.vad.silero import SileroVADAnalyzer
-from pipecat.audio.vad.vad_analyzer import VADParams
 from pipecat.pipeline.pipeline import Pipeline
 from pipecat.pipeline.runner import PipelineRunner
 from pipecat.pipeline.task import PipelineParams, PipelineTask
 from pipecat.processors.aggregators.openai_llm_context import OpenAILLMContext
-from pipecat.services.aws_nova_sonic import AWSNovaSonicLLMService
 from pipecat.services.llm_service import FunctionCallParams
-from pipecat.transports.base_transport import TransportParams
-from pipecat.transports.network.small_webrtc import SmallWebRTCTransport
-from pipecat.transports.network.webrtc_connection import SmallWebRTCConnection
+
+# The VAD model and the WebRTC transport (aiortc) load on the first lane, or
+# earlier when run.py warms WARM_IMPORTS in the background after startup
+if TYPE_CHECKING:
+    from pipecat.transports.network.webrtc_connection import SmallWebRTCConnection
+
+WARM_IMPORTS = (
+    "pipecat.audio.vad.silero",
+    "pipecat.transports.network.small_webrtc",
+    "local_llm_service" if os.getenv("LLM_BACKEND", "nova_sonic").lower() == "local" else "pipecat.services.aws_nova_sonic",
+)
 
 # Import food ordering functionality
 from food_ordering import food_order_function, process_food_order
+from fast_path_parser import DEFAULT_MIN_CONFIDENCE, FastPathOrderProcessor
+from speculative_cart import SpeculativeCartProcessor
+from context_trimmer import ContextTrimProcessor
+from lane_manager import lane_manager
 
 """
 About OpenAILLMContext:
@@ -33,13 +43,50 @@ Despite its name, it does not invoke any OpenAI models - it simply provides a st
 that works with various LLM services, including Amazon Nova Sonic.
 """
 
-# Import menu data for reference in the system prompt
-from menu import get_formatted_menu
+# System prompt and on-demand menu lookup for the compact prompt mode
+from prompts import PROMPT_MODE, PROMPT_MODE_COMPACT, build_system_instruction, count_tokens
+from menu_lookup import menu_lookup_function, process_menu_lookup
+
+# Create tools schema; compact prompts look the menu up instead of carrying it
+if PROMPT_MODE == PROMPT_MODE_COMPACT:
+    tools = ToolsSchema(standard_tools=[food_order_function, menu_lookup_function])
+else:
+    tools = ToolsSchema(standard_tools=[food_order_function])
+
+def create_llm_service():
+    """
+    Create the speech-to-speech LLM service selected by LLM_BACKEND.
+
+    LLM_BACKEND=local uses the scripted offline stand-in (see local_llm_service.py),
+    anything else uses AWS Nova Sonic.
+    """
+    if os.getenv("LLM_BACKEND", "nova_sonic").lower() == "local":
+        from local_llm_service import DEFAULT_SCRIPT_PATH, LocalNovaSonicLLMService
 
-# Create tools schema
-tools = ToolsSchema(standard_tools=[food_order_function])
+        script_path = os.getenv("LOCAL_LLM_SCRIPT", DEFAULT_SCRIPT_PATH)
+        logger.info(f"Using local Nova Sonic stand-in with script {script_path}")
+        return LocalNovaSonicLLMService(script=script_path)
+
+    from pipecat.services.aws_nova_sonic import AWSNovaSonicLLMService
+
+    # Create the AWS Nova Sonic LLM service with built-in TTS
+    return AWSNovaSonicLLMService(
+        secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+        region=os.getenv("AWS_REGION"),  # as of 2025-05-06, us-east-1 is the only supported region
+        voice_id="matthew",  # matthew, tiffany, amy - THIS ENABLES TTS!
+        function_calling_config={
+            "auto_invoke": False,  # Disable automatic function invocation to prevent self-triggering
+            "auto_invoke_threshold": 0.9  # Higher threshold for more conservative function calling
+        }
+    )
+
+async def run_bot(webrtc_connection: "SmallWebRTCConnection", _: argparse.Namespace = None):
+    from pipecat.audio.vad.silero import SileroVADAnalyzer
+    from pipecat.audio.vad.vad_analyzer import VADParams
+    from pipecat.transports.base_transport import TransportParams
+    from pipecat.transports.network.small_webrtc import SmallWebRTCTransport
 
-async def run_bot(webrtc_connection: SmallWebRTCConnection, _: argparse.Namespace = None):
     logger.info(f"Starting bot")
     
     # Load environment variables
@@ -63,175 +110,11 @@ async def run_bot(webrtc_connection: SmallWebRTCConnection, _: argparse.Namespac
         ),
     )
 
-    # Specify initial system instruction with all our improvements
-    system_instruction = (
-        "You are a friendly and welcoming drive-through assistant at Grill Talk restaurant. "
-        "Always greet with 'Welcome to Grill Talk, how can I help you today?' "
-        "Keep responses conversational and warm. Sound like a helpful, patient drive-thru worker. "
-        
-        "CRITICAL FUNCTION CALLING RULES: "
-        "1. When customer mentions food item: FIRST ask clarifying questions (protein, combo, size) "
-        "2. REMEMBER what item they wanted while asking questions "
-        "3. When they answer your question: COMBINE their answer with the original item "
-        "4. Example: Customer wants 'taco' → Ask 'What protein?' → They say 'chicken' → Call order_food({'item_id': 'taco', 'protein': 'chicken'}) "
-        "5. ALWAYS use action='add_item' for new items, NOT 'update_items' "
-        "6. NEVER send empty function calls like {'': ''} "
-        "7. After calling function: Give ONE brief response only "
-        "8. For changes (combo, size), use action='update_items' "
-        "9. For REPLACEMENTS (instead, change to, make that), use action='update_items' "
-        "10. For REMOVALS (remove, delete, take off), use action='remove_item' "
-        "11. When customer is done ordering, use action='confirm_order' "
-        "12. Only use action='finalize' when customer explicitly confirms payment "
-        "13. NEVER call finalize twice - once payment is processed, it's DONE "
-        
-        "MULTI-ITEM REQUESTS: "
-        "- 'burger with no onions and a Coke' → Include BOTH items: [{'item_id': 'burger', 'customizations': ['no_onion']}, {'item_id': 'cola'}] "
-        "- 'taco plus fries' → Include BOTH: [{'item_id': 'taco'}, {'item_id': 'fries'}] "
-        "- 'chicken burger and a drink' → Include BOTH: [{'item_id': 'chicken_burger'}, {'item_id': 'soda'}] "
-        "- ALWAYS parse ALL items mentioned in a single request "
-        "- CRITICAL: Each item MUST have 'item_id' field with the correct menu item name "
-        "- NEVER use empty keys or malformed JSON - always use proper 'item_id': 'value' format "
-        
-        "DRINK RECOGNITION: "
-        "- 'Coke' or 'Cola' → item_id='cola' "
-        "- 'Diet Coke' → item_id='diet_cola' "
-        "- 'Sprite' or 'Lemon-Lime' → item_id='lemon_lime' "
-        "- 'Orange soda' → item_id='orange_soda' "
-        "- 'Iced tea' → item_id='iced_tea' "
-        "- 'Water' → item_id='water' "
-        "- 'Soda' or 'drink' → item_id='soda' "
-        
-        "REPLACEMENT DETECTION: "
-        "- 'make that a chicken burger instead' → action='update_items' with item_id='burger' AND item_id_new='chicken_burger' "
-        "- 'change that to veggie' → action='update_items' with item_id='burger' AND item_id_new='veggie_burger' "
-        "- 'actually make it a combo' → action='update_items' with combo=true "
-        "- ALWAYS include both item_id (current) and item_id_new (target) for replacements "
-        
-        "REMOVAL DETECTION: "
-        "- 'remove the regular burger' → action='remove_item' with item_id='burger' "
-        "- 'take off the fries' → action='remove_item' with item_id='fries' "
-        "- 'delete that item' → action='remove_item' with last item "
-        
-        "RESPONSE STYLE: "
-        "- After adding item: 'Got it! Anything else for you?' (FRIENDLY) "
-        "- After multiple items: 'Perfect! What else can I get you?' (WARM) "
-        "- After replacement: 'Updated! Anything else today?' (SOFT) "
-        "- After removal: 'Removed! What else would you like?' (GENTLE) "
-        "- After payment complete: 'Processing your payment now.' (SHORT - screen handles rest) "
-        "- Use friendly, welcoming tone like a real drive-thru worker "
-        "- Vary responses to avoid repetition "
-        "- Sound helpful and patient, not rushed "
-        
-        "PAYMENT COMPLETION: "
-        "- After finalize succeeds: 'Processing your payment now.' (SHORT) "
-        "- Payment screen will handle the completion message and drive-thru instructions "
-        "- If customer asks to pay again: 'Your payment is already processed. Please drive to the next window.' "
-        "- NEVER try to finalize an already completed order "
-        
-        "ORDERING PROCESS: "
-        "- Customer says food item → CALL order_food(add_item) → Friendly response "
-        "- Customer wants changes/replacements → CALL order_food(update_items) → Warm response "
-        "- Customer is done → CALL order_food(confirm_order) → Read order summary "
-        "- Customer confirms payment → CALL order_food(finalize) → 'Processing your payment now.' "
-        "- Customer asks to pay again → 'Already processed. Drive to next window.' (NO function call) "
-        
-        "RESPONSE VARIATIONS: "
-        "- 'Anything else for you today?' "
-        "- 'What else can I get you?' "
-        "- 'Can I add anything else?' "
-        "- 'Anything else you'd like?' "
-        "- 'What else sounds good?' "
-        "- Mix these up to sound natural and friendly "
-        
-        "CONVERSATION FLOW & CONTEXT MANAGEMENT: "
-        "- When you ask 'What protein would you like for your taco?', REMEMBER the customer wants a TACO "
-        "- When customer responds 'chicken', combine it: taco + chicken = {'item_id': 'taco', 'protein': 'chicken'} "
-        "- When you ask 'What protein for your burger?', REMEMBER the customer wants a BURGER "
-        "- When customer responds 'beef', combine it: burger + beef = {'item_id': 'burger', 'protein': 'beef'} "
-        "- ALWAYS maintain context between question and answer "
-        "- NEVER send empty or malformed function calls "
-        
-        "MULTI-TURN CONVERSATION HANDLING: "
-        "- Turn 1: Customer says 'I want a taco' → You ask 'What protein?' "
-        "- Turn 2: Customer says 'chicken' → You call order_food({'item_id': 'taco', 'protein': 'chicken'}) "
-        "- Turn 3: You ask 'Would you like to make that a combo?' "
-        "- Turn 4: Customer says 'yes' → You call order_food with combo=true "
-        "- MAINTAIN CONTEXT throughout the entire conversation "
-        
-        "CRITICAL: NEVER SEND EMPTY FUNCTION CALLS "
-        "- WRONG: {'action': 'update_items', 'items': [{'': ''}]} "
-        "- RIGHT: {'action': 'add_item', 'items': [{'item_id': 'taco', 'protein': 'chicken'}]} "
-        "- ALWAYS include proper item_id and relevant details "
-        "- VALIDATE your function calls before sending "
-        
-        "INTERRUPTION HANDLING: "
-        "- Be VERY responsive to customer interruptions "
-        "- Stop talking IMMEDIATELY when customer starts speaking "
-        "- Keep responses SHORT to allow for easy interruption "
-        "- If interrupted, acknowledge and continue from where customer left off "
-        "- Don't repeat information if customer interrupts during explanation "
-        "- Be conversational and allow natural back-and-forth "
-        
-        "RESPONSE LENGTH: "
-        "- Keep responses under 15 words when possible "
-        "- Break long explanations into short chunks "
-        "- Pause frequently to allow customer input "
-        "- Ask one question at a time "
-        ""
-        "- When customer orders 'burger' or 'taco' or 'burrito': ASK 'What protein would you like? We have beef, chicken, or steak.' "
-        "- When customer orders single item: ASK 'Would you like to make that a combo for just $1.50 more?' "
-        "- When customer orders regular size: ASK 'Would you like to upgrade to large for just $0.50 more?' "
-        "- When customer orders food without drink: ASK 'Can I get you a drink with that?' "
-        "- After each item: ASK 'Anything else for you today?' "
-        "- Be helpful and natural, not pushy "
-        "- IMPORTANT: Ask questions BEFORE calling order_food function "
-        
-        "CONVERSATION EXAMPLES: "
-        "Example 1 - Taco Order: "
-        "Customer: 'I want a taco' → You: 'What protein would you like for your taco? Beef, chicken, or steak?' "
-        "Customer: 'chicken' → You: Call order_food({'action': 'add_item', 'items': [{'item_id': 'taco', 'protein': 'chicken'}]}) "
-        "Then: 'Great! Would you like to make that a combo?' "
-        
-        "Example 2 - Burger Order: "
-        "Customer: 'I'd like a burger' → You: 'What protein would you like for your burger? Beef, chicken, or steak?' "
-        "Customer: 'beef' → You: Call order_food({'action': 'add_item', 'items': [{'item_id': 'burger', 'protein': 'beef'}]}) "
-        "Then: 'Perfect! Would you like to make that a combo with fries and a drink for just $1.50 more?' "
-        
-        "NEVER FORGET THE ORIGINAL ITEM WHEN PROCESSING ANSWERS! "
-        
-        "PROTEIN CLARIFICATION REQUIRED: "
-        "- burger → ASK: 'What protein would you like for your burger? Beef, chicken, or steak?' "
-        "- taco → ASK: 'What protein would you like for your taco? Beef, chicken, or steak?' "
-        "- burrito → ASK: 'What protein would you like for your burrito? Beef, chicken, or steak?' "
-        "- quesadilla → ASK: 'What protein would you like for your quesadilla? Beef, chicken, or steak?' "
-        "- NEVER add protein items without asking first "
-        
-        "COMBO UPSELLING REQUIRED: "
-        "- Single burger → ASK: 'Would you like to make that a combo with fries and a drink for just $1.50 more?' "
-        "- Single taco → ASK: 'Would you like to make that a combo?' "
-        "- Any single item → Suggest combo upgrade "
-        "- Wait for customer response before processing "
-        
-        "SIZE UPSELLING: "
-        "- Regular fries → ASK: 'Would you like to upgrade to large fries for just $0.50 more?' "
-        "- Regular drink → ASK: 'Would you like to make that a large drink?' "
-        "- Offer size upgrades naturally "
-        
-        f"MENU: {get_formatted_menu()} "
-        f"{AWSNovaSonicLLMService.AWAIT_TRIGGER_ASSISTANT_RESPONSE_INSTRUCTION}"
-    )
+    llm = create_llm_service()
 
-    # Create the AWS Nova Sonic LLM service with built-in TTS
-    llm = AWSNovaSonicLLMService(
-        secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-        access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-        region=os.getenv("AWS_REGION"),  # as of 2025-05-06, us-east-1 is the only supported region
-        voice_id="matthew",  # matthew, tiffany, amy - THIS ENABLES TTS!
-        function_calling_config={
-            "auto_invoke": False,  # Disable automatic function invocation to prevent self-triggering
-            "auto_invoke_threshold": 0.9  # Higher threshold for more conservative function calling
-        }
-    )
+    # Specify initial system instruction (PROMPT_MODE=compact for the short core prompt)
+    system_instruction = build_system_instruction(llm.AWAIT_TRIGGER_ASSISTANT_RESPONSE_INSTRUCTION, PROMPT_MODE)
+    logger.info(f"Using {PROMPT_MODE} system prompt ({count_tokens(system_instruction)} tokens)")
 
     # Register the food ordering function
     print("Registering order_food function with process_food_order handler")
@@ -239,6 +122,9 @@ async def run_bot(webrtc_connection: SmallWebRTCConnection, _: argparse.Namespac
     llm.register_function("order_food", process_food_order)
     print("Successfully registered order_food function")
     logger.info("Successfully registered order_food function")
+    if PROMPT_MODE == PROMPT_MODE_COMPACT:
+        llm.register_function("menu_lookup", process_menu_lookup)
+        logger.info("Registered menu_lookup function for compact prompt mode")
 
     # Set up context and context management
     context = OpenAILLMContext(
@@ -253,12 +139,33 @@ async def run_bot(webrtc_connection: SmallWebRTCConnection, _: argparse.Namespac
     )
     context_aggregator = llm.create_context_aggregator(context)
 
+    # Optionally keep the context within CONTEXT_TOKEN_BUDGET on long orders (CONTEXT_TRIM_ENABLED=1).
+    # Only context-driven backends see it; Nova Sonic keeps its own history once the session starts.
+    context_trim = []
+    if os.getenv("CONTEXT_TRIM_ENABLED", "0").lower() in ("1", "true", "yes"):
+        context_trim = [ContextTrimProcessor()]
+
+    # Optionally prepare cart lines from interim transcripts ahead of the tool call (SPECULATIVE_CART_ENABLED=1)
+    speculative = []
+    if os.getenv("SPECULATIVE_CART_ENABLED", "0").lower() in ("1", "true", "yes"):
+        speculative = [SpeculativeCartProcessor()]
+
+    # Optionally apply simple orders straight from the transcript (FAST_PATH_ENABLED=1)
+    fast_path = []
+    if os.getenv("FAST_PATH_ENABLED", "0").lower() in ("1", "true", "yes"):
+        min_confidence = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", DEFAULT_MIN_CONFIDENCE))
+        fast_path = [FastPathOrderProcessor(process_food_order, min_confidence=min_confidence)]
+        logger.info(f"Fast-path order parser enabled (min confidence {min_confidence})")
+
     # Build the pipeline
     pipeline = Pipeline(
         [
             transport.input(),
             context_aggregator.user(),
+            *context_trim,
             llm,
+            *speculative,
+            *fast_path,
             transport.output(),
             context_aggregator.assistant(),
         ]
@@ -277,6 +184,9 @@ async def run_bot(webrtc_connection: SmallWebRTCConnection, _: argparse.Namespac
         ),
     )
 
+    # Let run.py's lane manager cancel this pipeline if the lane dies without closing
+    lane_manager.attach_pipeline_task(webrtc_connection.pc_id, task)
+
     # Handle client connection event
     @transport.event_handler("on_client_connected")
     async def on_client_connected(transport, client):
@@ -253,6 +253,33 @@ async def get_websocket_orders():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve WebSocket orders: {str(e)}")
 
+@router.get("/api/orders/{invoice_id}/events")
+async def get_order_events(invoice_id: str):
+    """Get the lifecycle event stream for an order."""
+    try:
+        from order_events import order_events
+        events = order_events.events(invoice_id)
+        return {
+            "status": "success",
+            "invoice_id": invoice_id,
+            "events": [{"seq": event.seq, **event.message} for event in events],
+            "count": len(events)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve order events: {str(e)}")
+
+@router.get("/api/order-analytics")
+async def get_order_analytics():
+    """Get running order metrics from the order event stream."""
+    try:
+        from order_events import analytics_projection
+        return {
+            "status": "success",
+            "analytics": analytics_projection.summary()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve order analytics: {str(e)}")
+
 class DriveThruMessage(BaseModel):
     message: str
 
@@ -0,0 +1,187 @@
+"""
+Cart Worker - Runs order-line building off the event loop
+
+Adding items (normalizing the request, building each line, duplicate
+merging, pricing, descriptions and their logging) is pure work on the cart,
+but it used to run on the Pipecat loop between other lanes' audio frames.
+With CART_WORKER_MODE=thread (or process) it runs in a worker pool instead:
+
+1. the loop takes a snapshot of the cart (copies of its lines, and which
+   one was added last)
+2. a worker replays the request against a scratch OrderSession built from
+   the snapshot, with the same code the inline path uses, and returns the
+   difference as OrderSession.apply_operations operations
+3. back on the loop the operations are applied in one transaction, so undo
+   and rollback work as before
+
+If the cart changed while the worker ran, the plan is discarded and the
+request is processed inline. CART_WORKER_MODE=off (the default) keeps
+everything on the loop.
+"""
+
+import asyncio
+import copy
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+CART_WORKER_MODE_OFF = "off"
+CART_WORKER_MODE_THREAD = "thread"
+CART_WORKER_MODE_PROCESS = "process"
+
+DEFAULT_WORKERS = 2
+
+# Smaller requests cost less than the hand-off to a worker
+DEFAULT_MIN_ITEMS = 2
+
+
+def snapshot_cart(session):
+    """
+    Copy the parts of a session a worker needs
+
+    Returns:
+        tuple: (lines, last_item_index) - copies of the order lines, and the
+        index of the line added last (None if none)
+    """
+    lines = [dict(item) for item in session.current_order_items]
+    last_item_index = None
+    for i in range(len(session.current_order_items) - 1, -1, -1):
+        if session.current_order_items[i] is session.last_item_added:
+            last_item_index = i
+            break
+    return lines, last_item_index
+
+
+def diff_cart(before: List[Dict], after: List[Dict]) -> List[tuple]:
+    """Operations that turn cart `before` into `after` (lines are only updated or appended)."""
+    operations = []
+    for i, (old, new) in enumerate(zip(before, after)):
+        if old != new:
+            operations.append(("update", i, {key: value for key, value in new.items() if old.get(key) != value}))
+    for item in after[len(before):]:
+        operations.append(("add", item))
+    return operations
+
+
+def plan_items(lines: List[Dict], last_item_index: Optional[int], items: List[Dict],
+               special_instructions: str = "") -> Dict:
+    """
+    Work out how a request changes a cart, without touching the real session
+
+    Runs in the worker. Uses process_items against a scratch session, so the
+    result is exactly what the inline path would do.
+
+    Returns:
+        dict: operations (for apply_operations), last_item_index,
+        processed_indexes (cart indexes of the added or merged lines) and
+        duplicate_items
+    """
+    from food_ordering import process_items
+    from order_session import OrderSession
+
+    scratch = OrderSession()
+    scratch.is_order_active = True
+    scratch.current_order_items = [dict(item) for item in lines]
+    if last_item_index is not None:
+        scratch.last_item_added = scratch.current_order_items[last_item_index]
+
+    processed_items, duplicate_items = process_items(copy.deepcopy(items), special_instructions, session=scratch)
+
+    def index_of(item):
+        for i in range(len(scratch.current_order_items) - 1, -1, -1):
+            if scratch.current_order_items[i] is item:
+                return i
+        return None
+
+    return {
+        "operations": diff_cart(lines, scratch.current_order_items),
+        "last_item_index": index_of(scratch.last_item_added),
+        "processed_indexes": [index_of(item) for item in processed_items],
+        "duplicate_items": duplicate_items,
+    }
+
+
+def apply_plan(session, plan: Dict):
+    """
+    Apply a worker's plan to the session on the loop
+
+    Returns:
+        tuple: (processed_items, duplicate_items), as from process_items
+    """
+    if not session.is_order_active:
+        session.start_new_order()
+    session.apply_operations(plan["operations"], "add_item")
+    if plan["last_item_index"] is not None:
+        session.last_item_added = session.current_order_items[plan["last_item_index"]]
+    if any(operation[0] == "add" for operation in plan["operations"]):
+        session.last_item_timestamp = time.time()
+    processed_items = [session.current_order_items[i] for i in plan["processed_indexes"] if i is not None]
+    return processed_items, plan["duplicate_items"]
+
+
+class CartWorkerPool:
+    """Lazily started thread or process pool for plan_items."""
+
+    def __init__(self, mode: str = CART_WORKER_MODE_OFF, workers: int = DEFAULT_WORKERS,
+                 min_items: int = DEFAULT_MIN_ITEMS):
+        self.mode = mode
+        self.workers = workers
+        self.min_items = min_items
+        self.counters = {"offloaded": 0, "inline": 0, "conflicts": 0, "errors": 0}
+        self._executor: Optional[Executor] = None
+
+    @classmethod
+    def from_env(cls) -> "CartWorkerPool":
+        return cls(
+            mode=os.getenv("CART_WORKER_MODE", CART_WORKER_MODE_OFF).lower(),
+            workers=int(os.getenv("CART_WORKERS", DEFAULT_WORKERS)),
+            min_items=int(os.getenv("CART_WORKER_MIN_ITEMS", DEFAULT_MIN_ITEMS)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in (CART_WORKER_MODE_THREAD, CART_WORKER_MODE_PROCESS)
+
+    def should_offload(self, items) -> bool:
+        return self.enabled and len(items) >= self.min_items
+
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == CART_WORKER_MODE_PROCESS:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="cart-worker")
+            logger.info(f"Cart worker: started {self.workers} {self.mode} workers")
+        return self._executor
+
+    async def plan(self, session, items, special_instructions=""):
+        """
+        Plan a request in the pool against a snapshot of the session's cart
+
+        Returns:
+            The plan, or None if it is stale (the cart changed meanwhile)
+        """
+        lines, last_item_index = snapshot_cart(session)
+        invoice_id = session.current_invoice_id
+        loop = asyncio.get_running_loop()
+        plan = await loop.run_in_executor(
+            self.executor(), plan_items, lines, last_item_index, items, special_instructions
+        )
+        if session.current_invoice_id != invoice_id or snapshot_cart(session) != (lines, last_item_index):
+            self.counters["conflicts"] += 1
+            logger.info("Cart worker: cart changed while planning, processing inline")
+            return None
+        self.counters["offloaded"] += 1
+        return plan
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Global pool used by process_food_order
+cart_worker_pool = CartWorkerPool.from_env()
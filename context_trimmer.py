@@ -0,0 +1,158 @@
+"""
+Context Trimmer - Keeps the conversation context bounded on long orders
+
+Every turn and every `order_food` call/result pair is appended to the
+`OpenAILLMContext`, so a big family order drags an ever longer history into
+each LLM turn. `ContextTrimProcessor` sits between the user context
+aggregator and the LLM and, before each context frame reaches the model:
+
+1. keeps the system prompt(s) as they are,
+2. collapses completed tool-call/result pairs into one "current order"
+   message built from the cart (the cart is the only thing those results
+   still matter for),
+3. drops the oldest remaining turns until the context fits a token budget.
+
+The tool calls of the turn in progress (after the last user message) are
+never touched, so the model always sees the result it is answering.
+
+Trimming only helps backends that read the context frame on every turn
+(the local stand-in, or a text LLM service). Nova Sonic takes the context
+once when its session starts and keeps the conversation history on the
+server side, so it sees no difference. Off unless CONTEXT_TRIM_ENABLED=1.
+"""
+
+import json
+import os
+
+from loguru import logger
+from pipecat.frames.frames import Frame
+from pipecat.processors.aggregators.openai_llm_context import OpenAILLMContextFrame
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+from prompts import count_tokens
+
+# Token budget for everything except the system prompt
+DEFAULT_CONTEXT_TOKEN_BUDGET = 1500
+
+CART_STATE_PREFIX = "CURRENT ORDER: "
+
+# Catering-sized carts are summarized past this many lines
+MAX_CART_STATE_LINES = 30
+
+
+def current_cart_state():
+    """Describe the current order session's cart in one line."""
+    from food_ordering import current_order_session
+
+    items = current_order_session.current_order_items
+    if not items:
+        return f"{CART_STATE_PREFIX}empty"
+    lines = "; ".join(
+        f"{item.get('description', item.get('item_id'))} ${item.get('price', 0):.2f}" for item in items[:MAX_CART_STATE_LINES]
+    )
+    if len(items) > MAX_CART_STATE_LINES:
+        lines += f"; and {len(items) - MAX_CART_STATE_LINES} more lines"
+    total = sum(item.get("price", 0) for item in items)
+    return f"{CART_STATE_PREFIX}{lines}. Total ${total:.2f}"
+
+
+def message_tokens(message):
+    """Approximate tokens a message adds to the context."""
+    content = message.get("content")
+    if not isinstance(content, str):
+        content = json.dumps(content) if content else ""
+    if message.get("tool_calls"):
+        content += json.dumps(message["tool_calls"])
+    return count_tokens(content) + 4
+
+
+def _is_cart_state(message):
+    content = message.get("content")
+    return message.get("role") == "system" and isinstance(content, str) and content.startswith(CART_STATE_PREFIX)
+
+
+class ContextTrimmer:
+    """Collapses tool traffic and trims history to a token budget."""
+
+    def __init__(self, token_budget=DEFAULT_CONTEXT_TOKEN_BUDGET, cart_state=current_cart_state):
+        self.token_budget = token_budget
+        self.cart_state = cart_state
+        self.collapsed_calls = 0
+        self.dropped_messages = 0
+
+    def trim(self, messages):
+        """
+        Return a trimmed copy of a message list
+
+        Args:
+            messages: Context messages, system prompt first
+
+        Returns:
+            list: The messages to send to the model
+        """
+        system = []
+        index = 0
+        while index < len(messages) and messages[index].get("role") == "system" and not _is_cart_state(messages[index]):
+            system.append(messages[index])
+            index += 1
+        history = [m for m in messages[index:] if not _is_cart_state(m)]
+        had_cart_state = len(history) < len(messages) - index
+
+        # Tool calls after the last user message belong to the turn in progress
+        last_user = max((i for i, m in enumerate(history) if m.get("role") == "user"), default=0)
+        settled, current = history[:last_user], history[last_user:]
+
+        kept = []
+        collapsed = 0
+        for message in settled:
+            if message.get("role") == "tool" or message.get("tool_calls"):
+                collapsed += 1
+                # Keep any words the assistant said alongside its tool call
+                if message.get("role") == "assistant" and message.get("content"):
+                    kept.append({"role": "assistant", "content": message["content"]})
+                continue
+            kept.append(message)
+        self.collapsed_calls += collapsed
+
+        history = kept + current
+        if collapsed or had_cart_state:
+            system = system + [{"role": "system", "content": self.cart_state()}]
+
+        budget = self.token_budget
+        total = sum(message_tokens(m) for m in history)
+        protected = len(current)
+        while total > budget and len(history) > protected:
+            dropped = history.pop(0)
+            total -= message_tokens(dropped)
+            self.dropped_messages += 1
+
+        return system + history
+
+
+class ContextTrimProcessor(FrameProcessor):
+    """
+    Trims the LLM context in place before each context frame reaches the LLM.
+
+    Place it between the user context aggregator and the LLM service.
+    """
+
+    def __init__(self, token_budget=None, trimmer=None, **kwargs):
+        super().__init__(**kwargs)
+        if token_budget is None:
+            token_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", DEFAULT_CONTEXT_TOKEN_BUDGET))
+        self._trimmer = trimmer or ContextTrimmer(token_budget)
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, OpenAILLMContextFrame):
+            try:
+                messages = frame.context.get_messages()
+                trimmed = self._trimmer.trim(messages)
+                if trimmed != messages:
+                    logger.debug(f"CONTEXT TRIM: {len(messages)} -> {len(trimmed)} messages")
+                    frame.context.set_messages(trimmed)
+            except Exception as e:
+                logger.warning(f"CONTEXT TRIM: left context untouched: {e}")
+
+        await self.push_frame(frame, direction)
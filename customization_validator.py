@@ -2,6 +2,8 @@
 Customization Validator - Fixes contradictory order customizations
 """
 
+from keyword_matcher import apply_corrections, scan_intents
+
 def validate_and_fix_customizations(customizations, user_input=""):
     """
     Validate and fix contradictory customizations
@@ -79,31 +81,11 @@ def clean_speech_transcription(text):
     
     print(f"CLEANING TRANSCRIPTION: {text}")
     
-    # Common speech recognition errors in food orders
-    corrections = {
-        # Contradictory phrases
-        'no cheese extra cheese': 'extra cheese',
-        'no onion extra onion': 'extra onion',
-        'no lettuce extra lettuce': 'extra lettuce',
-        'with no cheese extra cheese': 'with extra cheese',
-        'with no onion extra onion': 'with extra onion',
-        
-        # Common misheard words
-        'no cheese and extra cheese': 'extra cheese',
-        'no onions and extra onions': 'extra onions',
-        'without cheese but extra cheese': 'extra cheese',
-        
-        # Redundant phrases
-        'extra extra cheese': 'extra cheese',
-        'no no onions': 'no onions',
-    }
-    
-    cleaned_text = text.lower()
-    
-    for error, correction in corrections.items():
-        if error in cleaned_text:
-            cleaned_text = cleaned_text.replace(error, correction)
-            print(f"TRANSCRIPTION CORRECTED: '{error}' → '{correction}'")
+    # Single pass over the precompiled correction phrases
+    cleaned_text, applied = apply_corrections(text)
+    
+    for error, correction in applied:
+        print(f"TRANSCRIPTION CORRECTED: '{error}' → '{correction}'")
     
     # Restore original case for first letter
     if text and cleaned_text:
@@ -122,22 +104,11 @@ def analyze_order_intent(user_input, existing_items):
     Returns:
         'add' or 'modify'
     """
-    user_lower = user_input.lower()
-    
-    # Keywords that indicate adding new item
-    add_keywords = [
-        'another', 'second', 'also', 'add', 'plus', 'and',
-        'can i have', 'i want', 'i need', 'give me'
-    ]
-    
-    # Keywords that indicate modification
-    modify_keywords = [
-        'change', 'modify', 'update', 'make that', 'instead',
-        'actually', 'correction', 'fix'
-    ]
+    matches = scan_intents(user_input)
     
-    add_score = sum(1 for keyword in add_keywords if keyword in user_lower)
-    modify_score = sum(1 for keyword in modify_keywords if keyword in user_lower)
+    # Each distinct add/modify keyword counts once (tables live in keyword_matcher)
+    add_score = len(matches.get('add', []))
+    modify_score = len(matches.get('modify', []))
     
     print(f"INTENT ANALYSIS: add_score={add_score}, modify_score={modify_score}")
     
@@ -0,0 +1,166 @@
+"""
+Display Codec - Wire encodings for display and transcription messages
+
+A display picks its encoding when it connects, with ?encoding= on the URL;
+the welcome message says which one it got (unknown or unavailable ones fall
+back to json):
+
+- json: the messages as they are today (the default)
+- compact: JSON text with short keys (COMPACT_KEYS), money as integer
+  cents, timestamps as epoch milliseconds and null fields left out
+- msgpack: the compact form as a binary MessagePack frame, when the
+  msgpack package is installed
+
+Control messages (welcome, pong, subscribed) stay JSON text so a client can
+read them before it decodes anything else. Each broadcast is encoded once
+per encoding in use, not once per connection.
+
+permessage-deflate is negotiated by both WebSocket servers; it is on unless
+DISPLAY_WS_COMPRESSION=off. See wire_benchmark.py for bytes and encode cost
+of each encoding at realistic cart sizes, with and without deflate.
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, Optional, Union
+from urllib.parse import parse_qs, urlparse
+
+try:
+    import msgpack
+except ImportError:  # optional; the msgpack encoding is offered only when it is installed
+    msgpack = None
+
+ENCODING_JSON = "json"
+ENCODING_COMPACT = "compact"
+ENCODING_MSGPACK = "msgpack"
+
+COMPACT_KEYS = {
+    # Messages
+    "type": "t",
+    "invoice_id": "i",
+    "items": "l",
+    "status": "s",
+    "timestamp": "ts",
+    "lane": "ln",
+    "order": "o",
+    "total": "tot",
+    "total_price": "tot",
+    "text": "x",
+    "isFinal": "f",
+    "message": "m",
+    # Order lines
+    "item_id": "id",
+    "quantity": "q",
+    "size": "sz",
+    "combo": "c",
+    "combo_type": "ct",
+    "customizations": "cu",
+    "protein": "pr",
+    "drink_choice": "dr",
+    "description": "d",
+    "price": "p",
+}
+EXPANDED_KEYS = {short: key for key, short in COMPACT_KEYS.items() if key != "total_price"}
+
+# Sent as integer cents and epoch milliseconds in the compact forms
+MONEY_KEYS = frozenset({"price", "total", "total_price"})
+TIME_KEYS = frozenset({"timestamp"})
+
+
+def available_encodings():
+    encodings = [ENCODING_JSON, ENCODING_COMPACT]
+    if msgpack is not None:
+        encodings.append(ENCODING_MSGPACK)
+    return encodings
+
+
+def negotiate(requested: Optional[str]) -> str:
+    """The encoding a client gets for what it asked for."""
+    requested = (requested or ENCODING_JSON).lower()
+    return requested if requested in available_encodings() else ENCODING_JSON
+
+
+def requested_encoding(path: Optional[str]) -> Optional[str]:
+    """The ?encoding= a client connected with, if any."""
+    if not path:
+        return None
+    values = parse_qs(urlparse(path).query).get("encoding")
+    return values[0] if values else None
+
+
+def _epoch_ms(value):
+    if isinstance(value, str):
+        try:
+            return int(datetime.fromisoformat(value).timestamp() * 1000)
+        except ValueError:
+            return value
+    return value
+
+
+def compact(value):
+    """The compact form of a message: short keys, cents, epoch ms, no nulls."""
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            if item is None:
+                continue
+            if key in MONEY_KEYS and isinstance(item, (int, float)) and not isinstance(item, bool):
+                item = int(round(item * 100))
+            elif key in TIME_KEYS:
+                item = _epoch_ms(item)
+            else:
+                item = compact(item)
+            result[COMPACT_KEYS.get(key, key)] = item
+        return result
+    if isinstance(value, list):
+        return [compact(item) for item in value]
+    return value
+
+
+def expand(value):
+    """Long keys back for a compact message (cents and epoch ms are left as they are)."""
+    if isinstance(value, dict):
+        return {EXPANDED_KEYS.get(key, key): expand(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [expand(item) for item in value]
+    return value
+
+
+def encode(message: Dict, encoding: str, json_text: Optional[str] = None) -> Union[str, bytes]:
+    """
+    Encode a message for the wire
+
+    Args:
+        message: The message dict
+        encoding: ENCODING_JSON, ENCODING_COMPACT or ENCODING_MSGPACK
+        json_text: The message already serialized as JSON (e.g. an order event's), reused for json
+    """
+    if encoding == ENCODING_COMPACT:
+        return json.dumps(compact(message), separators=(",", ":"))
+    if encoding == ENCODING_MSGPACK:
+        return msgpack.packb(compact(message))
+    return json_text if json_text is not None else json.dumps(message)
+
+
+class EncodedMessage:
+    """A message encoded lazily, once per encoding, for one broadcast."""
+
+    def __init__(self, message: Dict, json_text: Optional[str] = None):
+        self.message = message
+        self._encoded: Dict[str, Union[str, bytes]] = {}
+        if json_text is not None:
+            self._encoded[ENCODING_JSON] = json_text
+
+    def get(self, encoding: str) -> Union[str, bytes]:
+        encoded = self._encoded.get(encoding)
+        if encoded is None:
+            encoded = self._encoded[encoding] = encode(self.message, encoding)
+        return encoded
+
+
+def compression() -> Optional[str]:
+    """permessage-deflate setting for websockets.serve (DISPLAY_WS_COMPRESSION=off disables it)."""
+    if os.getenv("DISPLAY_WS_COMPRESSION", "deflate").lower() in ("0", "off", "false", "no", "none"):
+        return None
+    return "deflate"
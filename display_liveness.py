@@ -0,0 +1,190 @@
+"""
+Display Liveness - Ping/pong keepalive for the order display WebSockets
+
+Each display connection is kept in a timer wheel: a ring of one-second
+buckets that a single task advances every TICK_SECS. A connection sits in the
+bucket for its next deadline, so a tick only touches the connections that
+are due, and adding, rescheduling or dropping one is O(1) however many
+displays are connected. When a connection comes due it is either
+
+- sent a protocol-level ping (browsers answer these themselves) and moved
+  to the bucket DISPLAY_PONG_TIMEOUT_SECS ahead, or
+- checked for the pong to that ping: if it arrived the connection waits
+  DISPLAY_PING_INTERVAL_SECS for its next ping, if not it is evicted at once
+
+Pings due in the same tick go out together, and a connection whose write
+buffer won't take a ping within the timeout is evicted too. This replaces
+both websockets' own keepalive task per connection and the JSON heartbeats.
+"""
+
+import asyncio
+import math
+import os
+from typing import Callable, Dict, List, Optional, Set
+
+from loguru import logger
+
+DEFAULT_PING_INTERVAL_SECS = 20.0
+DEFAULT_PONG_TIMEOUT_SECS = 10.0
+TICK_SECS = 1.0
+
+# What a connection is waiting for in the wheel
+WAITING_PING = "ping"
+WAITING_PONG = "pong"
+
+
+def _pong_received(pong_waiter) -> bool:
+    return (pong_waiter is not None and pong_waiter.done() and not pong_waiter.cancelled()
+            and pong_waiter.exception() is None)
+
+
+class _Entry:
+    __slots__ = ("websocket", "slot", "waiting", "pong_waiter")
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.slot = -1
+        self.waiting = WAITING_PING
+        self.pong_waiter = None
+
+
+class LivenessManager:
+    """Timer wheel of display connections, pinging each and evicting the ones that stop answering."""
+
+    def __init__(self, ping_interval: float = DEFAULT_PING_INTERVAL_SECS,
+                 pong_timeout: float = DEFAULT_PONG_TIMEOUT_SECS, tick_secs: float = TICK_SECS):
+        self.ping_interval = ping_interval
+        self.pong_timeout = pong_timeout
+        self.tick_secs = tick_secs
+        # One slot more than the longest delay, so a reschedule never lands in the current slot
+        size = int(math.ceil(max(ping_interval, pong_timeout) / tick_secs)) + 1
+        self.wheel: List[Set[_Entry]] = [set() for _ in range(size)]
+        self.position = 0
+        self.entries: Dict[object, _Entry] = {}
+        self.counters = {"pings": 0, "pongs": 0, "evicted": 0, "ticks": 0}
+        # Called with each evicted websocket, so the server stops broadcasting to it
+        self.evicted_callbacks: List[Callable] = []
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def from_env(cls) -> "LivenessManager":
+        return cls(
+            ping_interval=float(os.getenv("DISPLAY_PING_INTERVAL_SECS", DEFAULT_PING_INTERVAL_SECS)),
+            pong_timeout=float(os.getenv("DISPLAY_PONG_TIMEOUT_SECS", DEFAULT_PONG_TIMEOUT_SECS)),
+        )
+
+    def _schedule(self, entry: _Entry, delay: float, waiting: str):
+        if entry.slot >= 0:
+            self.wheel[entry.slot].discard(entry)
+        ticks = max(1, int(math.ceil(delay / self.tick_secs)))
+        entry.slot = (self.position + ticks) % len(self.wheel)
+        entry.waiting = waiting
+        self.wheel[entry.slot].add(entry)
+
+    def add(self, websocket):
+        """Track a new connection; its first ping is one interval away."""
+        if websocket in self.entries:
+            return
+        entry = _Entry(websocket)
+        self.entries[websocket] = entry
+        self._schedule(entry, self.ping_interval, WAITING_PING)
+
+    def remove(self, websocket):
+        """Stop tracking a connection (safe to call more than once)."""
+        entry = self.entries.pop(websocket, None)
+        if entry is not None and entry.slot >= 0:
+            self.wheel[entry.slot].discard(entry)
+            entry.slot = -1
+
+    def evict(self, websocket, reason: str):
+        """Drop a dead connection and close its socket without a closing handshake."""
+        if websocket not in self.entries:
+            return
+        self.remove(websocket)
+        self.counters["evicted"] += 1
+        logger.info(f"Display liveness: evicting connection ({reason}). Tracked connections: {len(self.entries)}")
+        for callback in self.evicted_callbacks:
+            callback(websocket)
+        transport = getattr(websocket, "transport", None)
+        if transport is None:
+            return
+        # The socket belongs to the display server's loop; broadcasts may call this from another one
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if self._loop is not None and running is not self._loop:
+            self._loop.call_soon_threadsafe(transport.abort)
+        else:
+            transport.abort()
+
+    async def _ping(self, entry: _Entry):
+        entry.pong_waiter = await entry.websocket.ping()
+
+    async def tick(self):
+        """Advance the wheel one slot and handle the connections that came due."""
+        self.position = (self.position + 1) % len(self.wheel)
+        due, self.wheel[self.position] = self.wheel[self.position], set()
+        self.counters["ticks"] += 1
+        to_ping = []
+        for entry in due:
+            entry.slot = -1
+            if entry.waiting == WAITING_PONG:
+                if _pong_received(entry.pong_waiter):
+                    self.counters["pongs"] += 1
+                    self._schedule(entry, self.ping_interval - self.pong_timeout, WAITING_PING)
+                else:
+                    self.evict(entry.websocket, "no pong")
+            else:
+                to_ping.append(entry)
+        if not to_ping:
+            return
+
+        pings = {asyncio.ensure_future(self._ping(entry)): entry for entry in to_ping}
+        done, pending = await asyncio.wait(pings, timeout=self.pong_timeout)
+        for task in pending:
+            task.cancel()
+            self.evict(pings[task].websocket, "write buffer full")
+        for task in done:
+            entry = pings[task]
+            if entry.websocket not in self.entries:
+                continue
+            if task.exception() is not None:
+                self.evict(entry.websocket, f"ping failed: {task.exception()!r}")
+            else:
+                self.counters["pings"] += 1
+                self._schedule(entry, self.pong_timeout, WAITING_PONG)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            # Keep the wheel on time even when a batch of pings took a while
+            next_tick += self.tick_secs
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"Display liveness tick failed: {e}")
+
+    def start(self):
+        """Start the wheel on the display server's running loop."""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self.run())
+        logger.info(f"Display liveness: pinging every {self.ping_interval:.0f} s, "
+                    f"evicting after {self.pong_timeout:.0f} s without a pong")
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict:
+        return {"connections": len(self.entries), **self.counters}
+
+
+# Global manager used by websocket_server
+display_liveness = LivenessManager.from_env()
@@ -0,0 +1,139 @@
+"""
+Display Topics - Which display connections want which order messages
+
+A display subscribes by lane, invoice and/or message type, either in the
+URL it connects to or later with a message:
+
+    ws://box:8766/?lane=2&type=order_update,order_finalized
+    {"type": "subscribe", "lanes": ["2"], "types": ["order_update"]}
+    {"type": "unsubscribe"}                      # back to everything
+
+Within a topic the values are alternatives, across topics all must match,
+and a topic left out matches anything; a display with no subscription gets
+every message as before.
+
+`TopicIndex` keeps, per topic, the connections listening to each value and
+the ones that don't filter on it. Finding a message's recipients walks only
+the candidates of the most selective topic, so a lane's update costs its
+lane's displays plus the unfiltered ones rather than every connection.
+"""
+
+from typing import Dict, Iterable, Optional, Set
+from urllib.parse import parse_qs, urlparse
+
+TOPIC_LANE = "lane"
+TOPIC_INVOICE = "invoice"
+TOPIC_TYPE = "type"
+TOPICS = (TOPIC_LANE, TOPIC_INVOICE, TOPIC_TYPE)
+
+# Keys accepted in subscribe messages ("type" is the message's own type there)
+_MESSAGE_KEYS = {"lane": TOPIC_LANE, "lanes": TOPIC_LANE, "invoice": TOPIC_INVOICE, "invoices": TOPIC_INVOICE,
+                 "types": TOPIC_TYPE}
+_QUERY_KEYS = dict(_MESSAGE_KEYS, type=TOPIC_TYPE)
+
+Filters = Dict[str, frozenset]
+
+
+def message_topics(message: Dict) -> Dict[str, Optional[str]]:
+    """The lane, invoice and type of a display message."""
+    invoice_id = message.get("invoice_id")
+    if invoice_id is None and isinstance(message.get("order"), dict):
+        invoice_id = message["order"].get("invoice_id")
+    return {TOPIC_LANE: message.get("lane"), TOPIC_INVOICE: invoice_id, TOPIC_TYPE: message.get("type")}
+
+
+def _values(value) -> Iterable[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [part for part in value.split(",") if part]
+    return [str(part) for part in value]
+
+
+def _filters(pairs, keys: Dict[str, str]) -> Filters:
+    filters: Dict[str, Set[str]] = {}
+    for key, value in pairs:
+        topic = keys.get(key)
+        if topic is not None:
+            filters.setdefault(topic, set()).update(_values(value))
+    return {topic: frozenset(values) for topic, values in filters.items() if values}
+
+
+def parse_subscription(data: Dict) -> Filters:
+    """Filters from a subscribe message ({"lanes": [...], "invoices": [...], "types": [...]})."""
+    return _filters(data.items(), _MESSAGE_KEYS)
+
+
+def parse_query(path: Optional[str]) -> Filters:
+    """Filters from a connection URL's query string (?lane=2&type=order_update)."""
+    if not path:
+        return {}
+    return _filters(((key, value) for key, values in parse_qs(urlparse(path).query).items() for value in values),
+                    _QUERY_KEYS)
+
+
+def matches(filters: Filters, topics: Dict[str, Optional[str]]) -> bool:
+    return all(topics.get(topic) in values for topic, values in filters.items())
+
+
+class TopicIndex:
+    """Subscriptions of display connections, indexed by topic value."""
+
+    def __init__(self):
+        self.filters: Dict[object, Filters] = {}
+        # topic -> value -> connections listening to that value
+        self.by_value: Dict[str, Dict[str, Set]] = {topic: {} for topic in TOPICS}
+        # topic -> connections that don't filter on it
+        self.unfiltered: Dict[str, Set] = {topic: set() for topic in TOPICS}
+
+    def subscribe(self, connection, filters: Optional[Filters] = None):
+        """Set a connection's subscription (replacing any previous one); no filters means everything."""
+        self.remove(connection)
+        filters = dict(filters or {})
+        self.filters[connection] = filters
+        for topic in TOPICS:
+            if topic in filters:
+                for value in filters[topic]:
+                    self.by_value[topic].setdefault(value, set()).add(connection)
+            else:
+                self.unfiltered[topic].add(connection)
+
+    def remove(self, connection):
+        filters = self.filters.pop(connection, None)
+        if filters is None:
+            return
+        for topic in TOPICS:
+            if topic in filters:
+                for value in filters[topic]:
+                    listeners = self.by_value[topic].get(value)
+                    if listeners is not None:
+                        listeners.discard(connection)
+                        if not listeners:
+                            del self.by_value[topic][value]
+            else:
+                self.unfiltered[topic].discard(connection)
+
+    def recipients(self, message: Dict) -> Set:
+        """Connections whose subscription matches a display message."""
+        topics = message_topics(message)
+        candidates = None
+        for topic in TOPICS:
+            listening = self.by_value[topic].get(topics[topic], ())
+            group = (self.unfiltered[topic], listening)
+            if candidates is None or sum(map(len, group)) < sum(map(len, candidates)):
+                candidates = group
+        # Copies, so a display (un)subscribing or being evicted meanwhile can't break the walk
+        recipients = set()
+        for group in candidates:
+            for connection in list(group):
+                filters = self.filters.get(connection)
+                if filters is not None and matches(filters, topics):
+                    recipients.add(connection)
+        return recipients
+
+    def subscription(self, connection) -> Dict[str, list]:
+        """A connection's filters, for the subscribe acknowledgement."""
+        return {topic: sorted(values) for topic, values in self.filters.get(connection, {}).items()}
+
+    def __len__(self):
+        return len(self.filters)
@@ -0,0 +1,505 @@
+"""
+Fast-path Parser - Turns simple spoken orders into order_food arguments without the LLM
+
+Builds a token trie over the menu vocabulary (item names, spoken synonyms,
+sizes, proteins, customizations) and parses final transcripts like
+"large fries and a coke" or "two chicken tacos with extra cheese" directly into
+`order_food` arguments. Anything ambiguous (replacements, removals, references to
+existing items, items that still need a protein) falls back to the LLM.
+"""
+
+import copy
+import re
+import time
+import uuid
+from contextvars import ContextVar
+
+from loguru import logger
+from pipecat.frames.frames import Frame, TranscriptionFrame
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+from pipecat.services.llm_service import FunctionCallParams
+
+from menu import MENU_ITEMS, SIZES, CUSTOMIZATIONS, PROTEIN_OPTIONS, ITEM_SYNONYMS, PROTEIN_CLARIFICATION_ITEMS
+
+DEFAULT_MIN_CONFIDENCE = 0.9
+
+# How long an applied fast-path order waits for the LLM's matching tool call
+FAST_PATH_CLAIM_WINDOW = 15.0
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+
+# Words that carry no order information
+FILLER_WORDS = {
+    "i", "i'd", "id", "i'll", "ill", "like", "would", "can", "could", "get", "have", "want",
+    "please", "the", "me", "give", "some", "order", "of", "let", "lets", "let's", "just", "um",
+    "uh", "yeah", "hi", "hello", "hey", "for", "to", "go", "with", "also", "may", "gonna",
+    "need", "we'll", "we", "take", "thanks", "thank", "you",
+}
+
+CONJUNCTIONS = {"and", "plus", "also"}
+
+# Words that signal the customer is modifying the existing order, asking a
+# question, or saying something the parser cannot safely interpret
+BLOCK_WORDS = {
+    "instead", "remove", "change", "replace", "switch", "make", "actually", "cancel", "undo",
+    "not", "no", "that", "it", "those", "them", "what", "how", "much", "is", "are", "does",
+    "off", "without", "delete", "don't", "dont", "wait", "scratch", "another", "what's",
+}
+
+COMBO_WORDS = {"combo", "meal"}
+
+
+def _tokenize(text):
+    text = text.lower().replace("-", " ")
+    text = re.sub(r"[^a-z0-9' ]+", " ", text)
+    return text.split()
+
+
+def _plural(word):
+    if word.endswith("s"):
+        return word
+    if word in ("tomato", "potato") or word.endswith(("ch", "sh")):
+        return word + "es"
+    return word + "s"
+
+
+def _phrase_variants(phrase):
+    """Return the phrase and its plural form (pluralizing the last word)."""
+    tokens = tuple(_tokenize(phrase))
+    if not tokens:
+        return []
+    plural = tokens[:-1] + (_plural(tokens[-1]),)
+    return [tokens] if plural == tokens else [tokens, plural]
+
+
+def build_vocabulary_trie(menu_items=None, sizes=None, customizations=None, protein_options=None, synonyms=None):
+    """
+    Build the token trie used by the parser
+
+    Args:
+        menu_items: Menu items dictionary
+        sizes: Sizes dictionary
+        customizations: Customizations dictionary
+        protein_options: Protein options dictionary
+        synonyms: Spoken synonym to item ID mapping
+
+    Returns:
+        Nested dict trie; terminal nodes hold (category, value) under the None key
+    """
+    menu_items = MENU_ITEMS if menu_items is None else menu_items
+    sizes = SIZES if sizes is None else sizes
+    customizations = CUSTOMIZATIONS if customizations is None else customizations
+    protein_options = PROTEIN_OPTIONS if protein_options is None else protein_options
+    synonyms = ITEM_SYNONYMS if synonyms is None else synonyms
+
+    trie = {}
+
+    def insert(tokens, category, value):
+        node = trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        # Earlier insertions win so menu items take priority over generic words
+        node.setdefault(None, (category, value))
+
+    for item_id, item in menu_items.items():
+        for phrase in (item["name"], item_id.replace("_", " ")):
+            for tokens in _phrase_variants(phrase):
+                insert(tokens, "item", item_id)
+    for phrase, item_id in synonyms.items():
+        if item_id in menu_items:
+            for tokens in _phrase_variants(phrase):
+                insert(tokens, "item", item_id)
+
+    for size_id in sizes:
+        insert((size_id,), "size", size_id)
+    insert(("regular",), "size", None)
+
+    for protein_id, protein in protein_options.items():
+        for phrase in (protein_id, protein["name"]):
+            insert(tuple(_tokenize(phrase)), "protein", protein_id)
+
+    for custom_id, custom in customizations.items():
+        if custom_id in protein_options:
+            continue
+        for phrase in (custom_id.replace("_", " "), custom["name"]):
+            for tokens in _phrase_variants(phrase):
+                insert(tokens, "customization", custom_id)
+            if custom_id.startswith("no_"):
+                # "without onions" is the same as "no onions"
+                for tokens in _phrase_variants("without " + custom_id[3:].replace("_", " ")):
+                    insert(tokens, "customization", custom_id)
+
+    for word in COMBO_WORDS:
+        insert((word,), "combo", True)
+    for word, number in NUMBER_WORDS.items():
+        insert((word,), "number", number)
+
+    return trie
+
+
+_VOCABULARY_TRIE = build_vocabulary_trie()
+
+
+def _match_tokens(tokens, trie):
+    """Greedy longest-match scan over the tokens."""
+    matches = []
+    i = 0
+    while i < len(tokens):
+        node = trie
+        best = None
+        j = i
+        while j < len(tokens) and tokens[j] in node:
+            node = node[tokens[j]]
+            j += 1
+            if None in node:
+                best = (j, node[None])
+        if best:
+            end, (category, value) = best
+            matches.append((category, value, " ".join(tokens[i:end])))
+            i = end
+        elif tokens[i].isdigit():
+            matches.append(("number", int(tokens[i]), tokens[i]))
+            i += 1
+        else:
+            matches.append(("word", tokens[i], tokens[i]))
+            i += 1
+    return matches
+
+
+def _fallback(reason, confidence=0.0):
+    return {'is_fast_path': False, 'confidence': confidence, 'arguments': None, 'reason': reason}
+
+
+def parse_order_utterance(text, min_confidence=DEFAULT_MIN_CONFIDENCE, trie=None):
+    """
+    Parse a final transcript into order_food arguments
+
+    Args:
+        text: The customer's final transcript
+        min_confidence: Minimum confidence required to take the fast path
+        trie: Optional vocabulary trie (defaults to the current menu)
+
+    Returns:
+        Dict: {
+            'is_fast_path': bool,
+            'confidence': float,
+            'arguments': order_food arguments or None,
+            'reason': str
+        }
+    """
+    tokens = _tokenize(text or "")
+    if not tokens:
+        return _fallback("empty transcript")
+
+    matches = _match_tokens(tokens, trie or _VOCABULARY_TRIE)
+
+    items = []
+    current = None
+    pending = {}
+    after_conjunction = False
+    known = 0
+    unknown = 0
+
+    for category, value, phrase in matches:
+        if category == "word":
+            if value in BLOCK_WORDS:
+                return _fallback(f"'{value}' needs the LLM")
+            if value in CONJUNCTIONS:
+                after_conjunction = True
+            elif value not in FILLER_WORDS:
+                unknown += 1
+            continue
+
+        known += 1
+        if category == "item":
+            item = {"item_id": value, "quantity": pending.pop("quantity", 1)}
+            item.update(pending)
+            pending = {}
+            items.append(item)
+            current = item
+            after_conjunction = False
+            continue
+
+        # Modifiers after an item noun belong to it until a conjunction or number
+        if category == "number":
+            if "quantity" in pending:
+                return _fallback("two quantities in a row")
+            pending["quantity"] = value
+            current = None
+            continue
+
+        target = pending if (current is None or after_conjunction or pending) else current
+        if category == "size":
+            if value:
+                target["size"] = value
+        elif category == "protein":
+            if target.get("protein") and target["protein"] != value:
+                return _fallback("conflicting proteins")
+            target["protein"] = value
+        elif category == "customization":
+            target.setdefault("customizations", []).append(value)
+        elif category == "combo":
+            target["combo"] = True
+
+    if not items:
+        return _fallback("no menu item recognized")
+
+    # Trailing "and extra cheese" attaches to the last item
+    if pending:
+        if "quantity" in pending or "size" in pending:
+            return _fallback("dangling quantity or size")
+        for key, value in pending.items():
+            if key == "customizations":
+                items[-1].setdefault("customizations", []).extend(value)
+            else:
+                items[-1][key] = value
+
+    for item in items:
+        if item.get("protein") and item["item_id"] not in PROTEIN_CLARIFICATION_ITEMS:
+            return _fallback(f"protein doesn't apply to {item['item_id']}")
+        if item["item_id"] in PROTEIN_CLARIFICATION_ITEMS and not item.get("protein"):
+            return _fallback(f"{item['item_id']} needs a protein question")
+        if item.get("combo"):
+            # Combos trigger the combo/drink follow-up conversation
+            return _fallback("combo orders need the LLM")
+
+    confidence = known / float(known + unknown)
+    if confidence < min_confidence:
+        return _fallback("too many unrecognized words", confidence)
+
+    return {
+        'is_fast_path': True,
+        'confidence': confidence,
+        'arguments': {"action": "add_item", "items": items},
+        'reason': "parsed",
+    }
+
+
+def _canonical_order_key(arguments):
+    """Normalize add_item arguments so the fast path and the LLM's call compare equal."""
+    from food_ordering import detect_invalid_item_id_patterns, detect_soda_type_conversion, normalize_size_value
+
+    lines = []
+    for item in arguments.get("items", []) or []:
+        item_id = detect_soda_type_conversion(item.get("item_id"), item.get("drink_choice"), MENU_ITEMS)
+        item_id, suggested_protein = detect_invalid_item_id_patterns(item_id, MENU_ITEMS, PROTEIN_OPTIONS)
+        lines.append((
+            item_id,
+            item.get("quantity", 1) or 1,
+            normalize_size_value(item.get("size")),
+            item.get("protein") or suggested_protein,
+            bool(item.get("combo")),
+            tuple(sorted(item.get("customizations") or [])),
+        ))
+    return tuple(sorted(lines, key=repr))
+
+
+# Tool call ids of the fast path's own order_food calls
+FAST_PATH_CALL_PREFIX = "fastpath-"
+
+
+class FastPathClaims:
+    """
+    One lane's fast-path bookkeeping
+
+    `pending` holds orders applied from the transcript that the LLM's own call
+    has not matched yet, with the cart lines each one added or changed so they
+    can be taken back. `tool_orders` holds the lines of add_item calls the LLM
+    made that were processed as made, so a transcript that arrives after its
+    call is not applied a second time.
+    """
+
+    def __init__(self):
+        self.pending = []
+        self.tool_orders = []
+
+    def expire(self, now=None):
+        """Forget entries older than FAST_PATH_CLAIM_WINDOW; an unmatched fast-path order stays in the cart."""
+        now = time.time() if now is None else now
+        self.pending = [claim for claim in self.pending if now - claim["time"] <= FAST_PATH_CLAIM_WINDOW]
+        self.tool_orders = [entry for entry in self.tool_orders if now - entry[0] <= FAST_PATH_CLAIM_WINDOW]
+
+    def record(self, arguments, result, added=(), changed=()):
+        """
+        Remember an applied fast-path order until the LLM's call matches it
+
+        Args:
+            arguments: order_food arguments the fast path applied
+            result: The tool result to answer the LLM's matching call with
+            added: Order lines the fast path appended
+            changed: (line, previous fields) for lines it merged into
+        """
+        self.expire()
+        self.pending.append({
+            "time": time.time(),
+            "arguments": arguments,
+            "result": result,
+            "added": list(added),
+            "changed": list(changed),
+        })
+
+    def clear(self):
+        self.pending.clear()
+        self.tool_orders.clear()
+
+
+# The current lane's claims; FastPathOrderProcessor sets it when the lane's pipeline
+# is built, so the lane's LLM tool calls only ever see that lane's fast-path orders
+_lane_claims = ContextVar("fast_path_claims", default=None)
+
+
+def _current_claims():
+    claims = _lane_claims.get()
+    if claims is None:
+        claims = FastPathClaims()
+        _lane_claims.set(claims)
+    return claims
+
+
+def record_fast_path_result(arguments, result, added=(), changed=()):
+    """Remember a fast-path order so the LLM's matching tool call doesn't apply it again."""
+    _current_claims().record(arguments, result, added, changed)
+
+
+def _revert_claim(session, claim):
+    """Take a fast-path order's lines back out of the cart, leaving other lines alone."""
+    added = {id(item) for item in claim["added"]}
+    session.current_order_items = [item for item in session.current_order_items if id(item) not in added]
+    for item, saved in claim["changed"]:
+        item.clear()
+        item.update(saved)
+    if session.last_item_added is not None and id(session.last_item_added) in added:
+        session.last_item_added = session.current_order_items[-1] if session.current_order_items else None
+
+
+def claim_fast_path_result(arguments, session, tool_call_id=None):
+    """
+    Reconcile the LLM's tool call with the fast-path orders applied before it
+
+    If the pending fast-path orders together match the call, it was already
+    applied and their result is returned. Otherwise their lines are taken back
+    out of the cart, inside the call's own transaction, and the call is
+    processed as the LLM made it.
+
+    Args:
+        arguments: order_food arguments from the LLM
+        session: The order session the call applies to
+        tool_call_id: The call's id; the fast path's own calls are left alone
+
+    Returns:
+        The fast-path tool result, or None if the order still needs processing
+    """
+    if (tool_call_id or "").startswith(FAST_PATH_CALL_PREFIX) or arguments.get("action", "add_item") != "add_item":
+        return None
+    claims = _current_claims()
+    claims.expire()
+    if not claims.pending:
+        claims.tool_orders.append((time.time(), set(_canonical_order_key(arguments))))
+        return None
+
+    pending, claims.pending = claims.pending, []
+    applied = {"items": [item for claim in pending for item in claim["arguments"].get("items", [])]}
+    if _canonical_order_key(applied) == _canonical_order_key(arguments):
+        result = dict(pending[-1]["result"])
+        if len(pending) > 1:
+            result["items"] = [item for claim in pending for item in claim["result"].get("items", [])]
+        return result
+
+    logger.info(f"FAST PATH: LLM call {arguments} differs from the transcript's {applied}, reverting the fast-path lines")
+    for claim in reversed(pending):
+        _revert_claim(session, claim)
+    claims.tool_orders.append((time.time(), set(_canonical_order_key(arguments))))
+    return None
+
+
+def clear_fast_path_claims():
+    _current_claims().clear()
+
+
+class FastPathOrderProcessor(FrameProcessor):
+    """
+    Applies simple orders straight from the user's final transcription.
+
+    Sits downstream of the speech-to-speech LLM. When a TranscriptionFrame parses
+    with high confidence the order handler runs immediately, so the order screen
+    updates without waiting for the model's tool call; the model's call is then
+    reconciled in `claim_fast_path_result`: answered without touching the cart
+    when it matches, or applied in place of the fast-path lines when it doesn't.
+    """
+
+    def __init__(self, handler, min_confidence=DEFAULT_MIN_CONFIDENCE, session=None, **kwargs):
+        super().__init__(**kwargs)
+        self._handler = handler
+        self._min_confidence = min_confidence
+        self._session = session
+        # Built inside the lane's bot task, before the pipeline starts its tasks
+        self.claims = FastPathClaims()
+        _lane_claims.set(self.claims)
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, TranscriptionFrame):
+            parsed = parse_order_utterance(frame.text, self._min_confidence)
+            if parsed['is_fast_path']:
+                await self._apply(parsed['arguments'])
+            else:
+                logger.debug(f"FAST PATH: falling back to LLM for '{frame.text}' ({parsed['reason']})")
+
+        await self.push_frame(frame, direction)
+
+    def _order_session(self):
+        if self._session is not None:
+            return self._session
+        import food_ordering
+        return food_ordering.current_order_session
+
+    async def _apply(self, arguments):
+        session = self._order_session()
+        # Hold the session's transaction so the lines this order adds can be told apart
+        transaction = await session.acquire_transaction("add_item")
+        try:
+            self.claims.expire()
+            lines = set(_canonical_order_key(arguments))
+            already_ordered = [entry for entry in self.claims.tool_orders if entry[1] & lines]
+            if already_ordered:
+                # The LLM's call for this utterance came in before its transcript
+                logger.info(f"FAST PATH: {arguments} was already ordered by the LLM, not applying it again")
+                self.claims.tool_orders = [entry for entry in self.claims.tool_orders if entry not in already_ordered]
+                return
+
+            logger.info(f"FAST PATH: applying {arguments}")
+            result_holder = {}
+
+            async def result_callback(result, *, properties=None):
+                result_holder["result"] = result
+
+            await self._handler(FunctionCallParams(
+                function_name="order_food",
+                tool_call_id=f"{FAST_PATH_CALL_PREFIX}{uuid.uuid4()}",
+                # The handler normalizes items in place; keep our copy intact for the claim
+                arguments=copy.deepcopy(arguments),
+                llm=None,
+                context=None,
+                result_callback=result_callback,
+            ))
+            if transaction.done or result_holder.get("result", {}).get("status") == "error":
+                return
+            # Whatever the handler did (a new line, or merged into an existing one) is claimed
+            before = {id(item) for item in transaction.before["items"]}
+            added = [item for item in session.current_order_items if id(item) not in before]
+            changed = [
+                (item, saved)
+                for item, saved in zip(transaction.before["items"], transaction.before["item_states"])
+                if dict(item) != saved
+            ]
+            if added or changed:
+                self.claims.record(arguments, result_holder["result"], added, changed)
+        except Exception:
+            transaction.rollback()
+            raise
+        finally:
+            transaction.commit()
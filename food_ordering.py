@@ -10,9 +10,18 @@ from pipecat.services.llm_service import FunctionCallParams
 from menu import MENU_ITEMS, SIZES, COMBOS, CUSTOMIZATIONS, PROTEIN_OPTIONS, DRINK_OPTIONS, calculate_order_price
 from customization_validator import validate_and_fix_customizations, clean_speech_transcription
 from replacement_handler import should_replace_instead_of_update, find_item_to_replace, execute_replacement, detect_replacement_intent
+from keyword_matcher import scan_intents
+from menu_aliases import get_alias_graph
+from fuzzy_resolver import resolve_fuzzy_item
+from fast_path_parser import claim_fast_path_result
+from speculative_cart import speculative_cart
+from upsell_engine import upsell_engine
+from cart_worker import apply_plan, cart_worker_pool
+import prompts
+import tool_results
 
 # Import OrderSession for managing orders
-from order_session import OrderSession
+from order_session import OrderSession, QUANTITY_PREFIX, order_line_key
 
 # Create a global order session
 current_order_session = OrderSession()
@@ -25,6 +34,29 @@ except ImportError:
     logger.warning("WebSocket server module not found. Order broadcasting disabled.")
     WEBSOCKET_ENABLED = False
 
+# Results that change the cart carry the upsell engine's next suggestion
+SUGGESTION_STATUSES = ("items_added", "items_updated", "items_removed", "change_undone")
+
+def attach_next_suggestion(response):
+    """
+    Add the single next upsell suggestion for the current cart to a tool result.
+    
+    Args:
+        response: Result about to be returned to the LLM
+        
+    Returns:
+        The same response, with "next_suggestion" set when there is something to offer
+    """
+    if isinstance(response, dict) and response.get("status") in SUGGESTION_STATUSES:
+        suggestion = upsell_engine.next_suggestion(
+            current_order_session.current_order_items, current_order_session.current_invoice_id
+        )
+        if suggestion:
+            response["next_suggestion"] = suggestion
+            print(f"UPSELL: next suggestion {suggestion['type']} for {suggestion['item_id']}")
+            logger.info(f"UPSELL: next suggestion {suggestion['type']} for {suggestion['item_id']}")
+    return response
+
 def detect_invalid_item_id_patterns(item_id, menu_items, protein_options):
     """
     Detect and correct invalid item IDs that follow common patterns.
@@ -48,27 +80,18 @@ def detect_invalid_item_id_patterns(item_id, menu_items, protein_options):
     if item_id in menu_items:
         return item_id, None
     
-    # Pattern 1: protein_item format (e.g., "beef_burrito", "chicken_taco", "steak_quesadilla")
-    # Split on underscore and check if first part is a protein and second part is a menu item
-    if "_" in item_id:
-        parts = item_id.split("_", 1)  # Split only on first underscore
-        if len(parts) == 2:
-            potential_protein, potential_item = parts
-            
-            # Check if the first part is a valid protein and second part is a valid menu item
-            if potential_protein in protein_options and potential_item in menu_items:
-                return potential_item, potential_protein
-    
-    # Pattern 2: item_protein format (e.g., "burrito_beef", "taco_chicken")
-    # Less common but possible
-    if "_" in item_id:
-        parts = item_id.split("_", 1)
-        if len(parts) == 2:
-            potential_item, potential_protein = parts
-            
-            # Check if the first part is a valid menu item and second part is a valid protein
-            if potential_item in menu_items and potential_protein in protein_options:
-                return potential_item, potential_protein
+    # One lookup in the menu's alias graph covers protein_item ("beef_burrito"),
+    # item_protein ("burrito_beef") and spoken names ("coke")
+    resolved = get_alias_graph(menu_items, protein_options).resolve(item_id)
+    if resolved:
+        return resolved[0], resolved[1]
+    
+    # Misrecognized speech ("chicken_burrow", "quesadeeya"): phonetic + edit-distance match
+    fuzzy_match = resolve_fuzzy_item(item_id, menu_items, protein_options)
+    if fuzzy_match:
+        print(f"FUZZY MATCH: '{item_id}' → '{fuzzy_match['item_id']}' (confidence {fuzzy_match['confidence']})")
+        logger.info(f"FUZZY MATCH: '{item_id}' → '{fuzzy_match['item_id']}' (confidence {fuzzy_match['confidence']})")
+        return fuzzy_match["item_id"], fuzzy_match["protein"]
     
     # No pattern detected, return original
     return item_id, None
@@ -85,26 +108,7 @@ def find_item_variants(item_id, menu_items):
     Returns:
         list: List of item IDs that are variants of the same base item
     """
-    variants = [item_id]  # Always include the original item
-    
-    # Pattern 1: protein_item vs item (e.g., "chicken_burrito" vs "burrito")
-    if "_" in item_id:
-        # If current item has underscore, check if base item exists
-        parts = item_id.split("_", 1)
-        if len(parts) == 2:
-            base_item = parts[1]
-            if base_item in menu_items and base_item not in variants:
-                variants.append(base_item)
-    else:
-        # If current item has no underscore, check for protein variants
-        for menu_item_id in menu_items:
-            if "_" in menu_item_id:
-                parts = menu_item_id.split("_", 1)
-                if len(parts) == 2 and parts[1] == item_id:
-                    if menu_item_id not in variants:
-                        variants.append(menu_item_id)
-    
-    return variants
+    return get_alias_graph(menu_items).variants(item_id)
 
 def normalize_size_value(size_value):
     """
@@ -135,17 +139,7 @@ def detect_soda_type_conversion(item_id, drink_choice, menu_items):
         str: Corrected item_id for specific soda type
     """
     if item_id == "soda" and drink_choice:
-        # Map drink choices to specific soda item IDs
-        soda_mapping = {
-            "cola": "cola",
-            "diet_cola": "diet_cola", 
-            "lemon_lime": "lemon_lime",
-            "orange": "orange_soda",
-            "iced_tea": "iced_tea"
-        }
-        
-        if drink_choice in soda_mapping and soda_mapping[drink_choice] in menu_items:
-            return soda_mapping[drink_choice]
+        return get_alias_graph(menu_items).soda_item(drink_choice) or item_id
     
     return item_id
 
@@ -427,7 +421,7 @@ def create_new_item_from_update(update_data, menu_items, sizes, combos, protein_
 # Define the function schema for food ordering
 food_order_function = FunctionSchema(
     name="order_food",
-    description="Process a food order at GrillTalk fast food restaurant. IMPORTANT: ONLY use action='finalize' when the customer explicitly confirms they want to complete their order and pay. For making items into combos or updating sizes, use action='update_items' instead.",
+    description="Process a food order at GrillTalk fast food restaurant. IMPORTANT: ONLY use action='finalize' when the customer explicitly confirms they want to complete their order and pay. For making items into combos or updating sizes, use action='update_items' instead. When a result includes next_suggestion, ask its question (it already has the price) before anything else.",
     properties={
         "items": {
             "type": "array",
@@ -491,14 +485,24 @@ food_order_function = FunctionSchema(
         },
         "action": {
             "type": "string",
-            "description": "Action to take with this order: 'add_item' to add items to the current order, 'update_items' to update existing items (e.g., make them combos), 'remove_item' to remove specific items from the order, 'confirm_order' to show order summary and ask for confirmation, 'finalize' to complete payment after customer confirms, 'new_order' to start a new order, or 'clear' to cancel the current order",
-            "enum": ["add_item", "update_items", "remove_item", "confirm_order", "finalize", "new_order", "clear"],
+            "description": "Action to take with this order: 'add_item' to add items to the current order, 'update_items' to update existing items (e.g., make them combos), 'remove_item' to remove specific items from the order, 'confirm_order' to show order summary and ask for confirmation, 'finalize' to complete payment after customer confirms, 'new_order' to start a new order, 'undo' to revert the most recent change when the customer says 'undo that', or 'clear' to cancel the current order",
+            "enum": ["add_item", "update_items", "remove_item", "confirm_order", "finalize", "new_order", "undo", "clear"],
             "default": "add_item"
         }
     },
     required=["items"],
 )
 
+def committed_snapshot(transaction):
+    """
+    Commit a call's cart changes and return the snapshot to publish
+    
+    Publishing after the commit lets every display broadcast of this cart
+    version share the session's cached snapshot.
+    """
+    transaction.commit()
+    return current_order_session.snapshot()
+
 async def process_food_order(params: FunctionCallParams):
     """
     Process a food order and return the order details.
@@ -514,6 +518,15 @@ async def process_food_order(params: FunctionCallParams):
     print(f"Order parameters received: {json.dumps(params.arguments, indent=2)}")
     logger.info(f"Order parameters received: {json.dumps(params.arguments, indent=2)}")
     
+    # IDEMPOTENCY: A replayed call (same call id and arguments) gets its original result back
+    call_key = current_order_session.tool_call_cache.key(getattr(params, "tool_call_id", None), params.arguments)
+    cached_result = current_order_session.tool_call_cache.get(call_key)
+    if cached_result is not None:
+        print(f"IDEMPOTENCY: Replayed tool call {params.tool_call_id}, returning the recorded result")
+        logger.info(f"IDEMPOTENCY: Replayed tool call {params.tool_call_id}, returning the recorded result")
+        await params.result_callback(cached_result)
+        return
+    
     # VALIDATION: Check for malformed requests
     if "items" in params.arguments:
         for i, item in enumerate(params.arguments["items"]):
@@ -525,6 +538,10 @@ async def process_food_order(params: FunctionCallParams):
                 print(f"WARNING: Item {i} has empty 'item_id': {item}")
                 logger.warning(f"Item {i} has empty 'item_id': {item}")
     
+    # TRANSACTION: Every cart change below commits together, or rolls back on error.
+    # Other calls on this session wait until it does, so a rollback only ever undoes this call.
+    transaction = await current_order_session.acquire_transaction(params.arguments.get("action", "add_item"))
+    
     try:
         # Extract order items from the parameters
         arguments = params.arguments
@@ -532,6 +549,28 @@ async def process_food_order(params: FunctionCallParams):
         special_instructions = arguments.get("special_instructions", "")
         action = arguments.get("action", "add_item")
         
+        # UPSELL: Cart-changing results tell the LLM what to offer next
+        # (and, with the compact prompt, what to say next); TOOL_RESULT_MODE=lean trims the payload
+        result_callback = params.result_callback
+        async def result_callback_with_suggestion(result, **kwargs):
+            result = attach_next_suggestion(result)
+            if prompts.PROMPT_MODE == prompts.PROMPT_MODE_COMPACT:
+                result = prompts.attach_next_step(result)
+            result = tool_results.encode_tool_result(result)
+            if isinstance(result, dict) and result.get("status") != "error":
+                current_order_session.tool_call_cache.put(call_key, result)
+            await result_callback(result, **kwargs)
+        params.result_callback = result_callback_with_suggestion
+        
+        # FAST PATH: The order was already applied from the transcript, don't add it twice;
+        # if the LLM ordered something else, the transcript's lines are taken back first
+        fast_path_result = claim_fast_path_result(arguments, current_order_session, getattr(params, "tool_call_id", None))
+        if fast_path_result is not None:
+            print("FAST PATH: LLM call matches an order already applied from the transcript")
+            logger.info("FAST PATH: LLM call matches an order already applied from the transcript")
+            await params.result_callback(fast_path_result)
+            return
+        
         # CUSTOMIZATION VALIDATION: Fix contradictory customizations
         for item in items:
             if "customizations" in item and item["customizations"]:
@@ -586,6 +625,45 @@ async def process_food_order(params: FunctionCallParams):
             await params.result_callback(response)
             return
             
+        elif action == "undo":
+            # Revert the most recent change ("undo that", "never mind that last one")
+            undone = current_order_session.undo()
+            if not undone:
+                response = {
+                    "status": "error",
+                    "message": "There is nothing to undo",
+                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                }
+                await params.result_callback(response)
+                return
+            
+            print(f"UNDO: Reverted last '{undone}' change")
+            logger.info(f"UNDO: Reverted last '{undone}' change")
+            
+            response = {
+                "invoice_id": current_order_session.current_invoice_id,
+                "status": "change_undone",
+                "undone_action": undone,
+                "items": [item["description"] for item in current_order_session.current_order_items],
+                "total_items": len(current_order_session.current_order_items),
+                "total_price": calculate_order_price(current_order_session.current_order_items),
+                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            
+            if WEBSOCKET_ENABLED and current_order_session.current_invoice_id:
+                try:
+                    await publish_order_update(
+                        current_order_session.current_invoice_id,
+                        committed_snapshot(transaction),
+                        "in_progress"
+                    )
+                except Exception as e:
+                    print(f"Failed to publish order update to WebSocket: {e}")
+                    logger.error(f"Failed to publish order update to WebSocket: {e}")
+            
+            await params.result_callback(response)
+            return
+            
         elif action == "update_items":
             # Update existing items (e.g., make them combos) instead of adding new ones
             if not current_order_session.is_order_active or not current_order_session.current_order_items:
@@ -601,8 +679,11 @@ async def process_food_order(params: FunctionCallParams):
             # This handles cases like "make that a chicken burger instead"
             user_input = getattr(params, 'user_input', '')  # Get user input if available
             
+            # Scan the utterance once; both replacement checks reuse the matches
+            intent_matches = scan_intents(user_input)
+            
             # Enhanced replacement detection - also check item patterns
-            is_replacement = should_replace_instead_of_update(user_input, items, current_order_session.current_order_items)
+            is_replacement = should_replace_instead_of_update(user_input, items, current_order_session.current_order_items, intent_matches)
             
             # Additional pattern-based replacement detection
             if not is_replacement and len(items) == 1 and len(current_order_session.current_order_items) > 0:
@@ -632,7 +713,7 @@ async def process_food_order(params: FunctionCallParams):
                 if len(items) == 1:
                     # Get replacement info, but ensure it has required keys
                     try:
-                        replacement_info = detect_replacement_intent(user_input, items)
+                        replacement_info = detect_replacement_intent(user_input, items, intent_matches)
                     except Exception as e:
                         print(f"Error in detect_replacement_intent: {e}")
                         replacement_info = {'is_replacement': False}
@@ -712,13 +793,11 @@ async def process_food_order(params: FunctionCallParams):
                                 print("WEBSOCKET_ENABLED is True, about to publish replacement update")
                                 logger.info("WEBSOCKET_ENABLED is True, about to publish replacement update")
                                 
-                                await publish_order_update({
-                                    "type": "order_update",
-                                    "invoice_id": current_order_session.current_invoice_id,
-                                    "items": current_order_session.current_order_items,
-                                    "status": "in_progress",
-                                    "timestamp": datetime.now().isoformat()
-                                })
+                                await publish_order_update(
+                                    current_order_session.current_invoice_id,
+                                    committed_snapshot(transaction),
+                                    "in_progress"
+                                )
                                 
                                 print(f"Order {current_order_session.current_invoice_id} replacement published to WebSocket clients")
                                 logger.info(f"Order {current_order_session.current_invoice_id} replacement published to WebSocket clients")
@@ -904,7 +983,7 @@ async def process_food_order(params: FunctionCallParams):
                     logger.info(f"WEBSOCKET_ENABLED is True, about to publish order update")
                     await publish_order_update(
                         current_order_session.current_invoice_id,
-                        current_order_session.current_order_items
+                        committed_snapshot(transaction)
                     )
                     print(f"Order {current_order_session.current_invoice_id} update published to WebSocket clients")
                     logger.info(f"Order {current_order_session.current_invoice_id} update published to WebSocket clients")
@@ -969,7 +1048,7 @@ async def process_food_order(params: FunctionCallParams):
                     try:
                         await publish_order_update(
                             current_order_session.current_invoice_id,
-                            current_order_session.current_order_items,
+                            committed_snapshot(transaction),
                             "in_progress"
                         )
                         print(f"Order {current_order_session.current_invoice_id} update published to WebSocket clients")
@@ -1034,7 +1113,7 @@ async def process_food_order(params: FunctionCallParams):
                     
                     await publish_order_update(
                         current_order_session.current_invoice_id,
-                        current_order_session.current_order_items,
+                        committed_snapshot(transaction),
                         "awaiting_confirmation"
                     )
                     print(f"Order confirmation published to WebSocket clients")
@@ -1129,6 +1208,9 @@ async def process_food_order(params: FunctionCallParams):
         updated_items = []
         removed_items = []
         
+        # SPECULATIVE CART: Lines prepared from the interim transcript skip item building
+        speculated_items = speculative_cart.commit(arguments, current_order_session.current_order_items)
+        
         # SMART DETECTION: Check if LLM is trying to modify existing items (combos, proteins, quantities, etc.)
         # If so, automatically treat this as an update_items action instead of add_item
         # IMPORTANT: Only convert to update if ALL items in the request are modifications of existing items
@@ -1136,6 +1218,7 @@ async def process_food_order(params: FunctionCallParams):
         items_needing_update = []
         items_to_add_normally = []
         
+        # Runs for speculated calls too: a prepared line is only committed if no item turns out to be an update
         if current_order_session.is_order_active and current_order_session.current_order_items:
             for item in items:
                 item_id = item.get("item_id")
@@ -1357,6 +1440,11 @@ async def process_food_order(params: FunctionCallParams):
             # For mixed requests (some items need update, some are new), process them separately
             should_convert_to_update = len(items_needing_update) > 0
         
+        if should_convert_to_update and speculated_items is not None:
+            print("SPECULATIVE CART: Discarding prepared items, the call updates existing items")
+            logger.info("SPECULATIVE CART: Discarding prepared items, the call updates existing items")
+            speculated_items = None
+        
         # If we detected items that need updating, handle them separately
         if should_convert_to_update:
             # Process items that need updating
@@ -1484,7 +1572,7 @@ async def process_food_order(params: FunctionCallParams):
                 print(f"SMART DETECTION: Processing {len(items_to_add_normally)} items normally after handling {len(items_needing_update)} updates")
                 logger.info(f"SMART DETECTION: Processing {len(items_to_add_normally)} items normally after handling {len(items_needing_update)} updates")
                 
-                processed_items, duplicate_items = process_items(items_to_add_normally, special_instructions)
+                processed_items, duplicate_items = await process_items_offloaded(items_to_add_normally, special_instructions)
                 updated_items.extend(processed_items)
             
             # Calculate the total price for all items in the order
@@ -1512,7 +1600,7 @@ async def process_food_order(params: FunctionCallParams):
                     logger.info(f"WEBSOCKET_ENABLED is True, about to publish order update")
                     await publish_order_update(
                         current_order_session.current_invoice_id,
-                        current_order_session.current_order_items
+                        committed_snapshot(transaction)
                     )
                     print(f"Order {current_order_session.current_invoice_id} update published to WebSocket clients")
                     logger.info(f"Order {current_order_session.current_invoice_id} update published to WebSocket clients")
@@ -1524,7 +1612,12 @@ async def process_food_order(params: FunctionCallParams):
             return
         
         # Process the items normally if no smart conversion is needed
-        processed_items, duplicate_items = process_items(items, special_instructions)
+        if speculated_items is not None:
+            print(f"SPECULATIVE CART: Committing {len(speculated_items)} prepared items")
+            logger.info(f"SPECULATIVE CART: Committing {len(speculated_items)} prepared items")
+            processed_items, duplicate_items = commit_prepared_items(speculated_items)
+        else:
+            processed_items, duplicate_items = await process_items_offloaded(items, special_instructions)
         
         # Calculate the total price for all items in the order
         total_price = sum(item["price"] for item in current_order_session.current_order_items)
@@ -1557,7 +1650,7 @@ async def process_food_order(params: FunctionCallParams):
                 logger.info(f"WEBSOCKET_ENABLED is True, about to publish order update")
                 await publish_order_update(
                     current_order_session.current_invoice_id,
-                    current_order_session.current_order_items
+                    committed_snapshot(transaction)
                 )
                 print(f"Order {current_order_session.current_invoice_id} update published to WebSocket clients")
                 logger.info(f"Order {current_order_session.current_invoice_id} update published to WebSocket clients")
@@ -1578,6 +1671,8 @@ async def process_food_order(params: FunctionCallParams):
         logger.info("===== process_food_order function completed =====")
         
     except Exception as e:
+        # Undo whatever part of the request was applied before the failure
+        transaction.rollback()
         print(f"Error processing food order: {e}")
         logger.error(f"Error processing food order: {e}")
         import traceback
@@ -1588,70 +1683,221 @@ async def process_food_order(params: FunctionCallParams):
             "message": f"Failed to process your order: {str(e)}",
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         })
+    finally:
+        transaction.commit()
 
-def process_items(items, special_instructions=""):
+def process_items(items, special_instructions="", session=None):
     """
     Process a list of items and add them to the current order session.
     
+    Args:
+        items: Requested items
+        special_instructions: Special instructions for the order
+        session: Order session to add to (default: the current order session)
+    
     Returns:
         tuple: (processed_items, duplicate_items)
         - processed_items: List of items that were processed
         - duplicate_items: List of items that were detected as duplicates and how they were handled
     """
+    # BULK ADD: Large multi-item requests are built, priced and inserted in one pass
+    if len(items) >= BULK_ADD_MIN_ITEMS:
+        return add_items_in_bulk(items, session)
+    
     processed_items = []
     duplicate_items = []
     
     for item in items:
-        item_id = item.get("item_id")
+        item_id = normalize_order_item(item)
         
-        # MALFORMED REQUEST FIX: Handle cases where item_id is missing but item data exists
-        if not item_id:
-            # Check if there's an empty key with the item_id value
-            if "" in item and item[""]:
-                item_id = item[""]
-                item["item_id"] = item_id  # Fix the malformed request
-                del item[""]  # Remove the malformed key
-                print(f"MALFORMED REQUEST FIXED: Found item_id '{item_id}' in empty key")
-                logger.info(f"MALFORMED REQUEST FIXED: Found item_id '{item_id}' in empty key")
-            # Check if there's a value that looks like an item_id
-            elif any(key for key in item.keys() if key in MENU_ITEMS):
-                for key in item.keys():
-                    if key in MENU_ITEMS:
-                        item_id = key
-                        item["item_id"] = item_id
-                        print(f"MALFORMED REQUEST FIXED: Found item_id '{item_id}' as key")
-                        logger.info(f"MALFORMED REQUEST FIXED: Found item_id '{item_id}' as key")
-                        break
         if item_id in MENU_ITEMS:
             # Create a new item using our helper function
             processed_item = create_new_item_from_update(item, MENU_ITEMS, SIZES, COMBOS, PROTEIN_OPTIONS)
             
             if processed_item:
-                # Add to the current order session with duplicate detection
-                order_items, is_duplicate, action_taken = current_order_session.add_item_to_order(processed_item)
-                
-                if is_duplicate:
-                    duplicate_info = {
-                        "item": processed_item["description"],
-                        "action_taken": action_taken,
-                        "message": f"Detected potential duplicate order for {processed_item['description']}. " +
-                                  (f"Increased quantity instead of adding duplicate." if action_taken == 'increased_quantity' else 
-                                   "Added as new item.")
-                    }
-                    duplicate_items.append(duplicate_info)
-                    logger.info(f"Duplicate handling: {json.dumps(duplicate_info)}")
-                    
-                    # If we increased the quantity of an existing item, we need to update our processed_items
-                    # to reflect the item that was actually modified
-                    if action_taken == 'increased_quantity':
-                        # Find the item that was modified
-                        for i, order_item in enumerate(current_order_session.current_order_items):
-                            if (order_item["item_id"] == item_id and
-                                order_item["size"] == processed_item["size"] and
-                                order_item["protein"] == processed_item["protein"]):
-                                processed_item = order_item
-                                break
-                
-                processed_items.append(processed_item)
+                add_processed_item(processed_item, processed_items, duplicate_items, session)
+    
+    return processed_items, duplicate_items
+
+async def process_items_offloaded(items, special_instructions=""):
+    """
+    process_items, run in the cart worker pool when CART_WORKER_MODE is set.
+    
+    The worker plans the change against a snapshot of the cart and the plan is
+    applied here, on the loop; a stale plan or a worker error falls back to
+    processing inline.
+    
+    Returns:
+        tuple: (processed_items, duplicate_items), as from process_items
+    """
+    if cart_worker_pool.should_offload(items):
+        try:
+            plan = await cart_worker_pool.plan(current_order_session, items, special_instructions)
+            if plan is not None:
+                return apply_plan(current_order_session, plan)
+        except Exception as e:
+            cart_worker_pool.counters["errors"] += 1
+            print(f"Cart worker failed, processing inline: {e}")
+            logger.error(f"Cart worker failed, processing inline: {e}")
+    cart_worker_pool.counters["inline"] += 1
+    return process_items(items, special_instructions)
+
+def normalize_order_item(item):
+    """
+    Fix up a requested item's item_id in place (malformed keys, aliases, misrecognized names).
+    
+    Returns:
+        The item_id to use, which may still not be on the menu
+    """
+    item_id = item.get("item_id")
+    
+    # MALFORMED REQUEST FIX: Handle cases where item_id is missing but item data exists
+    if not item_id:
+        # Check if there's an empty key with the item_id value
+        if "" in item and item[""]:
+            item_id = item[""]
+            item["item_id"] = item_id  # Fix the malformed request
+            del item[""]  # Remove the malformed key
+            print(f"MALFORMED REQUEST FIXED: Found item_id '{item_id}' in empty key")
+            logger.info(f"MALFORMED REQUEST FIXED: Found item_id '{item_id}' in empty key")
+        # Check if there's a value that looks like an item_id
+        elif any(key for key in item.keys() if key in MENU_ITEMS):
+            for key in item.keys():
+                if key in MENU_ITEMS:
+                    item_id = key
+                    item["item_id"] = item_id
+                    print(f"MALFORMED REQUEST FIXED: Found item_id '{item_id}' as key")
+                    logger.info(f"MALFORMED REQUEST FIXED: Found item_id '{item_id}' as key")
+                    break
+    
+    # UNKNOWN ITEM FIX: Resolve aliases and misrecognized names instead of dropping the item
+    if item_id and item_id not in MENU_ITEMS:
+        corrected_item_id, suggested_protein = detect_invalid_item_id_patterns(item_id, MENU_ITEMS, PROTEIN_OPTIONS)
+        if corrected_item_id in MENU_ITEMS:
+            print(f"UNKNOWN ITEM RESOLVED: '{item_id}' → '{corrected_item_id}'")
+            logger.info(f"UNKNOWN ITEM RESOLVED: '{item_id}' → '{corrected_item_id}'")
+            item_id = corrected_item_id
+            item["item_id"] = item_id
+            if suggested_protein and not item.get("protein"):
+                item["protein"] = suggested_protein
+    
+    return item_id
+
+# Requests with at least this many items use add_items_in_bulk
+BULK_ADD_MIN_ITEMS = 8
+
+def add_items_in_bulk(items, session=None):
+    """
+    Add a large multi-item request (e.g. a catering order) in one pass.
+    
+    Produces the same cart as adding the items one at a time: a line that
+    repeats the one before it is merged into it, and the first line can merge
+    into the last item already in the order. Each distinct line is priced and
+    described once, and the rest of the batch is inserted with a single
+    append, so the cost per line stays flat as the order grows.
+    
+    Returns:
+        tuple: (processed_items, duplicate_items), as from process_items
+    """
+    if session is None:
+        session = current_order_session
+    lines = []
+    duplicate_items = []
+    for item in items:
+        item_id = normalize_order_item(item)
+        if item_id not in MENU_ITEMS:
+            continue
+        line = {
+            "item_id": item_id,
+            "quantity": item.get("quantity", 1),
+            "size": item.get("size", "regular"),
+            "combo": item.get("combo", False),
+            "combo_type": item.get("combo_type"),
+            "customizations": item.get("customizations", []),
+            "protein": item.get("protein"),
+            "drink_choice": item.get("drink_choice"),
+        }
+        if lines and order_line_key(lines[-1]) == order_line_key(line):
+            lines[-1]["quantity"] += line["quantity"]
+            duplicate_items.append({
+                "item": lines[-1]["item_id"],
+                "action_taken": "increased_quantity",
+                "message": f"Merged repeated {item_id} line in the same request.",
+            })
+            continue
+        lines.append(line)
+    
+    # Price and describe each distinct line once, then scale by quantity
+    unit_lines = {}
+    for line in lines:
+        key = order_line_key(line)
+        if key not in unit_lines:
+            unit = dict(line, quantity=1)
+            unit_lines[key] = (
+                calculate_order_price([unit]),
+                rebuild_item_description(unit, MENU_ITEMS, SIZES, COMBOS, PROTEIN_OPTIONS),
+            )
+        unit_price, unit_description = unit_lines[key]
+        line["price"] = round(unit_price * line["quantity"], 2)
+        line["description"] = QUANTITY_PREFIX.sub(f"{line['quantity']}x", unit_description, count=1)
+    
+    processed_items = []
+    if lines:
+        add_processed_item(lines[0], processed_items, duplicate_items, session)
+        session.append_items_to_order(lines[1:])
+        processed_items.extend(lines[1:])
+    
+    print(f"BULK ADD: {len(items)} requested items -> {len(lines)} order lines")
+    logger.info(f"BULK ADD: {len(items)} requested items -> {len(lines)} order lines")
+    return processed_items, duplicate_items
+
+def add_processed_item(processed_item, processed_items, duplicate_items, session=None):
+    """
+    Add a built order line to the current order session with duplicate detection.
+    
+    Args:
+        processed_item: Item built by create_new_item_from_update
+        processed_items: List the added (or merged) item is appended to
+        duplicate_items: List duplicate-handling info is appended to
+        session: Order session to add to (default: the current order session)
+    """
+    if session is None:
+        session = current_order_session
+    item_id = processed_item["item_id"]
+    # Add to the current order session with duplicate detection
+    order_items, is_duplicate, action_taken = session.add_item_to_order(processed_item)
+    
+    if is_duplicate:
+        duplicate_info = {
+            "item": processed_item["description"],
+            "action_taken": action_taken,
+            "message": f"Detected potential duplicate order for {processed_item['description']}. " +
+                      (f"Increased quantity instead of adding duplicate." if action_taken == 'increased_quantity' else 
+                       "Added as new item.")
+        }
+        duplicate_items.append(duplicate_info)
+        logger.info(f"Duplicate handling: {json.dumps(duplicate_info)}")
+        
+        # If we increased the quantity of an existing item, we need to update our processed_items
+        # to reflect the item that was actually modified
+        if action_taken == 'increased_quantity':
+            # Find the item that was modified (the line just added, near the end)
+            for order_item in reversed(session.current_order_items):
+                if order_line_key(order_item) == order_line_key(processed_item):
+                    processed_item = order_item
+                    break
     
+    processed_items.append(processed_item)
+
+def commit_prepared_items(prepared_items):
+    """
+    Add order lines that were already built ahead of the tool call (speculative cart).
+    
+    Returns:
+        tuple: (processed_items, duplicate_items), as from process_items
+    """
+    processed_items = []
+    duplicate_items = []
+    for processed_item in prepared_items:
+        add_processed_item(processed_item, processed_items, duplicate_items)
     return processed_items, duplicate_items
@@ -0,0 +1,318 @@
+"""
+Fuzzy Resolver - Phonetic and edit-distance matching for misrecognized item names
+
+When speech recognition hears "chicken burrow" or "quesadeeya" the LLM passes
+an id that isn't on the menu. `FuzzyItemResolver` indexes every menu name and
+alias from the menu alias graph under a phonetic key (a Metaphone-style
+normalization that keeps the first sound, like Soundex) and resolves unknown
+ids to the closest entry by edit distance over both the spelling and the
+phonetic key. Matches below the confidence threshold are rejected so a clear
+mismatch still falls through to the LLM.
+
+Proteins are never guessed: an entry that carries a protein ("beef burrito")
+is only a candidate when the phrase contains its protein word as spoken, so
+"bean burrito" doesn't become a beef burrito one letter at a time.
+
+Run `python fuzzy_resolver.py` to benchmark accuracy and lookup time over a
+corpus of noisy transcripts.
+"""
+
+import re
+import time
+
+from menu import MENU_ITEMS, PROTEIN_OPTIONS
+from menu_aliases import get_alias_graph
+
+DEFAULT_FUZZY_THRESHOLD = 0.75
+
+# Applied in order; turn common spellings of the same sound into one form
+_PHONETIC_RULES = [
+    ("qu", "k"), ("ph", "f"), ("ck", "k"), ("ch", "k"), ("sh", "s"),
+    ("ll", "y"), ("gh", ""), ("ee", "i"), ("ea", "i"), ("ie", "i"),
+    ("ey", "i"), ("ow", "o"), ("oa", "o"), ("ou", "u"), ("oo", "u"),
+]
+
+
+def phonetic_key(text):
+    """
+    Reduce a phrase to a rough pronunciation key
+
+    "quesadeeya" and "quesadilla" both become "kesadiya"; "burrow" becomes "buro".
+
+    Args:
+        text: Spoken phrase or item id ("chicken_burrito" and "chicken burrito" are equivalent)
+
+    Returns:
+        str: Space-separated phonetic key per word
+    """
+    words = []
+    for word in re.findall(r"[a-z]+", text.lower().replace("_", " ")):
+        for pattern, replacement in _PHONETIC_RULES:
+            word = word.replace(pattern, replacement)
+        word = re.sub(r"c(?=[eiy])", "s", word).replace("c", "k")
+        word = word.replace("z", "s").replace("x", "ks")
+        # Collapse doubled letters and drop a silent trailing e
+        word = re.sub(r"(.)\1+", r"\1", word)
+        if len(word) > 2 and word.endswith("e"):
+            word = word[:-1]
+        if word:
+            words.append(word)
+    return " ".join(words)
+
+
+def edit_distance(a, b, max_distance=None):
+    """
+    Levenshtein distance between two strings
+
+    With max_distance set, gives up as soon as every path exceeds it and
+    returns max_distance + 1, which keeps scans over the index cheap.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is not None and len(a) - len(b) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+def similarity(a, b, minimum=0.0):
+    """Edit-distance similarity in [0, 1]; anything below minimum may be reported as 0."""
+    if not a and not b:
+        return 1.0
+    longest = max(len(a), len(b))
+    max_distance = int(longest * (1 - minimum)) if minimum > 0 else None
+    distance = edit_distance(a, b, max_distance)
+    if max_distance is not None and distance > max_distance:
+        return 0.0
+    return 1.0 - distance / longest
+
+
+def _spelling(text):
+    return " ".join(re.findall(r"[a-z]+", text.lower().replace("_", " ")))
+
+
+class FuzzyItemResolver:
+    """Resolves noisy item names against one version of the menu."""
+
+    def __init__(self, menu_items, protein_options, threshold=DEFAULT_FUZZY_THRESHOLD):
+        """
+        Precompute the phonetic index
+
+        Args:
+            menu_items: Dictionary of valid menu items
+            protein_options: Dictionary of available protein options
+            threshold: Minimum confidence (0-1) for a match to be returned
+        """
+        self.threshold = threshold
+        graph = get_alias_graph(menu_items, protein_options)
+
+        names = dict(graph.aliases)
+        for item_id, item in menu_items.items():
+            if isinstance(item, dict) and item.get("name"):
+                names.setdefault(item["name"], graph.resolve(item_id))
+
+        # spelling -> (phonetic key, canonical tuple)
+        self._entries = {}
+        # phonetic key -> (spelling, canonical tuple), for exact-sound hits
+        self._by_key = {}
+        # spelling -> protein words the phrase has to contain for a fuzzy match
+        self._protein_words = {}
+        for name, target in names.items():
+            spelling = _spelling(name)
+            if not spelling or spelling in self._entries:
+                continue
+            key = phonetic_key(spelling)
+            self._entries[spelling] = (key, target)
+            self._by_key.setdefault(key, (spelling, target))
+            item_id, protein = target[0], target[1]
+            if protein:
+                item_words = set(_spelling(item_id).split())
+                item_words.update(_spelling(menu_items.get(item_id, {}).get("name", "")).split())
+                self._protein_words[spelling] = frozenset(spelling.split()) - item_words
+        self._cache = {}
+
+    def score(self, query, candidate, minimum=0.0):
+        """Confidence that query was meant to be candidate (0 if clearly below minimum)."""
+        query_spelling, candidate_spelling = _spelling(query), _spelling(candidate)
+        return self._score(query_spelling, phonetic_key(query_spelling),
+                           candidate_spelling, phonetic_key(candidate_spelling), minimum)
+
+    @staticmethod
+    def _score(query_spelling, query_key, candidate_spelling, candidate_key, minimum):
+        # Like Soundex, a different first sound is strong evidence of a different word
+        penalty = 1.0 if query_key[:1] == candidate_key[:1] else 0.8
+        floor = min(1.0, minimum / penalty)
+        confidence = max(
+            similarity(query_spelling, candidate_spelling, floor),
+            similarity(query_key, candidate_key, floor),
+        )
+        return confidence * penalty
+
+    def resolve(self, text):
+        """
+        Resolve a noisy name to a menu item
+
+        Args:
+            text: Unknown item id or spoken phrase
+
+        Returns:
+            dict with item_id, protein, drink, matched and confidence, or None
+        """
+        if not text:
+            return None
+        spelling = _spelling(text)
+        if spelling in self._cache:
+            return self._cache[spelling]
+
+        match = None
+        if spelling in self._entries:
+            match = (spelling, self._entries[spelling][1], 1.0)
+        else:
+            key = phonetic_key(spelling)
+            if key in self._by_key:
+                match = self._by_key[key] + (1.0,)
+            else:
+                best = None
+                words = set(spelling.split())
+                for candidate, (candidate_key, target) in self._entries.items():
+                    if not self._protein_words.get(candidate, frozenset()) <= words:
+                        continue
+                    # Each candidate only has to beat the current best, so the
+                    # bounded edit distance bails out early on most of them
+                    minimum = best[2] if best else self.threshold
+                    confidence = self._score(spelling, key, candidate, candidate_key, minimum)
+                    if confidence >= minimum and (best is None or confidence > best[2]):
+                        best = (candidate, target, confidence)
+                if best and best[2] >= self.threshold:
+                    match = best
+
+        result = None
+        if match:
+            matched, (item_id, protein, drink), confidence = match
+            result = {
+                "item_id": item_id,
+                "protein": protein,
+                "drink": drink,
+                "matched": matched,
+                "confidence": round(confidence, 3),
+            }
+        if len(self._cache) >= 1024:
+            self._cache.clear()
+        self._cache[spelling] = result
+        return result
+
+
+# Resolvers keyed the same way as the alias graphs
+_resolver_cache = {}
+
+
+def get_fuzzy_resolver(menu_items=MENU_ITEMS, protein_options=PROTEIN_OPTIONS):
+    """Return the fuzzy resolver for a menu, building its index on first use."""
+    key = (id(menu_items), len(menu_items), id(protein_options), len(protein_options))
+    cached = _resolver_cache.get(key)
+    if cached is None:
+        if len(_resolver_cache) >= 16:
+            _resolver_cache.clear()
+        cached = (menu_items, protein_options, FuzzyItemResolver(menu_items, protein_options))
+        _resolver_cache[key] = cached
+    return cached[2]
+
+
+def resolve_fuzzy_item(text, menu_items=MENU_ITEMS, protein_options=PROTEIN_OPTIONS):
+    """Resolve a noisy item name with the menu's cached resolver."""
+    return get_fuzzy_resolver(menu_items, protein_options).resolve(text)
+
+
+# Noisy transcript -> expected item_id (None means it should not resolve)
+NOISY_CORPUS = [
+    ("chicken burrow", "chicken_burrito"),
+    ("chicken_burrow", "chicken_burrito"),
+    ("quesadeeya", "quesadilla"),
+    ("kesadia", "quesadilla"),
+    ("burritto", "burrito"),
+    ("burito", "burrito"),
+    ("tako", "taco"),
+    ("nacho", "nachos"),
+    ("natchos", "nachos"),
+    ("burgur", "burger"),
+    ("chikin burger", "chicken_burger"),
+    ("vegie burger", "veggie_burger"),
+    ("onion ring", "onion_rings"),
+    ("onyon rings", "onion_rings"),
+    ("frys", "fries"),
+    ("ice tea", "iced_tea"),
+    ("iced t", "iced_tea"),
+    ("dyet cola", "diet_cola"),
+    ("kola", "cola"),
+    ("lemon lyme", "lemon_lime"),
+    ("orange soder", "orange_soda"),
+    ("wadder", "water"),
+    ("beef burrow", "burrito"),
+    ("bean burrito", None),
+    ("bean burger", None),
+    ("stake burrito", None),
+    ("pizza", None),
+    ("milkshake", None),
+    ("hot dog", None),
+    ("salad", None),
+]
+
+
+def run_benchmark(corpus=NOISY_CORPUS, rounds=200):
+    """
+    Measure accuracy and lookup time over a noisy transcript corpus
+
+    Returns:
+        dict with accuracy, misses and per-lookup timings in microseconds
+    """
+    resolver = FuzzyItemResolver(MENU_ITEMS, PROTEIN_OPTIONS)
+
+    misses = []
+    for text, expected in corpus:
+        result = resolver.resolve(text)
+        actual = result["item_id"] if result else None
+        if actual != expected:
+            misses.append({"text": text, "expected": expected, "actual": actual})
+
+    # Cold: fresh resolver cache every lookup; warm: repeated phrases hit the cache
+    start = time.perf_counter()
+    for _ in range(rounds):
+        resolver._cache.clear()
+        for text, _ in corpus:
+            resolver.resolve(text)
+    cold_us = (time.perf_counter() - start) / (rounds * len(corpus)) * 1e6
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text, _ in corpus:
+            resolver.resolve(text)
+    warm_us = (time.perf_counter() - start) / (rounds * len(corpus)) * 1e6
+
+    return {
+        "samples": len(corpus),
+        "accuracy": round(1 - len(misses) / len(corpus), 3),
+        "misses": misses,
+        "cold_lookup_us": round(cold_us, 1),
+        "warm_lookup_us": round(warm_us, 2),
+    }
+
+
+if __name__ == "__main__":
+    report = run_benchmark()
+    print(f"Fuzzy resolver benchmark over {report['samples']} noisy transcripts")
+    print(f"  accuracy:        {report['accuracy'] * 100:.1f}%")
+    print(f"  cold lookup:     {report['cold_lookup_us']} µs")
+    print(f"  cached lookup:   {report['warm_lookup_us']} µs")
+    for miss in report["misses"]:
+        print(f"  MISS: '{miss['text']}' expected {miss['expected']}, got {miss['actual']}")
@@ -0,0 +1,76 @@
+"""
+Idempotency - Replay-safe handling of LLM tool calls
+
+Speech-to-speech models occasionally deliver the same function call twice
+(a reconnect, a retried stream, an interruption that replays the turn). Each
+`order_food` result is remembered under the Pipecat function call id plus a
+hash of the normalized arguments, so a replayed call gets the original result
+back instantly and never touches the cart a second time.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+
+# Recent results kept per order
+DEFAULT_MAX_ENTRIES = 128
+
+
+def _normalize(value):
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items() if v not in (None, "", [], {})}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, str):
+        return value.strip().lower()
+    return value
+
+
+def arguments_hash(arguments):
+    """Stable hash of tool-call arguments, ignoring key order, case and empty fields."""
+    encoded = json.dumps(_normalize(arguments or {}), sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+class ToolCallCache:
+    """Bounded LRU of tool results keyed by (tool_call_id, arguments hash)."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(tool_call_id, arguments):
+        """Cache key for a call, or None when the call has no id to key on."""
+        if not tool_call_id:
+            return None
+        return (tool_call_id, arguments_hash(arguments))
+
+    def get(self, key):
+        """Return the recorded result for a key, or None."""
+        if key is None:
+            return None
+        result = self._results.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self._results.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        """Record the result of a call."""
+        if key is None:
+            return
+        self._results[key] = result
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    def clear(self):
+        self._results.clear()
+
+    def __len__(self):
+        return len(self._results)
@@ -0,0 +1,238 @@
+"""
+Keyword Matcher - One Aho-Corasick automaton for every intent keyword table
+
+Replacement detection, order-intent analysis and transcription cleanup all look
+for fixed phrases in the customer's utterance. Instead of each of them
+lower-casing the text and running `keyword in text` over its own list, the
+tables below are compiled once into a single automaton; `scan_intents` walks
+the utterance once and reports every category that matched, honoring word
+boundaries (so "and" no longer matches inside "sandwich") while still
+accepting a plural "s"/"es" after a phrase (so "tacos" matches "taco").
+"""
+
+from collections import deque
+from functools import lru_cache
+
+# Endings a phrase may carry and still count as a whole-word match
+PLURAL_SUFFIXES = ("s", "es")
+
+# Common speech recognition errors in food orders (error phrase -> correction)
+TRANSCRIPTION_CORRECTIONS = {
+    # Contradictory phrases
+    'no cheese extra cheese': 'extra cheese',
+    'no onion extra onion': 'extra onion',
+    'no lettuce extra lettuce': 'extra lettuce',
+    'with no cheese extra cheese': 'with extra cheese',
+    'with no onion extra onion': 'with extra onion',
+
+    # Common misheard words
+    'no cheese and extra cheese': 'extra cheese',
+    'no onions and extra onions': 'extra onions',
+    'without cheese but extra cheese': 'extra cheese',
+
+    # Redundant phrases
+    'extra extra cheese': 'extra cheese',
+    'no no onions': 'no onions',
+}
+
+# Keyword tables by category. A phrase may appear in several categories.
+KEYWORD_TABLES = {
+    # replacement_handler.detect_replacement_intent
+    "replacement": [
+        'instead', 'change that to', 'make that', 'switch to',
+        'change to', 'replace with', 'actually make it',
+        'can you make that', 'make it a', 'change it to'
+    ],
+    # replacement_handler.should_replace_instead_of_update
+    "strong_replacement": ['instead', 'change that to', 'replace with', 'actually make it'],
+    # replacement_handler replacement patterns
+    "protein_change": ['chicken', 'beef', 'veggie'],
+    "item_type_change": ['burger', 'taco', 'burrito', 'quesadilla'],
+    "size_change": ['small', 'medium', 'large'],
+    "combo_change": ['combo', 'meal'],
+    # customization_validator.analyze_order_intent
+    "add": [
+        'another', 'second', 'also', 'add', 'plus', 'and',
+        'can i have', 'i want', 'i need', 'give me'
+    ],
+    "modify": [
+        'change', 'modify', 'update', 'make that', 'instead',
+        'actually', 'correction', 'fix'
+    ],
+    # customization_validator.clean_speech_transcription
+    "correction": list(TRANSCRIPTION_CORRECTIONS),
+}
+
+
+class KeywordAutomaton:
+    """Aho-Corasick multi-pattern matcher over lower-cased text."""
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self._patterns = []
+        self._categories = []
+        self._index = {}
+        self._built = False
+
+    @classmethod
+    def from_tables(cls, tables):
+        """Compile an automaton from a {category: [phrases]} mapping."""
+        automaton = cls()
+        for category, phrases in tables.items():
+            for phrase in phrases:
+                automaton.add(phrase, category)
+        automaton.build()
+        return automaton
+
+    def add(self, phrase, category):
+        """Add a phrase under a category (before build)."""
+        phrase = phrase.lower()
+        if phrase in self._index:
+            self._categories[self._index[phrase]].add(category)
+            return
+        pattern_id = len(self._patterns)
+        self._index[phrase] = pattern_id
+        self._patterns.append(phrase)
+        self._categories.append({category})
+
+        state = 0
+        for char in phrase:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._output[state].append(pattern_id)
+        self._built = False
+
+    def build(self):
+        """Compute failure links (breadth-first)."""
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+        self._built = True
+
+    def find_all(self, text):
+        """
+        Find every whole-word phrase occurrence in text
+
+        Args:
+            text: Text to scan (matched case-insensitively)
+
+        Returns:
+            list: (start, end, phrase, categories) tuples in order of end position
+        """
+        if not self._built:
+            self.build()
+        text = text.lower()
+        matches = []
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern_id in self._output[state]:
+                phrase = self._patterns[pattern_id]
+                start = position - len(phrase) + 1
+                end = position + 1
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                if end < len(text) and text[end].isalnum() and not self._plural_at(text, end):
+                    continue
+                matches.append((start, end, phrase, self._categories[pattern_id]))
+        return matches
+
+    @staticmethod
+    def _plural_at(text, end):
+        """Whether a plural suffix followed by a word boundary starts at end."""
+        for suffix in PLURAL_SUFFIXES:
+            after = end + len(suffix)
+            if text.startswith(suffix, end) and (after == len(text) or not text[after].isalnum()):
+                return True
+        return False
+
+    def scan(self, text):
+        """
+        Scan text once and group the matched phrases by category
+
+        Returns:
+            dict: {category: [phrases in order of appearance, without repeats]}
+        """
+        found = {}
+        for start, end, phrase, categories in sorted(self.find_all(text), key=lambda m: (m[0], -m[1])):
+            for category in categories:
+                phrases = found.setdefault(category, [])
+                if phrase not in phrases:
+                    phrases.append(phrase)
+        return found
+
+
+# The shared automaton built from all keyword tables
+INTENT_MATCHER = KeywordAutomaton.from_tables(KEYWORD_TABLES)
+
+
+def scan_intents(text):
+    """Scan an utterance once against every intent keyword table."""
+    if not text:
+        return {}
+    return INTENT_MATCHER.scan(text)
+
+
+def _corrections_matcher(corrections):
+    if corrections.keys() == TRANSCRIPTION_CORRECTIONS.keys():
+        return INTENT_MATCHER
+    return _compile_corrections(frozenset(corrections))
+
+
+@lru_cache(maxsize=16)
+def _compile_corrections(phrases):
+    return KeywordAutomaton.from_tables({"correction": sorted(phrases)})
+
+
+def apply_corrections(text, corrections=TRANSCRIPTION_CORRECTIONS):
+    """
+    Rewrite every correction phrase found in a single scan
+
+    Overlapping matches are resolved leftmost-longest, so "with no cheese extra
+    cheese" wins over the shorter "no cheese extra cheese" inside it.
+
+    Args:
+        text: Text to correct
+        corrections: {error phrase: correction} mapping (the default is compiled into INTENT_MATCHER)
+
+    Returns:
+        tuple: (lower-cased corrected text, [(error, correction), ...] applied)
+    """
+    lowered = text.lower()
+    corrections = {error.lower(): correction for error, correction in corrections.items()}
+    candidates = [
+        (start, end, phrase) for start, end, phrase, categories in _corrections_matcher(corrections).find_all(lowered)
+        if "correction" in categories and phrase in corrections
+    ]
+    candidates.sort(key=lambda m: (m[0], -m[1]))
+
+    pieces = []
+    applied = []
+    cursor = 0
+    for start, end, phrase in candidates:
+        if start < cursor:
+            continue
+        pieces.append(lowered[cursor:start])
+        pieces.append(corrections[phrase])
+        applied.append((phrase, corrections[phrase]))
+        cursor = end
+    pieces.append(lowered[cursor:])
+    return "".join(pieces), applied
@@ -0,0 +1,338 @@
+"""
+Lane Manager - Lifecycle of the WebRTC connections served by run.py
+
+Each car at the speaker post is a lane: a `SmallWebRTCConnection`, the bot
+task running its pipeline, and the `PipelineTask` inside it (VAD model, LLM
+stream, transport). Lanes used to be dropped from `pcs_map` only on a clean
+"closed" event, so a car that drove off mid-handshake or a network that went
+away left the connection and its whole pipeline running for the rest of the
+shift.
+
+`LaneManager` owns the connection map and:
+
+- admits at most MAX_LANES lanes per box
+- reaps lanes that never finish ICE within LANE_ICE_TIMEOUT_SECS, lanes
+  whose peer has been unreachable for LANE_IDLE_TIMEOUT_SECS, and lanes whose
+  connection failed
+- cancels the lane's `PipelineTask` (and then its bot task) when it reaps it,
+  and counts bot tasks still running after a clean close as leaked
+- keeps counters for `/api/lanes`
+
+A lane's bot runs with `current_lane` set to the lane's name (the offer's
+"lane" field, or its pc_id), and every task the pipeline starts inherits
+it, so order events published from a tool call know which lane they
+belong to.
+"""
+
+import asyncio
+import contextvars
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+DEFAULT_MAX_LANES = 4
+DEFAULT_IDLE_TIMEOUT_SECS = 30.0
+DEFAULT_ICE_TIMEOUT_SECS = 20.0
+DEFAULT_REAP_INTERVAL_SECS = 5.0
+
+# Lane lifetimes kept for the average used in wait estimates
+RECENT_LANE_DURATIONS = 50
+
+# How long a bot task may outlive a clean close before it is counted as leaked
+CLOSE_GRACE_SECS = 10.0
+
+# Lane states
+LANE_CONNECTING = "connecting"
+LANE_CONNECTED = "connected"
+LANE_DISCONNECTED = "disconnected"
+LANE_CLOSED = "closed"
+LANE_FAILED = "failed"
+
+# Reap reasons
+REAP_ICE_TIMEOUT = "ice_timeout"
+REAP_IDLE = "idle"
+REAP_FAILED = "failed"
+REAP_LEAKED = "leaked"
+REAP_SHUTDOWN = "shutdown"
+
+# Name of the lane whose bot is running the current task (None outside lanes)
+current_lane: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_lane", default=None)
+
+
+class Lane:
+    """One WebRTC connection and the tasks serving it."""
+
+    def __init__(self, pc_id: str, connection: Any, now: float, name: Optional[str] = None):
+        self.pc_id = pc_id
+        self.name = str(name) if name else pc_id
+        self.connection = connection
+        self.state = LANE_CONNECTING
+        self.created_at = now
+        self.last_seen = now
+        self.closed_at: Optional[float] = None
+        self.bot_task: Optional[asyncio.Task] = None
+        self.pipeline_task: Any = None
+
+    def bot_running(self) -> bool:
+        return self.bot_task is not None and not self.bot_task.done()
+
+    def to_dict(self, now: float) -> Dict:
+        return {
+            "pc_id": self.pc_id,
+            "name": self.name,
+            "state": self.state,
+            "age_secs": round(now - self.created_at, 1),
+            "idle_secs": round(now - self.last_seen, 1),
+            "bot_running": self.bot_running(),
+        }
+
+
+class LaneManager:
+    """Admission limit, timeouts and reaping for the box's WebRTC lanes."""
+
+    def __init__(self, max_lanes: int = DEFAULT_MAX_LANES, idle_timeout: float = DEFAULT_IDLE_TIMEOUT_SECS,
+                 ice_timeout: float = DEFAULT_ICE_TIMEOUT_SECS, reap_interval: float = DEFAULT_REAP_INTERVAL_SECS,
+                 clock=time.monotonic):
+        self.max_lanes = max_lanes
+        self.idle_timeout = idle_timeout
+        self.ice_timeout = ice_timeout
+        self.reap_interval = reap_interval
+        self.clock = clock
+
+        # pc_id -> connection, for renegotiation (run.py's pcs_map)
+        self.connections: Dict[str, Any] = {}
+        self.lanes: Dict[str, Lane] = {}
+        self.counters = {
+            "admitted": 0,
+            "rejected": 0,
+            "closed": 0,
+            REAP_ICE_TIMEOUT: 0,
+            REAP_IDLE: 0,
+            REAP_FAILED: 0,
+            REAP_LEAKED: 0,
+        }
+        self.recent_durations = deque(maxlen=RECENT_LANE_DURATIONS)
+        # Called whenever a lane frees its slot (see admission.py)
+        self.freed_callbacks: List[Callable[[], None]] = []
+        self._reaper: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls) -> "LaneManager":
+        return cls(
+            max_lanes=int(os.getenv("MAX_LANES", DEFAULT_MAX_LANES)),
+            idle_timeout=float(os.getenv("LANE_IDLE_TIMEOUT_SECS", DEFAULT_IDLE_TIMEOUT_SECS)),
+            ice_timeout=float(os.getenv("LANE_ICE_TIMEOUT_SECS", DEFAULT_ICE_TIMEOUT_SECS)),
+            reap_interval=float(os.getenv("LANE_REAP_INTERVAL_SECS", DEFAULT_REAP_INTERVAL_SECS)),
+        )
+
+    def active_lanes(self) -> int:
+        """Lanes still holding a connection or a running pipeline."""
+        return len(self.lanes)
+
+    def can_admit(self) -> bool:
+        return self.active_lanes() < self.max_lanes
+
+    def reject(self):
+        self.counters["rejected"] += 1
+
+    def average_lane_secs(self, default: float) -> float:
+        """Average lifetime of recent lanes, or default before any has ended."""
+        if not self.recent_durations:
+            return default
+        return sum(self.recent_durations) / len(self.recent_durations)
+
+    def _forget(self, lane: Lane):
+        """Drop a lane and free its slot."""
+        self.connections.pop(lane.pc_id, None)
+        if self.lanes.get(lane.pc_id) is not lane:
+            return
+        del self.lanes[lane.pc_id]
+        self.recent_durations.append(self.clock() - lane.created_at)
+        for callback in list(self.freed_callbacks):
+            callback()
+
+    def register(self, pc_id: str, connection: Any, name: Optional[str] = None) -> Lane:
+        """
+        Track a new connection
+
+        Hooks the connection's state events so the lane follows it (by the
+        connection's current pc_id, which renegotiation may change). Call
+        start_bot to run the lane's pipeline. `name` (default: pc_id) is what
+        the lane's order events are tagged with.
+        """
+        lane = Lane(pc_id, connection, self.clock(), name)
+        self.lanes[pc_id] = lane
+        self.connections[pc_id] = connection
+        self.counters["admitted"] += 1
+
+        async def on_connected(_connection):
+            self._set_state(_connection.pc_id, LANE_CONNECTED)
+
+        async def on_disconnected(_connection):
+            self._set_state(_connection.pc_id, LANE_DISCONNECTED)
+
+        async def on_failed(_connection):
+            self._set_state(_connection.pc_id, LANE_FAILED)
+
+        async def on_closed(_connection):
+            self.mark_closed(_connection.pc_id)
+
+        for event, handler in (("connected", on_connected), ("disconnected", on_disconnected),
+                               ("failed", on_failed), ("closed", on_closed)):
+            connection.add_event_handler(event, handler)
+        return lane
+
+    def start_bot(self, pc_id: str, coroutine) -> asyncio.Task:
+        """Run a lane's bot coroutine as a task the reaper can cancel."""
+        lane = self.lanes.get(pc_id)
+        name = lane.name if lane is not None else pc_id
+
+        async def run_in_lane():
+            # Set inside the task, so only this lane's tasks see it
+            current_lane.set(name)
+            return await coroutine
+
+        task = asyncio.create_task(run_in_lane())
+        # Cancelled before it first ran (reaper, shutdown), the bot coroutine was never
+        # awaited; close it so it is cleaned up instead of leaking
+        task.add_done_callback(lambda _task: coroutine.close())
+        if lane is not None:
+            lane.bot_task = task
+            task.add_done_callback(lambda _task: self._bot_finished(lane, _task))
+        return task
+
+    def attach_pipeline_task(self, pc_id: str, pipeline_task: Any):
+        """Called by the bot once it has built the lane's PipelineTask."""
+        lane = self.lanes.get(pc_id)
+        if lane is not None:
+            lane.pipeline_task = pipeline_task
+
+    def rekey(self, old_pc_id: str, new_pc_id: str):
+        """Follow a pc_id change after renegotiation."""
+        if old_pc_id == new_pc_id or old_pc_id not in self.lanes:
+            return
+        lane = self.lanes.pop(old_pc_id)
+        lane.pc_id = new_pc_id
+        self.lanes[new_pc_id] = lane
+        connection = self.connections.pop(old_pc_id, None)
+        if connection is not None:
+            self.connections[new_pc_id] = connection
+
+    def touch(self, pc_id: str):
+        lane = self.lanes.get(pc_id)
+        if lane is not None:
+            lane.last_seen = self.clock()
+
+    def _set_state(self, pc_id: str, state: str):
+        lane = self.lanes.get(pc_id)
+        if lane is None or lane.state == LANE_CLOSED:
+            return
+        lane.state = state
+        if state == LANE_CONNECTED:
+            lane.last_seen = self.clock()
+
+    def mark_closed(self, pc_id: str):
+        """The peer closed cleanly; the bot has CLOSE_GRACE_SECS to finish."""
+        self.connections.pop(pc_id, None)
+        lane = self.lanes.get(pc_id)
+        if lane is None or lane.state == LANE_CLOSED:
+            return
+        lane.state = LANE_CLOSED
+        lane.closed_at = self.clock()
+        self.counters["closed"] += 1
+        logger.info(f"Lane {pc_id} closed")
+        if not lane.bot_running():
+            self._forget(lane)
+
+    def _bot_finished(self, lane: Lane, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Lane {lane.pc_id} bot failed: {task.exception()}")
+        # A finished bot frees a lane that is already closed
+        if lane.state == LANE_CLOSED:
+            self._forget(lane)
+
+    def _reap_reason(self, lane: Lane, now: float) -> Optional[str]:
+        if lane.state == LANE_CLOSED:
+            if lane.bot_running() and now - lane.closed_at > CLOSE_GRACE_SECS:
+                return REAP_LEAKED
+            return None
+        if lane.state == LANE_FAILED:
+            return REAP_FAILED
+        # The pipeline ended but the peer connection is still open
+        if lane.bot_task is not None and lane.bot_task.done():
+            return REAP_IDLE
+        is_connected = getattr(lane.connection, "is_connected", None)
+        if callable(is_connected) and is_connected():
+            lane.last_seen = now
+            return None
+        if lane.state == LANE_CONNECTING:
+            return REAP_ICE_TIMEOUT if now - lane.created_at > self.ice_timeout else None
+        return REAP_IDLE if now - lane.last_seen > self.idle_timeout else None
+
+    async def reap_once(self) -> List[str]:
+        """Reap every lane past a timeout; returns the reaped pc_ids."""
+        now = self.clock()
+        reaped = []
+        for lane in list(self.lanes.values()):
+            reason = self._reap_reason(lane, now)
+            if reason is not None:
+                await self.reap(lane, reason)
+                reaped.append(lane.pc_id)
+        return reaped
+
+    async def reap(self, lane: Lane, reason: str):
+        """Cancel a lane's pipeline, close its connection and forget it."""
+        logger.warning(f"Reaping lane {lane.pc_id} ({reason}, state {lane.state})")
+        if reason in self.counters:
+            self.counters[reason] += 1
+        self._forget(lane)
+
+        if lane.pipeline_task is not None:
+            try:
+                await lane.pipeline_task.cancel()
+            except Exception as e:
+                logger.error(f"Lane {lane.pc_id}: error cancelling pipeline: {e}")
+        if lane.bot_running():
+            lane.bot_task.cancel()
+        if lane.state != LANE_CLOSED:
+            try:
+                await lane.connection.disconnect()
+            except Exception as e:
+                logger.error(f"Lane {lane.pc_id}: error closing connection: {e}")
+
+    async def run_reaper(self):
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            try:
+                await self.reap_once()
+            except Exception as e:
+                logger.error(f"Lane reaper error: {e}")
+
+    def start(self):
+        """Start the reaper task on the running loop."""
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self.run_reaper())
+
+    async def shutdown(self):
+        """Stop the reaper and tear down every lane."""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        for lane in list(self.lanes.values()):
+            await self.reap(lane, REAP_SHUTDOWN)
+
+    def stats(self) -> Dict:
+        now = self.clock()
+        return {
+            "active": self.active_lanes(),
+            "max_lanes": self.max_lanes,
+            "counters": dict(self.counters),
+            "lanes": [lane.to_dict(now) for lane in self.lanes.values()],
+        }
+
+
+# Global manager used by run.py and the bot
+lane_manager = LaneManager.from_env()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Load Generator - Simulates many concurrent drive-thru lanes against the order pipeline.
+
+Each synthetic lane drives a scripted order conversation through the same
+tool-call interface Nova Sonic uses (``process_food_order`` with a
+``FunctionCallParams``), with a local stand-in that sleeps for a configurable
+"model think time" between turns instead of calling AWS. While the lanes run,
+fake display clients hold the order WebSocket (the 8766 socket started by
+``run.py``) open and timestamp every ``order_update`` they receive, and fake
+transcription clients hold ``/transcription`` open on a running ``run.py``.
+
+The order WebSocket server is started in-process with the same
+``websocket_handler`` that ``run.py`` uses, so broadcasts produced by the
+lanes reach the display clients exactly as they would in production.
+``food_ordering`` keeps one global ``OrderSession`` per process; while a level
+runs, that global is routed to a separate ``OrderSession`` per synthetic lane,
+so each lane builds its own cart the way a lane on its own box would.
+
+Usage:
+    python load_test.py --lanes 1,2,4,8,16 --displays 4 --conversations 3
+    python load_test.py --lanes 8 --transcription-url ws://localhost:7860/transcription
+"""
+
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import io
+import json
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import websockets
+from loguru import logger
+from pipecat.services.llm_service import FunctionCallParams
+
+import food_ordering
+from food_ordering import process_food_order
+from local_llm_service import LatencyModel
+from order_session import OrderSession
+from websocket_server import websocket_handler
+
+# Scripted order conversations. Each turn is the transcript the customer says
+# and the order_food call the model would emit for it.
+SCRIPTED_CONVERSATIONS = [
+    [
+        {"transcript": "I'd like a beef burger", "arguments": {"action": "add_item", "items": [{"item_id": "burger", "protein": "beef"}]}},
+        {"transcript": "make that a combo", "arguments": {"action": "update_items", "items": [{"item_id": "burger", "combo": True}]}},
+        {"transcript": "and a large fries", "arguments": {"action": "add_item", "items": [{"item_id": "fries", "size": "large"}]}},
+        {"transcript": "that's it", "arguments": {"action": "confirm_order", "items": []}},
+        {"transcript": "yes", "arguments": {"action": "finalize", "items": []}},
+    ],
+    [
+        {"transcript": "two chicken tacos and a coke", "arguments": {"action": "add_item", "items": [{"item_id": "taco", "protein": "chicken", "quantity": 2}, {"item_id": "cola"}]}},
+        {"transcript": "add nachos", "arguments": {"action": "add_item", "items": [{"item_id": "nachos"}]}},
+        {"transcript": "take off the nachos", "arguments": {"action": "remove_item", "items": [{"item_id": "nachos"}]}},
+        {"transcript": "that's all", "arguments": {"action": "confirm_order", "items": []}},
+        {"transcript": "yes please", "arguments": {"action": "finalize", "items": []}},
+    ],
+    [
+        {"transcript": "a steak burrito with extra cheese", "arguments": {"action": "add_item", "items": [{"item_id": "burrito", "protein": "steak", "customizations": ["extra_cheese"]}]}},
+        {"transcript": "and a diet coke", "arguments": {"action": "add_item", "items": [{"item_id": "diet_cola"}]}},
+        {"transcript": "make the drink large", "arguments": {"action": "update_items", "items": [{"item_id": "diet_cola", "size": "large"}]}},
+        {"transcript": "done", "arguments": {"action": "confirm_order", "items": []}},
+        {"transcript": "yep", "arguments": {"action": "finalize", "items": []}},
+    ],
+]
+
+
+# The OrderSession of the synthetic lane running in the current task
+_lane_session: contextvars.ContextVar = contextvars.ContextVar("load_test_lane_session", default=None)
+
+
+class LaneSessionRouter:
+    """Stands in for food_ordering.current_order_session, forwarding to the calling lane's OrderSession."""
+
+    def __init__(self, fallback: OrderSession):
+        object.__setattr__(self, "_fallback", fallback)
+
+    def _target(self) -> OrderSession:
+        return _lane_session.get() or self._fallback
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._target(), name, value)
+
+
+@contextlib.contextmanager
+def lane_sessions():
+    """Route food_ordering's global session to per-lane sessions, restoring it afterwards."""
+    original = food_ordering.current_order_session
+    food_ordering.current_order_session = LaneSessionRouter(original)
+    try:
+        yield
+    finally:
+        food_ordering.current_order_session = original
+
+
+def bind_lane_session() -> OrderSession:
+    """Give the current lane task its own OrderSession and return it."""
+    session = OrderSession()
+    _lane_session.set(session)
+    return session
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Return the pct-th percentile of values using nearest-rank.
+
+    Args:
+        values: Samples to summarize
+        pct: Percentile between 0 and 100
+
+    Returns:
+        The percentile value, or 0.0 for an empty sample
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class NovaSonicStandIn:
+    """Local stand-in for the model: waits a think time, then issues the scripted tool call."""
+
+    def __init__(self, think_ms: float = 0.0, jitter_ms: float = 0.0, seed: Optional[int] = None):
+        self.latency = LatencyModel("uniform", mean_ms=think_ms, stddev_ms=jitter_ms, seed=seed)
+
+    async def think(self):
+        """Simulate model latency before the tool call is emitted."""
+        await self.latency.wait()
+
+    async def call_tool(self, arguments: Dict) -> Dict:
+        """Invoke process_food_order like the LLM service does and return the tool result."""
+        result_holder = {}
+
+        async def result_callback(result, *, properties=None):
+            result_holder["result"] = result
+
+        params = FunctionCallParams(
+            function_name="order_food",
+            tool_call_id=str(uuid.uuid4()),
+            arguments=json.loads(json.dumps(arguments)),
+            llm=None,
+            context=None,
+            result_callback=result_callback,
+        )
+        await process_food_order(params)
+        return result_holder.get("result", {})
+
+
+class DisplayClient:
+    """Fake order display that holds the order socket open and records broadcast latency."""
+
+    def __init__(self, uri: str):
+        self.uri = uri
+        self.latencies_ms: List[float] = []
+        self.messages = 0
+        self._task: Optional[asyncio.Task] = None
+        self._connected = asyncio.Event()
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+        await asyncio.wait_for(self._connected.wait(), timeout=5.0)
+
+    async def _run(self):
+        async with websockets.connect(self.uri) as websocket:
+            self._connected.set()
+            async for raw in websocket:
+                received_at = time.time()
+                self.messages += 1
+                try:
+                    message = json.loads(raw)
+                except (TypeError, ValueError):
+                    continue
+                if message.get("type") == "order_update" and message.get("timestamp"):
+                    sent_at = datetime.fromisoformat(message["timestamp"]).timestamp()
+                    self.latencies_ms.append((received_at - sent_at) * 1000.0)
+
+    def reset(self):
+        self.latencies_ms = []
+        self.messages = 0
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await self._task
+
+
+class TranscriptionClient:
+    """Fake transcription display that holds /transcription open on a running run.py."""
+
+    def __init__(self, uri: str):
+        self.uri = uri
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        try:
+            async with websockets.connect(self.uri) as websocket:
+                async for _ in websocket:
+                    pass
+        except Exception as e:
+            logger.warning(f"Transcription client {self.uri} disconnected: {e}")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await self._task
+
+
+async def run_lane(lane_id: int, stand_in: NovaSonicStandIn, conversations: int, tool_latencies_ms: List[float], errors: List[str]):
+    """Drive scripted conversations for a single lane, recording tool-call latency."""
+    # run_level gathers each lane as its own task, so this binding stays with the lane
+    bind_lane_session()
+    for n in range(conversations):
+        script = SCRIPTED_CONVERSATIONS[(lane_id + n) % len(SCRIPTED_CONVERSATIONS)]
+        for turn in script:
+            await stand_in.think()
+            start = time.perf_counter()
+            result = await stand_in.call_tool(turn["arguments"])
+            tool_latencies_ms.append((time.perf_counter() - start) * 1000.0)
+            if result.get("status") == "error":
+                errors.append(f"lane {lane_id}: {result.get('message')}")
+
+
+async def run_level(lanes: int, displays: List[DisplayClient], args: argparse.Namespace) -> Dict:
+    """Run one lane-count level and summarize its latencies."""
+    for display in displays:
+        display.reset()
+    food_ordering.current_order_session.clear_order()
+
+    tool_latencies_ms: List[float] = []
+    errors: List[str] = []
+    stand_ins = [
+        NovaSonicStandIn(args.think_ms, args.jitter_ms, seed=(args.seed + lane) if args.seed is not None else None)
+        for lane in range(lanes)
+    ]
+
+    start = time.perf_counter()
+    with lane_sessions():
+        await asyncio.gather(*[
+            run_lane(lane, stand_ins[lane], args.conversations, tool_latencies_ms, errors)
+            for lane in range(lanes)
+        ])
+    elapsed = time.perf_counter() - start
+    # Give the display sockets a moment to drain the last broadcasts
+    await asyncio.sleep(0.05)
+
+    broadcast_latencies_ms = [latency for display in displays for latency in display.latencies_ms]
+    return {
+        "lanes": lanes,
+        "tool_calls": len(tool_latencies_ms),
+        "errors": len(errors),
+        "elapsed_s": round(elapsed, 3),
+        "tool_call_p50_ms": round(percentile(tool_latencies_ms, 50), 3),
+        "tool_call_p99_ms": round(percentile(tool_latencies_ms, 99), 3),
+        "broadcast_samples": len(broadcast_latencies_ms),
+        "broadcast_p50_ms": round(percentile(broadcast_latencies_ms, 50), 3),
+        "broadcast_p99_ms": round(percentile(broadcast_latencies_ms, 99), 3),
+    }
+
+
+async def run_load_test(args: argparse.Namespace) -> List[Dict]:
+    """Start the order socket, attach the fake displays and sweep the lane counts."""
+    server = await websockets.serve(lambda websocket: websocket_handler(websocket, "/"), "127.0.0.1", args.ws_port)
+    port = server.sockets[0].getsockname()[1]
+
+    displays = [DisplayClient(f"ws://127.0.0.1:{port}") for _ in range(args.displays)]
+    transcription_clients = [TranscriptionClient(args.transcription_url) for _ in range(args.displays)] if args.transcription_url else []
+
+    results = []
+    try:
+        for display in displays:
+            await display.start()
+        for client in transcription_clients:
+            await client.start()
+
+        for lanes in args.lanes:
+            if args.show_app_output:
+                results.append(await run_level(lanes, displays, args))
+            else:
+                # process_food_order prints heavily; keep the report readable
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results.append(await run_level(lanes, displays, args))
+    finally:
+        for client in displays + transcription_clients:
+            await client.stop()
+        server.close()
+        await server.wait_closed()
+
+    return results
+
+
+def format_report(results: List[Dict]) -> str:
+    """Format the lane-count vs. latency curve as a table."""
+    header = f"{'lanes':>6} {'calls':>7} {'errors':>7} {'tool p50':>10} {'tool p99':>10} {'bcast p50':>10} {'bcast p99':>10}"
+    lines = [header, "-" * len(header)]
+    for row in results:
+        lines.append(
+            f"{row['lanes']:>6} {row['tool_calls']:>7} {row['errors']:>7} "
+            f"{row['tool_call_p50_ms']:>8.2f}ms {row['tool_call_p99_ms']:>8.2f}ms "
+            f"{row['broadcast_p50_ms']:>8.2f}ms {row['broadcast_p99_ms']:>8.2f}ms"
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="GrillTalk drive-thru lane load generator")
+    parser.add_argument("--lanes", default="1,2,4,8", help="Comma-separated lane counts to sweep (default: 1,2,4,8)")
+    parser.add_argument("--displays", type=int, default=2, help="Fake display clients per socket (default: 2)")
+    parser.add_argument("--conversations", type=int, default=2, help="Scripted conversations per lane (default: 2)")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Stand-in model think time per turn in ms")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform jitter applied to the think time in ms")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible think times")
+    parser.add_argument("--ws-port", type=int, default=0, help="Port for the in-process order socket (default: ephemeral)")
+    parser.add_argument("--transcription-url", default=None, help="ws:// URL of a running run.py /transcription endpoint")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON instead of a table")
+    parser.add_argument("--show-app-output", action="store_true", help="Don't suppress process_food_order stdout")
+    args = parser.parse_args(argv)
+    args.lanes = [int(n) for n in str(args.lanes).split(",") if n.strip()]
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    results = asyncio.run(run_load_test(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(format_report(results))
+
+
+if __name__ == "__main__":
+    main()
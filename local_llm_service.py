@@ -0,0 +1,327 @@
+"""
+Local Nova Sonic stand-in - Offline, latency-deterministic LLM/TTS service for the Pipecat pipeline.
+
+`LocalNovaSonicLLMService` is a drop-in replacement for `AWSNovaSonicLLMService`
+in `agent.py`. Instead of streaming audio to AWS it replays a scripted
+conversation: for every user turn it emits the user transcription, waits for a
+latency sampled from a configurable distribution, runs the scripted function
+calls through the registered handlers (e.g. `process_food_order`), then speaks
+the scripted assistant reply as text frames plus synthetic audio frames.
+
+Script format (JSON file or dict):
+
+    {
+        "latency_ms": {"distribution": "normal", "mean": 350, "stddev": 60, "seed": 1},
+        "greeting": "Welcome to Grill Talk, how can I help you today?",
+        "turns": [
+            {
+                "user": "a beef burger please",
+                "function_calls": [
+                    {"name": "order_food", "arguments": {"action": "add_item", "items": [{"item_id": "burger", "protein": "beef"}]}}
+                ],
+                "assistant": "Got it! Would you like to make that a combo?"
+            }
+        ]
+    }
+
+Enable it in `agent.py` with `LLM_BACKEND=local` and `LOCAL_LLM_SCRIPT=<path>`.
+"""
+
+import asyncio
+import json
+import math
+import random
+import struct
+import uuid
+from typing import Dict, List, Optional, Union
+
+from loguru import logger
+from pipecat.frames.frames import (
+    CancelFrame,
+    EndFrame,
+    Frame,
+    LLMFullResponseEndFrame,
+    LLMFullResponseStartFrame,
+    LLMTextFrame,
+    TranscriptionFrame,
+    TTSAudioRawFrame,
+    TTSStartedFrame,
+    TTSStoppedFrame,
+    TTSTextFrame,
+    UserStoppedSpeakingFrame,
+)
+from pipecat.processors.aggregators.llm_response import (
+    LLMAssistantAggregatorParams,
+    LLMUserAggregatorParams,
+)
+from pipecat.processors.aggregators.openai_llm_context import OpenAILLMContext, OpenAILLMContextFrame
+from pipecat.processors.frame_processor import FrameDirection
+from pipecat.services.llm_service import LLMService
+from pipecat.utils.time import time_now_iso8601
+
+DEFAULT_SCRIPT_PATH = "local_llm_script.json"
+
+
+class LatencyModel:
+    """Samples per-turn latencies from a fixed, uniform, normal or lognormal distribution."""
+
+    DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+    def __init__(self, distribution: str = "fixed", mean_ms: float = 0.0, stddev_ms: float = 0.0,
+                 min_ms: float = 0.0, max_ms: Optional[float] = None, seed: Optional[int] = None):
+        """
+        Initialize the latency model
+
+        Args:
+            distribution: One of "fixed", "uniform", "normal" or "lognormal"
+            mean_ms: Mean latency in milliseconds
+            stddev_ms: Spread in milliseconds (half-width for "uniform")
+            min_ms: Lower clamp for sampled values
+            max_ms: Optional upper clamp for sampled values
+            seed: Random seed for reproducible runs
+        """
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution '{distribution}', expected one of {self.DISTRIBUTIONS}")
+        self.distribution = distribution
+        self.mean_ms = mean_ms
+        self.stddev_ms = stddev_ms
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self._random = random.Random(seed)
+
+    @classmethod
+    def from_dict(cls, spec: Optional[Dict]) -> "LatencyModel":
+        """Build a latency model from a script's "latency_ms" block."""
+        spec = spec or {}
+        return cls(
+            distribution=spec.get("distribution", "fixed"),
+            mean_ms=spec.get("mean", 0.0),
+            stddev_ms=spec.get("stddev", 0.0),
+            min_ms=spec.get("min", 0.0),
+            max_ms=spec.get("max"),
+            seed=spec.get("seed"),
+        )
+
+    def sample_ms(self) -> float:
+        """Draw one latency sample in milliseconds."""
+        if self.distribution == "uniform":
+            value = self._random.uniform(self.mean_ms - self.stddev_ms, self.mean_ms + self.stddev_ms)
+        elif self.distribution == "normal":
+            value = self._random.gauss(self.mean_ms, self.stddev_ms)
+        elif self.distribution == "lognormal":
+            if self.mean_ms <= 0:
+                value = 0.0
+            else:
+                # Parameterize so the distribution has the requested mean and stddev
+                variance_ratio = (self.stddev_ms / self.mean_ms) ** 2
+                sigma = math.sqrt(math.log1p(variance_ratio))
+                mu = math.log(self.mean_ms) - sigma ** 2 / 2
+                value = self._random.lognormvariate(mu, sigma)
+        else:
+            value = self.mean_ms
+
+        value = max(self.min_ms, value)
+        if self.max_ms is not None:
+            value = min(self.max_ms, value)
+        return value
+
+    async def wait(self) -> float:
+        """Sleep for one sampled latency and return it in milliseconds."""
+        delay_ms = self.sample_ms()
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000.0)
+        return delay_ms
+
+
+def load_script(script: Union[str, Dict, List]) -> Dict:
+    """
+    Load and normalize a conversation script
+
+    Args:
+        script: Path to a JSON file, a script dict, or a bare list of turns
+
+    Returns:
+        Dict with "turns", "greeting" and "latency_ms" keys
+    """
+    if isinstance(script, str):
+        with open(script, "r") as f:
+            script = json.load(f)
+    if isinstance(script, list):
+        script = {"turns": script}
+
+    turns = []
+    for turn in script.get("turns", []):
+        turns.append({
+            "user": turn.get("user", ""),
+            "function_calls": [
+                {"name": call.get("name", "order_food"), "arguments": call.get("arguments", {})}
+                for call in turn.get("function_calls", [])
+            ],
+            "assistant": turn.get("assistant", ""),
+        })
+
+    return {
+        "turns": turns,
+        "greeting": script.get("greeting", ""),
+        "latency_ms": script.get("latency_ms", {}),
+    }
+
+
+class LocalContextAggregatorPair:
+    def __init__(self, user, assistant):
+        self._user = user
+        self._assistant = assistant
+
+    def user(self):
+        return self._user
+
+    def assistant(self):
+        return self._assistant
+
+
+class LocalNovaSonicLLMService(LLMService):
+    """Scripted speech-to-speech service that stands in for AWS Nova Sonic."""
+
+    # Mirrors AWSNovaSonicLLMService so agent.py can build the same system prompt
+    AWAIT_TRIGGER_ASSISTANT_RESPONSE_INSTRUCTION = ""
+
+    def __init__(self, *, script: Union[str, Dict, List] = DEFAULT_SCRIPT_PATH,
+                 latency: Optional[LatencyModel] = None, sample_rate: int = 24000,
+                 audio_chunk_ms: int = 20, words_per_second: float = 2.5,
+                 advance_on_user_stopped_speaking: bool = True, **kwargs):
+        """
+        Initialize the stand-in service
+
+        Args:
+            script: Conversation script (see module docstring)
+            latency: Latency model for model response time; defaults to the script's "latency_ms"
+            sample_rate: Sample rate of the synthetic output audio
+            audio_chunk_ms: Duration of each emitted audio frame
+            words_per_second: Speaking rate used to size the synthetic audio
+            advance_on_user_stopped_speaking: Play the next turn whenever VAD reports end of speech
+        """
+        super().__init__(**kwargs)
+        self._script = load_script(script)
+        self._latency = latency or LatencyModel.from_dict(self._script["latency_ms"])
+        self._sample_rate = sample_rate
+        self._audio_chunk_ms = audio_chunk_ms
+        self._words_per_second = words_per_second
+        self._advance_on_user_stopped_speaking = advance_on_user_stopped_speaking
+        self._context: Optional[OpenAILLMContext] = None
+        self._turn_index = 0
+        self._turn_lock = asyncio.Lock()
+        self._turn_tasks = set()
+        self._audio_chunk = self._build_audio_chunk()
+
+    @property
+    def turns_remaining(self) -> int:
+        return len(self._script["turns"]) - self._turn_index
+
+    def create_context_aggregator(
+        self,
+        context: OpenAILLMContext,
+        *,
+        user_params: LLMUserAggregatorParams = LLMUserAggregatorParams(),
+        assistant_params: LLMAssistantAggregatorParams = LLMAssistantAggregatorParams(),
+    ) -> LocalContextAggregatorPair:
+        from pipecat.services.openai.llm import OpenAIAssistantContextAggregator, OpenAIUserContextAggregator
+
+        context.set_llm_adapter(self.get_llm_adapter())
+        user = OpenAIUserContextAggregator(context, params=user_params)
+        assistant = OpenAIAssistantContextAggregator(context, params=assistant_params)
+        return LocalContextAggregatorPair(user, assistant)
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, OpenAILLMContextFrame):
+            if not self._context:
+                self._context = frame.context
+        elif isinstance(frame, UserStoppedSpeakingFrame) and self._advance_on_user_stopped_speaking:
+            await self._reap_turn_tasks()
+            self._turn_tasks.add(self.create_task(self.run_next_turn()))
+
+        await self.push_frame(frame, direction)
+
+    async def stop(self, frame: EndFrame):
+        await super().stop(frame)
+        await self._cancel_turn_tasks()
+
+    async def cancel(self, frame: CancelFrame):
+        await super().cancel(frame)
+        await self._cancel_turn_tasks()
+
+    async def trigger_assistant_response(self):
+        """Speak the scripted greeting, mirroring the Nova Sonic trigger API."""
+        if self._script["greeting"]:
+            await self._latency.wait()
+            await self._speak(self._script["greeting"])
+        return True
+
+    async def run_next_turn(self) -> bool:
+        """
+        Play the next scripted turn
+
+        Returns:
+            True if a turn was played, False if the script is exhausted
+        """
+        async with self._turn_lock:
+            if self._turn_index >= len(self._script["turns"]):
+                logger.debug("Local LLM script exhausted")
+                return False
+            turn = self._script["turns"][self._turn_index]
+            self._turn_index += 1
+
+            if turn["user"]:
+                if self._context:
+                    self._context.add_message({"role": "user", "content": turn["user"]})
+                await self.push_frame(TranscriptionFrame(text=turn["user"], user_id="", timestamp=time_now_iso8601()))
+
+            await self._latency.wait()
+
+            for call in turn["function_calls"]:
+                await self._run_function_call(
+                    self._context,
+                    f"local-{uuid.uuid4()}",
+                    call["name"],
+                    call["arguments"],
+                    run_llm=False,
+                )
+
+            if turn["assistant"]:
+                await self._speak(turn["assistant"])
+            return True
+
+    async def _reap_turn_tasks(self):
+        """Let the task manager forget finished turns so they aren't reported as dangling."""
+        for task in [task for task in self._turn_tasks if task.done()]:
+            self._turn_tasks.discard(task)
+            await self.wait_for_task(task)
+
+    async def _cancel_turn_tasks(self):
+        for task in list(self._turn_tasks):
+            self._turn_tasks.discard(task)
+            await self.cancel_task(task)
+
+    async def _speak(self, text: str):
+        await self.push_frame(LLMFullResponseStartFrame())
+        await self.push_frame(TTSStartedFrame())
+        await self.push_frame(LLMTextFrame(text))
+        await self.push_frame(TTSTextFrame(text))
+
+        word_count = max(1, len(text.split()))
+        duration_ms = word_count / self._words_per_second * 1000.0
+        for _ in range(max(1, int(duration_ms // self._audio_chunk_ms))):
+            await self.push_frame(TTSAudioRawFrame(audio=self._audio_chunk, sample_rate=self._sample_rate, num_channels=1))
+
+        await self.push_frame(TTSStoppedFrame())
+        await self.push_frame(LLMFullResponseEndFrame())
+
+    def _build_audio_chunk(self) -> bytes:
+        # A quiet 220 Hz tone; every chunk is identical so it is generated once
+        samples = int(self._sample_rate * self._audio_chunk_ms / 1000)
+        amplitude = 2000
+        return b"".join(
+            struct.pack("<h", int(amplitude * math.sin(2 * math.pi * 220 * n / self._sample_rate)))
+            for n in range(samples)
+        )
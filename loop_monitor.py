@@ -0,0 +1,228 @@
+"""
+Loop Monitor - Event-loop lag and slow-callback watchdog
+
+Audio frames for every lane, tool calls and the display servers share one
+asyncio loop, so any synchronous work on it (a pretty-printed json.dumps,
+print to a slow stdout, OrderHistory writing a file) stalls audio for every
+car. The monitor has two halves:
+
+- a ticker coroutine on the loop that sleeps TICK_INTERVAL_SECS and records
+  how late it wakes up (the loop lag)
+- a watchdog thread that notices when the ticker is overdue by more than
+  LOOP_STALL_THRESHOLD_MS, samples the loop thread's stack while the stall
+  lasts, and attributes the stall to the innermost frame from this project
+  (falling back to the innermost non-asyncio frame, or to GIL contention
+  when the loop was only waiting in its selector)
+
+`loop_monitor.stats()` (served at /api/debug/loop) reports lag percentiles,
+the worst offenders by total stalled time and the most recent stalls with
+their stacks.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+DEFAULT_STALL_THRESHOLD_MS = 50.0
+
+# Ticker cadence on the loop, and how often the watchdog thread checks it
+TICK_INTERVAL_SECS = 0.05
+SAMPLE_INTERVAL_SECS = 0.01
+
+# Lag samples kept for percentiles, stalls kept for /api/debug/loop
+MAX_LAG_SAMPLES = 1200
+MAX_RECENT_STALLS = 20
+
+# Deepest stack kept per sample
+MAX_STACK_DEPTH = 40
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Frames that are never the culprit: the loop machinery itself
+_LOOP_MODULES = ("asyncio", "selectors", "threading", "concurrent.futures", "uvloop")
+
+# A loop sampled inside its selector wait wasn't running a callback: another
+# thread (a to_thread import, a worker) held the GIL when it should have woken
+GIL_CONTENTION = "gil:other-thread"
+
+Frame = Tuple[str, str, int, str]  # (module, function, line, filename)
+
+
+def _stack(frame) -> Tuple[Frame, ...]:
+    """The frames of a stack, outermost first."""
+    frames = []
+    while frame is not None and len(frames) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        frames.append((frame.f_globals.get("__name__", "?"), code.co_name, frame.f_lineno, code.co_filename))
+        frame = frame.f_back
+    return tuple(reversed(frames))
+
+
+def _is_project_frame(frame: Frame) -> bool:
+    filename = os.path.abspath(frame[3])
+    return (filename.startswith(PROJECT_ROOT + os.sep) and "site-packages" not in filename
+            and frame[0] != __name__)
+
+
+def attribute(stack: Tuple[Frame, ...]) -> str:
+    """Name the function responsible for a stalled stack, as module.function."""
+    if stack and stack[-1][0] == "selectors":
+        return GIL_CONTENTION
+    for frame in reversed(stack):
+        if _is_project_frame(frame):
+            return f"{frame[0]}.{frame[1]}"
+    for frame in reversed(stack):
+        if not frame[0].startswith(_LOOP_MODULES):
+            return f"{frame[0]}.{frame[1]}"
+    return "unknown"
+
+
+def format_stack(stack: Tuple[Frame, ...]) -> List[str]:
+    return [f"{module}.{function}:{line}" for module, function, line, _ in stack]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+class LoopMonitor:
+    """Measures loop lag and samples the stack of callbacks that stall it."""
+
+    def __init__(self, threshold_ms: float = DEFAULT_STALL_THRESHOLD_MS, tick_interval: float = TICK_INTERVAL_SECS,
+                 sample_interval: float = SAMPLE_INTERVAL_SECS):
+        self.threshold_ms = threshold_ms
+        self.tick_interval = tick_interval
+        self.sample_interval = sample_interval
+
+        self.lag_samples = deque(maxlen=MAX_LAG_SAMPLES)
+        self.recent_stalls = deque(maxlen=MAX_RECENT_STALLS)
+        # culprit -> [count, total_ms, max_ms]
+        self.culprits: Dict[str, List[float]] = {}
+        self.stall_count = 0
+
+        self._lock = threading.Lock()
+        self._last_tick = time.perf_counter()
+        self._last_lag_ms = 0.0
+        self._loop_thread_id: Optional[int] = None
+        self._stall_samples: Optional[Counter] = None
+        self._stall_started = 0.0
+        self._ticker: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._ticker is not None and not self._ticker.done()
+
+    def start(self):
+        """Start monitoring the running event loop."""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.perf_counter()
+        self._stop.clear()
+        self._ticker = asyncio.create_task(self._tick())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+        logger.info(f"Loop monitor: watching for stalls over {self.threshold_ms:.0f} ms")
+
+    def stop(self):
+        self._stop.set()
+        if self._ticker is not None:
+            self._ticker.cancel()
+            self._ticker = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _tick(self):
+        while True:
+            scheduled = time.perf_counter()
+            await asyncio.sleep(self.tick_interval)
+            now = time.perf_counter()
+            lag_ms = max(0.0, (now - scheduled - self.tick_interval) * 1000)
+            with self._lock:
+                self.lag_samples.append(lag_ms)
+                self._last_lag_ms = lag_ms
+                self._last_tick = now
+
+    def _watch(self):
+        threshold = self.threshold_ms / 1000.0
+        while not self._stop.wait(self.sample_interval):
+            with self._lock:
+                overdue = time.perf_counter() - self._last_tick - self.tick_interval
+                if overdue > threshold:
+                    frame = sys._current_frames().get(self._loop_thread_id)
+                    if self._stall_samples is None:
+                        self._stall_samples = Counter()
+                        self._stall_started = self._last_tick + self.tick_interval
+                    if frame is not None:
+                        self._stall_samples[_stack(frame)] += 1
+                    del frame
+                elif self._stall_samples is not None and self._last_tick > self._stall_started:
+                    self._finish_stall()
+
+    def _finish_stall(self):
+        """Record the stall that just ended (called with the lock held)."""
+        samples, self._stall_samples = self._stall_samples, None
+        duration_ms = max(self._last_lag_ms, self.threshold_ms)
+        if not samples:
+            return
+        stack, _ = samples.most_common(1)[0]
+        culprit = attribute(stack)
+
+        self.stall_count += 1
+        entry = self.culprits.setdefault(culprit, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += duration_ms
+        entry[2] = max(entry[2], duration_ms)
+        self.recent_stalls.append({
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "duration_ms": round(duration_ms, 1),
+            "culprit": culprit,
+            "samples": sum(samples.values()),
+            "stack": format_stack(stack),
+        })
+        logger.warning(f"Event loop stalled {duration_ms:.0f} ms in {culprit}")
+
+    def stats(self, top: int = 10) -> Dict:
+        with self._lock:
+            lags = list(self.lag_samples)
+            culprits = sorted(self.culprits.items(), key=lambda item: item[1][1], reverse=True)[:top]
+            recent = list(self.recent_stalls)[-top:]
+            stall_count = self.stall_count
+        return {
+            "running": self.running,
+            "threshold_ms": self.threshold_ms,
+            "lag_ms": {
+                "p50": round(percentile(lags, 50), 1),
+                "p99": round(percentile(lags, 99), 1),
+                "max": round(max(lags, default=0.0), 1),
+                "samples": len(lags),
+            },
+            "stalls": stall_count,
+            "culprits": [
+                {"culprit": name, "count": int(count), "total_ms": round(total, 1), "max_ms": round(worst, 1)}
+                for name, (count, total, worst) in culprits
+            ],
+            "recent": list(reversed(recent)),
+        }
+
+
+def monitor_enabled() -> bool:
+    """LOOP_MONITOR_ENABLED=0 turns the watchdog off."""
+    return os.getenv("LOOP_MONITOR_ENABLED", "1").lower() in ("1", "true", "yes")
+
+
+# Global monitor started by run.py
+loop_monitor = LoopMonitor(threshold_ms=float(os.getenv("LOOP_STALL_THRESHOLD_MS", DEFAULT_STALL_THRESHOLD_MS)))
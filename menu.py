@@ -160,6 +160,26 @@ DRINK_OPTIONS = {
     "iced_tea": "Iced Tea"
 }
 
+# Spoken names that map onto menu item IDs (mirrors DRINK RECOGNITION in agent.py)
+ITEM_SYNONYMS = {
+    "coke": "cola",
+    "coca cola": "cola",
+    "diet coke": "diet_cola",
+    "sprite": "lemon_lime",
+    "lemon lime": "lemon_lime",
+    "orange soda": "orange_soda",
+    "iced tea": "iced_tea",
+    "water": "water",
+    "drink": "soda",
+}
+
+# Items the agent must ask a protein for before ordering
+PROTEIN_CLARIFICATION_ITEMS = ["burger", "taco", "burrito", "quesadilla"]
+
+# Menu sections; everything else in MENU_ITEMS is a main item
+SIDE_ITEMS = ["fries", "onion_rings"]
+DRINK_ITEMS = ["soda", "cola", "diet_cola", "lemon_lime", "orange_soda", "iced_tea", "water"]
+
 def get_formatted_menu():
     """Return a formatted menu for display purposes."""
     menu_text = "=== GrillTalk MENU ===\n\n"
@@ -167,18 +187,18 @@ def get_formatted_menu():
     # Main items
     menu_text += "MAIN ITEMS:\n"
     for item_id, item in MENU_ITEMS.items():
-        if item_id not in ["fries", "onion_rings", "soda", "water"]:
+        if item_id not in SIDE_ITEMS and item_id not in DRINK_ITEMS:
             menu_text += f"- {item['name']}: ${item['base_price']:.2f} - {item['description']}\n"
     
     # Sides
     menu_text += "\nSIDES:\n"
-    for item_id in ["fries", "onion_rings"]:
+    for item_id in SIDE_ITEMS:
         item = MENU_ITEMS[item_id]
         menu_text += f"- {item['name']}: ${item['base_price']:.2f} - {item['description']}\n"
     
     # Drinks
     menu_text += "\nDRINKS:\n"
-    for item_id in ["soda", "cola", "diet_cola", "lemon_lime", "orange_soda", "iced_tea", "water"]:
+    for item_id in DRINK_ITEMS:
         if item_id in MENU_ITEMS:
             item = MENU_ITEMS[item_id]
             menu_text += f"- {item['name']}: ${item['base_price']:.2f} - {item['description']}\n"
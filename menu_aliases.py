@@ -0,0 +1,125 @@
+"""
+Menu Aliases - Precomputed alias graph for item ids
+
+Maps every id the customer or the LLM might use for a menu item
+("beef_burrito", "burrito_beef", "coke", "sprite", "chicken_burrito") to a
+canonical (item_id, protein, drink) tuple, and every menu item to its variants
+(e.g. "burrito" <-> "chicken_burrito"). The graph is derived from the menu
+once and cached per menu version, so item-id correction in the order loop is a
+single dict lookup instead of re-splitting every menu id on each call.
+"""
+
+from menu import ITEM_SYNONYMS, MENU_ITEMS, PROTEIN_OPTIONS
+
+# drink_choice values the LLM sends with item_id "soda" -> specific soda item id
+SODA_DRINK_ITEMS = {
+    "cola": "cola",
+    "diet_cola": "diet_cola",
+    "lemon_lime": "lemon_lime",
+    "orange": "orange_soda",
+    "iced_tea": "iced_tea"
+}
+
+
+class MenuAliasGraph:
+    """Alias and variant lookups derived from one version of the menu."""
+
+    def __init__(self, menu_items, protein_options, synonyms=None, soda_drink_items=None):
+        """
+        Build the graph
+
+        Args:
+            menu_items: Dictionary of valid menu items
+            protein_options: Dictionary of available protein options
+            synonyms: Spoken name -> item id (defaults to menu.ITEM_SYNONYMS)
+            soda_drink_items: drink_choice -> soda item id (defaults to SODA_DRINK_ITEMS)
+        """
+        synonyms = ITEM_SYNONYMS if synonyms is None else synonyms
+        soda_drink_items = SODA_DRINK_ITEMS if soda_drink_items is None else soda_drink_items
+
+        # drink_choice -> item id, restricted to sodas this menu actually sells
+        self.soda_items = {
+            drink: item_id for drink, item_id in soda_drink_items.items() if item_id in menu_items
+        }
+        drink_for_item = {item_id: drink for drink, item_id in self.soda_items.items()}
+
+        # Canonical ids resolve to themselves
+        self.aliases = {
+            item_id: (item_id, None, drink_for_item.get(item_id)) for item_id in menu_items
+        }
+
+        # protein_item ("beef_burrito") first, then item_protein ("burrito_beef"),
+        # matching a split on the first underscore
+        for protein in protein_options:
+            if "_" in protein:
+                continue
+            for item_id in menu_items:
+                self.aliases.setdefault(f"{protein}_{item_id}", (item_id, protein, None))
+        for item_id in menu_items:
+            if "_" in item_id:
+                continue
+            for protein in protein_options:
+                self.aliases.setdefault(f"{item_id}_{protein}", (item_id, protein, None))
+
+        # Spoken names ("coke", "diet coke", "sprite")
+        for spoken, item_id in synonyms.items():
+            if item_id not in menu_items:
+                continue
+            for alias in (spoken, spoken.replace(" ", "_")):
+                self.aliases.setdefault(alias, (item_id, None, drink_for_item.get(item_id)))
+
+        # Variants: "chicken_burrito" -> base "burrito", "burrito" -> ["chicken_burrito"]
+        self._base_of = {}
+        self._variants_of_base = {}
+        for item_id in menu_items:
+            if "_" in item_id:
+                base = item_id.split("_", 1)[1]
+                self._base_of[item_id] = base
+                self._variants_of_base.setdefault(base, []).append(item_id)
+
+        self._menu_items = menu_items
+
+    def resolve(self, item_id):
+        """Return the canonical (item_id, protein, drink) tuple for an alias, or None."""
+        return self.aliases.get(item_id)
+
+    def variants(self, item_id):
+        """Return item_id followed by the menu items that are variants of the same base item."""
+        if "_" in item_id:
+            base = self._base_of.get(item_id, item_id.split("_", 1)[1])
+            if base in self._menu_items and base != item_id:
+                return [item_id, base]
+            return [item_id]
+        return [item_id] + [variant for variant in self._variants_of_base.get(item_id, []) if variant != item_id]
+
+    def soda_item(self, drink_choice):
+        """Return the specific soda item id for a drink_choice, or None."""
+        return self.soda_items.get(drink_choice)
+
+
+# Graphs keyed by menu identity and size; the dicts are kept referenced so
+# their ids can't be reused while cached.
+_graph_cache = {}
+
+
+def get_alias_graph(menu_items=MENU_ITEMS, protein_options=PROTEIN_OPTIONS):
+    """
+    Return the alias graph for a menu, building it on first use
+
+    A menu version is identified by the menu and protein dicts plus their sizes,
+    so adding or removing items rebuilds the graph. Call
+    invalidate_alias_graphs() after renaming entries in place.
+    """
+    key = (id(menu_items), len(menu_items), id(protein_options), len(protein_options))
+    cached = _graph_cache.get(key)
+    if cached is None:
+        if len(_graph_cache) >= 16:
+            _graph_cache.clear()
+        cached = (menu_items, protein_options, MenuAliasGraph(menu_items, protein_options))
+        _graph_cache[key] = cached
+    return cached[2]
+
+
+def invalidate_alias_graphs():
+    """Drop all cached graphs (e.g. after the menu is edited in place)."""
+    _graph_cache.clear()
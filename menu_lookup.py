@@ -0,0 +1,115 @@
+"""
+Menu Lookup - On-demand menu queries for the compact prompt mode
+
+In compact mode the formatted menu is no longer part of the system
+instruction. The model calls `menu_lookup` when it needs prices or options
+instead, and only the section it asked for lands in the context.
+"""
+
+import json
+
+from loguru import logger
+from pipecat.adapters.schemas.function_schema import FunctionSchema
+from pipecat.services.llm_service import FunctionCallParams
+
+from menu import COMBOS, DRINK_ITEMS, MENU_ITEMS, PROTEIN_CLARIFICATION_ITEMS, PROTEIN_OPTIONS, SIDE_ITEMS, SIZES
+from menu_aliases import get_alias_graph
+from fuzzy_resolver import resolve_fuzzy_item
+
+MENU_SECTIONS = ["mains", "sides", "drinks", "sizes", "combos", "proteins"]
+
+menu_lookup_function = FunctionSchema(
+    name="menu_lookup",
+    description="Look up the GrillTalk menu: items with prices, sizes, combo deals or protein options. Use it whenever you need a price or to check an item exists.",
+    properties={
+        "query": {
+            "type": "string",
+            "description": "A menu section (mains, sides, drinks, sizes, combos, proteins) or an item name; empty for an overview",
+        }
+    },
+    required=[],
+)
+
+
+def _item_entry(item_id):
+    item = MENU_ITEMS[item_id]
+    entry = {"item_id": item_id, "name": item["name"], "price": item["base_price"]}
+    if item_id in PROTEIN_CLARIFICATION_ITEMS:
+        entry["needs_protein"] = True
+    return entry
+
+
+def _section(section):
+    if section == "mains":
+        return [_item_entry(i) for i in MENU_ITEMS if i not in SIDE_ITEMS and i not in DRINK_ITEMS]
+    if section == "sides":
+        return [_item_entry(i) for i in SIDE_ITEMS if i in MENU_ITEMS]
+    if section == "drinks":
+        return [_item_entry(i) for i in DRINK_ITEMS if i in MENU_ITEMS]
+    if section == "sizes":
+        return [{"size": size_id, "name": size["name"], "extra": size["price_modifier"]} for size_id, size in SIZES.items()]
+    if section == "combos":
+        return [
+            {"combo_type": combo_id, "name": combo["name"], "includes": combo["includes"], "discount": combo["discount"]}
+            for combo_id, combo in COMBOS.items()
+        ]
+    if section == "proteins":
+        return [{"protein": protein_id, "name": p["name"], "extra": p["price"]} for protein_id, p in PROTEIN_OPTIONS.items()]
+    return None
+
+
+def lookup_menu(query=""):
+    """
+    Answer a menu query
+
+    Args:
+        query: Section name, item name/id, or empty for an overview
+
+    Returns:
+        dict: The matching menu section, item, or an overview of section names
+    """
+    query = (query or "").strip().lower()
+    if not query or query == "menu":
+        return {"sections": MENU_SECTIONS, "items": sorted(MENU_ITEMS)}
+
+    section = query if query in MENU_SECTIONS else query.rstrip("s") + "s"
+    entries = _section(section)
+    if entries is not None:
+        return {"section": section, "entries": entries}
+
+    item_key = query.replace(" ", "_")
+    resolved = get_alias_graph().resolve(item_key)
+    if resolved is None:
+        fuzzy = resolve_fuzzy_item(query)
+        resolved = (fuzzy["item_id"], fuzzy["protein"], fuzzy["drink"]) if fuzzy else None
+    if resolved is None:
+        return {"status": "not_found", "query": query, "sections": MENU_SECTIONS}
+
+    item_id, protein, _ = resolved
+    entry = _item_entry(item_id)
+    entry["description"] = MENU_ITEMS[item_id]["description"]
+    if protein:
+        entry["protein"] = protein
+    return {"item": entry}
+
+
+# Menu answers only change with the menu; keyed by normalized query
+_lookup_cache = {}
+
+
+async def process_menu_lookup(params: FunctionCallParams):
+    """
+    Handle a menu_lookup function call.
+
+    Args:
+        params: Function call parameters with an optional "query"
+    """
+    query = (params.arguments or {}).get("query", "")
+    key = (query or "").strip().lower()
+    result = _lookup_cache.get(key)
+    if result is None:
+        result = lookup_menu(key)
+        if len(_lookup_cache) < 256:
+            _lookup_cache[key] = result
+    logger.info(f"MENU LOOKUP: '{query}' -> {json.dumps(result)[:200]}")
+    await params.result_callback(result)
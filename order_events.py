@@ -0,0 +1,257 @@
+"""
+Order Events - Append-only order event stream with in-memory projections
+
+Every change in an order's lifecycle (started -> updated -> awaiting
+confirmation -> finalized -> cleared) is appended to the invoice's event stream
+exactly once. Each event is serialized to JSON once, when it is appended, and
+that same string is what the display sockets receive. Projections subscribe to
+the stream and keep the read models in step:
+
+- CartProjection: the current items and status per invoice
+- DisplayProjection: the last display message per invoice (`websocket_server.orders_store`)
+- HistoryProjection: finalized orders, optionally written through to `OrderHistory`
+- AnalyticsProjection: running counters (orders, items, revenue, time to finalize)
+
+`OrderSession` stays the working copy for a single conversation; the stream is
+the record everyone else reads from.
+"""
+
+import itertools
+import json
+import os
+from collections import Counter, OrderedDict, deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+# Event types; the display message "type" for each event
+ORDER_STARTED = "order_started"
+ORDER_UPDATED = "order_update"
+ORDER_FINALIZED = "order_finalized"
+ORDER_CLEARED = "order_cleared"
+
+# Streams kept in memory for recently seen invoices
+MAX_STREAMS = 200
+
+# Recent finalize times the analytics average is taken over
+FINALIZE_SAMPLES = 1000
+
+
+class OrderEvent:
+    """One immutable lifecycle event, serialized once."""
+
+    __slots__ = ("seq", "invoice_id", "type", "message", "json", "recorded_at")
+
+    def __init__(self, seq: int, invoice_id: str, message: Dict, event_type: Optional[str] = None):
+        self.seq = seq
+        self.invoice_id = invoice_id
+        self.type = event_type or message["type"]
+        self.message = message
+        self.json = json.dumps(message)
+        self.recorded_at = datetime.now()
+
+
+class OrderEventStream:
+    """Per-invoice append-only event log that feeds registered projections."""
+
+    def __init__(self, max_streams: int = MAX_STREAMS):
+        self._streams: "OrderedDict[str, List[OrderEvent]]" = OrderedDict()
+        self._seq = itertools.count(1)
+        self._projections = []
+        self.max_streams = max_streams
+
+    def subscribe(self, projection):
+        """Register a projection; it receives every event appended from now on."""
+        self._projections.append(projection)
+        return projection
+
+    def append(self, invoice_id: str, message: Dict, event_type: Optional[str] = None) -> OrderEvent:
+        """
+        Append a lifecycle event and apply it to every projection
+
+        Args:
+            invoice_id: Invoice the event belongs to
+            message: Display message for the event; must contain "type" unless event_type is given
+            event_type: The event's type when it isn't part of the message sent to displays
+
+        Returns:
+            The recorded event
+        """
+        event = OrderEvent(next(self._seq), invoice_id, message, event_type)
+
+        stream = self._streams.get(invoice_id)
+        if stream is None:
+            stream = self._streams[invoice_id] = []
+            while len(self._streams) > self.max_streams:
+                self._streams.popitem(last=False)
+        else:
+            self._streams.move_to_end(invoice_id)
+        stream.append(event)
+
+        for projection in self._projections:
+            try:
+                projection.apply(event)
+            except Exception as e:
+                logger.error(f"Projection {type(projection).__name__} failed on event {event.seq}: {e}")
+        return event
+
+    def events(self, invoice_id: str) -> List[OrderEvent]:
+        """Return the recorded events for an invoice, oldest first."""
+        return list(self._streams.get(invoice_id, []))
+
+    def replay(self, projection, invoice_id: Optional[str] = None):
+        """Rebuild a projection from the retained events."""
+        invoices = [invoice_id] if invoice_id else list(self._streams)
+        events = sorted((e for i in invoices for e in self._streams.get(i, [])), key=lambda e: e.seq)
+        for event in events:
+            projection.apply(event)
+        return projection
+
+
+def _keep_recent(entries: OrderedDict, invoice_id: str, value):
+    """Set an invoice's entry as the most recent, forgetting the oldest past MAX_STREAMS."""
+    entries[invoice_id] = value
+    entries.move_to_end(invoice_id)
+    while len(entries) > MAX_STREAMS:
+        entries.popitem(last=False)
+
+
+class CartProjection:
+    """Current items and status per invoice."""
+
+    def __init__(self):
+        # Orders abandoned without a clear age out after MAX_STREAMS newer ones
+        self.carts: "OrderedDict[str, Dict]" = OrderedDict()
+
+    def apply(self, event: OrderEvent):
+        if event.type == ORDER_CLEARED:
+            self.carts.pop(event.invoice_id, None)
+        elif event.type == ORDER_FINALIZED:
+            order = event.message.get("order", {})
+            _keep_recent(self.carts, event.invoice_id, {"items": order.get("items", []), "status": "confirmed"})
+        else:
+            _keep_recent(self.carts, event.invoice_id, {
+                "items": event.message.get("items", []),
+                "status": event.message.get("status", "in_progress"),
+            })
+
+    def get(self, invoice_id: str) -> Optional[Dict]:
+        return self.carts.get(invoice_id)
+
+
+class DisplayProjection:
+    """Last display message per invoice, plus its pre-serialized JSON."""
+
+    def __init__(self):
+        # Kept as a plain dict of messages; exposed as websocket_server.orders_store
+        self.orders: Dict[str, Dict] = {}
+        self._events: Dict[str, OrderEvent] = {}
+
+    def apply(self, event: OrderEvent):
+        if event.type == ORDER_CLEARED:
+            self.orders.pop(event.invoice_id, None)
+            self._events.pop(event.invoice_id, None)
+        else:
+            self.orders[event.invoice_id] = event.message
+            self._events[event.invoice_id] = event
+
+    def serialized(self, invoice_id: str) -> str:
+        """JSON for an invoice's current display message, reusing the event's serialization."""
+        event = self._events.get(invoice_id)
+        message = self.orders.get(invoice_id)
+        if event is not None and event.message is message:
+            return event.json
+        # orders_store was edited directly (e.g. by tests); serialize what's there
+        return json.dumps(message)
+
+
+class HistoryProjection:
+    """Finalized orders, optionally persisted through an OrderHistory store."""
+
+    def __init__(self, store=None):
+        # The last MAX_STREAMS finalized orders; the store, when set, keeps the rest
+        self.orders: "OrderedDict[str, Dict]" = OrderedDict()
+        self.store = store
+
+    def apply(self, event: OrderEvent):
+        if event.type != ORDER_FINALIZED:
+            return
+        order = dict(event.message.get("order", {}))
+        order.setdefault("timestamp", event.message.get("timestamp"))
+        _keep_recent(self.orders, event.invoice_id, order)
+        if self.store is not None:
+            self.store.save_order(order)
+
+    def recent(self, limit: int = 10) -> List[Dict]:
+        return list(reversed(self.orders.values()))[:limit]
+
+
+class AnalyticsProjection:
+    """Running order metrics."""
+
+    def __init__(self):
+        self.orders_started = 0
+        self.orders_finalized = 0
+        self.orders_abandoned = 0
+        self.updates = 0
+        self.revenue = 0.0
+        self.item_counts = Counter()
+        self.finalize_seconds = deque(maxlen=FINALIZE_SAMPLES)
+        # Open orders only: an invoice is dropped when it is finalized or cleared, or ages out if abandoned
+        self._first_seen: "OrderedDict[str, datetime]" = OrderedDict()
+        # Recently finalized invoices, so their clear isn't counted as a new or abandoned order
+        self._finalized: "OrderedDict[str, None]" = OrderedDict()
+
+    def apply(self, event: OrderEvent):
+        if event.invoice_id not in self._first_seen and event.invoice_id not in self._finalized:
+            _keep_recent(self._first_seen, event.invoice_id, event.recorded_at)
+            self.orders_started += 1
+
+        if event.type in (ORDER_STARTED, ORDER_UPDATED):
+            self.updates += 1
+        elif event.type == ORDER_FINALIZED:
+            order = event.message.get("order", {})
+            self.orders_finalized += 1
+            started = self._first_seen.pop(event.invoice_id, event.recorded_at)
+            _keep_recent(self._finalized, event.invoice_id, None)
+            self.revenue += order.get("total", 0.0) or 0.0
+            for item in order.get("items", []):
+                if isinstance(item, dict):
+                    self.item_counts[item.get("item_id")] += item.get("quantity", 1) or 1
+            self.finalize_seconds.append((event.recorded_at - started).total_seconds())
+        elif event.type == ORDER_CLEARED:
+            if event.invoice_id in self._finalized:
+                del self._finalized[event.invoice_id]
+            else:
+                self.orders_abandoned += 1
+            self._first_seen.pop(event.invoice_id, None)
+
+    def summary(self) -> Dict:
+        average = sum(self.finalize_seconds) / len(self.finalize_seconds) if self.finalize_seconds else 0.0
+        return {
+            "orders_started": self.orders_started,
+            "orders_finalized": self.orders_finalized,
+            "orders_abandoned": self.orders_abandoned,
+            "updates": self.updates,
+            "revenue": round(self.revenue, 2),
+            "average_order_value": round(self.revenue / self.orders_finalized, 2) if self.orders_finalized else 0.0,
+            "average_seconds_to_finalize": round(average, 1),
+            "top_items": self.item_counts.most_common(5),
+        }
+
+
+def _history_store():
+    # OrderHistory writes every finalized order to disk; opt in with ORDER_HISTORY_PERSIST=1
+    if os.getenv("ORDER_HISTORY_PERSIST", "0").lower() not in ("1", "true", "yes"):
+        return None
+    from order_history import order_history
+    return order_history
+
+
+# Global stream and projections shared by the order pipeline and the display server
+order_events = OrderEventStream()
+cart_projection = order_events.subscribe(CartProjection())
+display_projection = order_events.subscribe(DisplayProjection())
+history_projection = order_events.subscribe(HistoryProjection(store=_history_store()))
+analytics_projection = order_events.subscribe(AnalyticsProjection())
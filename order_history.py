@@ -17,9 +17,21 @@ if not os.path.exists(HISTORY_DIR):
 
 class OrderHistory:
     def __init__(self):
-        self.history_cache = {}
-        self.load_history()
-        
+        # Scanned from disk on first use rather than at import
+        self._history_cache = None
+
+    @property
+    def history_cache(self) -> Dict[str, Dict]:
+        """Orders by invoice ID, loaded from disk on first access."""
+        if self._history_cache is None:
+            self._history_cache = {}
+            self.load_history()
+        return self._history_cache
+
+    @history_cache.setter
+    def history_cache(self, value: Dict[str, Dict]):
+        self._history_cache = value
+
     def load_history(self):
         """Load order history from disk."""
         try:
@@ -1,13 +1,111 @@
+import asyncio
+import re
 import uuid
 import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
 
+from idempotency import ToolCallCache
+
+# How many committed changes "undo that" can walk back
+UNDO_LOG_SIZE = 20
+
+# The transaction open in the current task; a tool call's nested transactions join it.
+# Calls on other tasks wait for it in OrderSession.acquire_transaction
+_active_transaction = ContextVar("order_transaction", default=None)
+
 def generate_unique_invoice_id():
     """Generate a unique invoice ID using timestamp and UUID"""
     timestamp = datetime.now().strftime("%Y%m%d%H%M")
     unique_id = str(uuid.uuid4())[:8]
     return f"{timestamp}-{unique_id}"
 
+# "2x Large Fries" -> quantity prefix "2x"
+QUANTITY_PREFIX = re.compile(r"^\s*\d+\s*x")
+
+def order_line_key(item):
+    """Fields that make two items the same order line"""
+    combo = item.get("combo")
+    if isinstance(combo, str):
+        combo = combo.lower() not in ("", "false", "0", "no")
+    return (
+        item.get("item_id"),
+        item.get("size") or "regular",
+        item.get("protein"),
+        bool(combo),
+        item.get("combo_type") if combo else None,
+        tuple(sorted(item.get("customizations") or [])),
+    )
+
+class OrderTransaction:
+    """
+    One call's batch of cart changes, returned by OrderSession.begin_transaction
+    
+    Only the outermost transaction captures the cart; nested ones join it.
+    Committing or rolling back twice is a no-op, so a call can commit before
+    publishing and still roll back safely in its error handler.
+    """
+    
+    def __init__(self, session, label, parent=None):
+        self.session = session
+        self.label = label
+        self.parent = parent
+        self.before = session._capture() if parent is None else None
+        self.record_undo = True
+        self.done = False
+        # Session lock held from acquire_transaction until commit or rollback
+        self.lock = None
+        _active_transaction.set(self)
+    
+    @property
+    def root(self):
+        return self if self.parent is None else self.parent.root
+    
+    def _close(self):
+        self.done = True
+        if _active_transaction.get() is self:
+            _active_transaction.set(self.parent)
+    
+    def _release(self):
+        self.session._open_transactions.discard(self)
+        if self.lock is not None:
+            self.lock.release()
+            self.lock = None
+    
+    def commit(self):
+        """
+        Finish the transaction, recording an undo entry if the cart changed
+        
+        Returns:
+            bool: True if an outermost transaction committed a change
+        """
+        if self.done:
+            return False
+        self._close()
+        if self.parent is not None:
+            return False
+        self._release()
+        if not self.session._differs_from(self.before):
+            return False
+        if self.record_undo:
+            self.session.undo_log.append((self.label, self.before))
+        self.session._changed()
+        return True
+    
+    def rollback(self):
+        """Abandon the transaction (and the one it is nested in), restoring the cart it captured"""
+        if self.done:
+            return
+        self._close()
+        if self.parent is not None:
+            self.root.rollback()
+            return
+        self.session._restore(self.before)
+        self._release()
+
+
 class OrderSession:
     def __init__(self):
         self.current_invoice_id = None
@@ -15,7 +113,18 @@ class OrderSession:
         self.is_order_active = False
         self.last_item_added = None
         self.last_item_timestamp = 0
-        self.duplicate_threshold = 3.0  # seconds
+        
+        # Results of this order's tool calls, so replayed calls don't apply twice
+        self.tool_call_cache = ToolCallCache()
+        
+        # Bumped on every committed change; snapshots are cached per version
+        self.version = 0
+        self.undo_log = deque(maxlen=UNDO_LOG_SIZE)
+        self._open_transactions = set()
+        self._transaction_lock = None
+        self._transaction_loop = None
+        self._snapshot = ()
+        self._snapshot_version = 0
         
     def start_new_order(self):
         """Generate a unique invoice ID only once per customer"""
@@ -24,37 +133,210 @@ class OrderSession:
         self.is_order_active = True
         self.last_item_added = None
         self.last_item_timestamp = 0
+        self.undo_log.clear()
+        self.tool_call_cache.clear()
+        self._changed()
         return self.current_invoice_id
     
+    def _capture(self):
+        # The list and each item dict are copied shallowly: order lines are flat
+        # dicts, and nested values (customizations) are replaced, not mutated
+        return {
+            "invoice_id": self.current_invoice_id,
+            "is_order_active": self.is_order_active,
+            "items": list(self.current_order_items),
+            "item_states": [dict(item) for item in self.current_order_items],
+            "last_item_added": self.last_item_added,
+            "last_item_timestamp": self.last_item_timestamp,
+        }
+    
+    def _restore(self, state):
+        # Restore item dicts in place so references held elsewhere see the rollback
+        for item, saved in zip(state["items"], state["item_states"]):
+            item.clear()
+            item.update(saved)
+        self.current_order_items = list(state["items"])
+        self.current_invoice_id = state["invoice_id"]
+        self.is_order_active = state["is_order_active"]
+        self.last_item_added = state["last_item_added"]
+        self.last_item_timestamp = state["last_item_timestamp"]
+    
+    def _differs_from(self, state):
+        return (
+            state["invoice_id"] != self.current_invoice_id or
+            state["is_order_active"] != self.is_order_active or
+            len(state["items"]) != len(self.current_order_items) or
+            any(a is not b for a, b in zip(state["items"], self.current_order_items)) or
+            any(dict(item) != saved for item, saved in zip(state["items"], state["item_states"]))
+        )
+    
+    def _changed(self):
+        self.version += 1
+    
+    def _joined_transaction(self):
+        transaction = _active_transaction.get()
+        if transaction is not None and transaction.session is self and not transaction.done:
+            return transaction
+        return None
+    
+    def begin_transaction(self, label="update"):
+        """
+        Start a transaction; one already open in this task is joined
+        
+        Args:
+            label: Description recorded in the undo log (e.g. the order action)
+        
+        Returns:
+            OrderTransaction: Commit or roll back this handle when the call is done
+        """
+        transaction = OrderTransaction(self, label, self._joined_transaction())
+        if transaction.parent is None:
+            self._open_transactions.add(transaction)
+        return transaction
+    
+    def _lock_for_running_loop(self):
+        # The session outlives event loops (tests, tools), and an asyncio.Lock belongs to one
+        loop = asyncio.get_running_loop()
+        if self._transaction_loop is not loop:
+            self._transaction_lock = asyncio.Lock()
+            self._transaction_loop = loop
+        return self._transaction_lock
+    
+    async def acquire_transaction(self, label="update"):
+        """
+        Start a call's transaction once no other call's is open
+        
+        A tool call awaits (callbacks, broadcasts, offloaded work) while its
+        transaction is open. Holding the session lock until commit or rollback
+        keeps another call from starting in between, so a rollback or an undo
+        entry never covers lines a concurrent call added.
+        
+        Args:
+            label: Description recorded in the undo log (e.g. the order action)
+        
+        Returns:
+            OrderTransaction: Commit or roll back this handle when the call is done
+        """
+        if self._joined_transaction() is not None:
+            return self.begin_transaction(label)
+        lock = self._lock_for_running_loop()
+        await lock.acquire()
+        try:
+            transaction = self.begin_transaction(label)
+        except BaseException:
+            lock.release()
+            raise
+        transaction.lock = lock
+        return transaction
+    
+    @contextmanager
+    def transaction(self, label="update"):
+        """
+        Apply a batch of changes atomically
+        
+        Usage:
+            with session.transaction("update_items"):
+                ...mutate current_order_items...
+        
+        An exception rolls every change in the block back before it propagates.
+        """
+        transaction = self.begin_transaction(label)
+        try:
+            yield self
+        except BaseException:
+            transaction.rollback()
+            raise
+        transaction.commit()
+    
+    def apply_operations(self, operations, label="update"):
+        """
+        Apply a batch of cart operations atomically
+        
+        Args:
+            operations: List of tuples:
+                ("add", item), ("remove", index), ("update", index, fields), ("replace", index, item)
+            label: Description recorded in the undo log
+        
+        Returns:
+            list: Per-operation results (the added/removed/updated item)
+        """
+        results = []
+        with self.transaction(label):
+            for operation in operations:
+                kind = operation[0]
+                if kind == "add":
+                    self.current_order_items.append(operation[1])
+                    results.append(operation[1])
+                elif kind == "remove":
+                    results.append(self.current_order_items.pop(operation[1]))
+                elif kind == "update":
+                    self.current_order_items[operation[1]].update(operation[2])
+                    results.append(self.current_order_items[operation[1]])
+                elif kind == "replace":
+                    self.current_order_items[operation[1]] = operation[2]
+                    results.append(operation[2])
+                else:
+                    raise ValueError(f"Unknown cart operation: {kind}")
+        return results
+    
+    def undo(self):
+        """
+        Revert the most recent committed change ("undo that")
+        
+        Returns:
+            str or None: Label of the undone change, or None if there is nothing to undo
+        """
+        if not self.undo_log:
+            return None
+        label, state = self.undo_log.pop()
+        self._restore(state)
+        transaction = self._joined_transaction()
+        if transaction:
+            # Don't let the surrounding transaction record the undo itself
+            transaction.root.record_undo = False
+        else:
+            self._changed()
+        return label
+    
+    def snapshot(self):
+        """
+        Read-only view of the cart for broadcasting
+        
+        Cached per version, so repeated broadcasts of the same cart share one
+        copy; commit before publishing to get the cached one. While any
+        transaction is open the cart may still be changing, so a fresh copy
+        is returned.
+        
+        Returns:
+            tuple: Copies of the current order items
+        """
+        if self._open_transactions:
+            return tuple(dict(item) for item in self.current_order_items)
+        if self._snapshot_version != self.version:
+            self._snapshot = tuple(dict(item) for item in self.current_order_items)
+            self._snapshot_version = self.version
+        return self._snapshot
+    
     def is_duplicate_request(self, item):
         """
-        Check if this item is a duplicate of the last item added within the threshold time
+        Check if this item repeats the order line that was just added
+        
+        Replayed tool calls never get here (see tool_call_cache), so no time
+        window is needed: asking again for the line just added means "one more
+        of those", and it is merged into that line.
         
         Returns:
             tuple: (is_duplicate, existing_item_index)
-            - is_duplicate: True if item appears to be a duplicate
+            - is_duplicate: True if item is the same line as the last item added
             - existing_item_index: Index of the existing item in current_order_items if found, None otherwise
         """
-        if not self.last_item_added:
+        if not self.last_item_added or order_line_key(self.last_item_added) != order_line_key(item):
             return False, None
-            
-        current_time = time.time()
-        time_diff = current_time - self.last_item_timestamp
-        
-        # If the request is within the threshold time window
-        if time_diff < self.duplicate_threshold:
-            # Check if the item is the same as the last one added
-            if (self.last_item_added["item_id"] == item["item_id"] and
-                self.last_item_added["size"] == item["size"] and
-                self.last_item_added["protein"] == item["protein"]):
-                
-                # Find the index of the existing item in the order
-                for i, order_item in enumerate(self.current_order_items):
-                    if (order_item["item_id"] == item["item_id"] and
-                        order_item["size"] == item["size"] and
-                        order_item["protein"] == item["protein"]):
-                        return True, i
-                        
+        # The line just added is almost always at the end
+        for i in range(len(self.current_order_items) - 1, -1, -1):
+            order_item = self.current_order_items[i]
+            if order_item is self.last_item_added or order_line_key(order_item) == order_line_key(item):
+                return True, i
         return False, None
         
     def add_item_to_order(self, item):
@@ -69,7 +351,29 @@ class OrderSession:
         """
         if not self.is_order_active:
             self.start_new_order()
-            
+        
+        with self.transaction("add_item"):
+            return self._add_item_to_order(item)
+    
+    def append_items_to_order(self, items):
+        """
+        Append order lines in one step, without duplicate detection
+        
+        For batches the caller has already merged: no line may repeat the one
+        before it, and the first must not repeat the last item added.
+        """
+        if not items:
+            return self.current_order_items
+        if not self.is_order_active:
+            self.start_new_order()
+        
+        with self.transaction("add_item"):
+            self.current_order_items.extend(items)
+            self.last_item_added = items[-1]
+            self.last_item_timestamp = time.time()
+        return self.current_order_items
+    
+    def _add_item_to_order(self, item):
         is_duplicate, existing_item_index = self.is_duplicate_request(item)
         action_taken = 'added_new'
         
@@ -80,10 +384,9 @@ class OrderSession:
             # Update the description to reflect the new quantity
             quantity = self.current_order_items[existing_item_index]["quantity"]
             description = self.current_order_items[existing_item_index]["description"]
-            # Replace the quantity at the beginning of the description
-            old_quantity = description.split('x')[0]
-            self.current_order_items[existing_item_index]["description"] = description.replace(
-                f"{old_quantity}x", f"{quantity}x", 1
+            # Replace the "<n>x" quantity prefix at the beginning of the description
+            self.current_order_items[existing_item_index]["description"] = QUANTITY_PREFIX.sub(
+                f"{quantity}x", description, count=1
             )
             
             # Recalculate the price based on the new quantity
@@ -110,6 +413,12 @@ class OrderSession:
             "timestamp": datetime.now().isoformat()
         }
         self.is_order_active = False
+        # A paid order can't be walked back
+        self.undo_log.clear()
+        transaction = self._joined_transaction()
+        if transaction:
+            transaction.root.record_undo = False
+        self._changed()
         return order_summary
         
     def clear_order(self):
@@ -119,3 +428,6 @@ class OrderSession:
         self.is_order_active = False
         self.last_item_added = None
         self.last_item_timestamp = 0
+        self.undo_log.clear()
+        self.tool_call_cache.clear()
+        self._changed()
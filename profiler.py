@@ -0,0 +1,211 @@
+"""
+Profiler - Opt-in sampling profiler for a running box
+
+A deterministic profiler slows every call on the loop, which would be felt
+by every car. This one samples instead: a background thread reads the stack
+of every thread (the event loop with the Pipecat pipelines and
+process_food_order, the display WebSocket server thread, workers) with
+sys._current_frames() every few milliseconds for a fixed number of seconds.
+Nothing runs on the loop while it samples, and at the default 100 Hz the
+sampler costs about 1% of one core (status() reports the measured share).
+
+With tasks=True the loop's samples also get the name of the asyncio task
+that was running (Pipecat names its tasks after the processor, e.g.
+"SmallWebRTCInputTransport#3::_audio_in_task_handler", which tells the
+lanes apart). Results are aggregated as collapsed stacks ("thread;module.function;... N"),
+the input format of flamegraph.pl, speedscope and similar tools. run.py
+exposes it at /api/admin/profile when the box is started with
+PROFILER_ENABLED=1 and an ADMIN_TOKEN; without both the endpoints refuse:
+
+    curl -X POST -H "X-Admin-Token: $ADMIN_TOKEN" 'localhost:7860/api/admin/profile?seconds=20'
+    curl -H "X-Admin-Token: $ADMIN_TOKEN" localhost:7860/api/admin/profile             # status and top functions
+    curl -H "X-Admin-Token: $ADMIN_TOKEN" localhost:7860/api/admin/profile/collapsed > box.collapsed
+"""
+
+import asyncio
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+DEFAULT_INTERVAL_MS = 10.0
+MIN_INTERVAL_MS = 1.0
+MAX_DURATION_SECS = 120.0
+
+# Deepest stack kept per sample
+MAX_STACK_DEPTH = 64
+
+# Sample only the event loop thread, or every thread
+THREADS_LOOP = "loop"
+THREADS_ALL = "all"
+
+
+class ProfilerBusy(Exception):
+    """A profile is already being collected."""
+
+
+def _collapse(frame) -> List[str]:
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        names.append(f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}")
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+
+def _clean(name: str) -> str:
+    return name.replace(";", ":").replace(" ", "_")
+
+
+def _running_task_name(loop) -> str:
+    """The task the loop is running right now, read from another thread."""
+    # asyncio keeps {loop: task} here; a racy read only ever mislabels one sample
+    task = getattr(asyncio.tasks, "_current_tasks", {}).get(loop)
+    return task.get_name() if task is not None else "none"
+
+
+class SamplingProfiler:
+    """Samples thread stacks for a fixed time and aggregates them as collapsed stacks."""
+
+    def __init__(self):
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[str] = None
+        self.duration = 0.0
+        self.interval_ms = DEFAULT_INTERVAL_MS
+        self.threads = THREADS_ALL
+        self.tasks = False
+        self.overhead_secs = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float, interval_ms: float = DEFAULT_INTERVAL_MS, threads: str = THREADS_ALL,
+              tasks: bool = False):
+        """
+        Start collecting a profile in the background
+
+        Args:
+            seconds: How long to sample (capped at MAX_DURATION_SECS)
+            interval_ms: Time between samples (at least MIN_INTERVAL_MS)
+            threads: THREADS_LOOP to sample only the event loop thread, or THREADS_ALL
+            tasks: Add the running asyncio task's name to event loop samples
+
+        Raises:
+            ProfilerBusy: if a profile is already running
+        """
+        with self._lock:
+            if self.running:
+                raise ProfilerBusy("A profile is already running")
+            self.stacks = Counter()
+            self.samples = 0
+            self.overhead_secs = 0.0
+            self.duration = min(max(seconds, 0.1), MAX_DURATION_SECS)
+            self.interval_ms = max(interval_ms, MIN_INTERVAL_MS)
+            self.threads = threads
+            self.started_at = datetime.now().isoformat(timespec="seconds")
+            self._stop.clear()
+            self.tasks = tasks
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            self._thread = threading.Thread(target=self._sample, args=(threading.get_ident(), loop),
+                                            name="sampling-profiler", daemon=True)
+            self._thread.start()
+        logger.info(f"Profiler: sampling {threads} threads every {self.interval_ms:.0f} ms for {self.duration:.0f} s")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+    def _sample(self, loop_thread_id: int, loop: Optional[asyncio.AbstractEventLoop]):
+        own_id = threading.get_ident()
+        interval = self.interval_ms / 1000.0
+        deadline = time.perf_counter() + self.duration
+        while time.perf_counter() < deadline and not self._stop.is_set():
+            sample_start = time.perf_counter()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()
+            collapsed = []
+            for thread_id, frame in frames.items():
+                if thread_id == own_id or (self.threads == THREADS_LOOP and thread_id != loop_thread_id):
+                    continue
+                prefix = [names.get(thread_id, str(thread_id))]
+                if thread_id == loop_thread_id:
+                    prefix = ["event-loop"]
+                    if self.tasks and loop is not None:
+                        prefix.append(f"task:{_running_task_name(loop)}")
+                collapsed.append(";".join([_clean(name) for name in prefix] + _collapse(frame)))
+            del frames
+            with self._lock:
+                self.stacks.update(collapsed)
+                self.samples += 1
+                self.overhead_secs += time.perf_counter() - sample_start
+            self._stop.wait(interval)
+        logger.info(f"Profiler: collected {self.samples} samples ({len(self.stacks)} distinct stacks)")
+
+    def collapsed(self) -> str:
+        """The profile in collapsed-stack format, one "stack count" line per distinct stack."""
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+    def top_functions(self, top: int = 20) -> List[Dict]:
+        """Functions by samples on top of the stack (self) and anywhere in it (total)."""
+        own = Counter()
+        total = Counter()
+        with self._lock:
+            for stack, count in self.stacks.items():
+                frames = [name for name in stack.split(";")[1:] if not name.startswith("task:")]
+                if not frames:
+                    continue
+                own[frames[-1]] += count
+                for function in set(frames):
+                    total[function] += count
+        return [
+            {"function": function, "self": count, "total": total[function]}
+            for function, count in own.most_common(top)
+        ]
+
+    def status(self) -> Dict:
+        with self._lock:
+            samples = self.samples
+            overhead = self.overhead_secs
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "duration_secs": self.duration,
+            "interval_ms": self.interval_ms,
+            "threads": self.threads,
+            "tasks": self.tasks,
+            "samples": samples,
+            # Sampler time per second of profile: the cost to the box
+            "overhead_pct": round(100 * overhead / max(self.duration, 1e-6), 3) if samples else 0.0,
+            "top": self.top_functions(),
+        }
+
+
+def profiler_enabled() -> bool:
+    """PROFILER_ENABLED=1 turns the admin endpoints on for a box (off by default)."""
+    return os.getenv("PROFILER_ENABLED", "0").lower() in ("1", "true", "yes")
+
+
+def admin_token_ok(token: Optional[str]) -> bool:
+    """Admin endpoints require X-Admin-Token to match ADMIN_TOKEN, and refuse everyone when it isn't set."""
+    expected = os.getenv("ADMIN_TOKEN")
+    return bool(expected) and hmac.compare_digest(token or "", expected)
+
+
+# Global profiler used by run.py's admin endpoints
+profiler = SamplingProfiler()
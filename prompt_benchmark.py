@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Prompt Cost Model - Context tokens and modeled turn time under each prompt mode.
+
+This is a token/cost model, not a measurement of a live LLM. Every turn of a
+local stand-in script (see local_llm_service.py) is replayed through the real
+tool handlers, and the conversation context is rebuilt the way the context
+aggregator would hold it: system instruction, user transcripts, tool calls
+with their results, and assistant replies.
+
+The compact prompt leaves the menu out, so a model running it has to look an
+item up before ordering it. The replay adds those calls: the first time a
+turn orders an item that hasn't been looked up yet, a `menu_lookup` round
+trip is made through the real handler and counted, and its call and result
+join the context.
+
+Modeled turn time is the measured tool-handler time plus, per model round
+trip, the script's sampled think time and a prefill cost proportional to the
+context tokens read. Both modes replay with the same latency seed, so the
+difference comes from the prompt and the extra round trips.
+
+Usage:
+    python prompt_benchmark.py
+    python prompt_benchmark.py --script local_llm_script.json --prefill-ms-per-1k 60 --repeat 5
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import time
+import uuid
+from typing import Dict, List
+
+from loguru import logger
+from pipecat.services.llm_service import FunctionCallParams
+
+import food_ordering
+import prompts
+from food_ordering import process_food_order
+from load_test import percentile
+from local_llm_service import DEFAULT_SCRIPT_PATH, LatencyModel, load_script
+from menu_lookup import process_menu_lookup
+from prompts import PROMPT_MODE_COMPACT, PROMPT_MODE_FULL, build_system_instruction, count_tokens
+
+HANDLERS = {"order_food": process_food_order, "menu_lookup": process_menu_lookup}
+
+# Default prefill cost of the modeled LLM, in milliseconds per 1,000 context tokens
+DEFAULT_PREFILL_MS_PER_1K = 40.0
+
+
+async def call_handler(name: str, arguments: Dict) -> Dict:
+    """Invoke a tool handler like the LLM service does and return its result."""
+    result_holder = {}
+
+    async def result_callback(result, *, properties=None):
+        result_holder["result"] = result
+
+    await HANDLERS[name](FunctionCallParams(
+        function_name=name,
+        tool_call_id=str(uuid.uuid4()),
+        arguments=json.loads(json.dumps(arguments)),
+        llm=None,
+        context=None,
+        result_callback=result_callback,
+    ))
+    return result_holder.get("result", {})
+
+
+def ordered_items(call: Dict) -> List[str]:
+    """Item ids an order_food call names (new items and replacements)."""
+    if call["name"] != "order_food":
+        return []
+    item_ids = []
+    for item in call["arguments"].get("items", []):
+        for key in ("item_id", "item_id_new"):
+            if item.get(key):
+                item_ids.append(item[key])
+    return item_ids
+
+
+def with_menu_lookups(calls: List[Dict], looked_up: set) -> List[Dict]:
+    """The turn's calls, preceded by the menu_lookup calls the compact prompt needs first."""
+    lookups = []
+    for call in calls:
+        if call["name"] == "menu_lookup":
+            looked_up.add(call["arguments"].get("query", "").replace(" ", "_"))
+        for item_id in ordered_items(call):
+            if item_id not in looked_up:
+                looked_up.add(item_id)
+                lookups.append({"name": "menu_lookup", "arguments": {"query": item_id.replace("_", " ")}})
+    return lookups + list(calls)
+
+
+async def replay(script: Dict, mode: str, prefill_ms_per_1k: float) -> Dict:
+    """
+    Replay one conversation under a prompt mode
+
+    Returns:
+        dict with per-turn context tokens and modeled latencies, and the
+        menu_lookup round trips the mode added
+    """
+    food_ordering.current_order_session.clear_order()
+    previous_mode, prompts.PROMPT_MODE = prompts.PROMPT_MODE, mode
+    latency = LatencyModel.from_dict(script["latency_ms"])
+
+    system_tokens = count_tokens(build_system_instruction(mode=mode))
+    history_tokens = 0
+    turn_tokens: List[int] = []
+    turn_latencies_ms: List[float] = []
+    looked_up = set()
+    lookup_round_trips = 0
+    try:
+        for turn in script["turns"]:
+            history_tokens += count_tokens(turn["user"])
+            context_tokens = system_tokens + history_tokens
+            model_ms = latency.sample_ms() + context_tokens / 1000.0 * prefill_ms_per_1k
+
+            calls = turn["function_calls"]
+            if mode == PROMPT_MODE_COMPACT:
+                calls = with_menu_lookups(calls, looked_up)
+
+            start = time.perf_counter()
+            for call in calls:
+                if call not in turn["function_calls"]:
+                    # The model asked for the menu and runs again once it has the answer
+                    lookup_round_trips += 1
+                    model_ms += latency.sample_ms() + (system_tokens + history_tokens) / 1000.0 * prefill_ms_per_1k
+                result = await call_handler(call["name"], call["arguments"])
+                history_tokens += count_tokens(json.dumps(call["arguments"])) + count_tokens(json.dumps(result))
+                # The model reads the tool result before it speaks
+                model_ms += count_tokens(json.dumps(result)) / 1000.0 * prefill_ms_per_1k
+            tool_ms = (time.perf_counter() - start) * 1000.0
+
+            history_tokens += count_tokens(turn["assistant"])
+            turn_tokens.append(context_tokens)
+            turn_latencies_ms.append(model_ms + tool_ms)
+    finally:
+        prompts.PROMPT_MODE = previous_mode
+        food_ordering.current_order_session.clear_order()
+
+    return {"system_tokens": system_tokens, "turn_tokens": turn_tokens, "turn_latencies_ms": turn_latencies_ms,
+            "lookup_round_trips": lookup_round_trips}
+
+
+async def run_benchmark(script_path: str = DEFAULT_SCRIPT_PATH, prefill_ms_per_1k: float = DEFAULT_PREFILL_MS_PER_1K,
+                        repeat: int = 3) -> Dict[str, Dict]:
+    """Replay the script `repeat` times per mode and summarize the modeled cost."""
+    script = load_script(script_path)
+    summary = {}
+    for mode in (PROMPT_MODE_FULL, PROMPT_MODE_COMPACT):
+        latencies: List[float] = []
+        runs = []
+        for _ in range(repeat):
+            run = await replay(script, mode, prefill_ms_per_1k)
+            latencies.extend(run["turn_latencies_ms"])
+            runs.append(run)
+        summary[mode] = {
+            "system_tokens": runs[0]["system_tokens"],
+            "mean_context_tokens": sum(runs[0]["turn_tokens"]) / max(1, len(runs[0]["turn_tokens"])),
+            "lookup_round_trips": runs[0]["lookup_round_trips"],
+            "mean_turn_ms": sum(latencies) / max(1, len(latencies)),
+            "p95_turn_ms": percentile(latencies, 95),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Model context tokens and turn time of the full and compact prompts")
+    parser.add_argument("--script", default=DEFAULT_SCRIPT_PATH, help="Local stand-in conversation script")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=DEFAULT_PREFILL_MS_PER_1K,
+                        help="Modeled model time per 1,000 context tokens")
+    parser.add_argument("--repeat", type=int, default=3, help="Replays per mode")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary = asyncio.run(run_benchmark(args.script, args.prefill_ms_per_1k, args.repeat))
+    print(f"Modeled cost per turn (prefill {args.prefill_ms_per_1k:g} ms per 1k tokens; not a live LLM measurement)")
+    print(f"{'mode':8s} {'system tok':>10s} {'avg ctx tok':>11s} {'lookups':>7s} "
+          f"{'modeled ms':>10s} {'p95 modeled':>11s}")
+    for mode, row in summary.items():
+        print(f"{mode:8s} {row['system_tokens']:10d} {row['mean_context_tokens']:11.0f} {row['lookup_round_trips']:7d} "
+              f"{row['mean_turn_ms']:10.1f} {row['p95_turn_ms']:11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,19 @@
 Replacement Handler - Detects and handles item replacement requests
 """
 
-def detect_replacement_intent(user_input: str, items: list) -> dict:
+from keyword_matcher import KEYWORD_TABLES, scan_intents
+
+# Replacement pattern categories in priority order (compiled into keyword_matcher)
+REPLACEMENT_PATTERN_TYPES = ['protein_change', 'item_type_change', 'size_change', 'combo_change']
+
+def detect_replacement_intent(user_input: str, items: list, matches: dict = None) -> dict:
     """
     Detect if user wants to replace an item instead of adding it
     
     Args:
         user_input: The user's voice input
         items: List of items being processed
+        matches: Optional result of keyword_matcher.scan_intents(user_input) to avoid rescanning
         
     Returns:
         Dict with replacement info: {
@@ -21,19 +27,11 @@ def detect_replacement_intent(user_input: str, items: list) -> dict:
     if not user_input or not items:
         return {'is_replacement': False}
     
-    user_lower = user_input.lower()
-    
-    # Replacement keywords
-    replacement_keywords = [
-        'instead', 'change that to', 'make that', 'switch to', 
-        'change to', 'replace with', 'actually make it',
-        'can you make that', 'make it a', 'change it to'
-    ]
+    if matches is None:
+        matches = scan_intents(user_input)
     
     # Check if any replacement keywords are present
-    has_replacement_keyword = any(keyword in user_lower for keyword in replacement_keywords)
-    
-    if not has_replacement_keyword:
+    if not matches.get('replacement'):
         return {'is_replacement': False}
     
     # Determine what type of replacement
@@ -41,23 +39,15 @@ def detect_replacement_intent(user_input: str, items: list) -> dict:
         item = items[0]
         item_id = item.get('item_id', '')
         
-        # Common replacement patterns
-        replacement_patterns = {
-            'protein_change': ['chicken', 'beef', 'veggie'],
-            'item_type_change': ['burger', 'taco', 'burrito', 'quesadilla'],
-            'size_change': ['small', 'medium', 'large'],
-            'combo_change': ['combo', 'meal']
-        }
-        
         # Detect type of replacement
-        for pattern_type, keywords in replacement_patterns.items():
-            if any(keyword in user_lower for keyword in keywords):
+        for pattern_type in REPLACEMENT_PATTERN_TYPES:
+            if matches.get(pattern_type):
                 return {
                     'is_replacement': True,
                     'replacement_type': pattern_type,
                     'target_item': 'last_item',  # Replace the most recent item
                     'new_item': item_id,
-                    'keywords_found': [kw for kw in keywords if kw in user_lower]
+                    'keywords_found': [kw for kw in KEYWORD_TABLES[pattern_type] if kw in matches[pattern_type]]
                 }
     
     return {
@@ -65,10 +55,10 @@ def detect_replacement_intent(user_input: str, items: list) -> dict:
         'replacement_type': 'general',
         'target_item': 'last_item',
         'new_item': items[0].get('item_id', '') if items else '',
-        'keywords_found': [kw for kw in replacement_keywords if kw in user_lower]
+        'keywords_found': [kw for kw in KEYWORD_TABLES['replacement'] if kw in matches['replacement']]
     }
 
-def should_replace_instead_of_update(user_input: str, items: list, existing_items: list) -> bool:
+def should_replace_instead_of_update(user_input: str, items: list, existing_items: list, matches: dict = None) -> bool:
     """
     Determine if this should be a replacement instead of an update
     
@@ -76,20 +66,20 @@ def should_replace_instead_of_update(user_input: str, items: list, existing_item
         user_input: User's voice input
         items: Items being processed
         existing_items: Current order items
+        matches: Optional result of keyword_matcher.scan_intents(user_input) to avoid rescanning
         
     Returns:
         True if this should replace an item, False if it should update
     """
-    replacement_info = detect_replacement_intent(user_input, items)
+    if matches is None:
+        matches = scan_intents(user_input)
+    replacement_info = detect_replacement_intent(user_input, items, matches)
     
     if not replacement_info['is_replacement']:
         return False
     
     # If user says "instead" or similar, it's definitely a replacement
-    strong_replacement_keywords = ['instead', 'change that to', 'replace with', 'actually make it']
-    user_lower = user_input.lower()
-    
-    if any(keyword in user_lower for keyword in strong_replacement_keywords):
+    if matches.get('strong_replacement'):
         return True
     
     # If changing item type (burger -> chicken burger), it's likely a replacement
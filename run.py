@@ -1,24 +1,38 @@
+# Start the clock before anything heavy is imported
+from startup import (
+    BOT_MODE_WEBRTC,
+    inspect_bot_file,
+    preload_requested,
+    startup_timer,
+    warm_imports,
+)
+
 import argparse
 import asyncio
 import importlib.util
 import os
 import sys
 import websockets
-from contextlib import asynccontextmanager
 from datetime import datetime
 from inspect import iscoroutinefunction, signature
-from typing import Any, Callable, Dict, Optional, Tuple, Set
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple, Set
 
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import BackgroundTasks, FastAPI, HTTPException, WebSocket, WebSocketDisconnect
-from fastapi.responses import RedirectResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse
 from loguru import logger
-# Keep the import for compatibility but we won't mount it
-from pipecat_ai_small_webrtc_prebuilt.frontend import SmallWebRTCPrebuiltUI
 
-from pipecat.transports.network.webrtc_connection import IceServer, SmallWebRTCConnection
+# aiortc is only needed once a car connects; it is imported by /api/offer or warm-up
+if TYPE_CHECKING:
+    from pipecat.transports.network.webrtc_connection import SmallWebRTCConnection
+
+from admission import AdmissionRejected, admission_controller
+from display_codec import ENCODING_JSON, EncodedMessage, compression, negotiate
+from lane_manager import lane_manager
+from loop_monitor import loop_monitor, monitor_enabled
+from profiler import THREADS_ALL, THREADS_LOOP, ProfilerBusy, admin_token_ok, profiler, profiler_enabled
+from static_assets import StaticAssetCache
 
 # Import WebSocket server
 try:
@@ -43,33 +57,29 @@ app = FastAPI()
 
 # Store active transcription WebSocket connections
 active_transcription_connections: Set[WebSocket] = set()
+# Wire encoding each transcription connection asked for (?encoding=, see display_codec.py)
+transcription_encodings: Dict[WebSocket, str] = {}
 
 # Mount API router if enabled
 if API_ENABLED:
     app.include_router(api_router)
     logger.info("API endpoints mounted")
 
-# Store connections by pc_id
-pcs_map: Dict[str, SmallWebRTCConnection] = {}
+# Store connections by pc_id (owned by the lane manager, which reaps dead lanes)
+pcs_map: Dict[str, "SmallWebRTCConnection"] = lane_manager.connections
 
-ice_servers = [
-    IceServer(
-        urls="stun:stun.l.google.com:19302",
-    )
-]
+ICE_SERVER_URLS = ["stun:stun.l.google.com:19302"]
 
-# Mount the React frontend static files
-app.mount("/static", StaticFiles(directory="frontend/build/static"), name="static")
+# Modules every WebRTC lane needs, warmed in the background after startup
+WEBRTC_WARM_IMPORTS = ("pipecat.transports.network.webrtc_connection",)
 
-# Mount the images directory
-app.mount("/images", StaticFiles(directory="frontend/build/images"), name="images")
+def get_ice_servers():
+    from pipecat.transports.network.webrtc_connection import IceServer
 
-# Mount any other static assets at the root level
-for static_file in os.listdir("frontend/build"):
-    if static_file != "static" and static_file != "images" and os.path.isfile(os.path.join("frontend/build", static_file)):
-        @app.get(f"/{static_file}")
-        async def serve_static_file(static_file=static_file):
-            return FileResponse(f"frontend/build/{static_file}")
+    return [IceServer(urls=url) for url in ICE_SERVER_URLS]
+
+# Serve the React build from memory (see static_assets.py)
+static_assets = StaticAssetCache(os.getenv("FRONTEND_BUILD_DIR", "frontend/build"))
 
 # Store program arguments
 args: argparse.Namespace = argparse.Namespace()
@@ -79,6 +89,12 @@ bot_module: Any = None
 run_bot_func: Optional[Callable] = None
 is_webrtc_bot: bool = True
 
+# Bot file imported in the background once the server is up
+bot_file_path: Optional[str] = None
+bot_loader: Optional[asyncio.Task] = None
+# Why the background import failed; offers and the health check report it as 503
+bot_load_error: Optional[BaseException] = None
+
 def import_bot_file(file_path: str) -> Tuple[Any, Callable, bool]:
     """Dynamically import the bot file and determine how to run it.
 
@@ -117,6 +133,46 @@ def import_bot_file(file_path: str) -> Tuple[Any, Callable, bool]:
 
     raise AttributeError(f"No run_bot or async main function found in {file_path}")
 
+def load_bot(file_path: str) -> None:
+    """Import the bot file, then warm the modules its lanes need."""
+    global bot_module, run_bot_func, is_webrtc_bot
+    with startup_timer.phase("import bot"):
+        bot_module, run_bot_func, is_webrtc_bot = import_bot_file(file_path)
+    logger.info(f"Successfully loaded bot from {file_path}")
+    warm_imports(WEBRTC_WARM_IMPORTS + tuple(getattr(bot_module, "WARM_IMPORTS", ())))
+
+async def start_bot_loader():
+    global bot_loader
+    startup_timer.end_phase("server startup")
+    if run_bot_func is None and bot_file_path:
+        # The port binds while the bot imports in a worker thread
+        bot_loader = asyncio.create_task(asyncio.to_thread(load_bot, bot_file_path))
+        bot_loader.add_done_callback(_bot_loader_done)
+    else:
+        startup_timer.mark_ready()
+
+def _bot_loader_done(task: asyncio.Task):
+    global bot_load_error
+    if task.cancelled():
+        return
+    if task.exception() is not None:
+        bot_load_error = task.exception()
+        logger.error(f"Error loading bot file: {bot_load_error}")
+        return
+    startup_timer.mark_ready()
+
+async def ensure_bot_loaded():
+    """Wait for the background bot import, if it is still running; 503 if it failed."""
+    if run_bot_func is None and bot_loader is not None:
+        try:
+            await asyncio.shield(bot_loader)
+        except Exception as e:
+            raise HTTPException(status_code=503, detail=f"Bot failed to load: {e}")
+    if bot_load_error is not None:
+        raise HTTPException(status_code=503, detail=f"Bot failed to load: {bot_load_error}")
+
+app.add_event_handler("startup", start_bot_loader)
+
 @app.websocket("/transcription")
 async def transcription_websocket(websocket: WebSocket):
     await websocket.accept()
@@ -124,6 +180,7 @@ async def transcription_websocket(websocket: WebSocket):
     
     # Add to active connections
     active_transcription_connections.add(websocket)
+    transcription_encodings[websocket] = negotiate(websocket.query_params.get("encoding"))
     
     try:
         # Keep the connection alive
@@ -136,6 +193,8 @@ async def transcription_websocket(websocket: WebSocket):
         logger.error(f"Error in transcription WebSocket: {e}")
         if websocket in active_transcription_connections:
             active_transcription_connections.remove(websocket)
+    finally:
+        transcription_encodings.pop(websocket, None)
 
 async def broadcast_transcription(text: str, is_final: bool = False):
     """Broadcast transcription to all connected clients."""
@@ -151,31 +210,100 @@ async def broadcast_transcription(text: str, is_final: bool = False):
     
     logger.debug(f"Broadcasting transcription: {text} (final: {is_final})")
     
+    encoded = EncodedMessage(message)
     for connection in list(active_transcription_connections):
         try:
-            await connection.send_json(message)
+            payload = encoded.get(transcription_encodings.get(connection, ENCODING_JSON))
+            if isinstance(payload, bytes):
+                await connection.send_bytes(payload)
+            else:
+                await connection.send_text(payload)
         except Exception as e:
             logger.error(f"Error sending transcription: {e}")
             if connection in active_transcription_connections:
                 active_transcription_connections.remove(connection)
 
+@app.get("/api/health")
+async def health():
+    """200 once the bot is loaded (or while it loads); 503 with the error if its import failed."""
+    if bot_load_error is not None:
+        return JSONResponse({"status": "error", "error": f"Bot failed to load: {bot_load_error}"}, status_code=503)
+    return {"status": "ok" if run_bot_func is not None else "loading"}
+
+@app.get("/api/lanes")
+async def lanes():
+    return {**lane_manager.stats(), "admission": admission_controller.stats()}
+
+@app.get("/api/debug/loop")
+async def debug_loop():
+    """Event-loop lag and the functions behind recent stalls."""
+    return loop_monitor.stats()
+
+def check_profiler_access(request: Request):
+    if not profiler_enabled():
+        raise HTTPException(status_code=404)
+    if not os.getenv("ADMIN_TOKEN"):
+        raise HTTPException(status_code=403, detail="Set ADMIN_TOKEN to use the admin endpoints")
+    if not admin_token_ok(request.headers.get("X-Admin-Token")):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.post("/api/admin/profile")
+async def start_profile(request: Request, seconds: float = 10, interval_ms: float = 10,
+                        threads: str = THREADS_ALL, tasks: bool = False):
+    """Sample every thread's stack for `seconds` (see profiler.py)."""
+    check_profiler_access(request)
+    if threads not in (THREADS_ALL, THREADS_LOOP):
+        raise HTTPException(status_code=400, detail=f"threads must be '{THREADS_ALL}' or '{THREADS_LOOP}'")
+    try:
+        profiler.start(seconds, interval_ms=interval_ms, threads=threads, tasks=tasks)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return profiler.status()
+
+@app.get("/api/admin/profile")
+async def profile_status(request: Request):
+    check_profiler_access(request)
+    return profiler.status()
+
+@app.get("/api/admin/profile/collapsed")
+async def profile_collapsed(request: Request):
+    """The last profile as collapsed stacks, for flamegraph.pl or speedscope."""
+    check_profiler_access(request)
+    return PlainTextResponse(profiler.collapsed())
+
 @app.get("/", include_in_schema=False)
-async def root_redirect():
-    return FileResponse("frontend/build/index.html")
+async def root_redirect(request: Request):
+    response = static_assets.response("index.html", request.headers)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Frontend build not found")
+    return response
 
 @app.get("/{path:path}")
-async def serve_react(path: str):
+async def serve_react(path: str, request: Request):
     # Skip API paths
     if path.startswith("api/"):
         raise HTTPException(status_code=404)
-    
+
+    # Build files (bundles, images, manifest, ...) straight from memory
+    response = static_assets.response(path, request.headers)
+    if response is not None:
+        return response
+
+    # Missing bundles and images are real 404s, not client-side routes
+    if path.startswith(("static/", "images/")):
+        raise HTTPException(status_code=404)
+
     # Serve the React app for all other paths
-    return FileResponse("frontend/build/index.html")
+    response = static_assets.response("index.html", request.headers)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Frontend build not found")
+    return response
 
 @app.post("/api/offer")
-async def offer(request: dict, background_tasks: BackgroundTasks):
+async def offer(request: dict):
     global run_bot_func, is_webrtc_bot
 
+    await ensure_bot_loaded()
     if not run_bot_func:
         raise RuntimeError("No bot file has been loaded")
 
@@ -192,37 +320,53 @@ async def offer(request: dict, background_tasks: BackgroundTasks):
         await pipecat_connection.renegotiate(
             sdp=request["sdp"], type=request["type"], restart_pc=request.get("restart_pc", False)
         )
-    else:
-        pipecat_connection = SmallWebRTCConnection(ice_servers)
+        answer = pipecat_connection.get_answer()
+        # Renegotiation may have given the connection a new pc_id
+        lane_manager.rekey(pc_id, answer["pc_id"])
+        lane_manager.touch(answer["pc_id"])
+        return answer
+
+    # Wait for a lane slot (or reject with a retry hint) rather than overload every lane
+    try:
+        await admission_controller.acquire()
+    except AdmissionRejected as e:
+        logger.warning(f"Rejecting offer: {e.reason}, retry after {e.retry_after} s")
+        raise HTTPException(status_code=503, detail=f"Drive-thru busy: {e.reason}",
+                            headers={"Retry-After": str(e.retry_after)})
+
+    try:
+        from pipecat.transports.network.webrtc_connection import SmallWebRTCConnection
+
+        pipecat_connection = SmallWebRTCConnection(get_ice_servers())
         await pipecat_connection.initialize(sdp=request["sdp"], type=request["type"])
+        answer = pipecat_connection.get_answer()
 
-        @pipecat_connection.event_handler("closed")
-        async def handle_disconnected(webrtc_connection: SmallWebRTCConnection):
-            logger.info(f"Discarding peer connection for pc_id: {webrtc_connection.pc_id}")
-            try:
-                pcs_map.pop(webrtc_connection.pc_id, None)
-                logger.info(f"Successfully removed connection from pcs_map")
-            except Exception as e:
-                logger.error(f"Error removing connection from pcs_map: {e}")
-                import traceback
-                logger.error(traceback.format_exc())
+        # The lane manager drops the connection when it closes, and reaps it if it never connects or goes idle
+        lane_manager.register(answer["pc_id"], pipecat_connection, name=request.get("lane"))
 
         # We've already checked that run_bot_func exists
         assert run_bot_func is not None
-        background_tasks.add_task(run_bot_func, pipecat_connection, args)
-
-    answer = pipecat_connection.get_answer()
-    # Updating the peer connection inside the map
-    pcs_map[answer["pc_id"]] = pipecat_connection
+        lane_manager.start_bot(answer["pc_id"], run_bot_func(pipecat_connection, args))
+    finally:
+        admission_controller.release()
 
     return answer
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    yield  # Run app
-    coros = [pc.close() for pc in pcs_map.values()]
-    await asyncio.gather(*coros)
-    pcs_map.clear()
+async def start_lane_reaper():
+    lane_manager.start()
+    admission_controller.start()
+    # Watch for synchronous work stalling every lane's audio (LOOP_MONITOR_ENABLED=0 to disable)
+    if monitor_enabled():
+        loop_monitor.start()
+
+async def shutdown_lanes():
+    profiler.stop()
+    loop_monitor.stop()
+    admission_controller.stop()
+    await lane_manager.shutdown()
+
+app.add_event_handler("startup", start_lane_reaper)
+app.add_event_handler("shutdown", shutdown_lanes)
 
 
 async def run_standalone_bot() -> None:
@@ -248,6 +392,7 @@ def main(parser: Optional[argparse.ArgumentParser] = None):
     )
     parser.add_argument("--verbose", "-v", action="count", default=0)
     args = parser.parse_args()
+    startup_timer.record("runner imports", startup_timer.elapsed_ms())
 
     logger.remove(0)
     if args.verbose:
@@ -269,11 +414,17 @@ def main(parser: Optional[argparse.ArgumentParser] = None):
         print("❌ Could not determine the bot file. Pass it explicitly to main().")
         sys.exit(1)
 
-    # Import the bot file
+    # WebRTC bots are imported in the background once the server is up;
+    # anything the source doesn't settle (or PRELOAD_BOT=1) is imported now
     try:
-        global run_bot_func, bot_module, is_webrtc_bot
-        bot_module, run_bot_func, is_webrtc_bot = import_bot_file(bot_file)
-        logger.info(f"Successfully loaded bot from {bot_file}")
+        global run_bot_func, bot_module, is_webrtc_bot, bot_file_path
+        if inspect_bot_file(bot_file) == BOT_MODE_WEBRTC and not preload_requested():
+            bot_file_path = bot_file
+            is_webrtc_bot = True
+        else:
+            with startup_timer.phase("import bot"):
+                bot_module, run_bot_func, is_webrtc_bot = import_bot_file(bot_file)
+            logger.info(f"Successfully loaded bot from {bot_file}")
 
         if is_webrtc_bot:
             logger.info("Detected WebRTC-compatible bot, starting web server...")
@@ -303,17 +454,18 @@ def main(parser: Optional[argparse.ArgumentParser] = None):
                         logger.info(f"Starting WebSocket server on port {ws_port}...")
                         
                         try:
-                            # Start the heartbeat monitor
-                            from websocket_server import heartbeat_monitor
-                            asyncio.create_task(heartbeat_monitor())
-                            logger.info("Started WebSocket heartbeat monitor")
+                            # Ping displays and evict dead ones (replaces the per-connection keepalive)
+                            from display_liveness import display_liveness
+                            display_liveness.start()
                             
                             server = await websockets.serve(
                                 handler_wrapper, 
                                 "0.0.0.0",  # Listen on all interfaces
                                 ws_port,
                                 # Add CORS support
-                                origins=None  # Allow all origins
+                                origins=None,  # Allow all origins
+                                ping_interval=None,
+                                compression=compression()  # permessage-deflate unless DISPLAY_WS_COMPRESSION=off
                             )
                             print(f"WebSocket server started successfully on ws://0.0.0.0:{ws_port}")
                             logger.info(f"WebSocket server started successfully on ws://0.0.0.0:{ws_port}")
@@ -338,8 +490,13 @@ def main(parser: Optional[argparse.ArgumentParser] = None):
                 ws_thread.start()
                 logger.info("WebSocket server thread started")
             
+            # Load the frontend build into memory before taking requests
+            with startup_timer.phase("static assets"):
+                static_assets.load()
+
             # Start the main web server
-            uvicorn.run(app, host=args.host, port=args.port)
+            startup_timer.start_phase("server startup")
+            uvicorn.run(app, host=args.host, port=args.port, ws_per_message_deflate=compression() is not None)
         else:
             logger.info("Detected standalone bot, running directly...")
             asyncio.run(run_standalone_bot())
@@ -0,0 +1,156 @@
+"""
+Speculative Cart - Pre-computes cart deltas from interim transcripts
+
+While the customer is still talking, interim transcripts are parsed with the
+fast-path parser and turned into fully built order lines (normalized, described
+and priced) before the LLM has even decided to call `order_food`. When the
+model's `add_item` call arrives and normalizes to the same order, the prepared
+lines are committed straight to the cart and the order screen updates without
+rebuilding anything; if the call differs, the speculation is thrown away.
+"""
+
+import copy
+import time
+from collections import OrderedDict
+
+from loguru import logger
+from pipecat.frames.frames import Frame, InterimTranscriptionFrame, TranscriptionFrame
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+from fast_path_parser import _canonical_order_key, parse_order_utterance
+from menu import MENU_ITEMS, SIZES, COMBOS, PROTEIN_OPTIONS
+
+# Interim parses tend to be shakier than finals; accept slightly less coverage
+DEFAULT_SPECULATION_CONFIDENCE = 0.8
+
+# How long a prepared delta waits for the matching tool call
+SPECULATION_WINDOW = 15.0
+
+# Interim transcripts refine each other ("two chicken" -> "two chicken tacos");
+# keep the most recent few distinct parses
+MAX_CANDIDATES = 4
+
+
+class SpeculativeCart:
+    """Prepared cart deltas keyed by their normalized order."""
+
+    def __init__(self, min_confidence=DEFAULT_SPECULATION_CONFIDENCE, window=SPECULATION_WINDOW):
+        self.min_confidence = min_confidence
+        self.window = window
+        self._candidates = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def speculate(self, text):
+        """
+        Parse a (possibly interim) transcript and prepare its cart delta
+
+        Returns:
+            The prepared order lines, or None if the utterance isn't a simple add
+        """
+        parsed = parse_order_utterance(text, self.min_confidence)
+        if not parsed['is_fast_path']:
+            return None
+
+        key = _canonical_order_key(parsed['arguments'])
+        if key in self._candidates:
+            self._candidates.move_to_end(key)
+            return self._candidates[key][1]
+
+        prepared = self._prepare(parsed['arguments'])
+        if not prepared:
+            return None
+
+        self._candidates[key] = (time.time(), prepared)
+        while len(self._candidates) > MAX_CANDIDATES:
+            self._candidates.popitem(last=False)
+        logger.debug(f"SPECULATIVE CART: prepared {[item['description'] for item in prepared]} from '{text}'")
+        return prepared
+
+    def commit(self, arguments, current_items):
+        """
+        Take the prepared lines matching an order_food call
+
+        Speculation is only used when none of the prepared items overlap the
+        current cart, since overlapping items go through duplicate and
+        smart-update detection that depends on the cart.
+
+        Args:
+            arguments: order_food arguments from the LLM
+            current_items: Items currently in the order
+
+        Returns:
+            Copies of the prepared order lines, or None to process the call normally
+        """
+        if not self._candidates:
+            return None
+        if arguments.get("action", "add_item") != "add_item":
+            self.discard()
+            return None
+
+        entry = self._candidates.pop(_canonical_order_key(arguments), None)
+        # Whatever was said in this turn has now been answered by the model
+        self.discard()
+        if not entry or time.time() - entry[0] > self.window:
+            self.misses += 1
+            return None
+
+        from food_ordering import find_item_variants
+
+        existing_ids = {item.get("item_id") for item in current_items}
+        for item in entry[1]:
+            if existing_ids.intersection(find_item_variants(item["item_id"], MENU_ITEMS)):
+                self.misses += 1
+                return None
+
+        self.hits += 1
+        return copy.deepcopy(entry[1])
+
+    def discard(self):
+        """Drop every prepared delta."""
+        self._candidates.clear()
+
+    def _prepare(self, arguments):
+        from food_ordering import create_new_item_from_update, detect_invalid_item_id_patterns, detect_soda_type_conversion
+
+        prepared = []
+        for item in copy.deepcopy(arguments.get("items", [])):
+            item_id = detect_soda_type_conversion(item.get("item_id"), item.get("drink_choice"), MENU_ITEMS)
+            item_id, suggested_protein = detect_invalid_item_id_patterns(item_id, MENU_ITEMS, PROTEIN_OPTIONS)
+            item["item_id"] = item_id
+            if suggested_protein and not item.get("protein"):
+                item["protein"] = suggested_protein
+            new_item = create_new_item_from_update(item, MENU_ITEMS, SIZES, COMBOS, PROTEIN_OPTIONS)
+            if not new_item:
+                return None
+            prepared.append(new_item)
+        return prepared
+
+
+# Shared with food_ordering, like the global order session
+speculative_cart = SpeculativeCart()
+
+
+class SpeculativeCartProcessor(FrameProcessor):
+    """
+    Feeds interim and final user transcripts into the speculative cart.
+
+    Sits downstream of the LLM next to the fast-path processor. It never
+    changes the order itself; `process_food_order` commits the prepared lines
+    when the model's call matches.
+    """
+
+    def __init__(self, cart=None, **kwargs):
+        super().__init__(**kwargs)
+        self._cart = cart or speculative_cart
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, (InterimTranscriptionFrame, TranscriptionFrame)) and frame.text:
+            try:
+                self._cart.speculate(frame.text)
+            except Exception as e:
+                logger.warning(f"SPECULATIVE CART: failed to prepare '{frame.text}': {e}")
+
+        await self.push_frame(frame, direction)
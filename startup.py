@@ -0,0 +1,136 @@
+"""
+Startup - Cold-start helpers for run.py
+
+Importing the bot file pulls in pipecat, the VAD model, aiortc and the LLM
+service, which takes seconds on a cold box. A lane that crashed is dead for
+that whole time. run.py uses these helpers to get the port bound first:
+
+- `inspect_bot_file` decides how to run the bot from its source, without
+  importing it
+- the bot is then imported in a background thread while the server starts,
+  and `warm_imports` loads the modules the bot only needs per connection
+- `startup_timer` records each phase and logs a time-to-ready breakdown
+"""
+
+import ast
+import importlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+
+from loguru import logger
+
+# Bot run modes, as decided by run.py's import_bot_file
+BOT_MODE_WEBRTC = "webrtc"
+BOT_MODE_STANDALONE = "standalone"
+
+
+class StartupTimer:
+    """Records how long each startup phase takes, from process start to ready."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.ready_ms: Optional[float] = None
+        self._open: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def start_phase(self, name: str):
+        """Start timing a phase that ends somewhere else (see end_phase)."""
+        with self._lock:
+            self._open[name] = time.perf_counter()
+
+    def end_phase(self, name: str):
+        with self._lock:
+            phase_start = self._open.pop(name, None)
+            if phase_start is not None:
+                self.phases[name] = (time.perf_counter() - phase_start) * 1000
+
+    def record(self, name: str, ms: float):
+        with self._lock:
+            self.phases[name] = ms
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a startup phase."""
+        self.start_phase(name)
+        try:
+            yield
+        finally:
+            self.end_phase(name)
+
+    def mark_ready(self):
+        """Record that the server can serve a lane, and log the breakdown."""
+        if self.ready_ms is None:
+            self.ready_ms = self.elapsed_ms()
+            self.log_report()
+
+    def report(self) -> Dict:
+        with self._lock:
+            phases = {name: round(ms, 1) for name, ms in self.phases.items()}
+        return {
+            "phases_ms": phases,
+            "time_to_ready_ms": round(self.ready_ms, 1) if self.ready_ms is not None else None,
+        }
+
+    def log_report(self):
+        report = self.report()
+        breakdown = ", ".join(f"{name} {ms:.0f} ms" for name, ms in report["phases_ms"].items())
+        logger.info(f"Startup: ready in {report['time_to_ready_ms']:.0f} ms ({breakdown})")
+
+
+def inspect_bot_file(file_path: str) -> Optional[str]:
+    """
+    Decide how a bot file runs by parsing it instead of importing it
+
+    Mirrors run.py's import_bot_file: a `run_bot` function that takes
+    arguments is a WebRTC bot, otherwise `run_bot` or an async `main` runs
+    standalone.
+
+    Returns:
+        BOT_MODE_WEBRTC, BOT_MODE_STANDALONE, or None if the source doesn't
+        tell (the caller should import the file to find out)
+    """
+    try:
+        with open(file_path, "r") as f:
+            tree = ast.parse(f.read(), filename=file_path)
+    except (OSError, SyntaxError, ValueError):
+        return None
+
+    functions = {
+        node.name: node for node in tree.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+    }
+    run_bot = functions.get("run_bot")
+    if run_bot is not None:
+        args = run_bot.args
+        parameters = args.posonlyargs + args.args + args.kwonlyargs
+        has_parameters = bool(parameters or args.vararg or args.kwarg)
+        return BOT_MODE_WEBRTC if has_parameters else BOT_MODE_STANDALONE
+    if isinstance(functions.get("main"), ast.AsyncFunctionDef):
+        return BOT_MODE_STANDALONE
+    return None
+
+
+def warm_imports(modules: Iterable[str], timer: Optional["StartupTimer"] = None):
+    """Import modules now so the first lane doesn't pay for them."""
+    timer = timer or startup_timer
+    for module_name in modules:
+        try:
+            with timer.phase(f"warm {module_name}"):
+                importlib.import_module(module_name)
+        except Exception as e:
+            logger.warning(f"Startup: could not warm {module_name}: {e}")
+
+
+def preload_requested() -> bool:
+    """PRELOAD_BOT=1 imports the bot before the server starts, as before."""
+    return os.getenv("PRELOAD_BOT", "0").lower() in ("1", "true", "yes")
+
+
+# Global timer, created when run.py imports this module
+startup_timer = StartupTimer()
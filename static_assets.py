@@ -0,0 +1,230 @@
+"""
+Static Assets - In-memory cache for the React build served by run.py
+
+The build directory is read into memory once. Each file is kept with its
+content type, a strong ETag and precompressed gzip (and brotli, when the
+`brotli` package is installed) variants, so a request is a dict lookup and a
+header check instead of open + stat + read. Content-hashed bundles
+(`static/js/main.3f2a91c4.js`) are served as immutable; everything else,
+index.html included, is revalidated with its ETag. The cache reloads itself
+when the build directory changes (e.g. after `build_frontend.sh`): requests
+never wait for it, the scan and reload run on a worker thread while the
+current assets keep being served, and the new set replaces them in one swap.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import time
+from typing import Dict, Mapping, Optional
+
+from loguru import logger
+from starlette.responses import FileResponse, Response
+
+# Optional brotli support; gzip is always available
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_BUILD_DIR = "frontend/build"
+
+# Files above this size are streamed from disk rather than held in memory (videos)
+MAX_CACHED_FILE_BYTES = 4 * 1024 * 1024
+
+# Smaller files aren't worth compressing
+MIN_COMPRESS_BYTES = 512
+
+# How often (seconds) a request may trigger a check of the build directory
+RELOAD_CHECK_INTERVAL = 2.0
+
+# Brotli quality at startup, and for reloads while serving (11 costs seconds on a large bundle)
+BROTLI_QUALITY = 11
+BROTLI_RELOAD_QUALITY = 5
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml", "application/manifest+json")
+
+# CRA-style content hash in the file name: main.3f2a91c4.js, 453.8ab1c2d3.chunk.css
+HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+class StaticAsset:
+    """One file of the build, with its precomputed variants and headers."""
+
+    __slots__ = ("path", "body", "gzip", "brotli", "etag", "media_type", "cache_control", "size")
+
+    def __init__(self, path: str, relative_path: str, body: Optional[bytes], size: int, etag: str,
+                 brotli_quality: int = BROTLI_QUALITY):
+        self.path = path
+        self.body = body
+        self.size = size
+        self.etag = etag
+        self.media_type = mimetypes.guess_type(relative_path)[0] or "application/octet-stream"
+        self.cache_control = IMMUTABLE_CACHE_CONTROL if HASHED_NAME.search(os.path.basename(relative_path)) else REVALIDATE_CACHE_CONTROL
+        self.gzip = None
+        self.brotli = None
+        if body is not None and size >= MIN_COMPRESS_BYTES and self.media_type.startswith(COMPRESSIBLE_TYPES):
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < size:
+                self.gzip = compressed
+            if brotli is not None:
+                compressed = brotli.compress(body, quality=brotli_quality)
+                if len(compressed) < size:
+                    self.brotli = compressed
+
+
+class StaticAssetCache:
+    """The whole build directory, held in memory and reloaded when it changes."""
+
+    def __init__(self, root: str = DEFAULT_BUILD_DIR, reload_interval: float = RELOAD_CHECK_INTERVAL):
+        self.root = root
+        self.reload_interval = reload_interval
+        self.assets: Dict[str, StaticAsset] = {}
+        self.loaded = False
+        self.reloads = 0
+        self._signature = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._reload_thread: Optional[threading.Thread] = None
+
+    def _scan(self):
+        files = {}
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                relative_path = os.path.relpath(path, self.root).replace(os.sep, "/")
+                files[relative_path] = (path, stat.st_size, stat.st_mtime_ns)
+        return files
+
+    def load(self, brotli_quality: int = BROTLI_QUALITY):
+        """Read the build directory into memory, then swap it in for the current assets."""
+        started = time.perf_counter()
+        files = self._scan()
+        assets = {}
+        for relative_path, (path, size, _) in files.items():
+            try:
+                if size > MAX_CACHED_FILE_BYTES:
+                    body = None
+                    etag = hashlib.sha1(f"{relative_path}:{size}:{files[relative_path][2]}".encode()).hexdigest()
+                else:
+                    with open(path, "rb") as f:
+                        body = f.read()
+                    etag = hashlib.sha1(body).hexdigest()
+            except OSError as e:
+                logger.warning(f"Static assets: could not read {path}: {e}")
+                continue
+            assets[relative_path] = StaticAsset(path, relative_path, body, size, f'"{etag}"', brotli_quality)
+
+        self.assets = assets
+        self._signature = self._signature_of(files)
+        self._checked_at = time.monotonic()
+        if self.loaded:
+            self.reloads += 1
+        self.loaded = True
+
+        if not assets:
+            logger.warning(f"Static assets: no files found under {self.root}")
+        else:
+            cached = sum(asset.size for asset in assets.values() if asset.body is not None)
+            logger.info(f"Static assets: loaded {len(assets)} files ({cached / 1024:.0f} KiB in memory) "
+                        f"from {self.root} in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    @staticmethod
+    def _signature_of(files):
+        return frozenset((relative_path, size, mtime) for relative_path, (_, size, mtime) in files.items())
+
+    def _reload_if_changed(self, brotli_quality: int = BROTLI_QUALITY) -> bool:
+        with self._reload_lock:
+            if self._signature_of(self._scan()) == self._signature:
+                return False
+            logger.info(f"Static assets: {self.root} changed, reloading")
+            self.load(brotli_quality)
+            return True
+
+    def maybe_reload(self):
+        """Reload in the calling thread if the build directory changed; checks at most every reload_interval seconds."""
+        now = time.monotonic()
+        if self.loaded and now - self._checked_at < self.reload_interval:
+            return False
+        with self._lock:
+            if not self.loaded:
+                self.load()
+                return True
+            if now - self._checked_at < self.reload_interval:
+                return False
+            self._checked_at = now
+        return self._reload_if_changed()
+
+    def reload_in_background(self) -> Optional[threading.Thread]:
+        """
+        Check the build directory for changes on a worker thread
+
+        Requests keep getting the current assets until the reload swaps the
+        new ones in. Checks at most every reload_interval seconds, one at a time.
+
+        Returns:
+            The started thread, or None if no check was due
+        """
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return None
+        with self._lock:
+            if now - self._checked_at < self.reload_interval:
+                return None
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                return None
+            self._checked_at = now
+            self._reload_thread = threading.Thread(target=self._reload_if_changed, args=(BROTLI_RELOAD_QUALITY,),
+                                                   name="static-assets-reload", daemon=True)
+            self._reload_thread.start()
+            return self._reload_thread
+
+    def get(self, path: str) -> Optional[StaticAsset]:
+        if self.loaded:
+            self.reload_in_background()
+        else:
+            self.maybe_reload()
+        return self.assets.get(path.lstrip("/"))
+
+    def response(self, path: str, request_headers: Mapping[str, str]) -> Optional[Response]:
+        """
+        Build the response for a build file
+
+        Args:
+            path: Path relative to the build directory
+            request_headers: Request headers (If-None-Match, Accept-Encoding)
+
+        Returns:
+            The response, or None if the file isn't in the build
+        """
+        asset = self.get(path)
+        if asset is None:
+            return None
+
+        headers = {"ETag": asset.etag, "Cache-Control": asset.cache_control, "Vary": "Accept-Encoding"}
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or asset.etag in [tag.strip() for tag in if_none_match.split(",")]):
+            return Response(status_code=304, headers=headers)
+
+        if asset.body is None:
+            return FileResponse(asset.path, media_type=asset.media_type, headers=headers)
+
+        accept_encoding = request_headers.get("accept-encoding", "")
+        if asset.brotli is not None and "br" in accept_encoding:
+            headers["Content-Encoding"] = "br"
+            return Response(asset.brotli, media_type=asset.media_type, headers=headers)
+        if asset.gzip is not None and "gzip" in accept_encoding:
+            headers["Content-Encoding"] = "gzip"
+            return Response(asset.gzip, media_type=asset.media_type, headers=headers)
+        return Response(asset.body, media_type=asset.media_type, headers=headers)
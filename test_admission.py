@@ -0,0 +1,110 @@
+"""
+Test script for admission control on new lanes.
+"""
+
+import asyncio
+import unittest
+
+from admission import AdmissionController, AdmissionRejected
+from lane_manager import LaneManager
+from test_lane_manager import FakeConnection
+
+
+class TestAdmissionController(unittest.IsolatedAsyncioTestCase):
+    """Test cases for admitting, queueing and rejecting offers."""
+
+    def setUp(self):
+        self.lanes = LaneManager(max_lanes=2)
+        self.admission = AdmissionController(self.lanes, max_queue=2, max_wait=1.0, default_lane_secs=1.0)
+
+    async def asyncTearDown(self):
+        self.admission.stop()
+
+    async def open_lane(self, pc_id):
+        await self.admission.acquire()
+        connection = FakeConnection(pc_id)
+        self.lanes.register(pc_id, connection)
+        self.admission.release()
+        return connection
+
+    async def test_admits_while_slots_are_free(self):
+        await self.open_lane("a")
+        await self.admission.acquire()
+        # The reserved slot counts before its lane registers
+        self.assertEqual(self.admission.overload_reason(), "all lanes busy")
+        self.admission.release()
+        self.assertIsNone(self.admission.overload_reason())
+
+    async def test_queued_offer_gets_the_freed_slot(self):
+        first = await self.open_lane("a")
+        await self.open_lane("b")
+
+        waiting = asyncio.create_task(self.admission.acquire())
+        await asyncio.sleep(0)
+        self.assertEqual(len(self.admission.waiters), 1)
+
+        await first.emit("closed")
+        await asyncio.wait_for(waiting, 1)
+        self.assertEqual(self.admission.reserved, 1)
+        self.assertEqual(self.admission.counters["queued"], 1)
+
+    async def test_rejects_when_queue_is_full(self):
+        await self.open_lane("a")
+        await self.open_lane("b")
+        queued = [asyncio.create_task(self.admission.acquire()) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        with self.assertRaises(AdmissionRejected) as rejected:
+            await self.admission.acquire()
+        self.assertIn("queue full", rejected.exception.reason)
+        self.assertGreaterEqual(rejected.exception.retry_after, 1)
+        self.assertEqual(self.lanes.counters["rejected"], 1)
+        for task in queued:
+            task.cancel()
+
+    async def test_rejects_at_once_when_wait_is_too_long(self):
+        self.lanes.recent_durations.extend([240.0, 300.0])
+        await self.open_lane("a")
+        await self.open_lane("b")
+        with self.assertRaises(AdmissionRejected) as rejected:
+            await self.admission.acquire()
+        self.assertIn("estimated wait", rejected.exception.reason)
+        self.assertEqual(rejected.exception.retry_after, 68)
+        self.assertEqual(len(self.admission.waiters), 0)
+
+    async def test_times_out_when_no_lane_frees(self):
+        self.admission.max_wait = 0.05
+        self.admission.default_lane_secs = 0.01
+        await self.open_lane("a")
+        await self.open_lane("b")
+        with self.assertRaises(AdmissionRejected):
+            await self.admission.acquire()
+        self.assertEqual(self.admission.counters["timed_out"], 1)
+        self.assertEqual(len(self.admission.waiters), 0)
+
+    async def test_loop_lag_holds_new_lanes(self):
+        self.admission.loop_lag_ms = 400
+        waiting = asyncio.create_task(self.admission.acquire())
+        await asyncio.sleep(0)
+        self.assertFalse(waiting.done())
+
+        # The probe wakes the queue once the loop catches up
+        self.admission.loop_lag_ms = 10
+        self.admission.wake()
+        await asyncio.wait_for(waiting, 1)
+        self.assertEqual(self.admission.reserved, 1)
+
+    async def test_cancelled_offer_gives_back_its_slot(self):
+        await self.open_lane("a")
+        await self.open_lane("b")
+        waiting = asyncio.create_task(self.admission.acquire())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(self.admission.reserved, 0)
+        self.assertEqual(len(self.admission.waiters), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
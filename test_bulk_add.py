@@ -0,0 +1,86 @@
+"""
+Test script for the bulk multi-item add path.
+"""
+
+import random
+import unittest
+from unittest.mock import patch
+
+import food_ordering
+from food_ordering import current_order_session, process_items
+
+CATALOG = [
+    {"item_id": "burger", "protein": "beef", "size": "large", "customizations": ["extra_cheese"]},
+    {"item_id": "fries", "size": "medium"},
+    {"item_id": "soda", "size": "small"},
+    {"item_id": "chicken_burger", "combo": True, "combo_type": "large_combo", "customizations": ["no_mayo"]},
+    {"item_id": "taco", "protein": "chicken"},
+    {"item_id": "coke"},
+    {"item_id": "nachos", "combo": True},
+]
+
+
+def catering_order(lines, seed=7):
+    rng = random.Random(seed)
+    order = []
+    for _ in range(lines):
+        item = dict(rng.choice(CATALOG))
+        item["quantity"] = rng.randint(1, 4)
+        order.append(item)
+    return order
+
+
+def cart_lines():
+    return [
+        (item["item_id"], item["quantity"], item["size"], item["protein"], round(item["price"], 2), item["description"])
+        for item in current_order_session.current_order_items
+    ]
+
+
+class TestBulkAdd(unittest.TestCase):
+    """The bulk path builds the same cart as adding items one by one."""
+
+    def setUp(self):
+        current_order_session.clear_order()
+
+    def tearDown(self):
+        current_order_session.clear_order()
+
+    def build(self, items, bulk):
+        current_order_session.clear_order()
+        current_order_session.start_new_order()
+        current_order_session.add_item_to_order(food_ordering.create_new_item_from_update(
+            {"item_id": "burger", "protein": "beef", "size": "large", "customizations": ["extra_cheese"], "quantity": 1},
+            food_ordering.MENU_ITEMS, food_ordering.SIZES, food_ordering.COMBOS, food_ordering.PROTEIN_OPTIONS))
+        threshold = 1 if bulk else 10 ** 6
+        with patch.object(food_ordering, "BULK_ADD_MIN_ITEMS", threshold):
+            processed, _ = process_items([dict(item) for item in items])
+        return cart_lines(), processed
+
+    def test_matches_item_by_item_path(self):
+        items = catering_order(60)
+        # Force an in-batch repeat and a repeat of the line already in the cart
+        items.insert(0, dict(CATALOG[0], quantity=2))
+        items.insert(5, dict(items[4]))
+        sequential, _ = self.build(items, bulk=False)
+        bulk, processed = self.build(items, bulk=True)
+        self.assertEqual(bulk, sequential)
+        self.assertEqual(len(set(map(id, processed))), len(processed))
+
+    def test_single_transaction_and_undo(self):
+        current_order_session.start_new_order()
+        undo_entries = len(current_order_session.undo_log)
+        with current_order_session.transaction("add_item"):
+            process_items(catering_order(50))
+        self.assertEqual(len(current_order_session.undo_log), undo_entries + 1)
+        current_order_session.undo()
+        self.assertEqual(current_order_session.current_order_items, [])
+
+    def test_unknown_items_are_skipped(self):
+        items = catering_order(10) + [{"item_id": "pizza"}]
+        processed, _ = process_items(items)
+        self.assertNotIn("pizza", [item["item_id"] for item in processed])
+
+
+if __name__ == "__main__":
+    unittest.main()
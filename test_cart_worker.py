@@ -0,0 +1,101 @@
+"""
+Test script for planning cart changes in the worker pool.
+"""
+
+import unittest
+from unittest.mock import patch
+
+import cart_worker
+import food_ordering
+from cart_worker import CART_WORKER_MODE_PROCESS, CART_WORKER_MODE_THREAD, CartWorkerPool
+from food_ordering import current_order_session, process_items, process_items_offloaded
+from test_bulk_add import CATALOG, cart_lines, catering_order
+
+REQUESTS = [
+    [dict(CATALOG[0], quantity=1), dict(CATALOG[1], quantity=2)],
+    # Repeats the line already in the cart, so it merges into it
+    [dict(CATALOG[0], quantity=2), dict(CATALOG[2], quantity=1), {"item_id": "pizza"}],
+    catering_order(30),
+]
+
+
+class TestCartWorker(unittest.IsolatedAsyncioTestCase):
+    """Offloaded processing builds the same cart as processing inline."""
+
+    def setUp(self):
+        self.pool = CartWorkerPool(mode=CART_WORKER_MODE_THREAD, min_items=1)
+        patcher = patch.object(food_ordering, "cart_worker_pool", self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.pool.shutdown)
+        self.addCleanup(current_order_session.clear_order)
+
+    def start_cart(self):
+        current_order_session.clear_order()
+        current_order_session.start_new_order()
+        current_order_session.add_item_to_order(food_ordering.create_new_item_from_update(
+            dict(CATALOG[0], quantity=1),
+            food_ordering.MENU_ITEMS, food_ordering.SIZES, food_ordering.COMBOS, food_ordering.PROTEIN_OPTIONS))
+
+    async def run_both(self, items):
+        self.start_cart()
+        inline_processed, inline_duplicates = process_items([dict(item) for item in items])
+        inline = (cart_lines(), [item["description"] for item in inline_processed], inline_duplicates)
+
+        self.start_cart()
+        processed, duplicates = await process_items_offloaded([dict(item) for item in items])
+        offloaded = (cart_lines(), [item["description"] for item in processed], duplicates)
+        return inline, offloaded
+
+    async def test_matches_inline_processing(self):
+        for items in REQUESTS:
+            inline, offloaded = await self.run_both(items)
+            self.assertEqual(offloaded, inline)
+        self.assertEqual(self.pool.counters["offloaded"], len(REQUESTS))
+
+    async def test_processed_items_are_cart_lines(self):
+        self.start_cart()
+        processed, _ = await process_items_offloaded([dict(CATALOG[0], quantity=1), dict(CATALOG[1])])
+        self.assertIs(processed[0], current_order_session.current_order_items[0])
+        self.assertIs(processed[1], current_order_session.current_order_items[1])
+        self.assertIs(current_order_session.last_item_added, current_order_session.current_order_items[1])
+
+    async def test_one_undo_entry(self):
+        self.start_cart()
+        before = cart_lines()
+        await process_items_offloaded(catering_order(12))
+        self.assertEqual(current_order_session.undo(), "add_item")
+        self.assertEqual(cart_lines(), before)
+
+    async def test_stale_plan_falls_back_inline(self):
+        self.start_cart()
+        snapshot_cart = cart_worker.snapshot_cart
+        calls = []
+
+        def snapshot_then_change(session):
+            calls.append(session)
+            if len(calls) == 2:
+                # Another change lands while the worker is planning
+                session.append_items_to_order([dict(current_order_session.current_order_items[0], quantity=5)])
+            return snapshot_cart(session)
+
+        with patch.object(cart_worker, "snapshot_cart", side_effect=snapshot_then_change):
+            await process_items_offloaded([dict(CATALOG[1]), dict(CATALOG[2])])
+        self.assertEqual(self.pool.counters["conflicts"], 1)
+        self.assertEqual(self.pool.counters["inline"], 1)
+        self.assertEqual(len(current_order_session.current_order_items), 4)
+
+    async def test_small_requests_stay_inline(self):
+        self.pool.min_items = 3
+        self.start_cart()
+        await process_items_offloaded([dict(CATALOG[1])])
+        self.assertEqual(self.pool.counters, {"offloaded": 0, "inline": 1, "conflicts": 0, "errors": 0})
+
+    async def test_process_pool(self):
+        self.pool.mode = CART_WORKER_MODE_PROCESS
+        inline, offloaded = await self.run_both(REQUESTS[1])
+        self.assertEqual(offloaded, inline)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+Test script for conversation context trimming.
+"""
+
+import asyncio
+import json
+import unittest
+
+from pipecat.processors.aggregators.openai_llm_context import OpenAILLMContext, OpenAILLMContextFrame
+from pipecat.tests.utils import run_test
+
+from context_trimmer import CART_STATE_PREFIX, ContextTrimmer, ContextTrimProcessor, message_tokens
+
+SYSTEM = {"role": "system", "content": "You are a drive-thru assistant."}
+
+
+def tool_turn(n):
+    call_id = f"call-{n}"
+    return [
+        {"role": "user", "content": f"add item number {n}"},
+        {"role": "assistant", "tool_calls": [{"id": call_id, "type": "function", "function": {
+            "name": "order_food", "arguments": json.dumps({"action": "add_item", "items": [{"item_id": "fries"}]})}}]},
+        {"role": "tool", "tool_call_id": call_id, "content": json.dumps({"status": "items_added", "items": ["1x Regular Fries"] * 5})},
+        {"role": "assistant", "content": "Got it! Anything else for you?"},
+    ]
+
+
+def conversation(turns):
+    messages = [SYSTEM]
+    for n in range(turns):
+        messages.extend(tool_turn(n))
+    return messages
+
+
+class TestContextTrimmer(unittest.TestCase):
+    """Test cases for collapsing tool traffic and budgeting history."""
+
+    def setUp(self):
+        self.trimmer = ContextTrimmer(token_budget=200, cart_state=lambda: f"{CART_STATE_PREFIX}3x Regular Fries")
+
+    def test_collapses_settled_tool_calls(self):
+        messages = conversation(3) + [{"role": "user", "content": "and a coke"}]
+        trimmed = self.trimmer.trim(messages)
+        self.assertIs(trimmed[0], SYSTEM)
+        self.assertTrue(trimmed[1]["content"].startswith(CART_STATE_PREFIX))
+        self.assertFalse(any(m.get("role") == "tool" or m.get("tool_calls") for m in trimmed))
+        self.assertEqual(self.trimmer.collapsed_calls, 6)
+
+    def test_turn_in_progress_is_kept(self):
+        messages = conversation(2)
+        trimmed = self.trimmer.trim(messages)
+        self.assertEqual(trimmed[-3:], messages[-3:])
+        self.assertEqual(sum(1 for m in trimmed if m.get("role") == "tool"), 1)
+
+    def test_history_bounded_regardless_of_order_length(self):
+        sizes = []
+        messages = [SYSTEM]
+        for n in range(60):
+            messages = self.trimmer.trim(messages + tool_turn(n))
+            sizes.append(sum(message_tokens(m) for m in messages[2:]))
+        self.assertLessEqual(max(sizes[10:]), max(sizes[:10]) + 50)
+        self.assertEqual(sum(1 for m in messages if str(m.get("content")).startswith(CART_STATE_PREFIX)), 1)
+
+    def test_short_conversation_untouched(self):
+        messages = [SYSTEM, {"role": "user", "content": "Hello"}]
+        self.assertEqual(self.trimmer.trim(messages), messages)
+
+
+class TestContextTrimProcessor(unittest.TestCase):
+    """The processor trims context frames in place."""
+
+    def test_trims_context_frame(self):
+        context = OpenAILLMContext(messages=conversation(4) + [{"role": "user", "content": "that's all"}])
+        processor = ContextTrimProcessor(trimmer=ContextTrimmer(200, cart_state=lambda: f"{CART_STATE_PREFIX}empty"))
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(run_test(
+                processor,
+                frames_to_send=[OpenAILLMContextFrame(context=context)],
+                expected_down_frames=[OpenAILLMContextFrame],
+            ))
+        finally:
+            loop.close()
+        self.assertFalse(any(m.get("role") == "tool" for m in context.get_messages()))
+        self.assertEqual(context.get_messages()[-1]["content"], "that's all")
+
+
+if __name__ == "__main__":
+    unittest.main()
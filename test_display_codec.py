@@ -0,0 +1,130 @@
+"""
+Test script for the display wire encodings.
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+import websockets
+
+import display_codec
+import websocket_server
+import wire_benchmark
+from display_codec import (
+    ENCODING_COMPACT,
+    ENCODING_JSON,
+    ENCODING_MSGPACK,
+    EncodedMessage,
+    compact,
+    expand,
+    negotiate,
+    requested_encoding,
+)
+from display_topics import TopicIndex
+
+UPDATE = {
+    "type": "order_update",
+    "invoice_id": "INV-1",
+    "items": [{"item_id": "burger", "quantity": 2, "size": "large", "combo_type": None, "customizations": [],
+               "description": "2x Large Burger", "price": 17.98}],
+    "status": "in_progress",
+    "timestamp": "2026-10-19T12:00:00.250000",
+}
+
+
+class TestDisplayCodec(unittest.TestCase):
+    """Test cases for the compact form and negotiation."""
+
+    def test_compact_form(self):
+        message = compact(UPDATE)
+        self.assertEqual(message["t"], "order_update")
+        self.assertEqual(message["ts"], int(datetime(2026, 10, 19, 12, 0, 0, 250000).timestamp() * 1000))
+        line = message["l"][0]
+        self.assertEqual(line, {"id": "burger", "q": 2, "sz": "large", "cu": [], "d": "2x Large Burger", "p": 1798})
+
+    def test_expand_restores_keys(self):
+        restored = expand(compact(UPDATE))
+        self.assertEqual(set(restored), set(UPDATE))
+        self.assertEqual(restored["items"][0]["price"], 1798)
+        self.assertNotIn("combo_type", restored["items"][0])
+        finalized = expand(compact({"type": "order_finalized", "order": {"total": 5.5, "items": []}}))
+        self.assertEqual(finalized["order"]["total"], 550)
+
+    def test_negotiation(self):
+        self.assertEqual(requested_encoding("/?lane=1&encoding=compact"), "compact")
+        self.assertIsNone(requested_encoding("/"))
+        self.assertEqual(negotiate("COMPACT"), ENCODING_COMPACT)
+        self.assertEqual(negotiate("cbor"), ENCODING_JSON)
+        self.assertEqual(negotiate(None), ENCODING_JSON)
+        with patch.object(display_codec, "msgpack", None):
+            self.assertEqual(negotiate("msgpack"), ENCODING_JSON)
+
+    def test_msgpack_when_installed(self):
+        class FakeMsgpack:
+            @staticmethod
+            def packb(value):
+                return json.dumps(value).encode()
+
+        with patch.object(display_codec, "msgpack", FakeMsgpack):
+            self.assertEqual(negotiate("msgpack"), ENCODING_MSGPACK)
+            self.assertEqual(json.loads(display_codec.encode(UPDATE, ENCODING_MSGPACK)), compact(UPDATE))
+
+    def test_encoded_once_per_encoding(self):
+        encoded = EncodedMessage(UPDATE, "prebuilt")
+        self.assertEqual(encoded.get(ENCODING_JSON), "prebuilt")
+        with patch.object(display_codec, "encode", wraps=display_codec.encode) as encode:
+            first = encoded.get(ENCODING_COMPACT)
+            self.assertIs(encoded.get(ENCODING_COMPACT), first)
+        self.assertEqual(encode.call_count, 1)
+
+    def test_compression_setting(self):
+        with patch.dict("os.environ", {"DISPLAY_WS_COMPRESSION": "off"}):
+            self.assertIsNone(display_codec.compression())
+        with patch.dict("os.environ", {}, clear=True):
+            self.assertEqual(display_codec.compression(), "deflate")
+
+    def test_benchmark_runs(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = wire_benchmark.run_benchmark([2], repeat=1)
+        rows = results[2]
+        self.assertLess(rows[ENCODING_COMPACT]["bytes"], rows[wire_benchmark.BASELINE]["bytes"])
+        self.assertLess(rows[wire_benchmark.BASELINE]["deflated"], rows[wire_benchmark.BASELINE]["bytes"])
+
+
+class TestCompactDisplay(unittest.IsolatedAsyncioTestCase):
+    """A display that asks for the compact encoding gets it; others keep JSON."""
+
+    async def test_negotiated_on_connect(self):
+        for patcher in (patch.dict(websocket_server.orders_store, clear=True),
+                        patch.object(websocket_server, "subscriptions", TopicIndex())):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        server = await websocket_server.start_websocket_server("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            async with websockets.connect(f"ws://127.0.0.1:{port}/?encoding=compact") as compact_client, \
+                    websockets.connect(f"ws://127.0.0.1:{port}/") as json_client:
+                self.assertEqual(json.loads(await compact_client.recv())["encoding"], ENCODING_COMPACT)
+                self.assertEqual(json.loads(await json_client.recv())["encoding"], ENCODING_JSON)
+                # Both sides negotiated permessage-deflate
+                self.assertEqual(len(compact_client.extensions), 1)
+
+                await websocket_server.publish_order_update("INV-WIRE", UPDATE["items"])
+                compact_message = json.loads(await asyncio.wait_for(compact_client.recv(), 1))
+                json_message = json.loads(await asyncio.wait_for(json_client.recv(), 1))
+                self.assertEqual(compact_message["i"], "INV-WIRE")
+                self.assertEqual(compact_message["l"][0]["p"], 1798)
+                self.assertEqual(json_message["items"][0]["price"], 17.98)
+        finally:
+            server.close()
+            await server.wait_closed()
+            await websocket_server.clear_order("INV-WIRE")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+Test script for display WebSocket liveness.
+"""
+
+import asyncio
+import unittest
+from unittest.mock import patch
+
+import websockets
+
+import websocket_server
+from display_liveness import LivenessManager
+
+
+class FakeTransport:
+    def __init__(self):
+        self.aborted = False
+
+    def abort(self):
+        self.aborted = True
+
+
+class FakeDisplay:
+    """A display connection that answers pings (or not)."""
+
+    def __init__(self, answers=True, stuck=False):
+        self.answers = answers
+        self.stuck = stuck
+        self.pings = 0
+        self.transport = FakeTransport()
+
+    async def ping(self):
+        if self.stuck:
+            await asyncio.sleep(3600)
+        self.pings += 1
+        waiter = asyncio.get_running_loop().create_future()
+        if self.answers:
+            waiter.set_result(0.001)
+        return waiter
+
+
+class TestLivenessManager(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the ping/pong timer wheel."""
+
+    def setUp(self):
+        self.liveness = LivenessManager(ping_interval=4, pong_timeout=2, tick_secs=1)
+        self.evicted = []
+        self.liveness.evicted_callbacks.append(self.evicted.append)
+
+    async def ticks(self, count):
+        for _ in range(count):
+            await self.liveness.tick()
+
+    async def test_pings_on_schedule(self):
+        display = FakeDisplay()
+        self.liveness.add(display)
+        await self.ticks(3)
+        self.assertEqual(display.pings, 0)
+        await self.ticks(1)
+        self.assertEqual(display.pings, 1)
+        # Pong checked 2 ticks later, next ping one interval after the first
+        await self.ticks(4)
+        self.assertEqual(display.pings, 2)
+        self.assertEqual(self.liveness.counters["pongs"], 1)
+        self.assertEqual(self.evicted, [])
+
+    async def test_evicts_when_pong_is_missing(self):
+        dead = FakeDisplay(answers=False)
+        alive = FakeDisplay()
+        self.liveness.add(dead)
+        self.liveness.add(alive)
+        await self.ticks(6)
+        self.assertEqual(self.evicted, [dead])
+        self.assertTrue(dead.transport.aborted)
+        self.assertFalse(alive.transport.aborted)
+        self.assertNotIn(dead, self.liveness.entries)
+        self.assertEqual(self.liveness.stats()["connections"], 1)
+
+    async def test_evicts_when_ping_cannot_be_written(self):
+        self.liveness.pong_timeout = 0.05
+        stuck = FakeDisplay(stuck=True)
+        self.liveness.add(stuck)
+        await self.ticks(4)
+        self.assertEqual(self.evicted, [stuck])
+
+    async def test_tick_only_touches_due_connections(self):
+        early = [FakeDisplay() for _ in range(50)]
+        for display in early:
+            self.liveness.add(display)
+        await self.ticks(1)
+        late = FakeDisplay()
+        self.liveness.add(late)
+        self.assertEqual(len(self.liveness.wheel[self.liveness.entries[late].slot]), 1)
+        await self.ticks(3)
+        self.assertEqual(sum(display.pings for display in early), 50)
+        self.assertEqual(late.pings, 0)
+
+    async def test_remove_is_idempotent(self):
+        display = FakeDisplay()
+        self.liveness.add(display)
+        self.liveness.remove(display)
+        self.liveness.remove(display)
+        self.liveness.evict(display, "gone")
+        await self.ticks(8)
+        self.assertEqual(display.pings, 0)
+        self.assertEqual(self.evicted, [])
+
+
+class TestDisplayServerLiveness(unittest.IsolatedAsyncioTestCase):
+    """The display server pings real clients instead of sending JSON heartbeats."""
+
+    async def test_client_answers_protocol_pings(self):
+        liveness = LivenessManager(ping_interval=0.2, pong_timeout=0.1, tick_secs=0.05)
+        # No earlier orders replayed on connect
+        for name, value in (("display_liveness", liveness), ("orders_store", {})):
+            patcher = patch.object(websocket_server, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        liveness.start()
+        self.addCleanup(liveness.stop)
+
+        server = await websocket_server.start_websocket_server("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            async with websockets.connect(f"ws://127.0.0.1:{port}", ping_interval=None) as client:
+                welcome = await client.recv()
+                self.assertIn("welcome", welcome)
+                await asyncio.sleep(0.6)
+                self.assertGreaterEqual(liveness.counters["pongs"], 1)
+                self.assertEqual(liveness.counters["evicted"], 0)
+                # No application-level heartbeats or pings arrive
+                with self.assertRaises(asyncio.TimeoutError):
+                    await asyncio.wait_for(client.recv(), 0.1)
+            await asyncio.sleep(0.1)
+            self.assertEqual(liveness.stats()["connections"], 0)
+        finally:
+            server.close()
+            await server.wait_closed()
+
+
+if __name__ == "__main__":
+    unittest.main()
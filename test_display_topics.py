@@ -0,0 +1,194 @@
+"""
+Test script for topic subscriptions on the order display socket.
+"""
+
+import asyncio
+import json
+import threading
+import unittest
+from unittest.mock import patch
+
+import websockets
+
+import display_topics
+import websocket_server
+from display_topics import TopicIndex, parse_query, parse_subscription
+from lane_manager import current_lane
+
+
+def update(lane=None, invoice_id="INV-1", type="order_update"):
+    message = {"type": type, "invoice_id": invoice_id, "items": []}
+    if lane is not None:
+        message["lane"] = lane
+    return message
+
+
+class TestTopicIndex(unittest.TestCase):
+    """Test cases for matching messages to subscriptions."""
+
+    def setUp(self):
+        self.index = TopicIndex()
+
+    def test_unsubscribed_get_everything(self):
+        self.index.subscribe("kitchen")
+        self.assertEqual(self.index.recipients(update(lane="1")), {"kitchen"})
+        self.assertEqual(self.index.recipients({"type": "order_cleared", "invoice_id": "INV-9"}), {"kitchen"})
+
+    def test_lane_and_type_filters(self):
+        self.index.subscribe("kitchen")
+        self.index.subscribe("lane-1", {"lane": frozenset({"1"})})
+        self.index.subscribe("lane-2-payments", {"lane": frozenset({"2"}), "type": frozenset({"order_finalized"})})
+
+        self.assertEqual(self.index.recipients(update(lane="1")), {"kitchen", "lane-1"})
+        self.assertEqual(self.index.recipients(update(lane="2")), {"kitchen"})
+        finalized = {"type": "order_finalized", "lane": "2", "order": {"invoice_id": "INV-2"}}
+        self.assertEqual(self.index.recipients(finalized), {"kitchen", "lane-2-payments"})
+        # Untagged messages only reach displays that don't filter by lane
+        self.assertEqual(self.index.recipients(update()), {"kitchen"})
+
+    def test_invoice_filter_reads_finalized_orders(self):
+        self.index.subscribe("receipt", {"invoice": frozenset({"INV-2"})})
+        self.assertEqual(self.index.recipients({"type": "order_finalized", "order": {"invoice_id": "INV-2"}}),
+                         {"receipt"})
+        self.assertEqual(self.index.recipients(update(invoice_id="INV-3")), set())
+
+    def test_resubscribe_and_remove(self):
+        self.index.subscribe("display", {"lane": frozenset({"1"})})
+        self.index.subscribe("display", {"lane": frozenset({"2"})})
+        self.assertEqual(self.index.recipients(update(lane="1")), set())
+        self.assertEqual(self.index.recipients(update(lane="2")), {"display"})
+        self.index.remove("display")
+        self.index.remove("display")
+        self.assertEqual(len(self.index), 0)
+        self.assertEqual(self.index.by_value["lane"], {})
+
+    def test_only_candidates_are_checked(self):
+        for lane in range(100):
+            self.index.subscribe(f"display-{lane}", {"lane": frozenset({str(lane)})})
+        with patch.object(display_topics, "matches", wraps=display_topics.matches) as checked:
+            self.assertEqual(self.index.recipients(update(lane="7")), {"display-7"})
+        self.assertEqual(checked.call_count, 1)
+
+    def test_recipients_skip_connections_removed_meanwhile(self):
+        self.index.subscribe("kitchen")
+        self.index.subscribe("lane-1", {"lane": frozenset({"1"})})
+        # A display evicted between picking candidates and checking filters is skipped, not a KeyError
+        del self.index.filters["lane-1"]
+        self.assertEqual(self.index.recipients(update(lane="1")), {"kitchen"})
+
+    def test_parsing(self):
+        self.assertEqual(parse_query("/?lane=2&type=order_update,order_finalized"),
+                         {"lane": frozenset({"2"}), "type": frozenset({"order_update", "order_finalized"})})
+        self.assertEqual(parse_query("/"), {})
+        # In a subscribe message "type" is the message's own type
+        self.assertEqual(parse_subscription({"type": "subscribe", "lanes": [2], "invoices": "INV-1"}),
+                         {"lane": frozenset({"2"}), "invoice": frozenset({"INV-1"})})
+
+
+class TestDisplaySubscriptions(unittest.IsolatedAsyncioTestCase):
+    """Lane displays on a real socket only receive their lane."""
+
+    async def asyncSetUp(self):
+        # Start from no current orders; publishing still goes through the real display projection
+        for patcher in (patch.dict(websocket_server.orders_store, clear=True),
+                        patch.object(websocket_server, "subscriptions", TopicIndex())):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.server = await websocket_server.start_websocket_server("127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def connect(self, query=""):
+        client = await websockets.connect(f"ws://127.0.0.1:{self.port}/{query}")
+        self.addAsyncCleanup(client.close)
+        self.assertEqual(json.loads(await client.recv())["type"], "welcome")
+        return client
+
+    async def received(self, client):
+        messages = []
+        while True:
+            try:
+                messages.append(json.loads(await asyncio.wait_for(client.recv(), 0.2)))
+            except asyncio.TimeoutError:
+                return messages
+
+    async def publish_in_lane(self, lane, invoice_id):
+        token = current_lane.set(lane)
+        try:
+            await websocket_server.publish_order_update(invoice_id, [{"item_id": "taco"}])
+        finally:
+            current_lane.reset(token)
+
+    async def test_lane_displays_get_their_lane(self):
+        lane_1 = await self.connect("?lane=1")
+        lane_2 = await self.connect()
+        await lane_2.send(json.dumps({"type": "subscribe", "lanes": ["2"]}))
+        self.assertEqual(json.loads(await lane_2.recv()), {"type": "subscribed", "topics": {"lane": ["2"]}})
+        kitchen = await self.connect()
+
+        await self.publish_in_lane("1", "INV-L1")
+        await self.publish_in_lane("2", "INV-L2")
+
+        self.assertEqual([m["invoice_id"] for m in await self.received(lane_1)], ["INV-L1"])
+        self.assertEqual([m["invoice_id"] for m in await self.received(lane_2)], ["INV-L2"])
+        self.assertEqual([m["lane"] for m in await self.received(kitchen)], ["1", "2"])
+
+        # Subscribing replays the current orders that now match
+        await kitchen.send(json.dumps({"type": "subscribe", "lanes": ["2"]}))
+        replay = await self.received(kitchen)
+        self.assertEqual([m["type"] for m in replay], ["subscribed", "order_update"])
+        self.assertEqual(replay[1]["invoice_id"], "INV-L2")
+
+
+class TestBroadcastFromAnotherLoop(unittest.TestCase):
+    """Orders published on the bot's loop are sent from the display server's loop."""
+
+    def test_broadcast_runs_on_display_loop(self):
+        display = asyncio.new_event_loop()
+        thread = threading.Thread(target=display.run_forever, daemon=True)
+        thread.start()
+        self.addCleanup(display.close)
+        self.addCleanup(thread.join)
+        self.addCleanup(display.call_soon_threadsafe, display.stop)
+        for patcher in (patch.dict(websocket_server.orders_store, clear=True),
+                        patch.object(websocket_server, "subscriptions", TopicIndex())):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        async def serve():
+            return await websocket_server.start_websocket_server("127.0.0.1", 0)
+
+        server = asyncio.run_coroutine_threadsafe(serve(), display).result(5)
+        port = server.sockets[0].getsockname()[1]
+        self.addCleanup(lambda: asyncio.run_coroutine_threadsafe(server.wait_closed(), display).result(5))
+        self.addCleanup(display.call_soon_threadsafe, server.close)
+
+        sending_threads = []
+        recipients = websocket_server.subscriptions.recipients
+
+        def recording_recipients(message):
+            sending_threads.append(threading.current_thread())
+            return recipients(message)
+
+        async def publish_from_bot_loop():
+            async with websockets.connect(f"ws://127.0.0.1:{port}/") as client:
+                await client.recv()
+                with patch.object(websocket_server.subscriptions, "recipients", recording_recipients):
+                    await websocket_server.publish_order_update("INV-LOOP", [{"item_id": "taco"}])
+                return json.loads(await asyncio.wait_for(client.recv(), 1))
+
+        bot_loop = asyncio.new_event_loop()
+        try:
+            received = bot_loop.run_until_complete(publish_from_bot_loop())
+            bot_loop.run_until_complete(websocket_server.clear_order("INV-LOOP"))
+        finally:
+            bot_loop.close()
+        self.assertEqual(received["invoice_id"], "INV-LOOP")
+        self.assertEqual(sending_threads, [thread])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+"""
+Test script for the fast-path rule-based order parser.
+"""
+
+import asyncio
+import contextvars
+import unittest
+
+from pipecat.frames.frames import TranscriptionFrame
+from pipecat.tests.utils import run_test
+
+from fast_path_parser import (
+    FastPathOrderProcessor,
+    claim_fast_path_result,
+    clear_fast_path_claims,
+    parse_order_utterance,
+    record_fast_path_result,
+)
+from food_ordering import current_order_session, process_food_order
+
+
+class MockFunctionCallParams:
+    def __init__(self, arguments):
+        self.arguments = arguments
+        self.result = None
+
+    async def result_callback(self, result):
+        self.result = result
+
+
+class TestFastPathParser(unittest.TestCase):
+    """Test cases for parsing transcripts into order_food arguments."""
+
+    def test_multi_item_with_size_and_drink_synonym(self):
+        result = parse_order_utterance("large fries and a Coke")
+        self.assertTrue(result['is_fast_path'])
+        self.assertEqual(result['arguments'], {
+            "action": "add_item",
+            "items": [
+                {"item_id": "fries", "quantity": 1, "size": "large"},
+                {"item_id": "cola", "quantity": 1},
+            ],
+        })
+
+    def test_quantity_protein_and_customization(self):
+        result = parse_order_utterance("can I get two chicken tacos with extra cheese please")
+        self.assertTrue(result['is_fast_path'])
+        self.assertEqual(result['arguments']["items"], [
+            {"item_id": "taco", "quantity": 2, "protein": "chicken", "customizations": ["extra_cheese"]},
+        ])
+
+    def test_longest_match_prefers_menu_item(self):
+        result = parse_order_utterance("a chicken burger without onions")
+        self.assertEqual(result['arguments']["items"], [
+            {"item_id": "chicken_burger", "quantity": 1, "customizations": ["no_onion"]},
+        ])
+
+    def test_sprite_maps_to_lemon_lime(self):
+        result = parse_order_utterance("three sprites")
+        self.assertEqual(result['arguments']["items"], [{"item_id": "lemon_lime", "quantity": 3}])
+
+    def test_falls_back_when_protein_question_needed(self):
+        result = parse_order_utterance("I'd like a burger")
+        self.assertFalse(result['is_fast_path'])
+        self.assertIn("protein", result['reason'])
+
+    def test_falls_back_on_modifications(self):
+        for text in ["make that a large", "actually remove the fries", "change it to a coke instead"]:
+            self.assertFalse(parse_order_utterance(text)['is_fast_path'], text)
+
+    def test_falls_back_on_unrecognized_speech(self):
+        result = parse_order_utterance("could I see the breakfast specials and fries")
+        self.assertFalse(result['is_fast_path'])
+        self.assertLess(result['confidence'], 0.9)
+
+    def test_falls_back_on_combo(self):
+        self.assertFalse(parse_order_utterance("a steak burrito combo")['is_fast_path'])
+
+
+class TestFastPathClaims(unittest.TestCase):
+    """Test cases for de-duplicating the LLM's call after a fast-path order."""
+
+    def setUp(self):
+        clear_fast_path_claims()
+        current_order_session.clear_order()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        clear_fast_path_claims()
+        current_order_session.clear_order()
+        self.loop.close()
+
+    def test_claim_matches_equivalent_arguments(self):
+        record_fast_path_result(
+            {"action": "add_item", "items": [{"item_id": "cola", "quantity": 1}]},
+            {"status": "items_added"},
+        )
+        # The LLM may spell the same drink as soda + drink_choice
+        claimed = claim_fast_path_result({"action": "add_item", "items": [{"item_id": "soda", "drink_choice": "cola"}]}, current_order_session)
+        self.assertEqual(claimed, {"status": "items_added"})
+        # A claim is only honored once
+        self.assertIsNone(claim_fast_path_result({"action": "add_item", "items": [{"item_id": "cola"}]}, current_order_session))
+
+    def test_transcript_applies_order_once(self):
+        processor = FastPathOrderProcessor(process_food_order)
+        self.loop.run_until_complete(run_test(
+            processor,
+            frames_to_send=[TranscriptionFrame(text="large fries and a coke", user_id="", timestamp="")],
+        ))
+        self.assertEqual(len(current_order_session.current_order_items), 2)
+
+        # The model's own tool call for the same order must not add it again
+        params = MockFunctionCallParams({
+            "action": "add_item",
+            "items": [{"item_id": "fries", "size": "large"}, {"item_id": "cola"}],
+        })
+        self.loop.run_until_complete(process_food_order(params))
+        self.assertEqual(params.result["status"], "items_added")
+        self.assertEqual(len(current_order_session.current_order_items), 2)
+
+    def hear(self, processor, text):
+        self.loop.run_until_complete(run_test(
+            processor,
+            frames_to_send=[TranscriptionFrame(text=text, user_id="", timestamp="")],
+        ))
+
+    def llm_call(self, items):
+        params = MockFunctionCallParams({"action": "add_item", "items": items})
+        self.loop.run_until_complete(process_food_order(params))
+        return params.result
+
+    def cart(self):
+        return [(item["item_id"], item["quantity"]) for item in current_order_session.current_order_items]
+
+    def test_llm_splitting_the_order_replaces_the_fast_path_lines(self):
+        processor = FastPathOrderProcessor(process_food_order)
+        self.hear(processor, "large fries and a coke")
+        self.llm_call([{"item_id": "fries", "size": "large"}])
+        self.assertEqual(self.cart(), [("fries", 1)])
+        self.llm_call([{"item_id": "cola"}])
+        self.assertEqual(self.cart(), [("fries", 1), ("cola", 1)])
+
+    def test_mismatched_llm_call_is_applied_instead(self):
+        processor = FastPathOrderProcessor(process_food_order)
+        self.hear(processor, "large fries")
+        self.assertEqual(self.cart(), [("fries", 1)])
+        self.assertEqual(self.llm_call([{"item_id": "fries", "size": "large", "quantity": 2}])["status"], "items_added")
+        self.assertEqual(self.cart(), [("fries", 2)])
+
+    def test_repeated_transcript_is_reconciled_with_one_llm_call(self):
+        processor = FastPathOrderProcessor(process_food_order)
+        self.hear(processor, "large fries")
+        self.hear(processor, "large fries")
+        self.llm_call([{"item_id": "fries", "size": "large"}])
+        self.assertEqual(self.cart(), [("fries", 1)])
+
+    def test_transcript_after_the_llm_call_is_not_applied_again(self):
+        processor = FastPathOrderProcessor(process_food_order)
+        self.llm_call([{"item_id": "fries", "size": "large"}, {"item_id": "cola"}])
+        self.hear(processor, "large fries and a coke")
+        self.assertEqual(self.cart(), [("fries", 1), ("cola", 1)])
+        # Only that utterance is skipped; the next order applies as usual
+        self.hear(processor, "large fries")
+        self.assertEqual(self.cart(), [("fries", 2), ("cola", 1)])
+
+    def test_claims_belong_to_their_lane(self):
+        arguments = {"action": "add_item", "items": [{"item_id": "cola"}]}
+        lane_a, lane_b = contextvars.copy_context(), contextvars.copy_context()
+        lane_a.run(FastPathOrderProcessor, process_food_order)
+        lane_b.run(FastPathOrderProcessor, process_food_order)
+        lane_a.run(record_fast_path_result, arguments, {"status": "items_added"})
+        self.assertIsNone(lane_b.run(claim_fast_path_result, arguments, current_order_session))
+        self.assertEqual(lane_a.run(claim_fast_path_result, arguments, current_order_session), {"status": "items_added"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+Test script for the fuzzy menu-item resolver.
+"""
+
+import unittest
+
+from food_ordering import current_order_session, detect_invalid_item_id_patterns, process_items
+from fuzzy_resolver import (
+    FuzzyItemResolver,
+    NOISY_CORPUS,
+    edit_distance,
+    phonetic_key,
+    resolve_fuzzy_item,
+    run_benchmark,
+)
+from menu import MENU_ITEMS, PROTEIN_OPTIONS
+
+
+class TestFuzzyResolver(unittest.TestCase):
+    """Test cases for phonetic keys and resolution."""
+
+    def setUp(self):
+        self.resolver = FuzzyItemResolver(MENU_ITEMS, PROTEIN_OPTIONS)
+
+    def test_phonetic_key(self):
+        self.assertEqual(phonetic_key("quesadeeya"), phonetic_key("quesadilla"))
+        self.assertEqual(phonetic_key("chicken_burrito"), phonetic_key("chicken burrito"))
+
+    def test_bounded_edit_distance(self):
+        self.assertEqual(edit_distance("burrow", "burrito"), 3)
+        self.assertEqual(edit_distance("burrow", "water", max_distance=1), 2)
+
+    def test_resolves_noisy_names(self):
+        self.assertEqual(self.resolver.resolve("chicken burrow")["item_id"], "chicken_burrito")
+        self.assertEqual(self.resolver.resolve("quesadeeya")["item_id"], "quesadilla")
+        match = self.resolver.resolve("beef_burrow")
+        self.assertEqual((match["item_id"], match["protein"]), ("burrito", "beef"))
+
+    def test_proteins_are_not_guessed(self):
+        self.assertIsNone(resolve_fuzzy_item("bean burrito"))
+        for text in ("bean burger", "stake burrito", "beet taco"):
+            match = self.resolver.resolve(text)
+            self.assertTrue(match is None or match["protein"] is None, (text, match))
+        # A protein said as such still resolves alongside a misheard item
+        self.assertEqual(self.resolver.resolve("veggie burrow")["protein"], "veggie")
+
+    def test_threshold_rejects_unrelated_names(self):
+        self.assertIsNone(self.resolver.resolve("pizza"))
+        self.assertIsNone(self.resolver.resolve("milkshake"))
+        strict = FuzzyItemResolver(MENU_ITEMS, PROTEIN_OPTIONS, threshold=0.95)
+        self.assertIsNone(strict.resolve("chicken burrow"))
+
+    def test_benchmark_corpus(self):
+        report = run_benchmark(NOISY_CORPUS, rounds=1)
+        self.assertEqual(report["misses"], [])
+
+
+class TestFuzzyIntegration(unittest.TestCase):
+    """Unknown ids are resolved instead of dropped."""
+
+    def setUp(self):
+        current_order_session.clear_order()
+
+    def tearDown(self):
+        current_order_session.clear_order()
+
+    def test_detect_invalid_item_id_patterns(self):
+        self.assertEqual(detect_invalid_item_id_patterns("quesadeeya", MENU_ITEMS, PROTEIN_OPTIONS), ("quesadilla", None))
+        self.assertEqual(detect_invalid_item_id_patterns("beef_pizza", MENU_ITEMS, PROTEIN_OPTIONS), ("beef_pizza", None))
+
+    def test_process_items_keeps_misheard_item(self):
+        current_order_session.start_new_order()
+        processed, _ = process_items([{"item_id": "chicken_burrow"}])
+        self.assertEqual(len(processed), 1)
+        self.assertEqual(processed[0]["item_id"], "chicken_burrito")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Test script for replay-safe tool-call handling.
+"""
+
+import asyncio
+import unittest
+
+from pipecat.services.llm_service import FunctionCallParams
+
+from food_ordering import current_order_session, process_food_order
+from idempotency import ToolCallCache, arguments_hash
+from order_session import OrderSession
+
+
+class TestToolCallCache(unittest.TestCase):
+    """Test cases for the bounded result cache."""
+
+    def test_hash_ignores_key_order_case_and_empty_fields(self):
+        first = {"action": "add_item", "items": [{"item_id": "Fries", "size": "large", "customizations": []}]}
+        second = {"items": [{"size": "large", "item_id": "fries "}], "action": "add_item"}
+        self.assertEqual(arguments_hash(first), arguments_hash(second))
+        self.assertNotEqual(arguments_hash(first), arguments_hash({"action": "add_item", "items": [{"item_id": "nachos"}]}))
+
+    def test_lru_bound(self):
+        cache = ToolCallCache(max_entries=2)
+        for n in range(3):
+            cache.put(cache.key(f"call-{n}", {}), {"n": n})
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(cache.key("call-0", {})))
+        self.assertEqual(cache.get(cache.key("call-2", {})), {"n": 2})
+
+    def test_calls_without_id_are_not_cached(self):
+        cache = ToolCallCache()
+        self.assertIsNone(cache.key(None, {"action": "add_item"}))
+        cache.put(None, {"status": "items_added"})
+        self.assertEqual(len(cache), 0)
+
+
+class TestLineMerging(unittest.TestCase):
+    """Repeating the line just added merges it, without a time window."""
+
+    def test_repeat_of_last_line_merges(self):
+        session = OrderSession()
+        line = {"item_id": "fries", "quantity": 1, "size": "large", "protein": None, "price": 5.49,
+                "description": "1x Large Fries"}
+        session.add_item_to_order(dict(line))
+        session.last_item_timestamp -= 60
+        items, is_duplicate, action_taken = session.add_item_to_order(dict(line))
+        self.assertTrue(is_duplicate)
+        self.assertEqual(action_taken, "increased_quantity")
+        self.assertEqual(items[0]["description"], "2x Large Fries")
+
+    def test_different_combo_is_a_new_line(self):
+        session = OrderSession()
+        session.add_item_to_order({"item_id": "nachos", "quantity": 1, "price": 5.99, "description": "1x Regular Nachos"})
+        items, is_duplicate, _ = session.add_item_to_order(
+            {"item_id": "nachos", "quantity": 1, "combo": True, "price": 9.47, "description": "1x Regular Nachos Regular Combo"})
+        self.assertFalse(is_duplicate)
+        self.assertEqual(len(items), 2)
+
+
+class TestReplayedCalls(unittest.TestCase):
+    """process_food_order never applies a replayed call twice."""
+
+    def setUp(self):
+        current_order_session.clear_order()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        current_order_session.clear_order()
+        self.loop.close()
+
+    def call(self, tool_call_id, arguments):
+        results = []
+
+        async def result_callback(result, *, properties=None):
+            results.append(result)
+
+        self.loop.run_until_complete(process_food_order(FunctionCallParams(
+            function_name="order_food", tool_call_id=tool_call_id, arguments=arguments,
+            llm=None, context=None, result_callback=result_callback,
+        )))
+        return results[-1]
+
+    def test_replay_returns_recorded_result(self):
+        arguments = {"action": "add_item", "items": [{"item_id": "fries"}]}
+        first = self.call("call-1", dict(arguments))
+        replay = self.call("call-1", dict(arguments))
+        self.assertIs(replay, first)
+        self.assertEqual(len(current_order_session.current_order_items), 1)
+        self.assertEqual(current_order_session.current_order_items[0]["quantity"], 1)
+
+    def test_new_call_id_is_applied(self):
+        self.call("call-1", {"action": "add_item", "items": [{"item_id": "fries"}]})
+        self.call("call-2", {"action": "add_item", "items": [{"item_id": "nachos"}]})
+        self.assertEqual(len(current_order_session.current_order_items), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
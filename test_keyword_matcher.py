@@ -0,0 +1,79 @@
+"""
+Test script for the Aho-Corasick keyword matcher.
+"""
+
+import unittest
+
+from customization_validator import analyze_order_intent, clean_speech_transcription
+from keyword_matcher import KeywordAutomaton, apply_corrections, scan_intents
+from replacement_handler import detect_replacement_intent, should_replace_instead_of_update
+
+
+class TestKeywordAutomaton(unittest.TestCase):
+    """Test cases for the automaton itself."""
+
+    def test_overlapping_patterns(self):
+        automaton = KeywordAutomaton.from_tables({"a": ["he", "she", "hers"], "b": ["his"]})
+        phrases = [match[2] for match in automaton.find_all("she hers his")]
+        self.assertEqual(sorted(phrases), ["hers", "his", "she"])
+
+    def test_word_boundaries(self):
+        automaton = KeywordAutomaton.from_tables({"add": ["and", "add"]})
+        self.assertEqual(automaton.scan("a sandwich, added"), {})
+        self.assertEqual(automaton.scan("fries and a coke"), {"add": ["and"]})
+
+    def test_plurals_match(self):
+        automaton = KeywordAutomaton.from_tables({"item": ["burger", "taco", "sandwich"]})
+        self.assertEqual(automaton.scan("two burgers, three tacos"), {"item": ["burger", "taco"]})
+        self.assertEqual(automaton.scan("sandwiches please"), {"item": ["sandwich"]})
+        self.assertEqual(automaton.scan("burgerses and tacoss"), {})
+        self.assertEqual(scan_intents("Make those chicken burgers instead")["item_type_change"], ["burger"])
+
+    def test_phrase_in_several_categories(self):
+        matches = scan_intents("Make that a chicken burger instead")
+        self.assertIn("instead", matches["replacement"])
+        self.assertIn("instead", matches["strong_replacement"])
+        self.assertIn("instead", matches["modify"])
+        self.assertEqual(matches["protein_change"], ["chicken"])
+        self.assertEqual(matches["item_type_change"], ["burger"])
+
+    def test_empty_text(self):
+        self.assertEqual(scan_intents(""), {})
+        self.assertEqual(scan_intents(None), {})
+
+
+class TestIntentDetection(unittest.TestCase):
+    """Test cases for the callers that now share one scan."""
+
+    def test_replacement_intent(self):
+        items = [{"item_id": "chicken_burger"}]
+        info = detect_replacement_intent("can you make that a chicken burger instead", items)
+        self.assertEqual(info["replacement_type"], "protein_change")
+        self.assertTrue(should_replace_instead_of_update("change that to a veggie burger", items, []))
+        self.assertFalse(should_replace_instead_of_update("add fries to that", [{"item_id": "fries"}], []))
+
+    def test_precomputed_matches_are_reused(self):
+        items = [{"item_id": "burger"}]
+        matches = scan_intents("make it a combo")
+        self.assertEqual(detect_replacement_intent("ignored", items, matches)["replacement_type"], "combo_change")
+
+    def test_analyze_order_intent(self):
+        self.assertEqual(analyze_order_intent("actually change that", []), "modify")
+        self.assertEqual(analyze_order_intent("can i have another sandwich", []), "add")
+
+    def test_corrections_single_pass(self):
+        corrected, applied = apply_corrections("burger with no cheese extra cheese")
+        self.assertEqual(corrected, "burger with extra cheese")
+        self.assertEqual(applied, [("with no cheese extra cheese", "with extra cheese")])
+        self.assertEqual(clean_speech_transcription("Tacos no no onions"), "Tacos no onions")
+
+    def test_custom_corrections(self):
+        corrected, applied = apply_corrections("a large coak and fries", {"coak": "coke"})
+        self.assertEqual(corrected, "a large coke and fries")
+        self.assertEqual(applied, [("coak", "coke")])
+        # Only the corrections passed in are applied
+        self.assertEqual(apply_corrections("no no onions", {"coak": "coke"}), ("no no onions", []))
+
+
+if __name__ == "__main__":
+    unittest.main()
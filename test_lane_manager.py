@@ -0,0 +1,208 @@
+"""
+Test script for the WebRTC lane lifecycle manager.
+"""
+
+import asyncio
+import inspect
+import unittest
+
+from lane_manager import (
+    CLOSE_GRACE_SECS,
+    LANE_CLOSED,
+    LANE_CONNECTED,
+    REAP_FAILED,
+    REAP_ICE_TIMEOUT,
+    REAP_IDLE,
+    REAP_LEAKED,
+    LaneManager,
+    current_lane,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeConnection:
+    """Stands in for SmallWebRTCConnection: event handlers, is_connected, disconnect."""
+
+    def __init__(self, pc_id):
+        self.pc_id = pc_id
+        self.handlers = {}
+        self.connected = False
+        self.disconnected = False
+
+    def add_event_handler(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    async def emit(self, event):
+        for handler in self.handlers.get(event, []):
+            await handler(self)
+
+    def is_connected(self):
+        return self.connected
+
+    async def disconnect(self):
+        self.disconnected = True
+
+
+class FakePipelineTask:
+    def __init__(self):
+        self.cancelled = False
+
+    async def cancel(self):
+        self.cancelled = True
+
+
+async def forever():
+    await asyncio.Event().wait()
+
+
+class TestLaneManager(unittest.IsolatedAsyncioTestCase):
+    """Test cases for admission, timeouts and reaping."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.manager = LaneManager(max_lanes=2, idle_timeout=30, ice_timeout=20, clock=self.clock)
+
+    def open_lane(self, pc_id, run_forever=True):
+        connection = FakeConnection(pc_id)
+        self.manager.register(pc_id, connection)
+        pipeline = FakePipelineTask()
+        if run_forever:
+            self.manager.start_bot(pc_id, forever())
+            self.manager.attach_pipeline_task(pc_id, pipeline)
+        return connection, pipeline
+
+    async def asyncTearDown(self):
+        await self.manager.shutdown()
+
+    async def test_admission_limit(self):
+        self.open_lane("a")
+        self.open_lane("b")
+        self.assertFalse(self.manager.can_admit())
+
+        # A clean close without a running bot frees the slot straight away
+        connection, _ = self.open_lane("c", run_forever=False)
+        await connection.emit("closed")
+        self.assertNotIn("c", self.manager.lanes)
+
+    async def test_bot_cancelled_before_start_is_closed(self):
+        self.manager.register("a", FakeConnection("a"))
+        coroutine = forever()
+        task = self.manager.start_bot("a", coroutine)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(inspect.getcoroutinestate(coroutine), inspect.CORO_CLOSED)
+
+    async def test_ice_timeout_reaps_and_cancels_pipeline(self):
+        connection, pipeline = self.open_lane("a")
+        self.clock.now = 19
+        self.assertEqual(await self.manager.reap_once(), [])
+
+        self.clock.now = 21
+        self.assertEqual(await self.manager.reap_once(), ["a"])
+        self.assertTrue(pipeline.cancelled)
+        self.assertTrue(connection.disconnected)
+        self.assertEqual(self.manager.counters[REAP_ICE_TIMEOUT], 1)
+        self.assertNotIn("a", self.manager.connections)
+
+    async def test_idle_lane_is_reaped_after_peer_goes_away(self):
+        connection, pipeline = self.open_lane("a")
+        await connection.emit("connected")
+        connection.connected = True
+        self.assertEqual(self.manager.lanes["a"].state, LANE_CONNECTED)
+
+        # Still reachable: never idle, however long the order takes
+        self.clock.now = 600
+        self.assertEqual(await self.manager.reap_once(), [])
+
+        # The car drives off without closing
+        connection.connected = False
+        self.clock.now = 620
+        self.assertEqual(await self.manager.reap_once(), [])
+        self.clock.now = 631
+        self.assertEqual(await self.manager.reap_once(), ["a"])
+        self.assertEqual(self.manager.counters[REAP_IDLE], 1)
+        self.assertTrue(pipeline.cancelled)
+
+    async def test_failed_connection_is_reaped(self):
+        connection, _ = self.open_lane("a")
+        await connection.emit("failed")
+        self.assertEqual(await self.manager.reap_once(), ["a"])
+        self.assertEqual(self.manager.counters[REAP_FAILED], 1)
+
+    async def test_bot_outliving_clean_close_counts_as_leaked(self):
+        connection, pipeline = self.open_lane("a")
+        await connection.emit("closed")
+        self.assertEqual(self.manager.lanes["a"].state, LANE_CLOSED)
+        self.assertNotIn("a", self.manager.connections)
+
+        self.clock.now = CLOSE_GRACE_SECS + 1
+        self.assertEqual(await self.manager.reap_once(), ["a"])
+        self.assertEqual(self.manager.counters[REAP_LEAKED], 1)
+        self.assertTrue(pipeline.cancelled)
+        self.assertFalse(connection.disconnected)
+
+    async def test_rekey_after_renegotiation(self):
+        connection, _ = self.open_lane("a")
+        self.manager.rekey("a", "b")
+        connection.pc_id = "b"
+        await connection.emit("connected")
+        self.assertEqual(self.manager.lanes["b"].state, LANE_CONNECTED)
+        self.assertIs(self.manager.connections["b"], connection)
+
+    async def test_bot_tasks_know_their_lane(self):
+        seen = {}
+
+        async def bot(pc_id):
+            # Tasks the pipeline starts inherit the lane
+            child = asyncio.create_task(asyncio.sleep(0, result=current_lane.get()))
+            seen[pc_id] = (current_lane.get(), await child)
+
+        self.manager.register("pc-1", FakeConnection("pc-1"), name=2)
+        self.manager.register("pc-2", FakeConnection("pc-2"))
+        await asyncio.gather(self.manager.start_bot("pc-1", bot("pc-1")), self.manager.start_bot("pc-2", bot("pc-2")))
+        self.assertEqual(seen, {"pc-1": ("2", "2"), "pc-2": ("pc-2", "pc-2")})
+        self.assertIsNone(current_lane.get())
+
+    async def test_shift_leaves_no_lanes_behind(self):
+        """A 16-hour shift of cars that close, drop, or never connect."""
+        manager = LaneManager(max_lanes=4, idle_timeout=30, ice_timeout=20, clock=self.clock)
+        for car in range(16 * 60):
+            self.clock.now = car * 60.0
+            await manager.reap_once()
+            self.assertTrue(manager.can_admit())
+            pc_id = f"car-{car}"
+            connection = FakeConnection(pc_id)
+            manager.register(pc_id, connection)
+            fate = car % 3
+            if fate == 0:
+                # Clean order: bot ends with the connection
+                manager.start_bot(pc_id, asyncio.sleep(0))
+                await asyncio.sleep(0)
+                await connection.emit("connected")
+                await connection.emit("closed")
+            elif fate == 1:
+                # Drove off mid-order
+                manager.start_bot(pc_id, forever())
+                await connection.emit("connected")
+            # fate 2: never finished ICE
+        self.clock.now += 120
+        await manager.reap_once()
+        await asyncio.sleep(0)
+
+        self.assertEqual(manager.lanes, {})
+        self.assertEqual(manager.connections, {})
+        self.assertEqual(manager.counters["closed"], 320)
+        self.assertEqual(manager.counters[REAP_IDLE], 320)
+        self.assertEqual(manager.counters[REAP_ICE_TIMEOUT], 320)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Test script for the drive-thru lane load generator.
+"""
+
+import asyncio
+import unittest
+
+import food_ordering
+from load_test import NovaSonicStandIn, bind_lane_session, format_report, lane_sessions, parse_args, percentile, run_load_test
+
+
+class TestLoadTest(unittest.TestCase):
+    """Test cases for the load generator."""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        from food_ordering import current_order_session
+        current_order_session.clear_order()
+        self.loop.close()
+
+    def test_percentile(self):
+        """Nearest-rank percentiles over a small sample."""
+        samples = [float(n) for n in range(1, 101)]
+        self.assertEqual(percentile(samples, 50), 50.0)
+        self.assertEqual(percentile(samples, 99), 99.0)
+        self.assertEqual(percentile([], 99), 0.0)
+
+    def test_parse_lane_counts(self):
+        """Lane counts are parsed from a comma-separated list."""
+        args = parse_args(["--lanes", "1,4,16"])
+        self.assertEqual(args.lanes, [1, 4, 16])
+
+    def test_sweep_reports_each_level(self):
+        """Each lane count produces a row with tool-call and broadcast latencies."""
+        args = parse_args(["--lanes", "1,2", "--displays", "2", "--conversations", "1", "--seed", "7"])
+        results = self.loop.run_until_complete(run_load_test(args))
+
+        self.assertEqual([row["lanes"] for row in results], [1, 2])
+        for row in results:
+            # Every scripted turn is one tool call
+            self.assertEqual(row["tool_calls"], row["lanes"] * 5)
+            self.assertGreater(row["broadcast_samples"], 0)
+            self.assertGreaterEqual(row["tool_call_p99_ms"], row["tool_call_p50_ms"])
+        self.assertIn("tool p99", format_report(results))
+
+    def test_lanes_build_separate_carts(self):
+        """Concurrent lanes each see only their own order lines."""
+        both_added = asyncio.Event()
+        added = []
+
+        async def lane(item_id):
+            bind_lane_session()
+            await NovaSonicStandIn().call_tool({"action": "add_item", "items": [{"item_id": item_id}]})
+            added.append(item_id)
+            if len(added) == 2:
+                both_added.set()
+            await both_added.wait()
+            return [item["item_id"] for item in food_ordering.current_order_session.current_order_items]
+
+        async def scenario():
+            with lane_sessions():
+                return await asyncio.gather(lane("burger"), lane("fries"))
+
+        original = food_ordering.current_order_session
+        original_items = list(original.current_order_items)
+        self.assertEqual(self.loop.run_until_complete(scenario()), [["burger"], ["fries"]])
+        self.assertIs(food_ordering.current_order_session, original)
+        self.assertEqual(original.current_order_items, original_items)
+
+
+if __name__ == "__main__":
+    unittest.main()
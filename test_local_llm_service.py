@@ -0,0 +1,132 @@
+"""
+Test script for the local Nova Sonic stand-in service.
+"""
+
+import asyncio
+import unittest
+
+from pipecat.frames.frames import (
+    FunctionCallResultFrame,
+    TranscriptionFrame,
+    TTSAudioRawFrame,
+    TTSTextFrame,
+    UserStoppedSpeakingFrame,
+)
+from pipecat.processors.aggregators.openai_llm_context import OpenAILLMContext, OpenAILLMContextFrame
+from pipecat.tests.utils import SleepFrame, run_test
+
+from food_ordering import current_order_session, process_food_order
+from local_llm_service import LatencyModel, LocalNovaSonicLLMService, load_script
+
+SCRIPT = {
+    "latency_ms": {"distribution": "fixed", "mean": 0},
+    "turns": [
+        {
+            "user": "two chicken tacos",
+            "function_calls": [
+                {"name": "order_food", "arguments": {"action": "add_item", "items": [{"item_id": "taco", "protein": "chicken", "quantity": 2}]}}
+            ],
+            "assistant": "Got it! Anything else for you?",
+        },
+        {
+            "user": "and fries",
+            "function_calls": [
+                {"name": "order_food", "arguments": {"action": "add_item", "items": [{"item_id": "fries"}]}}
+            ],
+            "assistant": "Perfect!",
+        },
+    ],
+}
+
+
+class TestLatencyModel(unittest.TestCase):
+    """Test cases for the latency distributions."""
+
+    def test_fixed_latency(self):
+        model = LatencyModel("fixed", mean_ms=120)
+        self.assertEqual(model.sample_ms(), 120)
+
+    def test_seeded_distributions_are_reproducible(self):
+        for distribution in ("uniform", "normal", "lognormal"):
+            first = LatencyModel(distribution, mean_ms=300, stddev_ms=50, seed=3)
+            second = LatencyModel(distribution, mean_ms=300, stddev_ms=50, seed=3)
+            self.assertEqual([first.sample_ms() for _ in range(5)], [second.sample_ms() for _ in range(5)])
+
+    def test_clamping(self):
+        model = LatencyModel("normal", mean_ms=100, stddev_ms=500, min_ms=50, max_ms=150, seed=1)
+        for _ in range(50):
+            self.assertTrue(50 <= model.sample_ms() <= 150)
+
+    def test_unknown_distribution(self):
+        with self.assertRaises(ValueError):
+            LatencyModel("pareto")
+
+
+class TestLocalNovaSonicLLMService(unittest.TestCase):
+    """Test cases for scripted turn playback."""
+
+    def setUp(self):
+        current_order_session.clear_order()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        current_order_session.clear_order()
+        self.loop.close()
+
+    def test_load_script_accepts_bare_turn_list(self):
+        script = load_script([{"user": "hi"}])
+        self.assertEqual(script["turns"][0]["function_calls"], [])
+        self.assertEqual(script["greeting"], "")
+
+    def test_turns_drive_process_food_order(self):
+        """Each end-of-speech plays one turn: transcript, tool call, text and audio."""
+        llm = LocalNovaSonicLLMService(script=SCRIPT)
+        llm.register_function("order_food", process_food_order)
+        context = OpenAILLMContext(messages=[{"role": "system", "content": "test"}])
+
+        down_frames, _ = self.loop.run_until_complete(run_test(
+            llm,
+            frames_to_send=[
+                OpenAILLMContextFrame(context=context),
+                SleepFrame(sleep=0.05),
+                UserStoppedSpeakingFrame(),
+                SleepFrame(sleep=0.2),
+                UserStoppedSpeakingFrame(),
+                SleepFrame(sleep=0.2),
+            ],
+            expected_down_frames=None,
+        ))
+
+        self.assertEqual(llm.turns_remaining, 0)
+        # Finished turns were handed back to the task manager
+        self.assertEqual(llm._turn_tasks, set())
+        self.assertEqual(len(current_order_session.current_order_items), 2)
+        self.assertEqual(current_order_session.current_order_items[0]["quantity"], 2)
+        self.assertEqual(context.get_messages()[1], {"role": "user", "content": "two chicken tacos"})
+
+    def test_emitted_frames(self):
+        """Playback emits transcription, function results, text and synthetic audio."""
+        llm = LocalNovaSonicLLMService(script=SCRIPT, advance_on_user_stopped_speaking=False)
+        llm.register_function("order_food", process_food_order)
+        received = []
+
+        async def run():
+            from pipecat.processors.frame_processor import FrameDirection
+
+            async def capture(frame, direction=FrameDirection.DOWNSTREAM):
+                received.append(frame)
+
+            llm.push_frame = capture
+            self.assertTrue(await llm.run_next_turn())
+
+        self.loop.run_until_complete(run())
+
+        self.assertIsInstance(received[0], TranscriptionFrame)
+        self.assertTrue(any(isinstance(f, TTSTextFrame) for f in received))
+        self.assertTrue(any(isinstance(f, TTSAudioRawFrame) for f in received))
+        self.assertTrue(any(isinstance(f, FunctionCallResultFrame) for f in received))
+
+
+if __name__ == "__main__":
+    unittest.main()
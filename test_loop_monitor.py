@@ -0,0 +1,75 @@
+"""
+Test script for the event-loop lag monitor.
+"""
+
+import asyncio
+import time
+import unittest
+
+from loop_monitor import GIL_CONTENTION, LoopMonitor, attribute
+
+
+def save_order_synchronously():
+    # Stands in for blocking work on the loop (file I/O, json.dumps(indent=2), print)
+    time.sleep(0.25)
+
+
+class TestLoopMonitor(unittest.IsolatedAsyncioTestCase):
+    """Test cases for stall detection and attribution."""
+
+    async def asyncSetUp(self):
+        self.monitor = LoopMonitor(threshold_ms=50, tick_interval=0.02, sample_interval=0.005)
+        self.monitor.start()
+
+    async def asyncTearDown(self):
+        self.monitor.stop()
+
+    async def test_stall_is_attributed_to_blocking_function(self):
+        await asyncio.sleep(0.1)
+        save_order_synchronously()
+        await asyncio.sleep(0.1)
+
+        stats = self.monitor.stats()
+        self.assertEqual(stats["stalls"], 1)
+        culprit = stats["culprits"][0]
+        self.assertEqual(culprit["culprit"], "test_loop_monitor.save_order_synchronously")
+        self.assertGreaterEqual(culprit["max_ms"], 150)
+        self.assertTrue(any("save_order_synchronously" in frame for frame in stats["recent"][0]["stack"]))
+        self.assertGreaterEqual(stats["lag_ms"]["max"], 150)
+
+    async def test_no_stalls_when_loop_is_idle(self):
+        await asyncio.sleep(0.2)
+        stats = self.monitor.stats()
+        self.assertTrue(stats["running"])
+        self.assertEqual(stats["stalls"], 0)
+        self.assertGreater(stats["lag_ms"]["samples"], 0)
+
+
+class TestAttribution(unittest.TestCase):
+    """Test cases for naming the function behind a stack."""
+
+    def test_prefers_innermost_project_frame(self):
+        stack = (
+            ("asyncio.events", "_run", 80, "/usr/lib/python3/asyncio/events.py"),
+            ("food_ordering", "process_food_order", 10, __file__.replace("test_loop_monitor", "food_ordering")),
+            ("json.encoder", "iterencode", 200, "/usr/lib/python3/json/encoder.py"),
+        )
+        self.assertEqual(attribute(stack), "food_ordering.process_food_order")
+
+    def test_falls_back_to_innermost_library_frame(self):
+        stack = (
+            ("asyncio.events", "_run", 80, "/usr/lib/python3/asyncio/events.py"),
+            ("json.encoder", "iterencode", 200, "/usr/lib/python3/json/encoder.py"),
+        )
+        self.assertEqual(attribute(stack), "json.encoder.iterencode")
+
+    def test_selector_wait_is_gil_contention(self):
+        stack = (
+            ("asyncio.base_events", "_run_once", 1884, "/usr/lib/python3/asyncio/base_events.py"),
+            ("selectors", "select", 468, "/usr/lib/python3/selectors.py"),
+        )
+        self.assertEqual(attribute(stack), GIL_CONTENTION)
+
+
+if __name__ == "__main__":
+    unittest.main()
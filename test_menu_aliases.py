@@ -0,0 +1,71 @@
+"""
+Test script for the precomputed menu alias graph.
+"""
+
+import unittest
+
+from food_ordering import detect_invalid_item_id_patterns, detect_soda_type_conversion, find_item_variants
+from menu import MENU_ITEMS, PROTEIN_OPTIONS
+from menu_aliases import MenuAliasGraph, get_alias_graph, invalidate_alias_graphs
+
+
+class TestMenuAliasGraph(unittest.TestCase):
+    """Test cases for alias resolution and variants."""
+
+    def setUp(self):
+        self.graph = get_alias_graph(MENU_ITEMS, PROTEIN_OPTIONS)
+
+    def test_canonical_tuples(self):
+        self.assertEqual(self.graph.resolve("burrito"), ("burrito", None, None))
+        self.assertEqual(self.graph.resolve("beef_burrito"), ("burrito", "beef", None))
+        self.assertEqual(self.graph.resolve("burrito_beef"), ("burrito", "beef", None))
+        self.assertEqual(self.graph.resolve("coke"), ("cola", None, "cola"))
+        self.assertEqual(self.graph.resolve("sprite"), ("lemon_lime", None, "lemon_lime"))
+        self.assertEqual(self.graph.resolve("diet_coke"), ("diet_cola", None, "diet_cola"))
+        self.assertIsNone(self.graph.resolve("beef_pizza"))
+
+    def test_menu_ids_win_over_patterns(self):
+        self.assertEqual(self.graph.resolve("chicken_burrito"), ("chicken_burrito", None, None))
+
+    def test_variants(self):
+        self.assertEqual(self.graph.variants("burrito"), ["burrito", "chicken_burrito"])
+        self.assertEqual(self.graph.variants("chicken_burrito"), ["chicken_burrito", "burrito"])
+        self.assertEqual(self.graph.variants("nachos"), ["nachos"])
+
+    def test_graph_cached_per_menu_version(self):
+        self.assertIs(get_alias_graph(MENU_ITEMS, PROTEIN_OPTIONS), self.graph)
+        menu = {"bowl": {}}
+        first = get_alias_graph(menu, PROTEIN_OPTIONS)
+        menu["steak_bowl"] = {}
+        second = get_alias_graph(menu, PROTEIN_OPTIONS)
+        self.assertIsNot(first, second)
+        self.assertEqual(second.variants("bowl"), ["bowl", "steak_bowl"])
+        invalidate_alias_graphs()
+        self.assertIsNot(get_alias_graph(menu, PROTEIN_OPTIONS), second)
+
+    def test_custom_menu_skips_missing_targets(self):
+        graph = MenuAliasGraph({"soda": {}, "bowl": {}}, {"tofu": {}})
+        self.assertIsNone(graph.resolve("coke"))
+        self.assertIsNone(graph.soda_item("cola"))
+        self.assertEqual(graph.resolve("tofu_bowl"), ("bowl", "tofu", None))
+
+
+class TestFoodOrderingDelegation(unittest.TestCase):
+    """The food_ordering helpers keep their signatures and results."""
+
+    def test_detect_invalid_item_id_patterns(self):
+        self.assertEqual(detect_invalid_item_id_patterns("steak_quesadilla", MENU_ITEMS, PROTEIN_OPTIONS), ("quesadilla", "steak"))
+        self.assertEqual(detect_invalid_item_id_patterns("coke", MENU_ITEMS, PROTEIN_OPTIONS), ("cola", None))
+        self.assertEqual(detect_invalid_item_id_patterns(None, MENU_ITEMS, PROTEIN_OPTIONS), (None, None))
+
+    def test_find_item_variants(self):
+        self.assertIn("chicken_burger", find_item_variants("burger", MENU_ITEMS))
+
+    def test_detect_soda_type_conversion(self):
+        self.assertEqual(detect_soda_type_conversion("soda", "orange", MENU_ITEMS), "orange_soda")
+        self.assertEqual(detect_soda_type_conversion("soda", "root_beer", MENU_ITEMS), "soda")
+        self.assertEqual(detect_soda_type_conversion("fries", "cola", MENU_ITEMS), "fries")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+"""
+Test script for the order event stream and its projections.
+"""
+
+import asyncio
+import json
+import unittest
+from unittest.mock import patch
+
+import order_events
+from order_events import (
+    FINALIZE_SAMPLES,
+    ORDER_CLEARED,
+    ORDER_FINALIZED,
+    ORDER_STARTED,
+    ORDER_UPDATED,
+    AnalyticsProjection,
+    CartProjection,
+    DisplayProjection,
+    HistoryProjection,
+    OrderEventStream,
+)
+
+
+def update(invoice_id, items, status="in_progress"):
+    return {"type": ORDER_UPDATED, "invoice_id": invoice_id, "items": items, "status": status, "timestamp": "t"}
+
+
+class RecordingStore:
+    def __init__(self):
+        self.saved = []
+
+    def save_order(self, order):
+        self.saved.append(order)
+
+
+class TestOrderEventStream(unittest.TestCase):
+    """Test cases for the stream and projections."""
+
+    def setUp(self):
+        self.stream = OrderEventStream()
+        self.cart = self.stream.subscribe(CartProjection())
+        self.display = self.stream.subscribe(DisplayProjection())
+        self.store = RecordingStore()
+        self.history = self.stream.subscribe(HistoryProjection(store=self.store))
+        self.analytics = self.stream.subscribe(AnalyticsProjection())
+
+    def run_lifecycle(self, invoice_id="INV-1"):
+        items = [{"item_id": "fries", "quantity": 2, "price": 4.98, "description": "2x Regular Fries"}]
+        self.stream.append(invoice_id, update(invoice_id, items))
+        self.stream.append(invoice_id, update(invoice_id, items, "awaiting_confirmation"))
+        self.stream.append(invoice_id, {
+            "type": ORDER_FINALIZED, "status": "confirmed", "timestamp": "t",
+            "order": {"invoice_id": invoice_id, "items": items, "total": 4.98},
+        })
+        self.stream.append(invoice_id, {"type": ORDER_CLEARED, "invoice_id": invoice_id, "timestamp": "t"})
+
+    def test_events_are_append_only_and_ordered(self):
+        self.run_lifecycle()
+        events = self.stream.events("INV-1")
+        self.assertEqual([e.type for e in events], [ORDER_UPDATED, ORDER_UPDATED, ORDER_FINALIZED, ORDER_CLEARED])
+        self.assertEqual([e.seq for e in events], sorted(e.seq for e in events))
+
+    def test_serialized_once_and_shared(self):
+        event = self.stream.append("INV-2", update("INV-2", []))
+        self.assertEqual(json.loads(event.json)["invoice_id"], "INV-2")
+        self.assertIs(self.display.orders["INV-2"], event.message)
+        self.assertIs(self.display.serialized("INV-2"), event.json)
+
+    def test_projections(self):
+        self.stream.append("INV-1", update("INV-1", [{"item_id": "fries"}], "awaiting_confirmation"))
+        self.assertEqual(self.cart.get("INV-1")["status"], "awaiting_confirmation")
+        self.run_lifecycle()
+        self.assertIsNone(self.cart.get("INV-1"))
+        self.assertNotIn("INV-1", self.display.orders)
+        self.assertEqual(self.history.recent()[0]["invoice_id"], "INV-1")
+        self.assertEqual(len(self.store.saved), 1)
+
+        summary = self.analytics.summary()
+        self.assertEqual(summary["orders_finalized"], 1)
+        self.assertEqual(summary["orders_abandoned"], 0)
+        self.assertEqual(summary["revenue"], 4.98)
+        self.assertEqual(summary["top_items"], [("fries", 2)])
+
+    def test_analytics_memory_is_bounded(self):
+        for number in range(5):
+            self.run_lifecycle(f"INV-{number}")
+        self.stream.append("INV-OPEN", update("INV-OPEN", []))
+        self.stream.append("INV-GONE", update("INV-GONE", []))
+        self.stream.append("INV-GONE", {"type": ORDER_CLEARED, "invoice_id": "INV-GONE", "timestamp": "t"})
+
+        summary = self.analytics.summary()
+        self.assertEqual((summary["orders_started"], summary["orders_finalized"], summary["orders_abandoned"]), (7, 5, 1))
+        self.assertEqual(set(self.analytics._first_seen), {"INV-OPEN"})
+        self.assertEqual(len(self.analytics._finalized), 0)
+        self.assertEqual(self.analytics.finalize_seconds.maxlen, FINALIZE_SAMPLES)
+
+    def test_projections_keep_recent_invoices_only(self):
+        with patch.object(order_events, "MAX_STREAMS", 3):
+            stream = OrderEventStream()
+            cart = stream.subscribe(CartProjection())
+            history = stream.subscribe(HistoryProjection())
+            analytics = stream.subscribe(AnalyticsProjection())
+            for number in range(6):
+                # Abandoned carts (never cleared) and finalized orders alike
+                stream.append(f"OPEN-{number}", update(f"OPEN-{number}", []))
+                stream.append(f"DONE-{number}", {"type": ORDER_FINALIZED, "timestamp": "t",
+                                                  "order": {"invoice_id": f"DONE-{number}", "items": [], "total": 1.0}})
+        self.assertEqual(list(cart.carts), ["DONE-4", "OPEN-5", "DONE-5"])
+        self.assertEqual([order["invoice_id"] for order in history.recent()], ["DONE-5", "DONE-4", "DONE-3"])
+        self.assertEqual(list(analytics._first_seen), ["OPEN-4", "OPEN-5"])
+        self.assertEqual(analytics.summary()["orders_finalized"], 6)
+
+    def test_replay_rebuilds_projection(self):
+        self.run_lifecycle("INV-3")
+        rebuilt = self.stream.replay(AnalyticsProjection())
+        self.assertEqual(rebuilt.summary()["orders_finalized"], 1)
+
+
+class TestWebsocketServerEvents(unittest.TestCase):
+    """websocket_server publishes through the shared stream."""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_publish_feeds_orders_store(self):
+        from order_events import order_events
+        from websocket_server import clear_order, orders_store, publish_order_update
+
+        self.loop.run_until_complete(publish_order_update("INV-WS", [{"item_id": "taco"}]))
+        self.assertEqual(orders_store["INV-WS"]["items"], [{"item_id": "taco"}])
+        self.loop.run_until_complete(clear_order("INV-WS"))
+        self.assertNotIn("INV-WS", orders_store)
+        self.assertEqual([e.type for e in order_events.events("INV-WS")], [ORDER_UPDATED, ORDER_CLEARED])
+
+    def test_started_type_stays_off_the_wire(self):
+        from order_events import order_events
+        from websocket_server import clear_order, orders_store, publish_order
+
+        self.loop.run_until_complete(publish_order({"invoice_id": "INV-NEW", "items": []}))
+        self.assertNotIn("type", orders_store["INV-NEW"])
+        self.assertEqual(order_events.events("INV-NEW")[0].type, ORDER_STARTED)
+        self.loop.run_until_complete(clear_order("INV-NEW"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,219 @@
+"""
+Test script for OrderSession transactions, undo log and snapshots.
+"""
+
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from pipecat.services.llm_service import FunctionCallParams
+
+import food_ordering
+from food_ordering import current_order_session, process_food_order
+from order_session import OrderSession
+
+
+def make_item(item_id, quantity=1, price=1.0):
+    return {
+        "item_id": item_id, "quantity": quantity, "size": "regular", "protein": None,
+        "price": price, "description": f"{quantity}x Regular {item_id}",
+    }
+
+
+class TestOrderSessionTransactions(unittest.TestCase):
+    """Test cases for the transaction API."""
+
+    def setUp(self):
+        self.session = OrderSession()
+        self.session.start_new_order()
+
+    def test_commit_records_undo_and_bumps_version(self):
+        version = self.session.version
+        with self.session.transaction("add_item"):
+            self.session.current_order_items.append(make_item("fries"))
+        self.assertEqual(self.session.version, version + 1)
+        self.assertEqual(self.session.undo_log[-1][0], "add_item")
+
+    def test_exception_rolls_back_in_place_changes(self):
+        item = make_item("fries")
+        self.session.add_item_to_order(item)
+        with self.assertRaises(RuntimeError):
+            with self.session.transaction("update_items"):
+                item["quantity"] = 5
+                self.session.current_order_items.append(make_item("nachos"))
+                raise RuntimeError("boom")
+        self.assertEqual(item["quantity"], 1)
+        self.assertEqual([i["item_id"] for i in self.session.current_order_items], ["fries"])
+
+    def test_unchanged_transaction_records_nothing(self):
+        version = self.session.version
+        undo_entries = len(self.session.undo_log)
+        with self.session.transaction("confirm_order"):
+            pass
+        self.assertEqual(self.session.version, version)
+        self.assertEqual(len(self.session.undo_log), undo_entries)
+
+    def test_undo_restores_previous_cart(self):
+        self.session.add_item_to_order(make_item("fries"))
+        self.session.apply_operations([("update", 0, {"quantity": 3}), ("add", make_item("cola"))], "update_items")
+        self.assertEqual(self.session.undo(), "update_items")
+        self.assertEqual(self.session.current_order_items[0]["quantity"], 1)
+        self.assertEqual(len(self.session.current_order_items), 1)
+        self.assertEqual(self.session.undo(), "add_item")
+        self.assertEqual(self.session.current_order_items, [])
+        self.assertIsNone(self.session.undo())
+
+    def test_apply_operations_is_atomic(self):
+        self.session.add_item_to_order(make_item("fries"))
+        with self.assertRaises(IndexError):
+            self.session.apply_operations([("add", make_item("cola")), ("remove", 7)])
+        self.assertEqual(len(self.session.current_order_items), 1)
+
+    def test_concurrent_calls_wait_for_the_open_transaction(self):
+        first_added = asyncio.Event()
+        events = []
+
+        async def first_call():
+            transaction = await self.session.acquire_transaction("first")
+            self.session.current_order_items.append(make_item("fries"))
+            first_added.set()
+            await asyncio.sleep(0)
+            nested = await self.session.acquire_transaction("nested")
+            self.assertIs(nested.root, transaction)
+            nested.commit()
+            events.append("first rolled back")
+            transaction.rollback()
+
+        async def second_call():
+            await first_added.wait()
+            transaction = await self.session.acquire_transaction("second")
+            events.append("second started")
+            self.session.current_order_items.append(make_item("nachos"))
+            transaction.commit()
+
+        async def both_calls():
+            await asyncio.gather(first_call(), second_call())
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(both_calls())
+        finally:
+            loop.close()
+        # The second call only started once the first was done, so the rollback kept its line
+        self.assertEqual(events, ["first rolled back", "second started"])
+        self.assertEqual([i["item_id"] for i in self.session.current_order_items], ["nachos"])
+        self.assertEqual(self.session.undo(), "second")
+        self.assertEqual(self.session.current_order_items, [])
+
+    def test_commit_and_rollback_are_idempotent(self):
+        transaction = self.session.begin_transaction("add_item")
+        self.session.current_order_items.append(make_item("fries"))
+        self.assertTrue(transaction.commit())
+        transaction.rollback()
+        self.assertFalse(transaction.commit())
+        self.assertEqual(len(self.session.current_order_items), 1)
+
+    def test_snapshot_cached_per_version(self):
+        self.session.add_item_to_order(make_item("fries"))
+        first = self.session.snapshot()
+        self.assertIs(self.session.snapshot(), first)
+        self.session.add_item_to_order(make_item("nachos"))
+        second = self.session.snapshot()
+        self.assertIsNot(second, first)
+        self.assertEqual(len(first), 1)
+        self.assertEqual(len(second), 2)
+
+
+class TestProcessFoodOrderTransactions(unittest.TestCase):
+    """process_food_order applies each call atomically and supports undo."""
+
+    def setUp(self):
+        current_order_session.clear_order()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        current_order_session.clear_order()
+        self.loop.close()
+
+    def call(self, arguments):
+        results = []
+
+        async def result_callback(result, *, properties=None):
+            results.append(result)
+
+        self.loop.run_until_complete(process_food_order(FunctionCallParams(
+            function_name="order_food", tool_call_id="test", arguments=arguments,
+            llm=None, context=None, result_callback=result_callback,
+        )))
+        return results[-1]
+
+    def test_undo_action(self):
+        self.call({"action": "add_item", "items": [{"item_id": "fries"}]})
+        self.call({"action": "add_item", "items": [{"item_id": "nachos"}]})
+        result = self.call({"action": "undo", "items": []})
+        self.assertEqual(result["status"], "change_undone")
+        self.assertEqual([i["item_id"] for i in current_order_session.current_order_items], ["fries"])
+
+    def test_publishes_the_cached_snapshot(self):
+        published = []
+
+        async def publish_order_update(invoice_id, items, status="in_progress"):
+            published.append(items)
+
+        with patch.object(food_ordering, "WEBSOCKET_ENABLED", True), \
+                patch.object(food_ordering, "publish_order_update", publish_order_update):
+            self.call({"action": "add_item", "items": [{"item_id": "fries"}]})
+        self.assertEqual(len(published), 1)
+        self.assertIs(published[0], current_order_session.snapshot())
+        self.assertEqual(current_order_session.undo_log[-1][0], "add_item")
+
+    def test_overlapping_call_failure_keeps_the_other_calls_lines(self):
+        fries_applied = asyncio.Event()
+        process_items_offloaded = food_ordering.process_items_offloaded
+
+        async def fail_after_applying_fries(items, special_instructions=""):
+            result = await process_items_offloaded(items, special_instructions)
+            if items[0]["item_id"] == "fries":
+                fries_applied.set()
+                # Let the second call try to start while this one is still open
+                for _ in range(5):
+                    await asyncio.sleep(0)
+                raise RuntimeError("cart worker lost")
+            return result
+
+        async def result_callback(result, *, properties=None):
+            pass
+
+        def order(tool_call_id, item_id):
+            return process_food_order(FunctionCallParams(
+                function_name="order_food", tool_call_id=tool_call_id,
+                arguments={"action": "add_item", "items": [{"item_id": item_id}]},
+                llm=None, context=None, result_callback=result_callback,
+            ))
+
+        async def second_call():
+            await fries_applied.wait()
+            await order("second", "nachos")
+
+        async def both_calls():
+            await asyncio.gather(order("first", "fries"), second_call())
+
+        with patch.object(food_ordering, "process_items_offloaded", fail_after_applying_fries):
+            self.loop.run_until_complete(both_calls())
+        self.assertEqual([i["item_id"] for i in current_order_session.current_order_items], ["nachos"])
+        # Undo takes back the second call's change only
+        self.call({"action": "undo", "items": []})
+        self.assertEqual(current_order_session.current_order_items, [])
+
+    def test_failure_midway_leaves_cart_untouched(self):
+        self.call({"action": "add_item", "items": [{"item_id": "fries"}]})
+        before = [dict(item) for item in current_order_session.current_order_items]
+        with patch.object(food_ordering, "calculate_order_price", side_effect=RuntimeError("pricing down")):
+            result = self.call({"action": "remove_item", "items": [{"item_id": "fries"}]})
+        self.assertEqual(result["status"], "error")
+        self.assertEqual(current_order_session.current_order_items, before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Test script for the sampling profiler.
+"""
+
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import profiler
+from profiler import THREADS_LOOP, ProfilerBusy, SamplingProfiler
+
+
+def busy_handler(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def worker_thread(stop):
+    while not stop.is_set():
+        busy_handler(0.005)
+
+
+class TestSamplingProfiler(unittest.IsolatedAsyncioTestCase):
+    """Test cases for collecting collapsed stacks."""
+
+    def setUp(self):
+        self.profiler = SamplingProfiler()
+        self.addCleanup(self.profiler.stop)
+
+    async def wait_done(self):
+        while self.profiler.running:
+            await asyncio.sleep(0.01)
+
+    async def test_collects_loop_and_thread_stacks(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=worker_thread, args=(stop,), name="ws server", daemon=True)
+        worker.start()
+        self.addCleanup(stop.set)
+
+        self.profiler.start(0.3, interval_ms=2)
+        busy_handler(0.15)
+        await self.wait_done()
+
+        lines = self.profiler.collapsed().splitlines()
+        self.assertGreater(self.profiler.samples, 10)
+        loop_lines = [line for line in lines if line.startswith("event-loop;")]
+        self.assertTrue(any("test_profiler.busy_handler" in line for line in loop_lines))
+        # Thread names may not contain the separators of the format
+        self.assertTrue(any(line.startswith("ws_server;") and "test_profiler.worker_thread" in line
+                            for line in lines))
+        self.assertFalse(any("sampling-profiler" in line for line in lines))
+        for line in lines:
+            stack, count = line.rsplit(" ", 1)
+            self.assertGreater(int(count), 0)
+            self.assertNotIn(" ", stack)
+
+    async def test_loop_only_with_task_names(self):
+        stop = threading.Event()
+        threading.Thread(target=worker_thread, args=(stop,), daemon=True).start()
+        self.addCleanup(stop.set)
+
+        async def audio_handler():
+            busy_handler(0.15)
+
+        self.profiler.start(0.2, interval_ms=2, threads=THREADS_LOOP, tasks=True)
+        await asyncio.create_task(audio_handler(), name="SmallWebRTCInputTransport#3::audio")
+        await self.wait_done()
+
+        lines = self.profiler.collapsed().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(all(line.startswith("event-loop;task:") for line in lines))
+        self.assertTrue(any(line.startswith("event-loop;task:SmallWebRTCInputTransport#3::audio;") for line in lines))
+
+        top = self.profiler.status()["top"]
+        self.assertEqual(top[0]["function"], "test_profiler.busy_handler")
+        self.assertFalse(any(entry["function"].startswith("task:") for entry in top))
+
+    async def test_one_profile_at_a_time(self):
+        self.profiler.start(5)
+        with self.assertRaises(ProfilerBusy):
+            self.profiler.start(5)
+        self.profiler.stop()
+        self.assertFalse(self.profiler.running)
+
+    def test_limits(self):
+        self.profiler.start(10_000, interval_ms=0.01)
+        self.assertEqual(self.profiler.duration, profiler.MAX_DURATION_SECS)
+        self.assertEqual(self.profiler.interval_ms, profiler.MIN_INTERVAL_MS)
+
+    def test_admin_token(self):
+        with patch.dict("os.environ", {"ADMIN_TOKEN": "secret"}):
+            self.assertTrue(profiler.admin_token_ok("secret"))
+            self.assertFalse(profiler.admin_token_ok(None))
+        with patch.dict("os.environ", {}, clear=True):
+            self.assertFalse(profiler.admin_token_ok(None))
+            self.assertFalse(profiler.admin_token_ok(""))
+
+    def test_off_by_default(self):
+        with patch.dict("os.environ", {}, clear=True):
+            self.assertFalse(profiler.profiler_enabled())
+        with patch.dict("os.environ", {"PROFILER_ENABLED": "1"}):
+            self.assertTrue(profiler.profiler_enabled())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Test script for the prompt modes and the menu lookup function.
+"""
+
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from pipecat.services.llm_service import FunctionCallParams
+
+import prompts
+from food_ordering import current_order_session, process_food_order
+from menu import get_formatted_menu
+from menu_lookup import lookup_menu, process_menu_lookup
+from prompt_benchmark import with_menu_lookups
+from prompts import PROMPT_MODE_COMPACT, PROMPT_MODE_FULL, build_system_instruction, compare_prompts
+
+
+def call(loop, handler, name, arguments):
+    results = []
+
+    async def result_callback(result, *, properties=None):
+        results.append(result)
+
+    loop.run_until_complete(handler(FunctionCallParams(
+        function_name=name, tool_call_id="test", arguments=arguments,
+        llm=None, context=None, result_callback=result_callback,
+    )))
+    return results[-1]
+
+
+class TestPromptModes(unittest.TestCase):
+    """Test cases for building and comparing system prompts."""
+
+    def test_full_prompt_carries_menu(self):
+        self.assertIn(get_formatted_menu(), build_system_instruction(mode=PROMPT_MODE_FULL))
+        self.assertNotIn("MAIN ITEMS", build_system_instruction(mode=PROMPT_MODE_COMPACT))
+
+    def test_compact_prompt_is_much_smaller(self):
+        comparison = compare_prompts()
+        self.assertLess(comparison[PROMPT_MODE_COMPACT]["tokens"] * 4, comparison[PROMPT_MODE_FULL]["tokens"])
+
+    def test_cost_model_counts_menu_lookups(self):
+        looked_up = set()
+        calls = [{"name": "order_food", "arguments": {"action": "add_item", "items": [{"item_id": "burger"}]}}]
+        self.assertEqual([c["name"] for c in with_menu_lookups(calls, looked_up)], ["menu_lookup", "order_food"])
+        # An item the model already looked up costs no extra round trip
+        self.assertEqual(with_menu_lookups(calls, looked_up), calls)
+
+    def test_trigger_instruction_appended(self):
+        self.assertTrue(build_system_instruction("TRIGGER", PROMPT_MODE_COMPACT).endswith("TRIGGER"))
+
+
+class TestMenuLookup(unittest.TestCase):
+    """Test cases for on-demand menu queries."""
+
+    def test_sections(self):
+        drinks = lookup_menu("drinks")
+        self.assertIn("cola", [entry["item_id"] for entry in drinks["entries"]])
+        self.assertEqual(lookup_menu("drink")["section"], "drinks")
+        self.assertEqual(lookup_menu("combos")["entries"][0]["combo_type"], "regular_combo")
+
+    def test_items_by_alias_and_noisy_name(self):
+        self.assertEqual(lookup_menu("coke")["item"]["item_id"], "cola")
+        self.assertEqual(lookup_menu("quesadeeya")["item"]["item_id"], "quesadilla")
+        self.assertTrue(lookup_menu("taco")["item"]["needs_protein"])
+        self.assertEqual(lookup_menu("pizza")["status"], "not_found")
+
+    def test_handler(self):
+        loop = asyncio.new_event_loop()
+        try:
+            result = call(loop, process_menu_lookup, "menu_lookup", {"query": "Fries"})
+        finally:
+            loop.close()
+        self.assertEqual(result["item"]["price"], 2.99)
+
+
+class TestCompactToolResults(unittest.TestCase):
+    """order_food results carry next-step guidance in compact mode."""
+
+    def setUp(self):
+        current_order_session.clear_order()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        current_order_session.clear_order()
+        self.loop.close()
+
+    def test_next_step_only_in_compact_mode(self):
+        arguments = {"action": "add_item", "items": [{"item_id": "fries"}]}
+        result = call(self.loop, process_food_order, "order_food", arguments)
+        self.assertNotIn("next_step", result)
+
+        with patch.object(prompts, "PROMPT_MODE", PROMPT_MODE_COMPACT):
+            result = call(self.loop, process_food_order, "order_food", {"action": "confirm_order", "items": []})
+        self.assertEqual(result["next_step"], prompts.NEXT_STEPS[result["status"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Test script for the speculative cart.
+"""
+
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from pipecat.frames.frames import InterimTranscriptionFrame
+from pipecat.services.llm_service import FunctionCallParams
+from pipecat.tests.utils import run_test
+
+from food_ordering import current_order_session, process_food_order
+from speculative_cart import SpeculativeCartProcessor, speculative_cart
+
+
+def order_params(arguments, results):
+    async def result_callback(result, *, properties=None):
+        results.append(result)
+
+    return FunctionCallParams(
+        function_name="order_food",
+        tool_call_id="test",
+        arguments=arguments,
+        llm=None,
+        context=None,
+        result_callback=result_callback,
+    )
+
+
+class TestSpeculativeCart(unittest.TestCase):
+    """Test cases for preparing and committing cart deltas."""
+
+    def setUp(self):
+        current_order_session.clear_order()
+        speculative_cart.discard()
+        speculative_cart.hits = speculative_cart.misses = 0
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        current_order_session.clear_order()
+        speculative_cart.discard()
+        self.loop.close()
+
+    def test_prepares_priced_lines(self):
+        prepared = speculative_cart.speculate("two large fries and a coke")
+        self.assertEqual([item["item_id"] for item in prepared], ["fries", "cola"])
+        self.assertEqual(prepared[0]["quantity"], 2)
+        self.assertGreater(prepared[0]["price"], 0)
+        self.assertIn("Fries", prepared[0]["description"])
+
+    def test_ignores_utterances_needing_the_llm(self):
+        self.assertIsNone(speculative_cart.speculate("actually make that a combo"))
+
+    def test_matching_call_commits_prepared_lines(self):
+        speculative_cart.speculate("a large fries")
+        results = []
+        arguments = {"action": "add_item", "items": [{"item_id": "fries", "size": "large"}]}
+        self.loop.run_until_complete(process_food_order(order_params(arguments, results)))
+
+        self.assertEqual(speculative_cart.hits, 1)
+        self.assertEqual(results[0]["status"], "items_added")
+        self.assertEqual(len(current_order_session.current_order_items), 1)
+        self.assertEqual(current_order_session.current_order_items[0]["size"], "large")
+
+    def test_mismatched_call_discards_speculation(self):
+        speculative_cart.speculate("a large fries")
+        results = []
+        arguments = {"action": "add_item", "items": [{"item_id": "nachos"}]}
+        self.loop.run_until_complete(process_food_order(order_params(arguments, results)))
+
+        self.assertEqual(speculative_cart.hits, 0)
+        self.assertEqual([item["item_id"] for item in current_order_session.current_order_items], ["nachos"])
+        self.assertIsNone(speculative_cart.commit({"action": "add_item", "items": [{"item_id": "fries", "size": "large"}]}, []))
+
+    def test_overlapping_cart_falls_back(self):
+        current_order_session.start_new_order()
+        current_order_session.add_item_to_order({"item_id": "fries", "quantity": 1, "size": "regular", "protein": None, "price": 2.49, "description": "1x Regular Fries"})
+        speculative_cart.speculate("fries")
+        self.assertIsNone(speculative_cart.commit({"action": "add_item", "items": [{"item_id": "fries"}]}, current_order_session.current_order_items))
+
+    def test_smart_detection_runs_on_speculated_calls(self):
+        current_order_session.start_new_order()
+        current_order_session.add_item_to_order({"item_id": "fries", "quantity": 1, "size": "regular", "protein": None, "price": 2.49, "description": "1x Regular Fries"})
+        prepared = speculative_cart.speculate("a large fries")
+        results = []
+        arguments = {"action": "add_item", "items": [{"item_id": "fries", "size": "large"}]}
+        # Even if a prepared line slips through, an update of the cart isn't added as a new line
+        with patch.object(speculative_cart, "commit", return_value=prepared):
+            self.loop.run_until_complete(process_food_order(order_params(arguments, results)))
+
+        self.assertEqual(len(current_order_session.current_order_items), 1)
+        self.assertEqual(current_order_session.current_order_items[0]["size"], "large")
+
+    def test_processor_speculates_on_interim_frames(self):
+        self.loop.run_until_complete(run_test(
+            SpeculativeCartProcessor(),
+            frames_to_send=[InterimTranscriptionFrame(text="an order of nachos", user_id="", timestamp="")],
+            expected_down_frames=[InterimTranscriptionFrame],
+        ))
+        self.assertIsNotNone(speculative_cart.commit({"action": "add_item", "items": [{"item_id": "nachos"}]}, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Test script for the cold-start helpers used by run.py.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from fastapi import HTTPException
+
+from order_history import OrderHistory
+from startup import BOT_MODE_STANDALONE, BOT_MODE_WEBRTC, StartupTimer, inspect_bot_file, warm_imports
+
+
+class TestInspectBotFile(unittest.TestCase):
+    """Test cases for deciding the bot mode without importing the bot."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def bot_file(self, source):
+        path = os.path.join(self.directory, "bot.py")
+        with open(path, "w") as f:
+            f.write(source)
+        return path
+
+    def test_agent_is_a_webrtc_bot(self):
+        self.assertEqual(inspect_bot_file(os.path.join(os.path.dirname(__file__), "agent.py")), BOT_MODE_WEBRTC)
+
+    def test_standalone_bots(self):
+        self.assertEqual(inspect_bot_file(self.bot_file("async def run_bot():\n    pass\n")), BOT_MODE_STANDALONE)
+        self.assertEqual(inspect_bot_file(self.bot_file("async def main():\n    pass\n")), BOT_MODE_STANDALONE)
+
+    def test_undecided_files(self):
+        self.assertIsNone(inspect_bot_file(self.bot_file("def main():\n    pass\n")))
+        self.assertIsNone(inspect_bot_file(self.bot_file("def run_bot(:\n")))
+        self.assertIsNone(inspect_bot_file(os.path.join(self.directory, "missing.py")))
+
+
+class TestStartupTimer(unittest.TestCase):
+    """Test cases for the startup phase breakdown."""
+
+    def test_phases_and_ready(self):
+        timer = StartupTimer()
+        with timer.phase("import bot"):
+            pass
+        timer.start_phase("server startup")
+        timer.end_phase("server startup")
+        timer.end_phase("never started")
+        timer.mark_ready()
+
+        report = timer.report()
+        self.assertEqual(list(report["phases_ms"]), ["import bot", "server startup"])
+        self.assertIsNotNone(report["time_to_ready_ms"])
+
+    def test_warm_imports_tolerates_missing_modules(self):
+        timer = StartupTimer()
+        warm_imports(["json", "module_that_does_not_exist"], timer)
+        self.assertIn("warm json", timer.report()["phases_ms"])
+
+
+class TestLazyOrderHistory(unittest.TestCase):
+    """The history directory is scanned on first use, not at import."""
+
+    def test_scan_deferred_until_access(self):
+        with patch.object(OrderHistory, "load_history") as load_history:
+            history = OrderHistory()
+            load_history.assert_not_called()
+            history.get_order("INV-0000")
+            history.get_recent_orders()
+            load_history.assert_called_once()
+
+
+class TestBotLoadFailure(unittest.IsolatedAsyncioTestCase):
+    """A bot file that fails to import is reported, not hung on."""
+
+    async def test_offer_and_health_return_503(self):
+        import run
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "broken_bot.py")
+            with open(path, "w") as f:
+                f.write("raise ImportError('missing dependency')\n")
+            with patch.object(run, "bot_file_path", path), patch.object(run, "run_bot_func", None), \
+                    patch.object(run, "bot_loader", None), patch.object(run, "bot_load_error", None):
+                await run.start_bot_loader()
+                with self.assertRaises(HTTPException) as raised:
+                    await run.offer({"sdp": "", "type": "offer"})
+                self.assertEqual(raised.exception.status_code, 503)
+                self.assertIn("missing dependency", raised.exception.detail)
+
+                health = await run.health()
+                self.assertEqual(health.status_code, 503)
+                self.assertIn("missing dependency", json.loads(health.body)["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+Test script for the in-memory static asset cache.
+"""
+
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from static_assets import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, StaticAssetCache
+
+BUNDLE = "static/js/main.3f2a91c4.js"
+BUNDLE_SOURCE = b"console.log('drive thru');\n" * 100
+
+
+class TestStaticAssetCache(unittest.TestCase):
+    """Test cases for serving the React build from memory."""
+
+    def setUp(self):
+        self.build_dir = tempfile.mkdtemp()
+        self.write("index.html", b"<html><body>order screen</body></html>")
+        self.write(BUNDLE, BUNDLE_SOURCE)
+        self.write("images/logo.png", b"\x89PNG" + bytes(2048))
+        self.cache = StaticAssetCache(self.build_dir, reload_interval=0)
+        self.cache.load()
+
+    def tearDown(self):
+        shutil.rmtree(self.build_dir)
+
+    def write(self, relative_path, body):
+        path = os.path.join(self.build_dir, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(body)
+
+    def test_hashed_bundle_is_immutable_and_compressed(self):
+        response = self.cache.response(BUNDLE, {"accept-encoding": "gzip, deflate"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["cache-control"], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.body), BUNDLE_SOURCE)
+
+    def test_index_is_revalidated_and_uncompressed_without_accept_encoding(self):
+        response = self.cache.response("index.html", {})
+        self.assertEqual(response.headers["cache-control"], REVALIDATE_CACHE_CONTROL)
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(response.body, b"<html><body>order screen</body></html>")
+
+    def test_binary_files_are_not_compressed(self):
+        response = self.cache.response("images/logo.png", {"accept-encoding": "gzip"})
+        self.assertEqual(response.media_type, "image/png")
+        self.assertNotIn("content-encoding", response.headers)
+
+    def test_matching_etag_returns_304(self):
+        etag = self.cache.response(BUNDLE, {}).headers["etag"]
+        response = self.cache.response(BUNDLE, {"if-none-match": f'"other", {etag}'})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.body, b"")
+
+    def test_missing_file_returns_none(self):
+        self.assertIsNone(self.cache.response("static/js/missing.js", {}))
+
+    def test_reloads_when_build_changes(self):
+        etag = self.cache.response("index.html", {}).headers["etag"]
+        self.cache._reload_thread.join()
+        self.write("index.html", b"<html><body>new build</body></html>")
+        self.write("static/js/main.9c8b7a6d.js", b"console.log('v2');")
+        self.cache.reload_in_background().join()
+
+        response = self.cache.response("index.html", {"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.body, b"<html><body>new build</body></html>")
+        self.assertIsNotNone(self.cache.get("static/js/main.9c8b7a6d.js"))
+        self.assertEqual(self.cache.reloads, 1)
+
+    def test_requests_do_not_wait_for_a_reload(self):
+        scanning = threading.Event()
+        release = threading.Event()
+        scan = self.cache._scan
+
+        def slow_scan():
+            scanning.set()
+            release.wait(5)
+            return scan()
+
+        self.write("index.html", b"<html><body>new build</body></html>")
+        with patch.object(self.cache, "_scan", slow_scan):
+            self.cache.get("index.html")
+            self.assertTrue(scanning.wait(5))
+            # The reload is still scanning; requests get the current build meanwhile
+            self.assertEqual(self.cache.response("index.html", {}).body, b"<html><body>order screen</body></html>")
+            release.set()
+            self.cache._reload_thread.join()
+        self.assertEqual(self.cache.response("index.html", {}).body, b"<html><body>new build</body></html>")
+
+    def test_missing_build_directory(self):
+        cache = StaticAssetCache(os.path.join(self.build_dir, "nope"))
+        self.assertIsNone(cache.response("index.html", {}))
+
+
+if __name__ == "__main__":
+    unittest.main()
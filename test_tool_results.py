@@ -0,0 +1,81 @@
+"""
+Test script for the lean tool-result encoder.
+"""
+
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from pipecat.services.llm_service import FunctionCallParams
+
+import tool_results
+from food_ordering import current_order_session, process_food_order
+from tool_results import TOOL_RESULT_MODE_LEAN, encode_lean, encode_tool_result, measure_context_savings, to_cents
+
+
+class TestLeanEncoding(unittest.TestCase):
+    """Test cases for encoding order_food results."""
+
+    def test_drops_display_fields_and_uses_cents(self):
+        lean = encode_lean({
+            "invoice_id": "INV-1", "status": "items_removed", "removed_items": ["1x Regular Nachos"],
+            "remaining_items": ["1x Regular Fries"], "total_items": 1, "total_price": 2.99,
+            "timestamp": "2025-01-01 00:00:00",
+        })
+        self.assertEqual(lean, {"status": "items_removed", "removed_items": ["1x Regular Nachos"], "total_cents": 299})
+
+    def test_keeps_messages_the_model_acts_on(self):
+        self.assertIn("message", encode_lean({"status": "error", "message": "Unknown item"}))
+        self.assertNotIn("message", encode_lean({"status": "order_finalized", "message": "Processing payment..."}))
+
+    def test_suggestion_deltas_in_cents(self):
+        lean = encode_lean({"status": "items_added", "next_suggestion": {
+            "type": "combo", "item_id": "nachos", "question": "Combo?", "price_delta": 3.48}})
+        self.assertEqual(lean["next_suggestion"]["price_delta_cents"], 348)
+        self.assertNotIn("price_delta", lean["next_suggestion"])
+
+    def test_rounding(self):
+        self.assertEqual(to_cents(0.1 + 0.2), 30)
+        self.assertEqual(to_cents(None), 0)
+
+    def test_full_mode_passthrough(self):
+        response = {"status": "items_added", "timestamp": "t"}
+        self.assertIs(encode_tool_result(response, "full"), response)
+
+
+class TestLeanToolResults(unittest.TestCase):
+    """process_food_order returns lean results when configured."""
+
+    def setUp(self):
+        current_order_session.clear_order()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        current_order_session.clear_order()
+        self.loop.close()
+
+    def test_lean_result_and_full_cart(self):
+        results = []
+
+        async def result_callback(result, *, properties=None):
+            results.append(result)
+
+        with patch.object(tool_results, "TOOL_RESULT_MODE", TOOL_RESULT_MODE_LEAN):
+            self.loop.run_until_complete(process_food_order(FunctionCallParams(
+                function_name="order_food", tool_call_id="test",
+                arguments={"action": "add_item", "items": [{"item_id": "fries"}]},
+                llm=None, context=None, result_callback=result_callback,
+            )))
+        self.assertEqual(results[0]["total_cents"], 299)
+        self.assertNotIn("timestamp", results[0])
+        # The session (and so the display) keeps full item data
+        self.assertEqual(current_order_session.current_order_items[0]["price"], 2.99)
+
+    def test_measurement_shows_savings(self):
+        measurements = self.loop.run_until_complete(measure_context_savings())
+        self.assertTrue(all(lean < full for full, lean in measurements))
+
+
+if __name__ == "__main__":
+    unittest.main()
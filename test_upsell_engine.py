@@ -0,0 +1,91 @@
+"""
+Test script for the precomputed upsell decision tables.
+"""
+
+import asyncio
+import unittest
+
+from pipecat.services.llm_service import FunctionCallParams
+
+from food_ordering import current_order_session, process_food_order
+from menu import MENU_ITEMS, SIZES, calculate_order_price
+from upsell_engine import RULE_COMBO, RULE_DRINK, RULE_PROTEIN, RULE_SIZE_UPGRADE, UpsellEngine
+
+
+class TestUpsellEngine(unittest.TestCase):
+    """Test cases for rule compilation and suggestion order."""
+
+    def setUp(self):
+        self.engine = UpsellEngine()
+
+    def test_table_compiled_from_menu(self):
+        table = self.engine.compile()
+        self.assertEqual(set(table), set(MENU_ITEMS))
+        self.assertEqual([rule for rule, _ in table["burger"]], [RULE_PROTEIN, RULE_COMBO])
+        self.assertEqual([rule for rule, _ in table["fries"]], [RULE_SIZE_UPGRADE])
+
+    def test_price_deltas_come_from_pricing(self):
+        suggestion = self.engine.next_suggestion([{"item_id": "nachos"}], "INV-1")
+        self.assertEqual(suggestion["type"], RULE_COMBO)
+        expected = calculate_order_price([{"item_id": "nachos", "combo": True, "combo_type": "regular_combo"}]) - \
+            calculate_order_price([{"item_id": "nachos"}])
+        self.assertAlmostEqual(suggestion["price_delta"], expected, places=2)
+
+        suggestion = self.engine.next_suggestion([{"item_id": "fries", "size": "regular"}], "INV-2")
+        self.assertEqual(suggestion["type"], RULE_SIZE_UPGRADE)
+        self.assertEqual(suggestion["price_delta"], SIZES["large"]["price_modifier"])
+
+    def test_protein_first_then_one_offer_each(self):
+        cart = [{"item_id": "taco"}]
+        self.assertEqual(self.engine.next_suggestion(cart, "INV-1")["type"], RULE_PROTEIN)
+        cart[0]["protein"] = "chicken"
+        self.assertEqual(self.engine.next_suggestion(cart, "INV-1")["type"], RULE_COMBO)
+        self.assertEqual(self.engine.next_suggestion(cart, "INV-1")["type"], RULE_DRINK)
+        self.assertIsNone(self.engine.next_suggestion(cart, "INV-1"))
+        # A new order starts fresh
+        self.assertEqual(self.engine.next_suggestion(cart, "INV-2")["type"], RULE_COMBO)
+
+    def test_no_drink_offer_when_combo_or_drink(self):
+        self.engine.next_suggestion([], "INV-1")
+        self.assertIsNone(self.engine.next_suggestion([{"item_id": "nachos", "combo": True}], "INV-1"))
+        self.assertIsNone(self.engine.next_suggestion([{"item_id": "cola", "size": "large"}], "INV-1"))
+
+
+class TestProcessFoodOrderSuggestions(unittest.TestCase):
+    """order_food results carry the next suggestion."""
+
+    def setUp(self):
+        current_order_session.clear_order()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        current_order_session.clear_order()
+        self.loop.close()
+
+    def call(self, arguments):
+        results = []
+
+        async def result_callback(result, *, properties=None):
+            results.append(result)
+
+        self.loop.run_until_complete(process_food_order(FunctionCallParams(
+            function_name="order_food", tool_call_id="test", arguments=arguments,
+            llm=None, context=None, result_callback=result_callback,
+        )))
+        return results[-1]
+
+    def test_add_item_result_has_suggestion(self):
+        result = self.call({"action": "add_item", "items": [{"item_id": "nachos"}]})
+        self.assertEqual(result["status"], "items_added")
+        self.assertEqual(result["next_suggestion"]["type"], RULE_COMBO)
+        self.assertEqual(result["next_suggestion"]["item_id"], "nachos")
+
+    def test_confirm_order_has_no_suggestion(self):
+        self.call({"action": "add_item", "items": [{"item_id": "nachos"}]})
+        result = self.call({"action": "confirm_order", "items": []})
+        self.assertNotIn("next_suggestion", result)
+
+
+if __name__ == "__main__":
+    unittest.main()
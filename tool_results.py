@@ -0,0 +1,139 @@
+"""
+Tool Results - Encoder for order_food results sent back to the LLM
+
+Whatever `process_food_order` returns is appended to the LLM context and read
+by the model on every later turn. The full responses carry display-oriented
+fields the model never needs: invoice ids, formatted timestamps, the whole
+remaining cart after a removal, and prose messages that repeat the status.
+
+TOOL_RESULT_MODE=lean encodes results with minimal keys:
+
+- only the lines this call changed (the cart itself is on the order screen,
+  and in the CURRENT ORDER message when the context is trimmed)
+- money as integer cents (`total_cents`, `price_delta_cents`)
+- no invoice ids, timestamps or repeated status prose
+
+The display hub is unaffected; it is fed from the order session, not from the
+tool result.
+
+Run `python tool_results.py` to measure the context tokens saved per scripted
+conversation.
+"""
+
+import os
+
+from prompts import count_tokens
+
+TOOL_RESULT_MODE_FULL = "full"
+TOOL_RESULT_MODE_LEAN = "lean"
+TOOL_RESULT_MODE = os.getenv("TOOL_RESULT_MODE", TOOL_RESULT_MODE_FULL).lower()
+
+# Fields the model never uses
+LEAN_DROPPED_KEYS = ("invoice_id", "timestamp", "total_items", "remaining_items", "payment_status", "replacement")
+
+# Statuses whose message the model still needs to read out or act on
+LEAN_MESSAGE_STATUSES = ("error", "order_confirmation", "payment_already_processed")
+
+
+def to_cents(amount):
+    """Convert a dollar amount to integer cents."""
+    return int(round((amount or 0) * 100))
+
+
+def encode_lean(response):
+    """
+    Encode an order_food result with minimal keys
+
+    Args:
+        response: Full result dict from process_food_order
+
+    Returns:
+        dict: The lean result
+    """
+    if not isinstance(response, dict):
+        return response
+
+    lean = {}
+    for key, value in response.items():
+        if key in LEAN_DROPPED_KEYS:
+            continue
+        if key == "message" and response.get("status") not in LEAN_MESSAGE_STATUSES:
+            continue
+        if key in ("total_price", "total"):
+            lean["total_cents"] = to_cents(value)
+        elif key == "duplicate_handling":
+            lean["merged"] = [entry.get("item") for entry in value if entry.get("action_taken") == "increased_quantity"]
+        elif key == "next_suggestion" and isinstance(value, dict):
+            suggestion = {k: v for k, v in value.items() if k != "price_delta" and v is not None}
+            delta = value.get("price_delta")
+            if isinstance(delta, dict):
+                suggestion["price_delta_cents"] = {option: to_cents(amount) for option, amount in delta.items()}
+            elif delta is not None:
+                suggestion["price_delta_cents"] = to_cents(delta)
+            lean["next_suggestion"] = suggestion
+        else:
+            lean[key] = value
+    if "merged" in lean and not lean["merged"]:
+        del lean["merged"]
+    return lean
+
+
+def encode_tool_result(response, mode=None):
+    """Encode a result for the LLM context in the given mode (default TOOL_RESULT_MODE)."""
+    if (mode or TOOL_RESULT_MODE) == TOOL_RESULT_MODE_LEAN:
+        return encode_lean(response)
+    return response
+
+
+async def measure_context_savings(conversations=None):
+    """
+    Replay scripted conversations and count the context tokens of their tool results
+
+    Returns:
+        list of (full_tokens, lean_tokens) per conversation
+    """
+    global TOOL_RESULT_MODE
+    import json
+
+    import food_ordering
+    from load_test import SCRIPTED_CONVERSATIONS, NovaSonicStandIn
+
+    stand_in = NovaSonicStandIn()
+    measurements = []
+    # Collect full results, then encode each one both ways
+    previous_mode, TOOL_RESULT_MODE = TOOL_RESULT_MODE, TOOL_RESULT_MODE_FULL
+    try:
+        for script in conversations or SCRIPTED_CONVERSATIONS:
+            food_ordering.current_order_session.clear_order()
+            full_tokens = lean_tokens = 0
+            for turn in script:
+                result = await stand_in.call_tool(turn["arguments"])
+                full_tokens += count_tokens(json.dumps(result))
+                lean_tokens += count_tokens(json.dumps(encode_lean(result)))
+            measurements.append((full_tokens, lean_tokens))
+    finally:
+        TOOL_RESULT_MODE = previous_mode
+        food_ordering.current_order_session.clear_order()
+    return measurements
+
+
+if __name__ == "__main__":
+    import asyncio
+    import contextlib
+    import io
+    import sys
+
+    from loguru import logger
+
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+    with contextlib.redirect_stdout(io.StringIO()):
+        measurements = asyncio.run(measure_context_savings())
+
+    print("Tool-result context tokens per scripted conversation:")
+    for n, (full_tokens, lean_tokens) in enumerate(measurements, 1):
+        saved = (1 - lean_tokens / full_tokens) * 100 if full_tokens else 0
+        print(f"  conversation {n}: full {full_tokens:5d}  lean {lean_tokens:5d}  saved {full_tokens - lean_tokens:5d} ({saved:.0f}%)")
+    total_full = sum(full for full, _ in measurements)
+    total_lean = sum(lean for _, lean in measurements)
+    print(f"  average saved per conversation: {(total_full - total_lean) / max(1, len(measurements)):.0f} tokens")
@@ -0,0 +1,186 @@
+"""
+Upsell Engine - Precomputed upsell decision tables
+
+Instead of describing every upsell in the system prompt ("single burger -> ask
+about a combo", "regular fries -> offer large", ...) and letting the model work
+out what to ask after each tool call, the rules are compiled once from the menu
+into a per-item decision table. After each cart change the engine walks the
+cart against that table and returns the single next suggestion, with its price
+delta already computed by `calculate_order_price`, so the model only has to
+read it out.
+
+Rules, in priority order:
+- protein: an item that needs a protein was added without one
+- combo: a main item that isn't a combo yet
+- size_upgrade: a side or drink that isn't large yet
+- drink: food in the order but nothing to drink
+"""
+
+from menu import (
+    COMBOS,
+    DRINK_ITEMS,
+    MENU_ITEMS,
+    PROTEIN_CLARIFICATION_ITEMS,
+    PROTEIN_OPTIONS,
+    SIDE_ITEMS,
+    SIZES,
+    calculate_order_price,
+)
+
+RULE_PROTEIN = "protein"
+RULE_COMBO = "combo"
+RULE_SIZE_UPGRADE = "size_upgrade"
+RULE_DRINK = "drink"
+
+# Size offered by the size_upgrade rule, and the drink offered by the drink rule
+UPGRADE_SIZE = "large"
+OFFERED_DRINK = "soda"
+
+
+def _is_combo(value):
+    # Same truthiness as food_ordering.normalize_combo_value
+    if isinstance(value, str):
+        return value.lower() not in ("", "false", "0", "no")
+    return bool(value)
+
+
+def _price_delta(before, after):
+    return round(calculate_order_price([after]) - calculate_order_price([before]), 2)
+
+
+def _spoken_list(names):
+    names = list(names)
+    if len(names) < 2:
+        return "".join(names)
+    return f"{', '.join(names[:-1])}, or {names[-1]}"
+
+
+class UpsellEngine:
+    """Per-item upsell rules compiled from one version of the menu."""
+
+    def __init__(self, menu_items=MENU_ITEMS, sizes=SIZES, combos=COMBOS, protein_options=PROTEIN_OPTIONS):
+        self.menu_items = menu_items
+        self.sizes = sizes
+        self.combos = combos
+        self.protein_options = protein_options
+        self.table = {}
+        self._menu_key = None
+        # Suggestions already made for the current order: (rule, item_id)
+        self._offered_order = None
+        self._offered = set()
+
+    def compile(self):
+        """Build the decision table: item_id -> tuple of (rule, payload) in priority order."""
+        table = {}
+        combo_type = next(iter(self.combos), None)
+        protein_names = _spoken_list(option["name"].lower() for option in self.protein_options.values())
+
+        for item_id, item in self.menu_items.items():
+            name = item["name"].lower()
+            rules = []
+
+            if item_id in PROTEIN_CLARIFICATION_ITEMS:
+                rules.append((RULE_PROTEIN, {
+                    "question": f"What protein would you like for your {name}? We have {protein_names}.",
+                    "options": list(self.protein_options),
+                    "price_delta": {
+                        protein: _price_delta({"item_id": item_id}, {"item_id": item_id, "protein": protein})
+                        for protein in self.protein_options
+                    },
+                }))
+
+            if item_id in SIDE_ITEMS or item_id in DRINK_ITEMS:
+                if UPGRADE_SIZE in self.sizes:
+                    # Keyed by the line's current size; "regular" is the unsized default
+                    deltas = {
+                        size: _price_delta({"item_id": item_id, "size": size}, {"item_id": item_id, "size": UPGRADE_SIZE})
+                        for size in ["regular", *self.sizes]
+                        if size != UPGRADE_SIZE
+                    }
+                    rules.append((RULE_SIZE_UPGRADE, {
+                        "question": f"Would you like to upgrade to {self.sizes[UPGRADE_SIZE]['name'].lower()} {name} for ${{delta:.2f}} more?",
+                        "size": UPGRADE_SIZE,
+                        "price_delta": deltas,
+                    }))
+            elif combo_type:
+                combo = self.combos[combo_type]
+                includes = " and ".join(
+                    self.menu_items[included]["name"].lower() for included in combo["includes"] if included in self.menu_items
+                )
+                delta = _price_delta({"item_id": item_id}, {"item_id": item_id, "combo": True, "combo_type": combo_type})
+                rules.append((RULE_COMBO, {
+                    "question": f"Would you like to make that a combo with {includes} for ${delta:.2f} more?",
+                    "combo_type": combo_type,
+                    "price_delta": delta,
+                }))
+
+            table[item_id] = tuple(rules)
+
+        self.table = table
+        self._menu_key = self._current_menu_key()
+        return table
+
+    def next_suggestion(self, items, order_id=None):
+        """
+        Return the single next thing to offer for a cart
+
+        Args:
+            items: Current order items
+            order_id: Invoice the cart belongs to; each offer is made once per order
+
+        Returns:
+            dict with type, item_id, question and price_delta, or None
+        """
+        if self._menu_key != self._current_menu_key():
+            self.compile()
+        if order_id != self._offered_order:
+            self._offered_order = order_id
+            self._offered = set()
+
+        items = [item for item in items if isinstance(item, dict) and item.get("item_id") in self.table]
+
+        # A missing protein blocks the order, so it always comes first
+        for item in items:
+            if not item.get("protein"):
+                for rule, payload in self.table[item["item_id"]]:
+                    if rule == RULE_PROTEIN:
+                        return self._suggest(rule, item["item_id"], payload["question"], payload["price_delta"],
+                                             options=payload["options"])
+
+        # Then offers on the most recently added lines first
+        for item in reversed(items):
+            item_id = item["item_id"]
+            for rule, payload in self.table[item_id]:
+                if (rule, item_id) in self._offered:
+                    continue
+                if rule == RULE_COMBO and not _is_combo(item.get("combo")):
+                    return self._suggest(rule, item_id, payload["question"], payload["price_delta"],
+                                         combo_type=payload["combo_type"])
+                if rule == RULE_SIZE_UPGRADE:
+                    delta = payload["price_delta"].get(item.get("size") or "regular")
+                    if delta and delta > 0:
+                        return self._suggest(rule, item_id, payload["question"].format(delta=delta), delta,
+                                             size=payload["size"])
+
+        # Finally a drink, unless one is already ordered or included in a combo
+        if items and (RULE_DRINK, None) not in self._offered and OFFERED_DRINK in self.menu_items:
+            has_drink = any(item["item_id"] in DRINK_ITEMS or _is_combo(item.get("combo")) for item in items)
+            if not has_drink:
+                delta = _price_delta({"item_id": None}, {"item_id": OFFERED_DRINK})
+                return self._suggest(RULE_DRINK, None, "Can I get you a drink with that?", delta,
+                                     suggested_item_id=OFFERED_DRINK)
+        return None
+
+    def _suggest(self, rule, item_id, question, price_delta, **extra):
+        if rule != RULE_PROTEIN:
+            self._offered.add((rule, item_id))
+        suggestion = {"type": rule, "item_id": item_id, "question": question, "price_delta": price_delta}
+        suggestion.update(extra)
+        return suggestion
+
+    def _current_menu_key(self):
+        return (id(self.menu_items), len(self.menu_items), id(self.combos), len(self.combos))
+
+
+# Global engine for the order pipeline; compiled on first use
+upsell_engine = UpsellEngine()
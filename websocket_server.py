@@ -8,20 +8,52 @@ import websockets
 from datetime import datetime
 from loguru import logger
 
+from display_codec import ENCODING_JSON, EncodedMessage, compression, encode, negotiate, requested_encoding
+from display_liveness import display_liveness
+from display_topics import TopicIndex, matches, message_topics, parse_query, parse_subscription
+from lane_manager import current_lane
+from order_events import (
+    ORDER_CLEARED,
+    ORDER_FINALIZED,
+    ORDER_STARTED,
+    ORDER_UPDATED,
+    display_projection,
+    order_events,
+)
+
 # Global store for active WebSocket connections
 active_connections = set()
-# Store for orders that can be accessed by the order processing function
-orders_store = {}
+# Current display message per order; maintained by the order event stream's display projection
+orders_store = display_projection.orders
+# What each connection subscribed to (by lane, invoice and message type); see display_topics.py
+subscriptions = TopicIndex()
+# Wire encoding each connection asked for on connect; see display_codec.py
+encodings = {}
+# The loop the display server runs on (its own thread in run.py); broadcasts are sent from it
+display_loop = None
+# Dead connections found by the liveness manager stop getting broadcasts at once
+display_liveness.evicted_callbacks.append(active_connections.discard)
+display_liveness.evicted_callbacks.append(subscriptions.remove)
+display_liveness.evicted_callbacks.append(lambda websocket: encodings.pop(websocket, None))
 
-async def register(websocket):
-    """Register a new WebSocket connection."""
+async def register(websocket, path=None):
+    """Register a new WebSocket connection, with the subscription and encoding its URL asks for."""
+    global display_loop
+    display_loop = asyncio.get_running_loop()
     active_connections.add(websocket)
+    subscriptions.subscribe(websocket, parse_query(path))
+    encodings[websocket] = negotiate(requested_encoding(path))
+    display_liveness.add(websocket)
     print(f"New client connected. Total connections: {len(active_connections)}")
     logger.info(f"New client connected. Total connections: {len(active_connections)}")
     
     # Send a welcome message to confirm the connection is working
     try:
-        await websocket.send(json.dumps({"type": "welcome", "message": "Connected to GrillTalk Order Display WebSocket Server"}))
+        await websocket.send(json.dumps({
+            "type": "welcome",
+            "message": "Connected to GrillTalk Order Display WebSocket Server",
+            "encoding": encodings[websocket]
+        }))
         print("Sent welcome message to new client")
         logger.info("Sent welcome message to new client")
     except Exception as e:
@@ -30,34 +62,60 @@ async def register(websocket):
 
 async def unregister(websocket):
     """Unregister a WebSocket connection."""
-    active_connections.remove(websocket)
+    active_connections.discard(websocket)
+    subscriptions.remove(websocket)
+    encodings.pop(websocket, None)
+    display_liveness.remove(websocket)
     logger.info(f"Client disconnected. Total connections: {len(active_connections)}")
 
-async def broadcast_order(order_data):
-    """Broadcast order data to all connected clients."""
+async def broadcast_order(order_data, message=None):
+    """
+    Broadcast order data to the clients subscribed to it.
+    
+    Orders are published from the bot's loop while the display sockets and
+    subscriptions live on the display server's loop, so the broadcast is
+    handed to that loop and awaited from here.
+    
+    Args:
+        order_data: Message dict to broadcast
+        message: Optional pre-serialized JSON for order_data (e.g. an order event's), so it isn't encoded again
+    """
+    loop = display_loop
+    if loop is not None and loop.is_running() and loop is not asyncio.get_running_loop():
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(_send_to_subscribers(order_data, message), loop))
+    else:
+        await _send_to_subscribers(order_data, message)
+
+async def _send_to_subscribers(order_data, message=None):
     if not active_connections:
         print("No active connections to broadcast order to")
         logger.warning("No active connections to broadcast order to")
         return
     
+    if message is None:
+        message = json.dumps(order_data)
+    # Encoded at most once per encoding in use
+    encoded = EncodedMessage(order_data, message)
+    
     # Log the order data for debugging
-    print(f"Broadcasting order: {json.dumps(order_data)}")
-    logger.info(f"Broadcasting order: {json.dumps(order_data)}")
+    print(f"Broadcasting order: {message}")
+    logger.info(f"Broadcasting order: {message}")
     print(f"Active connections: {len(active_connections)}")
     logger.info(f"Active connections: {len(active_connections)}")
-    
-    message = json.dumps(order_data)
+
     try:
-        print(f"Attempting to send order to {len(active_connections)} clients")
-        logger.info(f"Attempting to send order to {len(active_connections)} clients")
-        for connection in active_connections:
+        recipients = subscriptions.recipients(order_data)
+        print(f"Attempting to send order to {len(recipients)} subscribed clients")
+        logger.info(f"Attempting to send order to {len(recipients)} subscribed clients")
+        for connection in recipients:
             try:
-                await connection.send(message)
+                await connection.send(encoded.get(encodings.get(connection, ENCODING_JSON)))
                 print("Successfully sent order to a client")
                 logger.info("Successfully sent order to a client")
             except Exception as e:
                 print(f"Error sending to a specific client: {e}")
                 logger.error(f"Error sending to a specific client: {e}")
+                display_liveness.evict(connection, "send failed")
         print(f"Order broadcast completed")
         logger.info(f"Order broadcast completed")
     except Exception as e:
@@ -67,26 +125,33 @@ async def broadcast_order(order_data):
         print(traceback.format_exc())
         logger.error(traceback.format_exc())
 
-async def heartbeat_monitor():
-    """Monitor connections and send heartbeats to keep them alive."""
-    while True:
-        if active_connections:
-            logger.debug(f"Sending heartbeat to {len(active_connections)} connections")
-            heartbeat_message = json.dumps({"type": "heartbeat", "timestamp": datetime.now().isoformat()})
-            
-            # Create a copy of the set to avoid modification during iteration
-            connections = active_connections.copy()
-            
-            for websocket in connections:
-                try:
-                    await websocket.send(heartbeat_message)
-                except Exception as e:
-                    logger.warning(f"Failed to send heartbeat, connection may be dead: {e}")
-                    # Connection might be dead, but we'll let the normal error handling take care of it
-                    # The connection will be removed when it raises an exception in the main handler
-        
-        # Wait for 30 seconds before sending the next heartbeat
-        await asyncio.sleep(30)
+async def send_current_orders(websocket):
+    """Send the current orders a client is subscribed to."""
+    filters = subscriptions.filters.get(websocket, {})
+    encoding = encodings.get(websocket, ENCODING_JSON)
+    sent = 0
+    for order_id, order in list(orders_store.items()):
+        # Check if this is a finalized order and send as order_history instead
+        if order.get("type") == "order_finalized":
+            # Create a copy of the order with type changed to order_history
+            history_order = order.copy()
+            history_order["type"] = "order_history"
+            if not matches(filters, message_topics(history_order)):
+                continue
+            await websocket.send(encode(history_order, encoding))
+            print(f"Sent order {order_id} as history to avoid duplicate payment screens")
+            logger.info(f"Sent order {order_id} as history to avoid duplicate payment screens")
+        else:
+            if not matches(filters, message_topics(order)):
+                continue
+            # Send regular order update, reusing the event's serialized form
+            await websocket.send(encode(order, encoding, display_projection.serialized(order_id)))
+            print(f"Sent current order {order_id} to new client")
+            logger.info(f"Sent current order {order_id} to new client")
+        sent += 1
+    if not sent:
+        print("No existing orders to send to new client")
+        logger.info("No existing orders to send to new client")
 
 async def websocket_handler(websocket, path):
     """Handle WebSocket connections."""
@@ -94,67 +159,37 @@ async def websocket_handler(websocket, path):
     logger.info(f"New websocket connection handler called with path: {path}")
     
     # Register the new connection
-    await register(websocket)
+    await register(websocket, getattr(websocket, "path", path))
     try:
         # Send existing orders to the new client
-        if orders_store:
-            print(f"Sending {len(orders_store)} existing orders to new client")
-            logger.info(f"Sending {len(orders_store)} existing orders to new client")
-            for order_id, order in orders_store.items():
-                print(f"Sending existing order {order_id} to new client")
-                logger.info(f"Sending existing order {order_id} to new client")
-                
-                # Check if this is a finalized order and send as order_history instead
-                if order.get("type") == "order_finalized":
-                    # Create a copy of the order with type changed to order_history
-                    history_order = order.copy()
-                    history_order["type"] = "order_history"
-                    await websocket.send(json.dumps(history_order))
-                    print(f"Sent order {order_id} as history to avoid duplicate payment screens")
-                    logger.info(f"Sent order {order_id} as history to avoid duplicate payment screens")
-                else:
-                    # Send regular order update
-                    await websocket.send(json.dumps(order))
-                    print(f"Sent current order {order_id} to new client")
-                    logger.info(f"Sent current order {order_id} to new client")
-        else:
-            print("No existing orders to send to new client")
-            logger.info("No existing orders to send to new client")
+        await send_current_orders(websocket)
         
-        # Keep the connection alive and handle incoming messages
-        while True:
+        # Handle incoming messages; display_liveness pings the connection and evicts it if it stops answering
+        async for message in websocket:
+            print(f"Received message from client: {message}")
+            logger.info(f"Received message from client: {message}")
+
             try:
-                # Wait for messages with a timeout to detect disconnections
-                message = await asyncio.wait_for(websocket.recv(), timeout=30.0)
-                
-                # Handle any client messages if needed
-                print(f"Received message from client: {message}")
-                logger.info(f"Received message from client: {message}")
-                
-                try:
-                    data = json.loads(message)
-                    if data.get("type") == "ping":
-                        print("Received ping, sending pong")
-                        logger.info("Received ping, sending pong")
-                        await websocket.send(json.dumps({"type": "pong"}))
-                except json.JSONDecodeError:
-                    logger.warning(f"Received non-JSON message: {message}")
-                    
-            except asyncio.TimeoutError:
-                # Send a ping to check if connection is still alive
-                try:
-                    await websocket.send(json.dumps({"type": "ping"}))
-                    print("Sent ping to check connection")
-                    logger.debug("Sent ping to check connection")
-                except:
-                    print("Connection appears to be dead, breaking")
-                    logger.info("Connection appears to be dead, breaking")
-                    break
-            except websockets.exceptions.ConnectionClosed:
-                print("Connection closed by client")
-                logger.info("Connection closed by client")
-                break
-                
+                data = json.loads(message)
+                if data.get("type") == "ping":
+                    print("Received ping, sending pong")
+                    logger.info("Received ping, sending pong")
+                    await websocket.send(json.dumps({"type": "pong"}))
+                elif data.get("type") in ("subscribe", "unsubscribe"):
+                    # Replace the subscription ("unsubscribe" goes back to everything) and resend what now matches
+                    filters = parse_subscription(data) if data["type"] == "subscribe" else None
+                    subscriptions.subscribe(websocket, filters)
+                    logger.info(f"Client subscribed to {subscriptions.subscription(websocket) or 'everything'}")
+                    await websocket.send(json.dumps({
+                        "type": "subscribed",
+                        "topics": subscriptions.subscription(websocket)
+                    }))
+                    await send_current_orders(websocket)
+            except json.JSONDecodeError:
+                logger.warning(f"Received non-JSON message: {message}")
+        print("Connection closed by client")
+        logger.info("Connection closed by client")
+
     except websockets.exceptions.ConnectionClosed:
         print("Connection closed")
         logger.info("Connection closed")
@@ -169,16 +204,26 @@ async def websocket_handler(websocket, path):
 
 def start_websocket_server(host="0.0.0.0", port=8765):
     """Start the WebSocket server."""
-    return websockets.serve(websocket_handler, host, port)
+    # Keepalive is display_liveness's job, not a task per connection
+    return websockets.serve(websocket_handler, host, port, ping_interval=None, compression=compression())
+
+# Functions called from food_ordering.py; each appends one event to the order
+# event stream and broadcasts that event's serialized form
+
+def _with_lane(message):
+    """Tag a display message with the lane publishing it, so lane displays can subscribe to it."""
+    lane = current_lane.get()
+    if lane is not None:
+        message["lane"] = lane
+    return message
 
-# Function to be called from food_ordering.py to broadcast new orders
 async def publish_order(order_data):
     """Publish a new order to all connected clients."""
-    # Store the order
-    orders_store[order_data["invoice_id"]] = order_data
-    # Log the order data
-    print(f"Publishing order: {json.dumps(order_data)}")
-    logger.info(f"Publishing order: {json.dumps(order_data)}")
+    # The event is typed order_started; the message displays get stays as it was sent
+    message = _with_lane(dict(order_data))
+    event = order_events.append(order_data["invoice_id"], message, message.get("type") or ORDER_STARTED)
+    print(f"Publishing order: {event.json}")
+    logger.info(f"Publishing order: {event.json}")
     # Check if there are any active connections
     if not active_connections:
         print(f"No active connections to publish order to. Active connections: {len(active_connections)}")
@@ -187,53 +232,45 @@ async def publish_order(order_data):
         print(f"Found {len(active_connections)} active connections to publish order to")
         logger.info(f"Found {len(active_connections)} active connections to publish order to")
     # Broadcast to all clients
-    await broadcast_order(order_data)
+    await broadcast_order(event.message, event.json)
     return True
 
 async def publish_order_update(invoice_id, items, status="in_progress"):
     """Publish an order update to all connected clients."""
-    message = {
-        "type": "order_update",
+    event = order_events.append(invoice_id, _with_lane({
+        "type": ORDER_UPDATED,
         "invoice_id": invoice_id,
         "items": items,
         "status": status,
         "timestamp": datetime.now().isoformat()
-    }
-    print(f"Publishing order update: {json.dumps(message)}")
-    logger.info(f"Publishing order update: {json.dumps(message)}")
+    }))
+    print(f"Publishing order update: {event.json}")
+    logger.info(f"Publishing order update: {event.json}")
     
-    # Store the current order state
-    orders_store[invoice_id] = message
-    
-    await broadcast_order(message)
+    await broadcast_order(event.message, event.json)
     return True
 
 async def publish_final_order(order_summary):
     """Publish a finalized order to all connected clients."""
-    message = {
-        "type": "order_finalized",
+    event = order_events.append(order_summary["invoice_id"], _with_lane({
+        "type": ORDER_FINALIZED,
         "order": order_summary,
         "status": "confirmed",
         "timestamp": datetime.now().isoformat()
-    }
-    print(f"Publishing finalized order: {json.dumps(message)}")
-    logger.info(f"Publishing finalized order: {json.dumps(message)}")
-    await broadcast_order(message)
-    # Update the order in the store
-    orders_store[order_summary["invoice_id"]] = message
+    }))
+    print(f"Publishing finalized order: {event.json}")
+    logger.info(f"Publishing finalized order: {event.json}")
+    await broadcast_order(event.message, event.json)
     return True
 
 async def clear_order(invoice_id):
     """Clear an order from the system."""
-    if invoice_id in orders_store:
-        del orders_store[invoice_id]
-    
-    message = {
-        "type": "order_cleared",
+    event = order_events.append(invoice_id, _with_lane({
+        "type": ORDER_CLEARED,
         "invoice_id": invoice_id,
         "timestamp": datetime.now().isoformat()
-    }
-    print(f"Clearing order: {json.dumps(message)}")
-    logger.info(f"Clearing order: {json.dumps(message)}")
-    await broadcast_order(message)
+    }))
+    print(f"Clearing order: {event.json}")
+    logger.info(f"Clearing order: {event.json}")
+    await broadcast_order(event.message, event.json)
     return True
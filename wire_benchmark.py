@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Wire Benchmark - Bytes and encode cost of each display encoding
+
+Builds real carts with food_ordering (random lines from the test catalog),
+and for each cart size encodes the messages a display receives for one
+order: an order_update per line as the cart grows, the order_finalized and
+a transcription per turn. The current path (json.dumps, as the order event
+stream does) is compared with each encoding in display_codec.
+
+Bytes are reported raw and after permessage-deflate as websockets
+negotiates it by default: one raw deflate stream per connection with
+context takeover, a 4 KiB window (12 bits), memLevel 5, flushed per message.
+
+Usage:
+    python wire_benchmark.py
+    python wire_benchmark.py --sizes 1,5,15,40 --repeat 200
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, List
+
+from loguru import logger
+
+import food_ordering
+from display_codec import ENCODING_JSON, available_encodings, encode
+from food_ordering import current_order_session
+from order_events import ORDER_FINALIZED, ORDER_UPDATED
+from test_bulk_add import catering_order
+
+DEFAULT_SIZES = (1, 3, 8, 20)
+
+BASELINE = "json.dumps"
+
+# websockets' permessage-deflate defaults on the server side
+DEFLATE_WINDOW_BITS = 12
+DEFLATE_MEM_LEVEL = 5
+
+
+def order_messages(lines: int, seed: int = 7) -> List[Dict]:
+    """The display messages for one order of `lines` lines, as websocket_server builds them."""
+    current_order_session.clear_order()
+    current_order_session.start_new_order()
+    messages = []
+    for item in catering_order(lines, seed):
+        food_ordering.process_items([item])
+        messages.append({
+            "type": "transcription",
+            "text": f"Can I get {item.get('quantity', 1)} {item['item_id'].replace('_', ' ')}",
+            "isFinal": True,
+            "timestamp": datetime.now().isoformat(),
+        })
+        messages.append({
+            "type": ORDER_UPDATED,
+            "invoice_id": current_order_session.current_invoice_id,
+            "items": current_order_session.snapshot(),
+            "status": "in_progress",
+            "timestamp": datetime.now().isoformat(),
+        })
+    messages.append({
+        "type": ORDER_FINALIZED,
+        "order": json.loads(json.dumps(current_order_session.finalize_order())),
+        "status": "confirmed",
+        "timestamp": datetime.now().isoformat(),
+    })
+    current_order_session.clear_order()
+    return messages
+
+
+def deflated_size(payloads) -> int:
+    """Bytes on the wire with permessage-deflate (context takeover, sync flush per message)."""
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -DEFLATE_WINDOW_BITS, DEFLATE_MEM_LEVEL)
+    total = 0
+    for payload in payloads:
+        data = payload.encode() if isinstance(payload, str) else payload
+        # The 00 00 ff ff tail of each flush isn't sent
+        total += len(compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)) - 4
+    return total
+
+
+def measure(messages: List[Dict], encoding: str, repeat: int) -> Dict:
+    if encoding == BASELINE:
+        encoder = json.dumps
+    else:
+        def encoder(message):
+            return encode(message, encoding)
+
+    payloads = [encoder(message) for message in messages]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message in messages:
+            encoder(message)
+    elapsed = time.perf_counter() - start
+    raw = sum(len(payload.encode() if isinstance(payload, str) else payload) for payload in payloads)
+    return {
+        "encode_us": elapsed / (repeat * len(messages)) * 1e6,
+        "bytes": raw,
+        "deflated": deflated_size(payloads),
+    }
+
+
+def run_benchmark(sizes, repeat: int) -> Dict[int, Dict[str, Dict]]:
+    # The json encoding reuses the event's serialized form, so its cost is the baseline's
+    encodings = [BASELINE] + [encoding for encoding in available_encodings() if encoding != ENCODING_JSON]
+    results = {}
+    for size in sizes:
+        messages = order_messages(size)
+        results[size] = {encoding: measure(messages, encoding, repeat) for encoding in encodings}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare display message encodings on bytes and encode cost")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Cart sizes (order lines)")
+    parser.add_argument("--repeat", type=int, default=100, help="Encodes of each message per measurement")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    sizes = [int(size) for size in args.sizes.split(",")]
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = run_benchmark(sizes, args.repeat)
+    print(f"{'lines':>5s} {'encoding':10s} {'encode us':>9s} {'bytes':>7s} {'vs json':>7s} "
+          f"{'deflated':>8s} {'vs json':>7s}")
+    for size, rows in results.items():
+        baseline = rows[BASELINE]
+        for encoding, row in rows.items():
+            print(f"{size:5d} {encoding:10s} {row['encode_us']:9.1f} {row['bytes']:7d} "
+                  f"{row['bytes'] / baseline['bytes']:7.0%} {row['deflated']:8d} "
+                  f"{row['deflated'] / baseline['deflated']:7.0%}")
+
+
+if __name__ == "__main__":
+    main()